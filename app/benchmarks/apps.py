@@ -0,0 +1,11 @@
+"""Приложение benchmarks."""
+
+from django.apps import AppConfig
+
+
+class BenchmarksConfig(AppConfig):
+    """Базовая конфигурация для приложения benchmarks."""
+
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "benchmarks"
+    verbose_name = "Замеры производительности"
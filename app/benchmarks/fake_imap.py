@@ -0,0 +1,808 @@
+"""Локальный IMAP4-сервер для замеров производительности без сети."""
+
+import asyncio
+import random
+import re
+import shlex
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime
+from email import message_from_bytes
+from email.header import decode_header, make_header
+from email.message import Message
+from email.parser import BytesParser
+from email.utils import parsedate_to_datetime
+from functools import cached_property
+from typing import Awaitable, Callable
+
+from core.constants import BenchmarkConfig, ImapConfig
+
+CRLF = b"\r\n"
+SECTION_PATTERN = re.compile(
+    r"BODY(?:\.PEEK)?\[([\d.]*|HEADER)\](?:<(\d+)\.(\d+)>)?$"
+)
+LITERAL_PATTERN = re.compile(r"\{(\d+)\}$")
+HEADER_FIELDS_PATTERN = re.compile(
+    r"BODY(?:\.PEEK)?\[HEADER\.FIELDS \((.*)\)\]$"
+)
+
+
+@dataclass
+class FakeMessage:
+    """
+    Письмо в почтовом ящике тестового сервера.
+
+    Атрибуты:
+        uid (int): Уникальный идентификатор письма в папке.
+        data (bytes): Письмо в формате RFC 822.
+    """
+
+    uid: int
+    data: bytes
+
+    @cached_property
+    def headers(self) -> Message:
+        """Заголовки письма."""
+        return BytesParser().parsebytes(self.data, headersonly=True)
+
+    @cached_property
+    def message(self) -> Message:
+        """Письмо целиком без декодирования частей."""
+        return message_from_bytes(self.data)
+
+    @cached_property
+    def header(self) -> bytes:
+        """Заголовки письма вместе с завершающей пустой строкой."""
+        end = self.data.find(CRLF + CRLF)
+        return self.data if end < 0 else self.data[: end + 4]
+
+    def header_fields(self, names: list[str]) -> bytes:
+        """
+        Заголовки письма с заданными именами и завершающая пустая строка.
+
+        Аргументы:
+            names (list[str]): Имена заголовков.
+
+        Возвращает:
+            bytes: Заголовки в формате RFC 822.
+        """
+        return (
+            "".join(
+                "%s: %s\r\n" % (name, value)
+                for name in names
+                for value in self.headers.get_all(name) or []
+            ).encode("ascii", "surrogateescape")
+            + CRLF
+        )
+
+    @cached_property
+    def date(self) -> date:
+        """Дата письма из заголовка Date (вместо INTERNALDATE)."""
+        return parsedate_to_datetime(self.headers["Date"]).date()
+
+
+@dataclass
+class FaultPlan:
+    """
+    Неисправности, которые тестовый сервер вносит в обработку команд.
+
+    Неисправность выбирается случайно для каждой команды из commands с
+    заданным seed, поэтому прогон с теми же параметрами воспроизводим.
+
+    Атрибуты:
+        drop_rate (float): Доля команд, после получения которых сервер
+    разрывает соединение без ответа.
+        stall_rate (float): Доля команд, ответ на которые задерживается.
+        stall_seconds (float): Задержка ответа на такие команды в секундах.
+        commands (tuple[str, ...]): Команды, в которые вносятся
+    неисправности.
+        seed (int): Начальное значение генератора случайных чисел.
+    """
+
+    drop_rate: float = 0.0
+    stall_rate: float = 0.0
+    stall_seconds: float = 0.0
+    commands: tuple[str, ...] = BenchmarkConfig.FAULT_COMMANDS
+    seed: int = BenchmarkConfig.SEED
+
+
+def quote(value: str | None) -> str:
+    """
+    Представление значения строкой IMAP в кавычках или NIL.
+
+    Аргументы:
+        value (str | None): Значение.
+
+    Возвращает:
+        str: Строка в кавычках или NIL.
+    """
+    if value is None:
+        return "NIL"
+    return '"%s"' % str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def build_bodystructure(part: Message) -> str:
+    """
+    Формирование BODYSTRUCTURE части письма по RFC 3501.
+
+    Аргументы:
+        part (Message): Письмо или его часть.
+
+    Возвращает:
+        str: BODYSTRUCTURE в синтаксисе IMAP.
+    """
+    if part.is_multipart():
+        return "(%s %s)" % (
+            "".join(
+                build_bodystructure(child) for child in part.get_payload()
+            ),
+            quote(part.get_content_subtype()),
+        )
+    params = " ".join(
+        "%s %s" % (quote(name), quote(value))
+        for name, value in (part.get_params() or [])[1:]
+    )
+    body = section_body(part)
+    fields = [
+        quote(part.get_content_maintype()),
+        quote(part.get_content_subtype()),
+        "(%s)" % params if params else "NIL",
+        "NIL",
+        "NIL",
+        quote(part.get("Content-Transfer-Encoding", "7bit")),
+        str(len(body)),
+    ]
+    if part.get_content_maintype() == "text":
+        fields.append(str(body.count(b"\n")))
+    disposition = part.get_content_disposition()
+    fields.extend(
+        ("NIL", "(%s NIL)" % quote(disposition) if disposition else "NIL")
+    )
+    return "(%s)" % " ".join(fields)
+
+
+def section_body(part: Message) -> bytes:
+    """
+    Тело части письма в кодировании передачи, как его хранит сервер.
+
+    Аргументы:
+        part (Message): Часть письма без вложенных частей.
+
+    Возвращает:
+        bytes: Тело части.
+    """
+    return part.get_payload().encode("ascii", "surrogateescape")
+
+
+def find_section(message: Message, section: str) -> Message:
+    """
+    Поиск части письма по номеру раздела IMAP ("1", "2.1").
+
+    Аргументы:
+        message (Message): Письмо.
+        section (str): Номер раздела.
+
+    Возвращает:
+        Message: Часть письма.
+
+    Вызывает ошибку:
+        IndexError: Если раздела нет в письме.
+    """
+    part = message
+    for number in section.split("."):
+        if part.is_multipart():
+            part = part.get_payload()[int(number) - 1]
+        elif number != "1":
+            raise IndexError(section)
+    return part
+
+
+def header_contains(message: FakeMessage, name: str, value: str) -> bool:
+    """
+    Проверка вхождения подстроки в заголовок письма без учета регистра.
+
+    Аргументы:
+        message (FakeMessage): Письмо.
+        name (str): Имя заголовка.
+        value (str): Искомая подстрока.
+
+    Возвращает:
+        bool: True, если подстрока входит в заголовок.
+    """
+    header = message.headers[name]
+    if header is None:
+        return False
+    return value.lower() in str(make_header(decode_header(header))).lower()
+
+
+def parse_search_date(value: str) -> date:
+    """
+    Разбор даты критерия поиска IMAP (01-Jan-2024).
+
+    Аргументы:
+        value (str): Дата в формате IMAP.
+
+    Возвращает:
+        date: Дата.
+    """
+    return datetime.strptime(value, "%d-%b-%Y").date()
+
+
+SEARCH_KEYS: dict[str, Callable[[FakeMessage, str], bool]] = {
+    "SINCE": lambda message, value: message.date >= parse_search_date(value),
+    "BEFORE": lambda message, value: message.date < parse_search_date(value),
+    "ON": lambda message, value: message.date == parse_search_date(value),
+    "FROM": lambda message, value: header_contains(message, "From", value),
+    "SUBJECT": lambda message, value: header_contains(
+        message, "Subject", value
+    ),
+    "LARGER": lambda message, value: len(message.data) > int(value),
+    "SMALLER": lambda message, value: len(message.data) < int(value),
+}
+SEARCH_FLAGS: dict[str, Callable[[FakeMessage], bool]] = {
+    "ALL": lambda message: True,
+    "UNSEEN": lambda message: True,
+}
+
+
+def parse_message_set(message_set: str, numbers: list[int]) -> list[int]:
+    """
+    Разбор набора сообщений IMAP ("1:5,7,9:*").
+
+    Аргументы:
+        message_set (str): Набор сообщений в синтаксисе IMAP.
+        numbers (list[int]): Существующие номера (порядковые или UID).
+
+    Возвращает:
+        list[int]: Номера из numbers, попавшие в набор.
+    """
+    largest = numbers[-1] if numbers else 0
+    ranges = []
+    for part in message_set.split(","):
+        start, _, end = part.partition(":")
+        start = largest if start == "*" else int(start)
+        end = start if not end else largest if end == "*" else int(end)
+        ranges.append((min(start, end), max(start, end)))
+    return [
+        number
+        for number in numbers
+        if any(start <= number <= end for start, end in ranges)
+    ]
+
+
+def split_fetch_items(items: str) -> list[str]:
+    """
+    Разбиение списка элементов FETCH с учетом скобок.
+
+    Аргументы:
+        items (str): Элементы FETCH, например "(UID BODY.PEEK[HEADER])".
+
+    Возвращает:
+        list[str]: Список элементов в верхнем регистре.
+    """
+    items = items.strip()
+    if items.startswith("(") and items.endswith(")"):
+        items = items[1:-1]
+    result, current, depth = [], "", 0
+    for char in items:
+        if char in "[(":
+            depth += 1
+        elif char in "])":
+            depth -= 1
+        if char == " " and depth == 0:
+            result.append(current)
+            current = ""
+        else:
+            current += char
+    if current:
+        result.append(current)
+    return [item.upper() for item in result]
+
+
+class FakeImapSession:
+    """
+    Сеанс клиента тестового IMAP-сервера.
+
+    Поддерживает подмножество IMAP4rev1, которое использует приложение:
+    CAPABILITY, LOGIN, COMPRESS, LIST, SELECT, SEARCH, FETCH, UID, NOOP и
+    LOGOUT.
+    """
+
+    def __init__(
+        self,
+        server: "FakeImapServer",
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+    ) -> None:
+        """
+        Инициализация сеанса.
+
+        Аргументы:
+            server (FakeImapServer): Сервер, принявший соединение.
+            reader (asyncio.StreamReader): Поток чтения.
+            writer (asyncio.StreamWriter): Поток записи.
+        """
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.selected = None
+        self.buffer = b""
+        self._compressor = None
+        self._decompressor = None
+        self.handlers: dict[
+            str, Callable[[str, str, bool], Awaitable[None]]
+        ] = {
+            "CAPABILITY": self.capability,
+            "LOGIN": self.login,
+            "COMPRESS": self.compress,
+            "LIST": self.list_mailboxes,
+            "SELECT": self.select,
+            "EXAMINE": self.select,
+            "SEARCH": self.search,
+            "FETCH": self.fetch,
+            "NOOP": self.noop,
+            "LOGOUT": self.logout,
+        }
+
+    async def write(self, data: bytes) -> None:
+        """
+        Отправка данных клиенту с учетом объема переданных байт.
+
+        После COMPRESS DEFLATE данные сжимаются, и каждая запись завершается
+        Z_SYNC_FLUSH. Если задана пропускная способность, запись длится
+        столько, сколько заняла бы передача данных по такому соединению.
+
+        Аргументы:
+            data (bytes): Отправляемые данные.
+        """
+        self.server.uncompressed_bytes_sent += len(data)
+        if self._compressor is not None:
+            data = self._compressor.compress(data) + self._compressor.flush(
+                zlib.Z_SYNC_FLUSH
+            )
+        self.server.bytes_sent += len(data)
+        self.writer.write(data)
+        await self.writer.drain()
+        if self.server.bandwidth:
+            await asyncio.sleep(len(data) / self.server.bandwidth)
+
+    async def write_line(self, line: str) -> None:
+        """
+        Отправка строки ответа клиенту.
+
+        Аргументы:
+            line (str): Строка ответа без завершающего CRLF.
+        """
+        await self.write(line.encode() + CRLF)
+
+    async def read_line(self) -> bytes:
+        """
+        Чтение строки команды клиента с распаковкой после COMPRESS DEFLATE.
+
+        Возвращает:
+            bytes: Строка с завершающим LF или пустая строка при закрытии
+        соединения.
+        """
+        if self._decompressor is None:
+            return await self.reader.readline()
+        while b"\n" not in self.buffer:
+            chunk = await self.reader.read(BenchmarkConfig.READ_SIZE)
+            if not chunk:
+                line, self.buffer = self.buffer, b""
+                return line
+            self.buffer += self._decompressor.decompress(chunk)
+        line, _, self.buffer = self.buffer.partition(b"\n")
+        return line + b"\n"
+
+    async def read_bytes(self, size: int) -> bytes:
+        """
+        Чтение литерала команды с распаковкой после COMPRESS DEFLATE.
+
+        Аргументы:
+            size (int): Размер литерала в байтах.
+
+        Возвращает:
+            bytes: Литерал или его часть при закрытии соединения.
+        """
+        if self._decompressor is None:
+            try:
+                return await self.reader.readexactly(size)
+            except asyncio.IncompleteReadError as error:
+                return error.partial
+        while len(self.buffer) < size:
+            chunk = await self.reader.read(BenchmarkConfig.READ_SIZE)
+            if not chunk:
+                break
+            self.buffer += self._decompressor.decompress(chunk)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    async def read_command(self) -> str:
+        """
+        Чтение команды клиента вместе с литералами {n}.
+
+        Перед каждым литералом клиенту отправляется продолжение "+".
+        Литералы подставляются в команду строками в кавычках shlex, чтобы
+        обработчики разбирали их так же, как строки в кавычках IMAP.
+
+        Возвращает:
+            str: Команда без завершающего CRLF или пустая строка при
+        закрытии соединения.
+        """
+        command = line = (await self.read_line()).decode().rstrip("\r\n")
+        match = LITERAL_PATTERN.search(line)
+        while match:
+            await self.write_line("+ Ready for literal data")
+            literal = await self.read_bytes(int(match.group(1)))
+            line = (await self.read_line()).decode().rstrip("\r\n")
+            command = (
+                command[: len(command) - len(match.group(0))]
+                + shlex.quote(literal.decode())
+                + line
+            )
+            match = LITERAL_PATTERN.search(line)
+        return command
+
+    async def run(self) -> None:
+        """Обработка команд клиента до завершения сеанса."""
+        await self.write_line(
+            "* OK [CAPABILITY %s] Fake IMAP ready" % self.server.capabilities
+        )
+        while not self.writer.is_closing():
+            line = await self.read_command()
+            if not line:
+                break
+            tag, _, rest = line.partition(" ")
+            command, _, args = rest.partition(" ")
+            command, uid = command.upper(), False
+            if command == "UID":
+                command, _, args = args.partition(" ")
+                command, uid = command.upper(), True
+            handler = self.handlers.get(command)
+            fault = self.server.draw_fault(command)
+            if fault == BenchmarkConfig.FAULT_DROP:
+                break
+            if fault == BenchmarkConfig.FAULT_STALL:
+                await asyncio.sleep(self.server.faults.stall_seconds)
+            if self.server.latency:
+                await asyncio.sleep(self.server.latency)
+            if handler is None:
+                await self.write_line("%s BAD Unknown command" % tag)
+                continue
+            await handler(tag, args, uid)
+        self.writer.close()
+
+    @property
+    def messages(self) -> list[FakeMessage]:
+        """Письма выбранной папки."""
+        return self.server.mailboxes.get(self.selected, [])
+
+    async def capability(self, tag: str, args: str, uid: bool) -> None:
+        """Ответ на команду CAPABILITY."""
+        await self.write_line("* CAPABILITY %s" % self.server.capabilities)
+        await self.write_line("%s OK CAPABILITY completed" % tag)
+
+    async def login(self, tag: str, args: str, uid: bool) -> None:
+        """Ответ на команду LOGIN."""
+        await self.write_line("%s OK LOGIN completed" % tag)
+
+    async def compress(self, tag: str, args: str, uid: bool) -> None:
+        """Ответ на команду COMPRESS и включение сжатия (RFC 4978)."""
+        if (
+            not self.server.compress
+            or args.upper() != ImapConfig.DEFLATE
+            or self._compressor is not None
+        ):
+            await self.write_line("%s BAD COMPRESS not available" % tag)
+            return
+        await self.write_line("%s OK DEFLATE active" % tag)
+        self._compressor = zlib.compressobj(wbits=ImapConfig.DEFLATE_WBITS)
+        self._decompressor = zlib.decompressobj(wbits=ImapConfig.DEFLATE_WBITS)
+
+    async def noop(self, tag: str, args: str, uid: bool) -> None:
+        """Ответ на команду NOOP."""
+        await self.write_line("%s OK NOOP completed" % tag)
+
+    async def logout(self, tag: str, args: str, uid: bool) -> None:
+        """Ответ на команду LOGOUT и закрытие соединения."""
+        await self.write_line("* BYE Fake IMAP logging out")
+        await self.write_line("%s OK LOGOUT completed" % tag)
+        self.writer.close()
+
+    async def list_mailboxes(self, tag: str, args: str, uid: bool) -> None:
+        """Ответ на команду LIST: все папки без учета шаблона."""
+        for mailbox in self.server.mailboxes:
+            await self.write_line(
+                '* LIST (\\HasNoChildren) "/" %s' % quote(mailbox)
+            )
+        await self.write_line("%s OK LIST completed" % tag)
+
+    async def select(self, tag: str, args: str, uid: bool) -> None:
+        """Ответ на команды SELECT и EXAMINE."""
+        mailbox = shlex.split(args)[0] if args else ""
+        if mailbox not in self.server.mailboxes:
+            await self.write_line("%s NO Mailbox does not exist" % tag)
+            return
+        self.selected = mailbox
+        await self.write_line("* %d EXISTS" % len(self.messages))
+        await self.write_line(
+            "* OK [UIDVALIDITY %d] UIDs valid" % self.server.uidvalidity
+        )
+        await self.write_line(
+            "* OK [UIDNEXT %d] Predicted next UID" % (len(self.messages) + 1)
+        )
+        await self.write_line("%s OK [READ-WRITE] SELECT completed" % tag)
+
+    def search_messages(self, criteria: list[str]) -> list[FakeMessage]:
+        """
+        Отбор писем по критериям поиска.
+
+        Аргументы:
+            criteria (list[str]): Критерии поиска IMAP.
+
+        Возвращает:
+            list[FakeMessage]: Письма, удовлетворяющие всем критериям.
+
+        Вызывает ошибку:
+            KeyError: Если критерий не поддерживается.
+        """
+        if criteria[:1] == ["CHARSET"]:
+            criteria = criteria[2:]
+        found = list(self.messages)
+        keys = iter(criteria)
+        for key in keys:
+            key = key.upper()
+            if key in SEARCH_FLAGS:
+                found = [
+                    message for message in found if SEARCH_FLAGS[key](message)
+                ]
+                continue
+            value = next(keys)
+            if key == "UID":
+                uids = set(
+                    parse_message_set(
+                        value, [message.uid for message in self.messages]
+                    )
+                )
+                found = [message for message in found if message.uid in uids]
+            else:
+                found = [
+                    message
+                    for message in found
+                    if SEARCH_KEYS[key](message, value)
+                ]
+        return found
+
+    async def search(self, tag: str, args: str, uid: bool) -> None:
+        """Ответ на команды SEARCH и UID SEARCH."""
+        if self.selected is None:
+            await self.write_line("%s BAD No mailbox selected" % tag)
+            return
+        try:
+            found = self.search_messages(shlex.split(args))
+        except (KeyError, StopIteration, ValueError):
+            await self.write_line("%s BAD Unsupported search criteria" % tag)
+            return
+        numbers = [
+            message.uid if uid else self.messages.index(message) + 1
+            for message in found
+        ]
+        await self.write_line(
+            " ".join(["* SEARCH"] + [str(number) for number in numbers])
+        )
+        await self.write_line("%s OK SEARCH completed" % tag)
+
+    def fetch_item(self, message: FakeMessage, item: str) -> tuple:
+        """
+        Формирование одного элемента ответа FETCH.
+
+        Аргументы:
+            message (FakeMessage): Письмо.
+            item (str): Запрошенный элемент FETCH.
+
+        Возвращает:
+            tuple: Имя элемента и его значение (str или bytes для литерала).
+        """
+        if item == "UID":
+            return item, str(message.uid)
+        if item == "RFC822.SIZE":
+            return item, str(len(message.data))
+        if item in ("RFC822", "BODY[]", "BODY.PEEK[]"):
+            return item.replace(".PEEK", ""), message.data
+        if item == "BODYSTRUCTURE":
+            return item, build_bodystructure(message.message)
+        fields = HEADER_FIELDS_PATTERN.match(item)
+        if fields is not None:
+            return "BODY[HEADER.FIELDS (%s)]" % fields.group(1), (
+                message.header_fields(fields.group(1).split())
+            )
+        section = SECTION_PATTERN.match(item)
+        if section is None:
+            return item, "NIL"
+        name, origin, length = section.groups()
+        if name == "HEADER":
+            data = message.header
+        else:
+            data = section_body(find_section(message.message, name))
+        if origin is None:
+            return "BODY[%s]" % name, data
+        origin, end = int(origin), int(origin) + int(length)
+        return "BODY[%s]<%d>" % (name, origin), data[origin:end]
+
+    async def fetch(self, tag: str, args: str, uid: bool) -> None:
+        """Ответ на команды FETCH и UID FETCH."""
+        if self.selected is None:
+            await self.write_line("%s BAD No mailbox selected" % tag)
+            return
+        message_set, _, items = args.partition(" ")
+        items = split_fetch_items(items)
+        if uid and "UID" not in items:
+            items.insert(0, "UID")
+        numbers = [
+            message.uid if uid else index + 1
+            for index, message in enumerate(self.messages)
+        ]
+        selected = set(parse_message_set(message_set, numbers))
+        for index, message in enumerate(self.messages):
+            number = message.uid if uid else index + 1
+            if number in selected:
+                await self.write_fetch_response(index + 1, message, items)
+        await self.write_line("%s OK FETCH completed" % tag)
+
+    async def write_fetch_response(
+        self, sequence: int, message: FakeMessage, items: list[str]
+    ) -> None:
+        """
+        Отправка ответа FETCH для одного письма.
+
+        Аргументы:
+            sequence (int): Порядковый номер письма.
+            message (FakeMessage): Письмо.
+            items (list[str]): Запрошенные элементы FETCH.
+        """
+        response = ("* %d FETCH (" % sequence).encode()
+        for position, item in enumerate(items):
+            name, value = self.fetch_item(message, item)
+            separator = b" " if position else b""
+            if isinstance(value, bytes):
+                response += (
+                    separator + ("%s {%d}" % (name, len(value))).encode()
+                )
+                await self.write(response + CRLF + value)
+                response = b""
+            else:
+                response += separator + ("%s %s" % (name, value)).encode()
+        await self.write(response + b")" + CRLF)
+
+
+class FakeImapServer:
+    """
+    Локальный IMAP4-сервер, работающий с синтетическими почтовыми ящиками.
+
+    Атрибуты:
+        mailboxes (dict[str, list[FakeMessage]]): Папки и письма в них.
+        latency (float): Задержка перед ответом на каждую команду в секундах.
+        bandwidth (float): Пропускная способность каждого соединения в
+    байтах в секунду, 0 — без ограничения.
+        faults (FaultPlan): Вносимые неисправности.
+        faults_injected (dict[str, int]): Количество внесенных неисправностей
+    по видам.
+        compress (bool): Поддерживает ли сервер COMPRESS=DEFLATE.
+        bytes_sent (int): Количество байт, отправленных клиентам.
+        uncompressed_bytes_sent (int): Количество байт, отправленных
+    клиентам, до сжатия.
+    """
+
+    def __init__(
+        self,
+        mailboxes: dict[str, list[bytes]],
+        latency: float = 0.0,
+        bandwidth: float = 0.0,
+        host: str = BenchmarkConfig.HOST,
+        faults: FaultPlan = None,
+        compress: bool = False,
+    ) -> None:
+        """
+        Инициализация сервера.
+
+        Аргументы:
+            mailboxes (dict[str, list[bytes]]): Папки и письма в формате
+        RFC 822.
+            latency (float): Задержка ответа на каждую команду в секундах.
+            bandwidth (float): Пропускная способность каждого соединения в
+        байтах в секунду, 0 — без ограничения.
+            host (str): Адрес, на котором сервер принимает соединения.
+            faults (FaultPlan): Вносимые неисправности, по умолчанию без
+        неисправностей.
+            compress (bool): Объявлять ли поддержку COMPRESS=DEFLATE.
+        """
+        self.mailboxes = {
+            name: [
+                FakeMessage(uid=index + 1, data=data)
+                for index, data in enumerate(messages)
+            ]
+            for name, messages in mailboxes.items()
+        }
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.faults = faults or FaultPlan()
+        self.faults_injected = {
+            BenchmarkConfig.FAULT_DROP: 0,
+            BenchmarkConfig.FAULT_STALL: 0,
+        }
+        self._fault_random = random.Random(self.faults.seed)
+        self.host = host
+        self.port = None
+        self.compress = compress
+        self.capabilities = "IMAP4rev1"
+        if compress:
+            self.capabilities += " " + ImapConfig.COMPRESS_DEFLATE
+        self.uidvalidity = BenchmarkConfig.UIDVALIDITY
+        self.bytes_sent = 0
+        self.uncompressed_bytes_sent = 0
+        self._server = None
+
+    def draw_fault(self, command: str) -> str | None:
+        """
+        Выбор неисправности для полученной команды.
+
+        Аргументы:
+            command (str): Имя команды без префикса UID.
+
+        Возвращает:
+            str | None: FAULT_DROP, FAULT_STALL или None.
+        """
+        if command not in self.faults.commands:
+            return None
+        value = self._fault_random.random()
+        if value < self.faults.drop_rate:
+            fault = BenchmarkConfig.FAULT_DROP
+        elif value < self.faults.drop_rate + self.faults.stall_rate:
+            fault = BenchmarkConfig.FAULT_STALL
+        else:
+            return None
+        self.faults_injected[fault] += 1
+        return fault
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        Обработка нового клиентского соединения.
+
+        Аргументы:
+            reader (asyncio.StreamReader): Поток чтения.
+            writer (asyncio.StreamWriter): Поток записи.
+        """
+        try:
+            await FakeImapSession(self, reader, writer).run()
+        except (ConnectionError, asyncio.CancelledError):
+            # Зависшие сеансы отменяются при остановке сервера.
+            writer.close()
+
+    async def start(self) -> int:
+        """
+        Запуск сервера на свободном порту.
+
+        Возвращает:
+            int: Номер порта, на котором запущен сервер.
+        """
+        self._server = await asyncio.start_server(
+            self.handle_connection, self.host, 0
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self) -> None:
+        """Остановка сервера."""
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def __aenter__(self) -> "FakeImapServer":
+        """Запуск сервера при входе в контекстный менеджер."""
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Остановка сервера при выходе из контекстного менеджера."""
+        await self.stop()
@@ -0,0 +1,257 @@
+"""Генератор синтетических почтовых ящиков для замеров производительности."""
+
+import random
+from argparse import ArgumentParser
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from email import policy
+from email.message import EmailMessage
+from email.utils import format_datetime
+from typing import Any
+
+from core.constants import BenchmarkConfig
+
+CYRILLIC_WORDS = (
+    "письмо отчет счет договор встреча проект задача сроки оплата "
+    "поставка клиент документ согласование приложение неделя итоги"
+).split()
+LATIN_WORDS = (
+    "report invoice meeting project deadline payment delivery customer "
+    "document approval attachment weekly summary update status"
+).split()
+
+
+@dataclass
+class MailboxProfile:
+    """
+    Параметры синтетического почтового ящика.
+
+    Атрибуты:
+        messages (int): Количество писем.
+        attachment_ratio (float): Доля писем с вложениями.
+        html_share (float): Доля писем с HTML-версией текста.
+        charsets (dict[str, float]): Кодировки текста и их веса.
+        median_size (int): Медианный размер текста письма в байтах.
+        size_sigma (float): Разброс логнормального распределения размеров.
+        attachment_median_size (int): Медианный размер вложения в байтах.
+        large_ratio (float): Доля писем с крупным вложением.
+        large_size (int): Размер крупного вложения в байтах.
+        seed (int): Начальное значение генератора случайных чисел.
+    """
+
+    messages: int = BenchmarkConfig.MESSAGES
+    attachment_ratio: float = BenchmarkConfig.ATTACHMENT_RATIO
+    html_share: float = BenchmarkConfig.HTML_SHARE
+    charsets: dict[str, float] = field(
+        default_factory=lambda: dict(BenchmarkConfig.CHARSETS)
+    )
+    median_size: int = BenchmarkConfig.MEDIAN_SIZE
+    size_sigma: float = BenchmarkConfig.SIZE_SIGMA
+    attachment_median_size: int = BenchmarkConfig.ATTACHMENT_MEDIAN_SIZE
+    large_ratio: float = BenchmarkConfig.LARGE_RATIO
+    large_size: int = BenchmarkConfig.LARGE_SIZE
+    seed: int = BenchmarkConfig.SEED
+
+
+def parse_weights(value: str) -> dict[str, float]:
+    """
+    Преобразование строки вида "utf-8=0.6,koi8-r=0.4" в словарь весов.
+
+    Аргументы:
+        value (str): Строка с парами "ключ=вес", разделенными запятыми.
+
+    Возвращает:
+        dict[str, float]: Словарь весов.
+    """
+    weights = {}
+    for pair in value.split(","):
+        key, _, weight = pair.partition("=")
+        weights[key.strip()] = float(weight) if weight else 1.0
+    return weights
+
+
+def add_profile_arguments(parser: ArgumentParser) -> None:
+    """
+    Добавление параметров синтетического почтового ящика в команду.
+
+    Аргументы:
+        parser (ArgumentParser): Парсер аргументов команды.
+    """
+    parser.add_argument(
+        "--messages", type=int, default=BenchmarkConfig.MESSAGES
+    )
+    parser.add_argument(
+        "--attachment-ratio",
+        type=float,
+        default=BenchmarkConfig.ATTACHMENT_RATIO,
+    )
+    parser.add_argument(
+        "--html-share", type=float, default=BenchmarkConfig.HTML_SHARE
+    )
+    parser.add_argument(
+        "--charsets",
+        type=parse_weights,
+        default=dict(BenchmarkConfig.CHARSETS),
+        help="utf-8=0.6,koi8-r=0.2,cp1251=0.2",
+    )
+    parser.add_argument(
+        "--median-size", type=int, default=BenchmarkConfig.MEDIAN_SIZE
+    )
+    parser.add_argument(
+        "--size-sigma", type=float, default=BenchmarkConfig.SIZE_SIGMA
+    )
+    parser.add_argument(
+        "--attachment-median-size",
+        type=int,
+        default=BenchmarkConfig.ATTACHMENT_MEDIAN_SIZE,
+    )
+    parser.add_argument(
+        "--large-ratio", type=float, default=BenchmarkConfig.LARGE_RATIO
+    )
+    parser.add_argument(
+        "--large-size", type=int, default=BenchmarkConfig.LARGE_SIZE
+    )
+    parser.add_argument("--seed", type=int, default=BenchmarkConfig.SEED)
+
+
+def profile_from_options(options: dict[str, Any]) -> MailboxProfile:
+    """
+    Параметры почтового ящика из аргументов команды.
+
+    Аргументы:
+        options (dict[str, Any]): Аргументы, добавленные
+    add_profile_arguments.
+
+    Возвращает:
+        MailboxProfile: Параметры почтового ящика.
+    """
+    return MailboxProfile(
+        messages=options["messages"],
+        attachment_ratio=options["attachment_ratio"],
+        html_share=options["html_share"],
+        charsets=options["charsets"],
+        median_size=options["median_size"],
+        size_sigma=options["size_sigma"],
+        attachment_median_size=options["attachment_median_size"],
+        large_ratio=options["large_ratio"],
+        large_size=options["large_size"],
+        seed=options["seed"],
+    )
+
+
+def generate_text(rng: random.Random, charset: str, size: int) -> str:
+    """
+    Генерация текста заданного размера, представимого в кодировке.
+
+    Аргументы:
+        rng (random.Random): Генератор случайных чисел.
+        charset (str): Кодировка текста.
+        size (int): Примерный размер текста в символах.
+
+    Возвращает:
+        str: Сгенерированный текст.
+    """
+    words = CYRILLIC_WORDS
+    if charset.lower() in ("utf-8", "utf8"):
+        words = CYRILLIC_WORDS + LATIN_WORDS
+    parts = []
+    length = 0
+    while length < size:
+        word = rng.choice(words)
+        parts.append(word)
+        length += len(word) + 1
+    return " ".join(parts)
+
+
+def sample_size(rng: random.Random, median: int, sigma: float) -> int:
+    """
+    Выбор размера из логнормального распределения.
+
+    Аргументы:
+        rng (random.Random): Генератор случайных чисел.
+        median (int): Медианный размер.
+        sigma (float): Разброс распределения.
+
+    Возвращает:
+        int: Размер не меньше одного байта.
+    """
+    return max(1, int(median * rng.lognormvariate(0, sigma)))
+
+
+def generate_message(
+    rng: random.Random, profile: MailboxProfile, index: int
+) -> bytes:
+    """
+    Генерация одного синтетического письма в формате RFC 822.
+
+    Аргументы:
+        rng (random.Random): Генератор случайных чисел.
+        profile (MailboxProfile): Параметры почтового ящика.
+        index (int): Порядковый номер письма.
+
+    Возвращает:
+        bytes: Письмо в формате RFC 822.
+    """
+    charset = rng.choices(
+        list(profile.charsets), weights=list(profile.charsets.values())
+    )[0]
+    sent = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=index)
+    message = EmailMessage()
+    message["Message-ID"] = BenchmarkConfig.MESSAGE_ID.format(
+        index=index, seed=profile.seed
+    )
+    message["Subject"] = generate_text(rng, charset, 40)
+    message["From"] = BenchmarkConfig.MAIL_FROM.format(index=index % 50)
+    message["Date"] = format_datetime(sent)
+    message["Received"] = BenchmarkConfig.RECEIVED.format(
+        date=format_datetime(sent + timedelta(seconds=5))
+    )
+    text = generate_text(
+        rng,
+        charset,
+        sample_size(rng, profile.median_size, profile.size_sigma),
+    )
+    message.set_content(text, charset=charset)
+    if rng.random() < profile.html_share:
+        message.add_alternative(
+            BenchmarkConfig.HTML_TEMPLATE.format(text=text),
+            subtype="html",
+            charset=charset,
+        )
+    if rng.random() < profile.attachment_ratio:
+        message.add_attachment(
+            rng.randbytes(
+                sample_size(
+                    rng, profile.attachment_median_size, profile.size_sigma
+                )
+            ),
+            maintype="application",
+            subtype="octet-stream",
+            filename=BenchmarkConfig.ATTACHMENT_FILENAME.format(index=index),
+        )
+    # Без крупных писем генератор дает те же ящики, что и раньше.
+    if profile.large_ratio and rng.random() < profile.large_ratio:
+        message.add_attachment(
+            rng.randbytes(profile.large_size),
+            maintype="application",
+            subtype="octet-stream",
+            filename=BenchmarkConfig.LARGE_FILENAME.format(index=index),
+        )
+    return message.as_bytes(policy=policy.SMTP)
+
+
+def generate_mailbox(profile: MailboxProfile) -> list[bytes]:
+    """
+    Генерация синтетического почтового ящика.
+
+    Аргументы:
+        profile (MailboxProfile): Параметры почтового ящика.
+
+    Возвращает:
+        list[bytes]: Список писем в формате RFC 822.
+    """
+    rng = random.Random(profile.seed)
+    return [
+        generate_message(rng, profile, index)
+        for index in range(profile.messages)
+    ]
@@ -0,0 +1,70 @@
+"""Команда замера холодного запуска."""
+
+import json
+
+from benchmarks.startup_benchmark import (
+    find_startup_problems,
+    run_startup_benchmark,
+)
+from core.constants import BENCH_STARTUP_HELP, BenchmarkConfig
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Замер холодного запуска Django и ASGI-приложения.
+
+    Каждый замер выполняется в новом интерпретаторе с флагом -X importtime.
+    Команда завершается ошибкой, если запуск дольше бюджета или при запуске
+    импортируются модули разбора писем, которые должны загружаться при
+    первом разборе. Бюджет зависит от машины и задается флагами.
+    """
+
+    help = BENCH_STARTUP_HELP
+
+    def add_arguments(self, parser) -> None:
+        """Добавление параметров замера."""
+        parser.add_argument(
+            "--repeat", type=int, default=BenchmarkConfig.STARTUP_REPEAT
+        )
+        parser.add_argument(
+            "--top", type=int, default=BenchmarkConfig.STARTUP_TOP
+        )
+        parser.add_argument(
+            "--setup-budget",
+            type=float,
+            default=BenchmarkConfig.STARTUP_SETUP_BUDGET,
+        )
+        parser.add_argument(
+            "--serve-budget",
+            type=float,
+            default=BenchmarkConfig.STARTUP_SERVE_BUDGET,
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Запуск замера и проверка бюджета."""
+        results = run_startup_benchmark(
+            repeat=options["repeat"], top=options["top"]
+        )
+        self.stdout.write(
+            json.dumps(
+                {
+                    target: {
+                        key: value
+                        for key, value in result.items()
+                        if key != "modules"
+                    }
+                    for target, result in results.items()
+                },
+                indent=2,
+            )
+        )
+        problems = find_startup_problems(
+            results,
+            {
+                BenchmarkConfig.STARTUP_SETUP: options["setup_budget"],
+                BenchmarkConfig.STARTUP_SERVE: options["serve_budget"],
+            },
+        )
+        if problems:
+            raise CommandError("\n".join(problems))
@@ -0,0 +1,65 @@
+"""Команда сквозного замера синхронизации почтового ящика."""
+
+import asyncio
+import json
+import logging
+
+from benchmarks.fake_imap import FaultPlan
+from benchmarks.mailbox_generator import (
+    add_profile_arguments,
+    profile_from_options,
+)
+from benchmarks.sync_benchmark import run_sync_benchmark
+from core.constants import BENCH_SYNC_HELP, BenchmarkConfig
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Сквозной замер синхронизации через локальный IMAP-сервер.
+
+    Генерирует синтетический почтовый ящик, поднимает FakeImapServer и
+    выполняет start_sync -> process_email -> save_email без
+    обращения к сети. Результат выводится в формате JSON.
+    """
+
+    help = BENCH_SYNC_HELP
+
+    def add_arguments(self, parser) -> None:
+        """Добавление параметров синтетического почтового ящика."""
+        add_profile_arguments(parser)
+        parser.add_argument("--latency", type=float, default=0.0)
+        parser.add_argument("--bandwidth", type=float, default=0.0)
+        parser.add_argument("--log-level", default="WARNING")
+        parser.add_argument("--preview", action="store_true")
+        parser.add_argument(
+            "--folders", type=int, default=BenchmarkConfig.FOLDERS
+        )
+        parser.add_argument("--drop-rate", type=float, default=0.0)
+        parser.add_argument("--stall-rate", type=float, default=0.0)
+        parser.add_argument("--stall-seconds", type=float, default=0.0)
+        parser.add_argument("--compress", action="store_true")
+        parser.add_argument("--resync", action="store_true")
+
+    def handle(self, *args, **options) -> None:
+        """Запуск замера и вывод результатов."""
+        profile = profile_from_options(options)
+        report = asyncio.run(
+            run_sync_benchmark(
+                profile,
+                latency=options["latency"],
+                bandwidth=options["bandwidth"],
+                log_level=logging.getLevelName(options["log_level"].upper()),
+                preview=options["preview"],
+                folders=options["folders"],
+                faults=FaultPlan(
+                    drop_rate=options["drop_rate"],
+                    stall_rate=options["stall_rate"],
+                    stall_seconds=options["stall_seconds"],
+                    seed=options["seed"],
+                ),
+                compress=options["compress"],
+                resync=options["resync"],
+            )
+        )
+        self.stdout.write(json.dumps(report, indent=2))
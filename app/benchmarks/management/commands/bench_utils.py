@@ -0,0 +1,97 @@
+"""Команда микробенчмарков функций разбора писем."""
+
+import json
+
+from benchmarks.utils_benchmark import (
+    calibrate_utils_benchmark,
+    find_regressions,
+    load_baseline,
+    run_utils_benchmark,
+    save_baseline,
+)
+from core.constants import (
+    BENCH_UTILS_HELP,
+    UTILS_BENCHMARK_BASELINE_SAVED_MESSAGE,
+    UTILS_BENCHMARK_RECHECK_MESSAGE,
+    BenchmarkConfig,
+)
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    """
+    Микробенчмарки функций разбора писем на корпусе benchmarks/corpus.
+
+    Сравнивает результаты с benchmarks/utils_baseline.json и завершается
+    ошибкой, если лучший замер какой-либо функции стал медленнее допуска с
+    учетом шума, измеренного при сохранении базовых замеров. Базовые
+    замеры зависят от машины, поэтому их нужно обновлять через
+    --update-baseline на той машине, где выполняется проверка: замер
+    запускается --calibration-runs раз, чтобы оценить шум каждой функции.
+    Замедление считается регрессией, только если оно повторяется во всех
+    --attempts замерах: единичный всплеск нагрузки не проваливает проверку.
+    """
+
+    help = BENCH_UTILS_HELP
+
+    def add_arguments(self, parser) -> None:
+        """Добавление параметров замера."""
+        parser.add_argument(
+            "--repeat", type=int, default=BenchmarkConfig.UTILS_REPEAT
+        )
+        parser.add_argument(
+            "--number", type=int, default=BenchmarkConfig.UTILS_NUMBER
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=BenchmarkConfig.UTILS_TOLERANCE,
+        )
+        parser.add_argument("--update-baseline", action="store_true")
+        parser.add_argument(
+            "--calibration-runs",
+            type=int,
+            default=BenchmarkConfig.UTILS_CALIBRATION_RUNS,
+        )
+        parser.add_argument(
+            "--attempts", type=int, default=BenchmarkConfig.UTILS_ATTEMPTS
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Запуск замера и сравнение с базовыми замерами."""
+        if options["update_baseline"]:
+            results, noise = calibrate_utils_benchmark(
+                runs=options["calibration_runs"],
+                repeat=options["repeat"],
+                number=options["number"],
+            )
+            self.stdout.write(json.dumps(results, indent=2))
+            save_baseline(results, noise)
+            self.stdout.write(UTILS_BENCHMARK_BASELINE_SAVED_MESSAGE)
+            return
+        results = run_utils_benchmark(
+            repeat=options["repeat"], number=options["number"]
+        )
+        self.stdout.write(json.dumps(results, indent=2))
+        baseline = load_baseline()
+        regressions = find_regressions(results, baseline, options["tolerance"])
+        for _ in range(options["attempts"] - 1):
+            if not regressions:
+                return
+            self.stdout.write(
+                UTILS_BENCHMARK_RECHECK_MESSAGE.format(
+                    names=", ".join(regressions)
+                )
+            )
+            results = run_utils_benchmark(
+                repeat=options["repeat"], number=options["number"]
+            )
+            regressions = {
+                name: message
+                for name, message in find_regressions(
+                    results, baseline, options["tolerance"]
+                ).items()
+                if name in regressions
+            }
+        if regressions:
+            raise CommandError("\n".join(regressions.values()))
@@ -0,0 +1,74 @@
+"""Команда нагрузочного замера WebSocket-соединений."""
+
+import asyncio
+import json
+import logging
+from functools import partial
+
+from benchmarks.mailbox_generator import (
+    add_profile_arguments,
+    profile_from_options,
+)
+from benchmarks.websocket_benchmark import run_websocket_benchmark
+from core.constants import BENCH_WEBSOCKET_HELP, BenchmarkConfig
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    """
+    Нагрузочный замер EmailListConsumer в одном процессе.
+
+    Для каждого количества клиентов из --clients выполняется отдельный
+    замер: клиенты одновременно синхронизируют почтовые ящики через
+    локальный IMAP-сервер. Результаты выводятся списком в формате JSON,
+    по одному объекту на замер, для автоматического планирования
+    мощностей. Перед замерами выполняется пробный прогон с одним клиентом,
+    чтобы в память на соединение не попадали модули, загружаемые при
+    первом разборе письма.
+    """
+
+    help = BENCH_WEBSOCKET_HELP
+
+    def add_arguments(self, parser) -> None:
+        """Добавление параметров нагрузки и почтового ящика."""
+        add_profile_arguments(parser)
+        parser.set_defaults(messages=BenchmarkConfig.WEBSOCKET_MESSAGES)
+        parser.add_argument(
+            "--clients",
+            type=lambda value: [int(count) for count in value.split(",")],
+            default=BenchmarkConfig.WEBSOCKET_CLIENTS,
+            help="1,10,50",
+        )
+        parser.add_argument("--latency", type=float, default=0.0)
+        parser.add_argument("--ramp", type=float, default=0.0)
+        parser.add_argument(
+            "--timeout", type=float, default=BenchmarkConfig.WEBSOCKET_TIMEOUT
+        )
+        parser.add_argument(
+            "--lag-interval",
+            type=float,
+            default=BenchmarkConfig.LAG_INTERVAL,
+        )
+        parser.add_argument("--channel-layer", action="store_true")
+        parser.add_argument("--no-warmup", action="store_true")
+        parser.add_argument("--log-level", default="WARNING")
+
+    def handle(self, *args, **options) -> None:
+        """Запуск замеров и вывод результатов."""
+        profile = profile_from_options(options)
+        run = partial(
+            run_websocket_benchmark,
+            profile=profile,
+            latency=options["latency"],
+            ramp=options["ramp"],
+            timeout=options["timeout"],
+            lag_interval=options["lag_interval"],
+            channel_layer=options["channel_layer"],
+            log_level=logging.getLevelName(options["log_level"].upper()),
+        )
+        if not options["no_warmup"]:
+            asyncio.run(run(clients=1))
+        reports = [
+            asyncio.run(run(clients=clients)) for clients in options["clients"]
+        ]
+        self.stdout.write(json.dumps(reports, indent=2))
@@ -0,0 +1,166 @@
+"""Замер времени холодного запуска Django и ASGI-приложения."""
+
+import os
+import subprocess
+import sys
+import time
+from typing import Any
+
+from core.constants import (
+    STARTUP_BUDGET_EXCEEDED_MESSAGE,
+    STARTUP_EAGER_IMPORT_MESSAGE,
+    STARTUP_FAILED_MESSAGE,
+    BenchmarkConfig,
+)
+from django.conf import settings
+
+IMPORTTIME_PREFIX = "import time:"
+
+
+def parse_importtime(output: str) -> list[tuple[str, int, int, int]]:
+    """
+    Разбор вывода python -X importtime.
+
+    Аргументы:
+        output (str): Поток ошибок процесса с выводом importtime.
+
+    Возвращает:
+        list[tuple[str, int, int, int]]: Имя модуля, глубина вложенности
+    импорта, собственное и суммарное время импорта в микросекундах.
+    """
+    modules = []
+    start = len(IMPORTTIME_PREFIX)
+    for line in output.splitlines():
+        if not line.startswith(IMPORTTIME_PREFIX):
+            continue
+        own, cumulative, name = line[start:].split("|")
+        if not own.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules.append((name.strip(), depth, int(own), int(cumulative)))
+    return modules
+
+
+def measure_startup(code: str) -> dict[str, Any]:
+    """
+    Запуск нового интерпретатора с замером времени до готовности.
+
+    Аргументы:
+        code (str): Код, выполняемый интерпретатором.
+
+    Возвращает:
+        dict[str, Any]: Время работы процесса, время импортов и список
+    импортированных модулей.
+
+    Вызывает ошибку:
+        RuntimeError: Если процесс завершился с ошибкой.
+    """
+    start = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=settings.BASE_DIR,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+    )
+    seconds = time.perf_counter() - start
+    if process.returncode:
+        raise RuntimeError(process.stderr)
+    modules = parse_importtime(process.stderr)
+    return {
+        "seconds": seconds,
+        "import_seconds": sum(own for _, _, own, _ in modules) / 1e6,
+        "modules": modules,
+    }
+
+
+def run_startup_benchmark(
+    repeat: int = BenchmarkConfig.STARTUP_REPEAT,
+    top: int = BenchmarkConfig.STARTUP_TOP,
+) -> dict[str, dict[str, Any]]:
+    """
+    Замер холодного запуска для каждой цели из STARTUP_TARGETS.
+
+    Цель setup — запуск Django, который выполняет каждая команда
+    manage.py, цель serve — запуск до готовности ASGI-приложения. Каждый
+    замер выполняется в новом процессе, и берется лучший из repeat
+    замеров, чтобы снизить влияние фоновой нагрузки.
+
+    Аргументы:
+        repeat (int): Количество повторов замера.
+        top (int): Количество самых долгих импортов верхнего уровня в
+    результате.
+
+    Возвращает:
+        dict[str, dict[str, Any]]: Результаты замера по целям.
+    """
+    results = {}
+    for target, code in BenchmarkConfig.STARTUP_TARGETS.items():
+        try:
+            best = min(
+                (measure_startup(code) for _ in range(max(repeat, 1))),
+                key=lambda run: run["seconds"],
+            )
+        except RuntimeError as error:
+            results[target] = {"error": str(error)}
+            continue
+        modules = best["modules"]
+        roots = sorted(
+            (module for module in modules if module[1] == 0),
+            key=lambda module: module[3],
+            reverse=True,
+        )
+        results[target] = {
+            "seconds": round(best["seconds"], 6),
+            "import_seconds": round(best["import_seconds"], 6),
+            "modules": [name for name, *_ in modules],
+            "top_imports": {
+                name: round(cumulative / 1000, 3)
+                for name, _, _, cumulative in roots[:top]
+            },
+        }
+    return results
+
+
+def find_startup_problems(
+    results: dict[str, dict[str, Any]],
+    budgets: dict[str, float],
+    deferred_modules: tuple[str, ...] = (
+        BenchmarkConfig.STARTUP_DEFERRED_MODULES
+    ),
+) -> list[str]:
+    """
+    Поиск превышений бюджета и лишних импортов при запуске.
+
+    Аргументы:
+        results (dict[str, dict[str, Any]]): Результаты замера.
+        budgets (dict[str, float]): Бюджет времени запуска в секундах по
+    целям.
+        deferred_modules (tuple[str, ...]): Модули, которые должны
+    загружаться при первом использовании, а не при запуске.
+
+    Возвращает:
+        list[str]: Описания найденных проблем.
+    """
+    problems = []
+    for target, result in results.items():
+        if "error" in result:
+            problems.append(
+                STARTUP_FAILED_MESSAGE.format(
+                    target=target, error=result["error"]
+                )
+            )
+            continue
+        budget = budgets.get(target)
+        if budget is not None and result["seconds"] > budget:
+            problems.append(
+                STARTUP_BUDGET_EXCEEDED_MESSAGE.format(
+                    target=target, seconds=result["seconds"], budget=budget
+                )
+            )
+        problems.extend(
+            STARTUP_EAGER_IMPORT_MESSAGE.format(target=target, module=module)
+            for module in deferred_modules
+            if module in result["modules"]
+        )
+    return problems
@@ -0,0 +1,341 @@
+"""Сквозной замер синхронизации почтового ящика через локальный IMAP."""
+
+import gc
+import logging
+import math
+import resource
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import ExitStack
+from typing import Any, Callable
+from unittest import mock
+
+from benchmarks.fake_imap import FakeImapServer, FaultPlan
+from benchmarks.mailbox_generator import MailboxProfile, generate_mailbox
+from core.constants import (
+    CONSUMER,
+    INBOX,
+    NEW_EMAIL,
+    PREVIEW,
+    RECEIVED,
+    SAVE_EMAIL_TO_DB,
+    SENT,
+    SYNC_STATE,
+    TYPE,
+    WINDOW_DAYS,
+    BenchmarkConfig,
+    SerializationConfig,
+)
+from django.test import override_settings
+from email_account.models import EmailAccount
+from mail_recipient import consumers, fetch_emails, imap_pool
+from mail_recipient.consumers import EmailListConsumer
+from mail_recipient.models import Email, SyncState
+from mail_recipient.serialization import dumps
+from prometheus_client import REGISTRY
+
+SYNC_LOGGERS = ("fetch_emails", CONSUMER, SAVE_EMAIL_TO_DB, SYNC_STATE)
+# Начало кадра NEW_EMAIL без закрывающей скобки.
+NEW_EMAIL_FRAME_PREFIX = dumps({TYPE: NEW_EMAIL}).removesuffix(
+    SerializationConfig.FRAME_END
+)
+
+
+class StageTimer:
+    """
+    Накопитель времени, затраченного на этапы синхронизации.
+
+    Атрибуты:
+        totals (dict[str, float]): Суммарное время этапов в секундах.
+        calls (dict[str, int]): Количество вызовов этапов.
+    """
+
+    def __init__(self) -> None:
+        """Инициализация пустых счетчиков."""
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        """
+        Оборачивание корутины с замером времени ее выполнения.
+
+        Аргументы:
+            stage (str): Название этапа.
+            func (Callable): Оборачиваемая корутина.
+
+        Возвращает:
+            Callable: Корутина с замером времени.
+        """
+
+        async def timed(*args, **kwargs) -> Any:
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.totals[stage] += time.perf_counter() - start
+                self.calls[stage] += 1
+
+        return timed
+
+    def instrument(self) -> ExitStack:
+        """
+        Подмена этапов синхронизации обертками с замером времени.
+
+        Возвращает:
+            ExitStack: Контекст, восстанавливающий исходные функции.
+        """
+        stack = ExitStack()
+        for module, name, stage in (
+            (imap_pool, "connect_imap", "connect"),
+            (consumers, "get_folder_emails", "plan"),
+            (consumers, "check_email", "fetch"),
+            (consumers, "read_email", "parse_and_save"),
+            (fetch_emails, "save_email", "save"),
+        ):
+            stack.enter_context(
+                mock.patch.object(
+                    module, name, self.wrap(stage, getattr(module, name))
+                )
+            )
+        return stack
+
+    def report(self) -> dict[str, dict[str, float]]:
+        """
+        Формирование отчета по этапам.
+
+        Время разбора письма считается как разница между временем чтения
+        письма и временем его сохранения.
+
+        Возвращает:
+            dict[str, dict[str, float]]: Время и количество вызовов этапов.
+        """
+        totals = dict(self.totals)
+        calls = dict(self.calls)
+        totals["parse"] = totals.pop("parse_and_save", 0.0) - totals.get(
+            "save", 0.0
+        )
+        calls["parse"] = calls.pop("parse_and_save", 0)
+        return {
+            stage: {"seconds": round(seconds, 6), "calls": calls[stage]}
+            for stage, seconds in totals.items()
+        }
+
+
+class FrameCollector:
+    """
+    Замена отправки WebSocket-кадров с подсчетом их количества и объема.
+
+    Атрибуты:
+        frames (int): Количество кадров.
+        bytes (int): Объем кадров в символах.
+        email_times (list[float]): Моменты отправки кадров NEW_EMAIL по
+    time.perf_counter.
+    """
+
+    def __init__(self) -> None:
+        """Инициализация пустых счетчиков."""
+        self.frames = 0
+        self.bytes = 0
+        self.email_times = []
+
+    async def send(self, text_data: str = None, **kwargs) -> None:
+        """
+        Учет отправляемого кадра.
+
+        Аргументы:
+            text_data (str): Текст кадра.
+        """
+        self.frames += 1
+        self.bytes += len(text_data or "")
+        if text_data and text_data.startswith(NEW_EMAIL_FRAME_PREFIX):
+            self.email_times.append(time.perf_counter())
+
+    def time_to_share(self, start: float, total: int) -> float | None:
+        """
+        Время до отправки клиенту доли BenchmarkConfig.FRAMES_SHARE писем.
+
+        Аргументы:
+            start (float): Начало замера по time.perf_counter.
+            total (int): Количество писем почтового ящика.
+
+        Возвращает:
+            float | None: Время в секундах или None, если столько писем
+        отправлено не было.
+        """
+        index = math.ceil(total * BenchmarkConfig.FRAMES_SHARE) - 1
+        if not 0 <= index < len(self.email_times):
+            return None
+        return round(sorted(self.email_times)[index] - start, 6)
+
+
+def compression_seconds() -> float:
+    """
+    Процессорное время клиента на сжатие и распаковку IMAP-трафика.
+
+    Возвращает:
+        float: Значение счетчика mail_imap_compression_seconds в секундах.
+    """
+    return sum(
+        REGISTRY.get_sample_value(
+            "mail_imap_compression_seconds_total", {"direction": direction}
+        )
+        or 0.0
+        for direction in (RECEIVED, SENT)
+    )
+
+
+async def cleanup_benchmark_emails() -> None:
+    """Удаление писем и контрольных точек предыдущих замеров."""
+    await Email.objects.filter(
+        message_id__endswith=BenchmarkConfig.MESSAGE_ID_DOMAIN
+    ).adelete()
+    await SyncState.objects.filter(
+        email_account__email=BenchmarkConfig.EMAIL
+    ).adelete()
+
+
+async def sync_mailbox(
+    email_account: EmailAccount, preview: bool, collector: FrameCollector
+) -> None:
+    """
+    Синхронизация почтового ящика без начального окна до завершения.
+
+    Аргументы:
+        email_account (EmailAccount): Учетная запись электронной почты.
+        preview (bool): Выполнять ли синхронизацию в режиме предпросмотра.
+        collector (FrameCollector): Получатель кадров клиенту.
+    """
+    consumer = EmailListConsumer()
+    consumer.send = collector.send
+    await consumer.start_sync(
+        email_account, {WINDOW_DAYS: 0, PREVIEW: preview}
+    )
+    await consumer.fetch_task
+
+
+async def run_sync_benchmark(
+    profile: MailboxProfile,
+    latency: float = 0.0,
+    log_level: int = logging.WARNING,
+    preview: bool = False,
+    folders: int = BenchmarkConfig.FOLDERS,
+    faults: FaultPlan = None,
+    compress: bool = False,
+    resync: bool = False,
+    bandwidth: float = 0.0,
+) -> dict[str, Any]:
+    """
+    Сквозной замер синхронизации синтетического почтового ящика.
+
+    Выполняет start_sync, process_email и save_email для почтового ящика,
+    обслуживаемого локальным FakeImapServer, без начального окна. Письма
+    распределяются по папкам по очереди, начиная с INBOX. Вложения
+    сохраняются во временный каталог, письма удаляются после замера.
+    Неисправности faults проверяют переподключение и повтор запросов:
+    количество сохраненных писем должно совпасть с размером ящика. С
+    compress сервер поддерживает COMPRESS=DEFLATE, и отчет сравнивает объем
+    переданных данных до и после сжатия с процессорным временем клиента на
+    сжатие и распаковку. С resync замеряется повторная синхронизация после
+    смены UIDVALIDITY всех папок: письма уже сохранены, и этап fetch
+    показывает, сколько из них загружено с сервера заново. Ограничение
+    bandwidth делает время загрузки письма пропорциональным его размеру, и
+    поле emails_95_seconds показывает, через сколько секунд клиент получил
+    95% писем.
+
+    Аргументы:
+        profile (MailboxProfile): Параметры почтового ящика.
+        latency (float): Задержка ответа IMAP-сервера на команду в секундах.
+        log_level (int): Уровень логирования модулей синхронизации.
+        preview (bool): Выполнять ли синхронизацию в режиме предпросмотра.
+        folders (int): Количество папок почтового ящика.
+        faults (FaultPlan): Неисправности, вносимые IMAP-сервером.
+        compress (bool): Поддерживает ли IMAP-сервер COMPRESS=DEFLATE.
+        resync (bool): Замерять ли повторную синхронизацию после смены
+    UIDVALIDITY.
+        bandwidth (float): Пропускная способность каждого IMAP-соединения в
+    байтах в секунду, 0 — без ограничения.
+
+    Возвращает:
+        dict[str, Any]: Результаты замера.
+    """
+    mailbox = generate_mailbox(profile)
+    mailbox_bytes = sum(len(message) for message in mailbox)
+    folders = max(folders, 1)
+    mailboxes = {
+        (
+            BenchmarkConfig.FOLDER.format(index=index) if index else INBOX
+        ): mailbox[index::folders]
+        for index in range(folders)
+    }
+    for logger_name in SYNC_LOGGERS:
+        logging.getLogger(logger_name).setLevel(log_level)
+    email_account, _ = await EmailAccount.objects.aget_or_create(
+        email=BenchmarkConfig.EMAIL,
+        defaults={"password": BenchmarkConfig.PASSWORD},
+    )
+    await cleanup_benchmark_emails()
+    timer = StageTimer()
+    collector = FrameCollector()
+    async with FakeImapServer(
+        mailboxes,
+        latency=latency,
+        bandwidth=bandwidth,
+        faults=faults,
+        compress=compress,
+    ) as server:
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            IMAP_HOST=server.host,
+            IMAP_PORT=server.port,
+            IMAP_USE_SSL=False,
+            MEDIA_ROOT=media_root,
+        ):
+            if resync:
+                await sync_mailbox(email_account, preview, FrameCollector())
+                server.uidvalidity += 1
+                server.bytes_sent = server.uncompressed_bytes_sent = 0
+            rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            gc_before = [stats["collections"] for stats in gc.get_stats()]
+            compression_before = compression_seconds()
+            with timer.instrument():
+                start = time.perf_counter()
+                await sync_mailbox(email_account, preview, collector)
+                elapsed = time.perf_counter() - start
+            compression_cpu = compression_seconds() - compression_before
+            gc_collections = [
+                stats["collections"] - before
+                for stats, before in zip(gc.get_stats(), gc_before)
+            ]
+    saved = await Email.objects.filter(
+        message_id__endswith=BenchmarkConfig.MESSAGE_ID_DOMAIN
+    ).acount()
+    await cleanup_benchmark_emails()
+    total = len(mailbox)
+    return {
+        "messages": total,
+        "saved": saved,
+        "folders": folders,
+        "resync": resync,
+        "mailbox_bytes": mailbox_bytes,
+        "transferred_bytes": server.bytes_sent,
+        "seconds": round(elapsed, 6),
+        "emails_per_second": round(total / elapsed, 2),
+        "emails_95_seconds": collector.time_to_share(start, total),
+        "bytes_per_second": round(server.bytes_sent / elapsed, 2),
+        "compression": {
+            "offered": compress,
+            "uncompressed_bytes": server.uncompressed_bytes_sent,
+            "saved_share": round(
+                1 - server.bytes_sent / max(server.uncompressed_bytes_sent, 1),
+                4,
+            ),
+            "client_cpu_seconds": round(compression_cpu, 6),
+        },
+        "rss_before_kb": rss_before,
+        "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "gc_collections": gc_collections,
+        "frames": collector.frames,
+        "frame_bytes": collector.bytes,
+        "faults": server.faults_injected,
+        "stages": timer.report(),
+    }
@@ -0,0 +1,30 @@
+"""Тесты проверки регрессий микробенчмарков."""
+
+from benchmarks.utils_benchmark import find_regressions
+from django.test import SimpleTestCase
+
+BASELINE = {
+    "results": {"decode_text": 0.002, "parse_dates": 0.0001},
+    "noise": {"decode_text": 0.05, "parse_dates": 0.02},
+}
+
+
+class FindRegressionsTests(SimpleTestCase):
+    """Сравнение замеров с базовыми с учетом шума."""
+
+    def test_slowdown_within_noise_passes(self) -> None:
+        """Замедление в пределах допуска и шума не считается регрессией."""
+        results = {"decode_text": 0.0025, "parse_dates": 0.00012}
+        self.assertEqual(find_regressions(results, BASELINE, 0.2), {})
+
+    def test_slowdown_over_tolerance_fails(self) -> None:
+        """Замедление на 40% обнаруживается независимо от других функций."""
+        results = {"decode_text": 0.0028, "parse_dates": 0.00008}
+        self.assertEqual(
+            list(find_regressions(results, BASELINE, 0.2)), ["decode_text"]
+        )
+
+    def test_new_function_is_skipped(self) -> None:
+        """Функция без базового замера не сравнивается."""
+        results = {"decode_text": 0.002, "new_case": 1.0}
+        self.assertEqual(find_regressions(results, BASELINE, 0.2), {})
@@ -0,0 +1,265 @@
+"""Микробенчмарки функций разбора писем из core.utils."""
+
+import json
+import math
+import os
+import platform
+import statistics
+import timeit
+from contextlib import suppress
+from email.message import Message
+from email.parser import BytesParser
+from typing import Any, Callable
+
+from core.constants import (
+    DATE,
+    RECEIVED,
+    SUBJECT,
+    UTILS_BENCHMARK_REGRESSION_MESSAGE,
+    AttachmentConfig,
+    BenchmarkConfig,
+)
+from core.utils import (
+    decode_text,
+    email_policy,
+    extract_text_from_message,
+    get_attachments_from_message,
+    parse_email_date,
+    parse_received_date,
+    sanitize_and_truncate_filename,
+)
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(BENCHMARKS_DIR, BenchmarkConfig.CORPUS_DIR)
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, BenchmarkConfig.UTILS_BASELINE)
+
+
+def load_corpus(corpus_dir: str = CORPUS_DIR) -> list[Message]:
+    """
+    Загрузка и разбор писем из каталога с файлами .eml.
+
+    Аргументы:
+        corpus_dir (str): Каталог с письмами.
+
+    Возвращает:
+        list[Message]: Разобранные письма в порядке имен файлов.
+    """
+    messages = []
+    for name in sorted(os.listdir(corpus_dir)):
+        if name.endswith(BenchmarkConfig.EML_EXTENSION):
+            with open(os.path.join(corpus_dir, name), "rb") as file:
+                messages.append(
+                    BytesParser(policy=email_policy).parsebytes(file.read())
+                )
+    return messages
+
+
+def build_cases(messages: list[Message]) -> dict[str, Callable[[], Any]]:
+    """
+    Подготовка замеряемых вызовов функций разбора по всему корпусу.
+
+    Ошибки разбора некорректных заголовков подавляются: путь обработки
+    ошибки тоже входит в замер.
+
+    Аргументы:
+        messages (list[Message]): Разобранные письма корпуса.
+
+    Возвращает:
+        dict[str, Callable[[], Any]]: Имя функции и вызов без аргументов.
+    """
+    payloads = [
+        part.get_payload(decode=True)
+        for message in messages
+        for part in message.walk()
+        if part.get_content_maintype() == "text"
+    ]
+    filenames = [str(message[SUBJECT.title()]) for message in messages] + [
+        part.get_filename()
+        for message in messages
+        for part in message.walk()
+        if part.get_filename()
+    ]
+    dates = [str(message[DATE.title()]) for message in messages]
+    received = [str(message[RECEIVED.title()]) for message in messages]
+
+    def parse_dates() -> None:
+        for date, received_date in zip(dates, received):
+            with suppress(ValueError):
+                parse_email_date(date)
+            with suppress(IndexError, ValueError):
+                parse_received_date(received_date)
+
+    return {
+        extract_text_from_message.__name__: lambda: [
+            extract_text_from_message(message) for message in messages
+        ],
+        decode_text.__name__: lambda: [
+            decode_text(payload) for payload in payloads
+        ],
+        get_attachments_from_message.__name__: lambda: [
+            get_attachments_from_message(message) for message in messages
+        ],
+        sanitize_and_truncate_filename.__name__: lambda: [
+            sanitize_and_truncate_filename(
+                filename, AttachmentConfig.ATTACHMENT_FILENAME_MAX_LENGTH
+            )
+            for filename in filenames
+        ],
+        BenchmarkConfig.PARSE_DATES_CASE: parse_dates,
+    }
+
+
+def run_utils_benchmark(
+    repeat: int = BenchmarkConfig.UTILS_REPEAT,
+    number: int = BenchmarkConfig.UTILS_NUMBER,
+) -> dict[str, float]:
+    """
+    Замер времени функций разбора на корпусе писем.
+
+    Функции замеряются по очереди в каждом из repeat кругов короткими
+    измерениями около UTILS_MEASURE_SECONDS секунд, и для каждой функции
+    берется лучшее измерение. Фоновая нагрузка только замедляет измерения,
+    поэтому лучшее из многих коротких измерений почти не меняется от
+    запуска к запуску, а медиана длинных измерений отличается на десятки
+    процентов вместе со скоростью машины.
+
+    Аргументы:
+        repeat (int): Количество повторов измерения.
+        number (int): Минимальное количество прогонов корпуса в одном
+    измерении.
+
+    Возвращает:
+        dict[str, float]: Лучшее время одного прогона корпуса в секундах.
+    """
+    timers = {}
+    for name, case in build_cases(load_corpus()).items():
+        timer = timeit.Timer(case)
+        single = timer.timeit(number=1)
+        timers[name] = (
+            timer,
+            max(
+                number,
+                math.ceil(BenchmarkConfig.UTILS_MEASURE_SECONDS / single),
+            ),
+        )
+    timings = {name: [] for name in timers}
+    for _ in range(repeat):
+        for name, (timer, loops) in timers.items():
+            timings[name].append(timer.timeit(number=loops) / loops)
+    return {name: min(samples) for name, samples in timings.items()}
+
+
+def calibrate_utils_benchmark(
+    runs: int = BenchmarkConfig.UTILS_CALIBRATION_RUNS,
+    repeat: int = BenchmarkConfig.UTILS_REPEAT,
+    number: int = BenchmarkConfig.UTILS_NUMBER,
+) -> tuple[dict[str, float], dict[str, float]]:
+    """
+    Базовые замеры и шум каждой функции по нескольким запускам замера.
+
+    Базовым замером служит медиана результатов запусков, а шумом —
+    наибольшее замедление отдельного запуска относительно нее.
+
+    Аргументы:
+        runs (int): Количество запусков замера.
+        repeat (int): Количество повторов измерения в запуске.
+        number (int): Минимальное количество прогонов корпуса в одном
+    измерении.
+
+    Возвращает:
+        tuple[dict[str, float], dict[str, float]]: Базовое время одного
+    прогона корпуса в секундах и относительный шум.
+    """
+    runs_results = [
+        run_utils_benchmark(repeat=repeat, number=number)
+        for _ in range(max(runs, 1))
+    ]
+    results, noise = {}, {}
+    for name in runs_results[0]:
+        samples = [run_results[name] for run_results in runs_results]
+        results[name] = statistics.median(samples)
+        noise[name] = max(samples) / results[name] - 1
+    return results, noise
+
+
+def load_baseline(path: str = BASELINE_PATH) -> dict[str, Any]:
+    """
+    Загрузка сохраненных базовых замеров.
+
+    Аргументы:
+        path (str): Путь к файлу базовых замеров.
+
+    Возвращает:
+        dict[str, Any]: Базовые замеры или пустой словарь.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as file:
+        return json.load(file)
+
+
+def save_baseline(
+    results: dict[str, float],
+    noise: dict[str, float],
+    path: str = BASELINE_PATH,
+) -> None:
+    """
+    Сохранение результатов замера в качестве базовых.
+
+    Аргументы:
+        results (dict[str, float]): Результаты замера.
+        noise (dict[str, float]): Относительный шум замера.
+        path (str): Путь к файлу базовых замеров.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "noise": noise,
+                "results": results,
+            },
+            file,
+            indent=2,
+            sort_keys=True,
+        )
+        file.write("\n")
+
+
+def find_regressions(
+    results: dict[str, float],
+    baseline: dict[str, Any],
+    tolerance: float,
+) -> dict[str, str]:
+    """
+    Поиск функций, ставших медленнее базового замера сверх допуска.
+
+    Допуск каждой функции увеличивается на ее шум, измеренный при
+    сохранении базовых замеров, поэтому обычный разброс запусков не
+    считается регрессией, а замедление сверх него обнаруживается.
+
+    Аргументы:
+        results (dict[str, float]): Результаты текущего замера.
+        baseline (dict[str, Any]): Базовые замеры с ключами results и
+    noise.
+        tolerance (float): Допустимое относительное замедление.
+
+    Возвращает:
+        dict[str, str]: Описания найденных регрессий по именам функций.
+    """
+    baseline_results = baseline.get("results", {})
+    noise = baseline.get("noise", {})
+    regressions = {}
+    for name, seconds in results.items():
+        if name not in baseline_results:
+            continue
+        allowed = tolerance + noise.get(name, 0.0)
+        if seconds > baseline_results[name] * (1 + allowed):
+            regressions[name] = UTILS_BENCHMARK_REGRESSION_MESSAGE.format(
+                name=name,
+                current=seconds * 1000,
+                baseline=baseline_results[name] * 1000,
+                slowdown=(seconds / baseline_results[name] - 1) * 100,
+                allowed=allowed * 100,
+            )
+    return regressions
@@ -0,0 +1,407 @@
+"""Нагрузочный замер EmailListConsumer множеством WebSocket-клиентов."""
+
+import asyncio
+import gc
+import json
+import logging
+import resource
+import tempfile
+import time
+import tracemalloc
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable
+from unittest import mock
+
+from benchmarks.fake_imap import FakeImapServer
+from benchmarks.mailbox_generator import MailboxProfile, generate_mailbox
+from benchmarks.sync_benchmark import SYNC_LOGGERS
+from channels.testing import WebsocketCommunicator
+from config.asgi import application
+from core.constants import (
+    ACTION,
+    EMAIL,
+    ERROR,
+    FETCH_EMAILS,
+    INBOX,
+    NEW_EMAIL,
+    TOTAL,
+    TOTAL_EMAILS,
+    TYPE,
+    WINDOW_DAYS,
+    BenchmarkConfig,
+)
+from django.test import override_settings
+from email_account.models import EmailAccount
+from mail_recipient.consumers import EmailListConsumer
+from prometheus_client import REGISTRY
+
+
+@dataclass
+class ClientResult:
+    """
+    Результаты одного WebSocket-клиента.
+
+    Атрибуты:
+        frames (int): Количество полученных кадров.
+        bytes (int): Объем полученных кадров в символах.
+        emails (int): Количество полученных писем.
+        total (int | None): Количество писем из кадра TOTAL_EMAILS.
+        first_frame (float | None): Время от запроса до первого кадра.
+        seconds (float | None): Время от запроса до последнего письма.
+        latencies (list[float]): Время доставки кадров от вызова send
+    consumer'а до получения клиентом.
+        error (str | None): Текст кадра ошибки или тайм-аута.
+    """
+
+    frames: int = 0
+    bytes: int = 0
+    emails: int = 0
+    total: int | None = None
+    first_frame: float | None = None
+    seconds: float | None = None
+    latencies: list[float] = field(default_factory=list)
+    error: str | None = None
+
+    @property
+    def completed(self) -> bool:
+        """Получены ли все письма почтового ящика."""
+        return self.total is not None and self.emails >= self.total
+
+
+class LoopLagMonitor:
+    """
+    Замер задержки цикла событий и объема памяти процесса.
+
+    Фоновая задача засыпает на interval секунд, и задержкой считается
+    превышение фактической паузы над заданной: столько ждала бы любая
+    готовая к выполнению корутина, например отправка кадра клиенту.
+
+    Атрибуты:
+        interval (float): Пауза между замерами в секундах.
+        lags (list[float]): Задержки цикла событий в секундах.
+        peak_rss_kb (int): Наибольший объем резидентной памяти в КБ.
+    """
+
+    def __init__(self, interval: float) -> None:
+        """
+        Инициализация монитора.
+
+        Аргументы:
+            interval (float): Пауза между замерами в секундах.
+        """
+        self.interval = interval
+        self.lags = []
+        self.peak_rss_kb = current_rss_kb()
+        self._task = None
+
+    async def run(self) -> None:
+        """Замеры задержки до отмены задачи."""
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(
+                max(time.perf_counter() - start - self.interval, 0.0)
+            )
+            self.peak_rss_kb = max(self.peak_rss_kb, current_rss_kb())
+
+    async def __aenter__(self) -> "LoopLagMonitor":
+        """Запуск замеров при входе в контекстный менеджер."""
+        self._task = asyncio.create_task(self.run())
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Остановка замеров при выходе из контекстного менеджера."""
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+def current_rss_kb() -> int:
+    """
+    Текущий объем резидентной памяти процесса.
+
+    Возвращает:
+        int: Объем в КБ из /proc/self/statm или, если файла нет, наибольший
+    объем из getrusage.
+    """
+    try:
+        with open(BenchmarkConfig.PROC_STATM) as statm:
+            pages = int(statm.read().split()[1])
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pages * resource.getpagesize() // 1024
+
+
+def summarize(values: list[float], scale: float = 1000.0) -> dict[str, Any]:
+    """
+    Медиана, 99-й перцентиль и наибольшее значение выборки.
+
+    Аргументы:
+        values (list[float]): Значения в секундах.
+        scale (float): Множитель результата, по умолчанию в миллисекунды.
+
+    Возвращает:
+        dict[str, Any]: Поля p50, p99, max и количество значений samples.
+    """
+    ordered = sorted(values)
+
+    def percentile(share: float) -> float | None:
+        if not ordered:
+            return None
+        index = min(int(len(ordered) * share), len(ordered) - 1)
+        return round(ordered[index] * scale, 3)
+
+    return {
+        "p50": percentile(0.5),
+        "p99": percentile(0.99),
+        "max": percentile(1.0),
+        "samples": len(ordered),
+    }
+
+
+def stamp_frames(send: Callable) -> Callable:
+    """
+    Оборачивание send consumer'а с отметкой времени отправки кадра.
+
+    Отметки складываются в очередь из scope соединения, а клиент забирает
+    их в порядке получения кадров.
+
+    Аргументы:
+        send (Callable): Исходный метод send.
+
+    Возвращает:
+        Callable: Метод send с отметкой времени.
+    """
+
+    async def stamped(
+        self, text_data: str = None, bytes_data: bytes = None, close=False
+    ) -> None:
+        sent_at = self.scope.get(BenchmarkConfig.SENT_AT)
+        if sent_at is not None and text_data is not None:
+            sent_at.append(time.perf_counter())
+        await send(
+            self, text_data=text_data, bytes_data=bytes_data, close=close
+        )
+
+    return stamped
+
+
+async def run_client(
+    communicator: WebsocketCommunicator,
+    email: str,
+    delay: float,
+    timeout: float,
+) -> ClientResult:
+    """
+    Синхронизация почтового ящика одним клиентом.
+
+    Клиент отправляет запрос fetch_emails без начального окна и читает
+    кадры, пока не получит все письма из кадра TOTAL_EMAILS, кадр ошибки
+    или не истечет timeout ожидания кадра.
+
+    Аргументы:
+        communicator (WebsocketCommunicator): Подключенный клиент.
+        email (str): Адрес синхронизируемой учетной записи.
+        delay (float): Пауза перед запросом в секундах.
+        timeout (float): Наибольшее время ожидания кадра в секундах.
+
+    Возвращает:
+        ClientResult: Результаты клиента.
+    """
+    result = ClientResult()
+    sent_at = communicator.scope[BenchmarkConfig.SENT_AT]
+    await asyncio.sleep(delay)
+    start = time.perf_counter()
+    await communicator.send_json_to(
+        {ACTION: FETCH_EMAILS, EMAIL: email, WINDOW_DAYS: 0}
+    )
+    while not result.completed:
+        try:
+            text_data = await communicator.receive_from(timeout)
+        except asyncio.TimeoutError:
+            result.error = TimeoutError.__name__
+            break
+        received = time.perf_counter()
+        if sent_at:
+            result.latencies.append(received - sent_at.popleft())
+        if result.first_frame is None:
+            result.first_frame = received - start
+        result.frames += 1
+        result.bytes += len(text_data)
+        data = json.loads(text_data)
+        if data[TYPE] == TOTAL_EMAILS:
+            result.total = data[TOTAL]
+        elif data[TYPE] == NEW_EMAIL:
+            result.emails += 1
+        elif data[TYPE] == ERROR:
+            result.error = text_data
+            break
+    result.seconds = time.perf_counter() - start
+    return result
+
+
+async def wait_syncs_finished(baseline: float, timeout: float) -> None:
+    """
+    Ожидание завершения синхронизаций, начатых во время замера.
+
+    Последнее письмо клиент получает раньше, чем consumer закроет
+    соединения пула, поэтому клиенты отключаются после того, как метрика
+    mail_active_syncs вернется к значению до замера.
+
+    Аргументы:
+        baseline (float): Значение метрики до замера.
+        timeout (float): Наибольшее время ожидания в секундах.
+    """
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if (REGISTRY.get_sample_value("mail_active_syncs") or 0) <= baseline:
+            return
+        await asyncio.sleep(BenchmarkConfig.LAG_INTERVAL)
+
+
+async def run_websocket_benchmark(
+    clients: int,
+    profile: MailboxProfile,
+    latency: float = 0.0,
+    ramp: float = 0.0,
+    timeout: float = BenchmarkConfig.WEBSOCKET_TIMEOUT,
+    lag_interval: float = BenchmarkConfig.LAG_INTERVAL,
+    channel_layer: bool = False,
+    log_level: int = logging.WARNING,
+) -> dict[str, Any]:
+    """
+    Нагрузочный замер одного процесса ASGI-приложения.
+
+    Клиенты WebsocketCommunicator подключаются к ASGI-приложению проекта
+    через тот же стек маршрутизации, что и в daphne, и каждый
+    синхронизирует свою учетную запись с почтовым ящиком profile на
+    локальном FakeImapServer. Запросы равномерно распределяются на ramp
+    секунд. Замеряются задержка цикла событий, время доставки кадров,
+    время до первого кадра и до последнего письма, память на соединение
+    и пропускная способность. Сетевой стек и протокол WebSocket daphne в
+    замер не входят.
+
+    Без channel_layer используется InMemoryChannelLayer и синхронизация без
+    аренды, поэтому замер не требует Redis.
+
+    Аргументы:
+        clients (int): Количество одновременных клиентов.
+        profile (MailboxProfile): Параметры почтового ящика каждого клиента.
+        latency (float): Задержка ответа IMAP-сервера на команду в секундах.
+        ramp (float): Время, за которое отправляются все запросы.
+        timeout (float): Наибольшее время ожидания кадра в секундах.
+        lag_interval (float): Пауза между замерами задержки цикла событий.
+        channel_layer (bool): Использовать ли настроенный канальный слой и
+    аренду синхронизации.
+        log_level (int): Уровень логирования модулей синхронизации.
+
+    Возвращает:
+        dict[str, Any]: Результаты замера.
+    """
+    clients = max(clients, 1)
+    mailbox = generate_mailbox(profile)
+    for logger_name in SYNC_LOGGERS:
+        logging.getLogger(logger_name).setLevel(log_level)
+    emails = [
+        BenchmarkConfig.WEBSOCKET_EMAIL.format(index=index)
+        for index in range(clients)
+    ]
+    await EmailAccount.objects.filter(email__in=emails).adelete()
+    await EmailAccount.objects.abulk_create(
+        EmailAccount(email=email, password=BenchmarkConfig.PASSWORD)
+        for email in emails
+    )
+    layer_settings = (
+        {}
+        if channel_layer
+        else {
+            "CHANNEL_LAYERS": BenchmarkConfig.IN_MEMORY_CHANNEL_LAYER,
+            "SYNC_SINGLE_FLIGHT": False,
+        }
+    )
+    active_syncs = REGISTRY.get_sample_value("mail_active_syncs") or 0
+    async with FakeImapServer({INBOX: mailbox}, latency=latency) as server:
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            IMAP_HOST=server.host,
+            IMAP_PORT=server.port,
+            IMAP_USE_SSL=False,
+            MEDIA_ROOT=media_root,
+            **layer_settings,
+        ), mock.patch.object(
+            EmailListConsumer, "send", stamp_frames(EmailListConsumer.send)
+        ):
+            gc.collect()
+            rss_before = current_rss_kb()
+            tracemalloc.start()
+            communicators = []
+            for _ in emails:
+                communicator = WebsocketCommunicator(
+                    application, BenchmarkConfig.WEBSOCKET_PATH
+                )
+                communicator.scope[BenchmarkConfig.SENT_AT] = deque()
+                await communicator.connect(timeout)
+                communicators.append(communicator)
+            gc.collect()
+            connected_bytes, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            async with LoopLagMonitor(lag_interval) as monitor:
+                start = time.perf_counter()
+                results = await asyncio.gather(
+                    *(
+                        run_client(
+                            communicator,
+                            email,
+                            ramp * index / clients,
+                            timeout,
+                        )
+                        for index, (communicator, email) in enumerate(
+                            zip(communicators, emails)
+                        )
+                    )
+                )
+                elapsed = time.perf_counter() - start
+                await wait_syncs_finished(active_syncs, timeout)
+            for communicator in communicators:
+                await communicator.disconnect()
+    await EmailAccount.objects.filter(email__in=emails).adelete()
+    received = sum(result.emails for result in results)
+    frames = sum(result.frames for result in results)
+    frame_bytes = sum(result.bytes for result in results)
+    return {
+        "clients": clients,
+        "messages_per_client": len(mailbox),
+        "imap_latency": latency,
+        "ramp": ramp,
+        "completed_clients": sum(result.completed for result in results),
+        "errors": [result.error for result in results if result.error],
+        "seconds": round(elapsed, 6),
+        "throughput": {
+            "emails_per_second": round(received / elapsed, 2),
+            "frames_per_second": round(frames / elapsed, 2),
+            "frame_bytes_per_second": round(frame_bytes / elapsed, 2),
+        },
+        "loop_lag_ms": summarize(monitor.lags),
+        "frame_latency_ms": summarize(
+            [latency for result in results for latency in result.latencies]
+        ),
+        "first_frame_ms": summarize(
+            [
+                result.first_frame
+                for result in results
+                if result.first_frame is not None
+            ]
+        ),
+        "client_seconds": summarize(
+            [result.seconds for result in results], scale=1.0
+        ),
+        "memory": {
+            "idle_kb_per_connection": round(
+                connected_bytes / 1024 / clients, 2
+            ),
+            "peak_rss_kb_per_connection": round(
+                (monitor.peak_rss_kb - rss_before) / clients, 2
+            ),
+            "rss_before_kb": rss_before,
+            "peak_rss_kb": monitor.peak_rss_kb,
+        },
+    }
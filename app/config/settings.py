@@ -3,8 +3,13 @@
 import os
 from pathlib import Path
 
-from core.utils import cast_redis_hosts
-from decouple import config
+from core.settings_utils import (
+    cast_networks,
+    cast_redis_hosts,
+    cast_timeouts,
+    replica_databases,
+)
+from decouple import Csv, config
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -30,6 +35,13 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
 ]
 
+# Команды замеров производительности нужны только при разработке.
+BENCHMARKS_ENABLED = DEBUG or config(
+    "BENCHMARKS_ENABLED", default=False, cast=bool
+)
+if BENCHMARKS_ENABLED:
+    INSTALLED_APPS.append("benchmarks.apps.BenchmarksConfig")
+
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -82,6 +94,19 @@ else:
         }
     }
 
+DATABASES.update(
+    replica_databases(
+        DATABASES["default"],
+        config("DB_REPLICAS", default="", cast=Csv()),
+        BASE_DIR,
+    )
+)
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_REPLICA_STICKY_SECONDS = config(
+    "DATABASE_REPLICA_STICKY_SECONDS", default=10.0, cast=float
+)
+DATABASE_ROUTERS = ["core.db_router.ReplicaRouter"]
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -97,21 +122,51 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+REDIS_HOSTS = config(
+    "REDIS_HOSTS", default="127.0.0.1, 6379", cast=cast_redis_hosts
+)
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
         "CONFIG": {
-            "hosts": [
-                config(
-                    "REDIS_HOSTS",
-                    default="127.0.0.1, 6379",
-                    cast=cast_redis_hosts,
-                )
-            ],
+            "hosts": [REDIS_HOSTS],
         },
     },
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": "redis://%s:%d" % REDIS_HOSTS,
+        "OPTIONS": {"socket_connect_timeout": 1, "socket_timeout": 1},
+    },
+}
+
+IMAP_HOST = config("IMAP_HOST", default="")
+IMAP_PORT = config("IMAP_PORT", default=993, cast=int)
+IMAP_USE_SSL = config("IMAP_USE_SSL", default=True, cast=bool)
+IMAP_TIMEOUTS = config(
+    "IMAP_TIMEOUTS",
+    default=(
+        "connect=15, login=15, capability=15, compress=15, list=15, "
+        "select=15, search=60, fetch=60, logout=5"
+    ),
+    cast=cast_timeouts,
+)
+IMAP_RECONNECT_ATTEMPTS = config(
+    "IMAP_RECONNECT_ATTEMPTS", default=3, cast=int
+)
+IMAP_RECONNECT_BACKOFF = config(
+    "IMAP_RECONNECT_BACKOFF", default=0.5, cast=float
+)
+IMAP_COMPRESS = config("IMAP_COMPRESS", default=True, cast=bool)
+IMAP_HEDGE = config("IMAP_HEDGE", default=False, cast=bool)
+IMAP_HEDGE_PERCENTILE = config(
+    "IMAP_HEDGE_PERCENTILE", default=0.99, cast=float
+)
+IMAP_HEDGE_MIN_DELAY = config("IMAP_HEDGE_MIN_DELAY", default=1.0, cast=float)
+
 LANGUAGE_CODE = "en-us"
 TIME_ZONE = "UTC"
 USE_I18N = True
@@ -126,6 +181,17 @@ STATICFILES_DIRS = [
 
 ATTACHMENTS_URL = "app/attachments/"
 ATTACHMENTS_ROOT = os.path.join(BASE_DIR, "attachments")
+ATTACHMENTS_STORAGE_MAX_WORKERS = config(
+    "ATTACHMENTS_STORAGE_MAX_WORKERS", default=4, cast=int
+)
+
+EXPORT_CHUNK_SIZE = config("EXPORT_CHUNK_SIZE", default=65536, cast=int)
+RETENTION_BATCH_SIZE = config("RETENTION_BATCH_SIZE", default=500, cast=int)
+RETENTION_ORPHAN_GRACE = config(
+    "RETENTION_ORPHAN_GRACE", default=3600, cast=int
+)
+RETENTION_INTERVAL = config("RETENTION_INTERVAL", default=0, cast=int)
+THREADS_PAGE_SIZE = config("THREADS_PAGE_SIZE", default=50, cast=int)
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
@@ -134,6 +200,67 @@ CSRF_COOKIE_SECURE = not DEBUG
 
 CSRF_TRUSTED_ORIGINS = ["http://localhost", "https://localhost"]
 
+SYNC_PROFILE = config("SYNC_PROFILE", default=False, cast=bool)
+SYNC_PROFILE_DIR = config(
+    "SYNC_PROFILE_DIR", default=os.path.join(BASE_DIR, "profiles")
+)
+SYNC_PROFILE_INTERVAL = config(
+    "SYNC_PROFILE_INTERVAL", default=0.005, cast=float
+)
+SYNC_PROFILE_TOP_ALLOCATIONS = config(
+    "SYNC_PROFILE_TOP_ALLOCATIONS", default=25, cast=int
+)
+
+SYNC_ORDERING = config("SYNC_ORDERING", default="newest")
+SYNC_WINDOW_DAYS = config("SYNC_WINDOW_DAYS", default=30, cast=int)
+SYNC_WINDOW_MESSAGES = config("SYNC_WINDOW_MESSAGES", default=0, cast=int)
+SYNC_BACKFILL_DELAY = config("SYNC_BACKFILL_DELAY", default=0.0, cast=float)
+
+SYNC_FOLDERS = [
+    folder.strip()
+    for folder in config("SYNC_FOLDERS", default="*").split(",")
+    if folder.strip()
+]
+SYNC_FOLDERS_EXCLUDE = [
+    folder.strip()
+    for folder in config(
+        "SYNC_FOLDERS_EXCLUDE", default="[Gmail]/All Mail"
+    ).split(",")
+    if folder.strip()
+]
+SYNC_FOLDER_CONNECTIONS = config(
+    "SYNC_FOLDER_CONNECTIONS", default=4, cast=int
+)
+SYNC_LARGE_MESSAGE_BYTES = config(
+    "SYNC_LARGE_MESSAGE_BYTES", default=5 * 1024 * 1024, cast=int
+)
+SYNC_LARGE_MESSAGE_CONNECTIONS = config(
+    "SYNC_LARGE_MESSAGE_CONNECTIONS", default=1, cast=int
+)
+
+SYNC_SINGLE_FLIGHT = config("SYNC_SINGLE_FLIGHT", default=True, cast=bool)
+SYNC_LEASE_TTL = config("SYNC_LEASE_TTL", default=30.0, cast=float)
+
+SYNC_SKIP_KNOWN = config("SYNC_SKIP_KNOWN", default=True, cast=bool)
+SYNC_KNOWN_ERROR_RATE = config(
+    "SYNC_KNOWN_ERROR_RATE", default=0.01, cast=float
+)
+SYNC_PREVIEW = config("SYNC_PREVIEW", default=False, cast=bool)
+SYNC_PREVIEW_BYTES = config("SYNC_PREVIEW_BYTES", default=4096, cast=int)
+
+OUTBOUND_QUEUE_SIZE = config("OUTBOUND_QUEUE_SIZE", default=200, cast=int)
+SERIALIZATION_CACHE_SIZE = config(
+    "SERIALIZATION_CACHE_SIZE", default=32 * 1024 * 1024, cast=int
+)
+
+METRICS_ALLOWED_NETWORKS = config(
+    "METRICS_ALLOWED_NETWORKS",
+    default="127.0.0.1/32, ::1/128",
+    cast=cast_networks,
+)
+
+SYNC_LOG_LEVEL = config("SYNC_LOG_LEVEL", default="INFO")
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -156,17 +283,32 @@ LOGGING = {
         },
         "fetch_emails": {
             "handlers": ["console"],
-            "level": "DEBUG",
+            "level": SYNC_LOG_LEVEL,
             "propagate": True,
         },
         "consumer": {
             "handlers": ["console"],
-            "level": "DEBUG",
+            "level": SYNC_LOG_LEVEL,
             "propagate": True,
         },
         "save_email_to_db": {
             "handlers": ["console"],
-            "level": "DEBUG",
+            "level": SYNC_LOG_LEVEL,
+            "propagate": True,
+        },
+        "sync_state": {
+            "handlers": ["console"],
+            "level": SYNC_LOG_LEVEL,
+            "propagate": True,
+        },
+        "mail_import": {
+            "handlers": ["console"],
+            "level": SYNC_LOG_LEVEL,
+            "propagate": True,
+        },
+        "retention": {
+            "handlers": ["console"],
+            "level": SYNC_LOG_LEVEL,
             "propagate": True,
         },
     },
@@ -4,16 +4,19 @@
 URL-адреса:
 - `admin/`: Административная панель Django.
 - `""`: Главная страница, включает URL-адреса из приложения `email_account`.
+- `metrics`: Метрики синхронизации в формате Prometheus.
 
 Список `urlpatterns` направляет URL-адреса в представления.
 Дополнительная информация об этом файле доступна по ссылке
     https://docs.djangoproject.com/en/stable/topics/http/urls/
 """
 
+from core.views import metrics
 from django.contrib import admin
 from django.urls import include, path
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics, name="metrics"),
     path("", include("email_account.urls")),
 ]
@@ -6,19 +6,57 @@ ALL = "ALL"
 ALL_EMAILS_ID_RECEIVED_LOGGER_INFO = (
     "Получены идентификаторы всех электронных писем и обновлен прогресс-бар"
 )
+ASCII = "ascii"
 AT = "@"
 ATTACHMENTS = "attachments"
+ATTACHMENT_WRITES = "attachment_writes"
+ATTACHMENTS_STORAGE_THREAD_NAME_PREFIX = "attachments_storage"
 BAD = "BAD"
+BENCH_STARTUP_HELP = (
+    "Замер холодного запуска Django и ASGI-приложения через python -X "
+    "importtime с проверкой бюджета времени запуска"
+)
+BENCH_SYNC_HELP = (
+    "Сквозной замер синхронизации синтетического почтового ящика через "
+    "локальный IMAP-сервер"
+)
+BENCH_UTILS_HELP = (
+    "Микробенчмарки функций разбора писем из core.utils с проверкой "
+    "регрессий относительно базовых замеров"
+)
+BENCH_WEBSOCKET_HELP = (
+    "Нагрузочный замер EmailListConsumer множеством одновременных "
+    "WebSocket-клиентов с выводом результатов в формате JSON"
+)
+BODY_HEADER = "BODY[HEADER]"
+BODYSTRUCTURE = "BODYSTRUCTURE"
 BS4_PARSER = "html.parser"
 AUTH_FAILED_ERROR_MESSAGE = "Введены некорректные данные пользователя"
 AUTH_FAILED_LOGGER_ERROR_MESSAGE = "Ошибка аутентификации: %s"
+BACKFILL = "backfill"
+BACKFILL_STARTED_LOGGER_MESSAGE = (
+    "Начальное окно синхронизации загружено, догружается история: %s писем"
+)
+CAPABILITY = "capability"
 CHECKED = "checked"
+CHECKED_BYTES = "checked_bytes"
 CHECKED_EMAIL_LOGGER_INFO_MESSAGE = "Проверено письмо с id %s"
 CLOSE_CONNECTION = "close_connection"
-CONTENT = "content"
 CONTENT_DISPOSITION = "Content-Disposition"
+CONTENT_TRANSFER_ENCODING = "Content-Transfer-Encoding"
+CONTENT_TYPE = "Content-Type"
+COMPRESS = "compress"
+COMPRESS_DISABLED_LOGGER_MESSAGE = (
+    "Сервер отклонил COMPRESS DEFLATE, соединение без сжатия: %s"
+)
+CONNECT = "connect"
 CONSUMER = "consumer"
+COUNT = "count"
+CREDIT = "credit"
+CREDITS = "credits"
+CREDITS_INVALID_ERROR_MESSAGE = "Некорректное количество кредитов: %s"
 CURRENT_GMT = 3
+DATABASE_REPLICA_STICKY_KEY = "replica_sticky:{account}"
 DATE = "date"
 DATETIME_FORMAT = "%a, %d %b %Y %H:%M:%S %z"
 EMAIL = "email"
@@ -32,17 +70,29 @@ EMAIL_DATA_SEND_LOGGER_MESSAGE = (
 )
 EMAIL_LIST_HTML = "email_list.html"
 EMAIL_LIST_REDIRECT = "/email_list/?email={email}"
+EMAILS = "emails"
 EMAIL_REQUIRED_ERROR_MESSAGE = "Требуется электронная почта"
 EMAIL_REQUIRED_LOGGER_ERROR_MESSAGE = (
     "Нет электронной почты в text_data_json: %s"
 )
 ENCODING = "encoding"
 ERROR = "error"
+FETCH = "fetch"
 FETCH_EMAILS = "fetch_emails"
 FETCH_EMAILS_CANCELLED_LOGGER_MESSAGE = "Обработка писем отменена"
 FETCH_EMAILS_COMPLETE_LOGGER_MESSAGE = (
     "Проверка и обработка писем закончены %s"
 )
+FETCH_THREADS = "fetch_threads"
+FETCH_UID = "UID"
+FILE_PATH = "file_path"
+FILTERS = "filters"
+FOLDER = "folder"
+FOLDER_PATTERN_WILDCARD = "*"
+FOLDER_PATTERN_WILDCARD_REGEX = ".*"
+FOLDERS = "folders"
+FOLDERS_DISCOVERED_LOGGER_MESSAGE = "Папки для синхронизации: %s"
+FOLDERS_INVALID_ERROR_MESSAGE = "Список папок должен содержать строки: %s"
 FILE_NOT_FOUND = "Файл {filename} не найден"
 FILENAME = "filename"
 FORM = "form"
@@ -56,12 +106,87 @@ IMAP_DOMAIN_SERVER = {
     "bk.ru": "imap.mail.ru",
     "list.ru": "imap.mail.ru",
 }
+IMAP_ATTACHMENT = b"attachment"
+IMAP_CHARSET = b"charset"
+IMAP_COMMAND_TIMEOUT_ERROR_MESSAGE = (
+    "Команда IMAP {command} не выполнена за отведенное время"
+)
+IMAP_CONNECTION_LOST_ERROR_MESSAGE = (
+    "Соединение с IMAP-сервером разорвано во время команды {command}"
+)
+IMAP_DATE_FORMAT = "{day:02d}-{month}-{year:04d}"
+IMAP_MONTHS = (
+    "Jan",
+    "Feb",
+    "Mar",
+    "Apr",
+    "May",
+    "Jun",
+    "Jul",
+    "Aug",
+    "Sep",
+    "Oct",
+    "Nov",
+    "Dec",
+)
+IMAP_DEFAULT_ENCODING = b"7bit"
+IMAP_HEDGE_LOGGER_MESSAGE = (
+    "FETCH письма %s в папке %s не завершился за %.3f с, запрос повторен "
+    "через запасное соединение"
+)
+IMAP_LINE_END = "\r\n"
+IMAP_LITERAL = "{%d}" + IMAP_LINE_END
+IMAP_NIL = b"NIL"
+IMAP_NOT_SELECTABLE_FLAGS = (b"\\noselect", b"\\nonexistent")
+IMAP_RECONNECT_LOGGER_MESSAGE = (
+    "Соединение с IMAP-сервером потеряно (%r), переподключение %s из %s "
+    "через %.1f с"
+)
+IMAP_RESPONSE_PARSE_ERROR_MESSAGE = "Не удалось разобрать ответ FETCH: %s"
+IMAP_TEXT = b"text"
+IMPORT_ACCOUNT_NOT_FOUND_ERROR_MESSAGE = "Учетная запись {email} не найдена"
+IMPORT_CHECKPOINT_IGNORED_LOGGER_MESSAGE = (
+    "Контрольная точка %s относится к другому импорту и не используется"
+)
+IMPORT_MAIL_HELP = (
+    "Импорт писем из файлов .eml, mbox и каталогов Maildir в учетную запись"
+)
+IMPORT_PARSE_FAILED_LOGGER_MESSAGE = "Не удалось разобрать письмо %s:%s: %s"
+IMPORT_PROGRESS_MESSAGE = (
+    "Обработано писем: {done}, сохранено: {imported}, ошибок: {failed}, "
+    "{per_minute:.0f} писем/мин"
+)
+IMPORT_SOURCE_NOT_FOUND_ERROR_MESSAGE = "Архив {source} не найден"
 INBOX = "INBOX"
+IN_REPLY_TO = "In-Reply-To"
 INDEX = "index"
+IS_PREVIEW = "is_preview"
+KNOWN_MESSAGES_SKIPPED_LOGGER_MESSAGE = (
+    "Папка %s учетной записи %s: без загрузки с сервера восстановлено "
+    "писем: %d, ложных срабатываний фильтра: %d"
+)
+LARGE_MESSAGES = "large_messages"
+LARGE_MESSAGES_STARTED_LOGGER_MESSAGE = (
+    "Крупные письма (%s, больше %s байт) загружаются отдельно"
+)
+LATEST = "latest"
+LIMIT = "limit"
+LIST = "list"
+LIST_ALL_FOLDERS = "*"
+LIST_FOLDERS_ERROR_MESSAGE = "Ошибка при получении списка папок"
+LIST_FOLDERS_LOGGER_ERROR_MESSAGE = "Ошибка при получении списка папок: %s"
+LIST_REFERENCE = '""'
+LOGIN = "login"
+LOGOUT = "logout"
 MAIL_FROM = "mail_from"
+MAIL_IMPORT = "mail_import"
 MESSAGE = "message"
 MESSAGE_ID = "Message-ID"
+MESSAGE_ID_FETCH_FORMAT = "(BODY.PEEK[HEADER.FIELDS (MESSAGE-ID)])"
+MESSAGE_ID_FETCH_KEY = "BODY[HEADER.FIELDS (MESSAGE-ID)]"
+MESSAGE_SIZE_FETCH_FORMAT = "(RFC822.SIZE)"
 NEW_EMAIL = "new_email"
+NEWEST = "newest"
 REQUEST_METHOD = "POST"
 MULTIPART = "multipart"
 NEW_DATETIME_FORMAT = "%a, %d %b %Y %H:%M:%S"
@@ -71,13 +196,76 @@ NO_DATA_IN_MAIL_LOGGER_ERROR_MESSAGE = (
 NO_SUBJECT = "Без темы"
 NO_MESSAGE_TO_PROCESS_ERROR_MESSAGE = "Нет письма для обработки"
 NO_MESSAGE_TO_PROCESS_LOGGER_ERROR_MESSAGE = "Нет письма для обработки: %s"
+OFFSET = "offset"
 OK = "OK"
+OLDEST = "oldest"
+ORDERING = "ordering"
+ORDERINGS = (NEWEST, OLDEST)
+OUTBOUND = "outbound"
+# История отправленных писем в очереди отправки в размерах очереди.
+OUTBOUND_HISTORY_QUEUES = 4
+OUTBOUND_REPLAY_LOGGER_MESSAGE = (
+    "Клиент не успевает получать письма учетной записи %s, недоставленные "
+    "письма будут отправлены из базы данных"
+)
 PARSING_MAIL_LOGGER_ERROR_MESSAGE = "Ошибка при парсинге письма %s: %s"
 PASSWORD = "password"
+PENDING_EMAILS = "pending_emails"
+POSITION = "position"
+PREVIEW = "preview"
+PREVIEW_BASE64 = "base64"
+PREVIEW_QUOTED_PRINTABLE = "quoted-printable"
+PREVIEW_SECTION_FORMAT = "(BODY.PEEK[{section}]<0.{size}>)"
+PREVIEW_SECTION_KEY = "BODY[{section}]<0>"
+PREVIEW_STRUCTURE_FORMAT = "(BODYSTRUCTURE BODY.PEEK[HEADER])"
+PREVIEW_SUBTYPES = ("plain", "html")
+PROFILE = "profile"
+PROFILE_ALLOCATIONS_HEADER = (
+    "# Синхронизация: {label}\n"
+    "# Начало: {started}\n"
+    "# Длительность: {duration:.3f} с\n"
+    "# Снято стеков: {samples}\n"
+)
+PROFILE_ALLOCATIONS_SKIPPED = (
+    "# Выделения памяти не отслеживались: tracemalloc уже запущен другим "
+    "профилем или приложением\n"
+)
+PROFILE_ALLOCATIONS_SHARED = (
+    "# Во время профиля выполнялись другие профилируемые синхронизации: "
+    "снимок включает и их выделения памяти\n"
+)
+PROFILE_FILENAME = "{label}_{started}_{duration:.1f}s"
+PROFILE_FOLDED_EXTENSION = ".folded"
+PROFILE_NOT_ALLOWED_LOGGER_WARNING_MESSAGE = (
+    "Профилирование синхронизации доступно только администраторам: %s"
+)
+PROFILE_SAMPLER_THREAD_NAME = "sync_profiler"
+PROFILE_SAVED_LOGGER_MESSAGE = "Профиль синхронизации %s сохранен"
+PROFILE_TIMESTAMP_FORMAT = "%Y%m%d-%H%M%S"
+PROFILE_TOP_EXTENSION = ".alloc.txt"
 PROGRESS = "progress"
 RFC822_FORMAT = "(RFC822)"
+RFC822_SIZE = "RFC822.SIZE"
 RECEIVE_MAIL_LOGGER_ERROR_MESSAGE = "Ошибка при получении письма %s: %s"
 RECEIVED = "received"
+REFERENCES = "References"
+RETENTION = "retention"
+RETENTION_ACCOUNT_NOT_FOUND_ERROR_MESSAGE = "Учетная запись {email} не найдена"
+RETENTION_FOLDER_SKIPPED_LOGGER_MESSAGE = (
+    "Папка %s учетной записи %s пропущена: %s"
+)
+RETENTION_HELP = (
+    "Удаление писем, удаленных на сервере, повторяющихся записей о вложениях "
+    "и файлов вложений без записей"
+)
+RETENTION_REPORT_MESSAGE = (
+    "Удалено писем: {emails}, записей о вложениях: {attachments}, файлов: "
+    "{files} ({bytes} байт), пропущено папок: {skipped}"
+)
+RETENTION_STORAGE_SKIPPED_LOGGER_MESSAGE = (
+    "Хранилище %s не является файловой системой, файлы не проверяются"
+)
+RETENTION_UIDVALIDITY_CHANGED_MESSAGE = "UIDVALIDITY изменился"
 SAVE_EMAIL_TO_DB = "save_email_to_db"
 SAVE_EMAIL_ATTACHMENTS_TO_DB_SUCCESS = (
     "Вложение %s для письма с message_id %s успешно сохранено."
@@ -85,28 +273,116 @@ SAVE_EMAIL_ATTACHMENTS_TO_DB_SUCCESS = (
 SAVE_EMAIL_TO_DB_SUCCESS = (
     "Электронное письмо с message_id %s успешно сохранено."
 )
+SAVE_EMAILS_TO_DB_SUCCESS = "Пакет из %s писем успешно сохранен."
+SEARCH = "search"
+SEARCH_FILTER_INVALID_ERROR_MESSAGE = (
+    "Некорректное значение фильтра поиска: %s"
+)
+SEARCH_FILTER_UNSAFE_ERROR_MESSAGE = (
+    "Фильтр поиска содержит недопустимые символы: %s"
+)
+SEARCH_FILTER_UNSUPPORTED_ERROR_MESSAGE = "Неподдерживаемый фильтр поиска: %s"
+SEARCH_SINCE = "SINCE"
 SEARCH_MAILS_ERROR_MESSAGE = "Ошибка при поиске писем"
 SEARCH_MAILS_LOGGER_ERROR_MESSAGE = "Ошибка при поиске писем: %s"
+SELECT = "select"
 SELECT_INBOX_ERROR_MESSAGE = "Ошибка при выборе почтового ящика"
-SELECT_INBOX_LOGGER_ERROR_MESSAGE = "Ошибка при выборе почтового ящика: %s"
+SELECT_INBOX_LOGGER_ERROR_MESSAGE = "Ошибка при выборе почтового ящика %s: %s"
+SENT = "sent"
+STARTUP_BUDGET_EXCEEDED_MESSAGE = (
+    "{target}: запуск занял {seconds:.3f} с при бюджете {budget:.3f} с"
+)
+STARTUP_EAGER_IMPORT_MESSAGE = (
+    "{target}: при запуске импортирован модуль {module}, который должен "
+    "загружаться при первом использовании"
+)
+STARTUP_FAILED_MESSAGE = (
+    "{target}: процесс запуска завершился ошибкой\n{error}"
+)
 SUBJECT = "subject"
+SURROGATEESCAPE = "surrogateescape"
+SYNC_FINISHED = "sync.finished"
+SYNC_FOLLOWER_ATTACHED_LOGGER_MESSAGE = (
+    "Синхронизация почтового ящика %s уже выполняется, клиент подключен "
+    "к ее потоку писем"
+)
+SYNC_FRAME = "sync.frame"
+SYNC_GROUP = "sync_{account}_{options}"
+SYNC_LEADER_LOGGER_MESSAGE = "Синхронизация почтового ящика %s запущена"
+SYNC_LEASE_KEY = "sync_lease:{account}:{options}"
+SYNC_LEASE_LOST_LOGGER_MESSAGE = (
+    "Аренда синхронизации почтового ящика %s потеряна, синхронизация "
+    "остановлена"
+)
+SYNC_LEASE_RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1], KEYS[2])
+end
+return 0
+"""
+SYNC_LEASE_RENEW_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    redis.call("PEXPIRE", KEYS[2], ARGV[2])
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+SYNC_LEASE_TOTAL_KEY = "sync_lease:{account}:{options}:total"
+SYNC_LEASE_UNAVAILABLE_LOGGER_MESSAGE = (
+    "Redis недоступен, синхронизация почтового ящика %s выполняется без "
+    "аренды: %s"
+)
+SYNC_OPTIONS = "{ordering}_{window_days}_{window_messages}_{preview:d}"
+SYNC_RELEASED = "sync.released"
+SYNC_STATE = "sync_state"
+SYNC_STATES = "sync_states"
+SYNC_STATE_RESET_LOGGER_MESSAGE = (
+    "UIDVALIDITY папки %s почтового ящика %s изменился (%s -> %s), "
+    "контрольная точка синхронизации сброшена"
+)
+SYNCED_EMAILS_CHUNK_SIZE = 100
+SYNCED_EMAILS_SENT_LOGGER_MESSAGE = (
+    "Отправлено уже синхронизированных писем из базы данных: %s"
+)
 TEXT = "text"
 TEXT_HTML = "text/html"
 TEXT_PLANE = "text/plain"
+THREAD = "thread"
+THREAD_REFERENCES = "thread_references"
+THREADS = "threads"
+THREADS_PAGE_INVALID_ERROR_MESSAGE = (
+    "Некорректная страница цепочек писем: offset %s, limit %s"
+)
+THREADS_SENT_LOGGER_MESSAGE = "Отправлено цепочек писем: %s"
 TIMEOUT_ERROR_MESSAGE = "Превышено время ожидания ответа"
 TIMEOUT_LOGGER_ERROR_MESSAGE = (
     "Превышено время ожидания ответа от imap-сервера"
 )
 TOTAL_EMAILS = "total_emails"
 TOTAL = "total"
+TOTAL_BYTES = "total_bytes"
 TYPE = "type"
 UNEXPECTED_ERROR_MESSAGE = "Произошла неожиданная ошибка: %s"
 UNEXPECTED_LOGGER_ERROR_MESSAGE = "Произошла неожиданная ошибка: %s"
+UTILS_BENCHMARK_BASELINE_SAVED_MESSAGE = "Базовые замеры сохранены"
+UTILS_BENCHMARK_RECHECK_MESSAGE = "Повторный замер после замедления: {names}"
+UTILS_BENCHMARK_REGRESSION_MESSAGE = (
+    "{name}: {current:.3f} мс против {baseline:.3f} мс "
+    "(медленнее на {slowdown:.1f}%, допуск {allowed:.1f}%)"
+)
+UNSUPPORTED_ORDERING_ERROR_MESSAGE = "Неподдерживаемый порядок писем: %s"
 UNSUPPORTED_ACTION_ERROR_MESSAGE = "Неподдерживаемое действие: %s"
 UNSUPPORTED_ACTION_LOGGER_ERROR_MESSAGE = (
     "Передано неподдерживаемое действие: %s"
 )
+UID_RANGE_SEARCH = "UID {start}:*"
+UID_SET_RANGE = "{start}:{end}"
 URL = "url"
+WINDOW_COMPLETE = "window_complete"
+WINDOW_DAYS = "window_days"
+WINDOW_MESSAGES = "window_messages"
+WINDOW_NEGATIVE_ERROR_MESSAGE = "Размер окна синхронизации отрицательный: %s"
+USER = "user"
 
 
 class AttachmentConfig:
@@ -115,20 +391,114 @@ class AttachmentConfig:
     ATTACHMENT_FILENAME_MAX_LENGTH = 255
     ATTACHMENT_PATH_MAX_LENGTH = 150
     ATTACHMENT_VERBOSE_NAME = "Вложение"
+    CRC32 = "crc32"
+    CRC32_VERBOSE_NAME = "Контрольная сумма CRC-32 файла"
+    EMAIL_ID = "email_id"
+    FILE = "file"
 
 
 class EmailConfig:
     """Настройки для модели Email."""
 
+    ACCOUNT_FOLDER_MESSAGE_ID_UNIQUE_NAME = "unique_account_folder_message"
+    ACCOUNT_FOLDER_UID_INDEX_NAME = "email_account_folder_uid_idx"
+    ACCOUNT_SYNCED_AT_INDEX_NAME = "email_account_synced_at_idx"
+    EMAIL_ACCOUNT = "email_account"
+    EMAIL_ACCOUNT_VERBOSE_NAME = "Учетная запись электронной почты"
+    FOLDER = "folder"
+    FOLDER_MAX_LENGTH = 255
+    FOLDER_VERBOSE_NAME = "Папка на IMAP-сервере"
+    ID = "id"
+    IN_REPLY_TO = "in_reply_to"
+    IS_PREVIEW_VERBOSE_NAME = "Сохранено только начало текста письма"
+    MESSAGE_ID = "message_id"
     MESSAGE_ID_MAX_LENGTH = 255
     SUBJECT_MAX_LENGTH = 255
     SUBJECT_VERBOSE_NAME = "Тема сообщения"
+    SYNCED_AT = "synced_at"
+    SYNCED_AT_VERBOSE_NAME = "Дата последнего сохранения письма"
     MAIL_FROM_MAX_LENGTH = 255
     MAIL_FROM_VERBOSE_NAME = "Отправитель"
     DATE_VERBOSE_NAME = "Дата получения письма"
     RECEIVED_VERBOSE_NAME = "Дата отправки письма"
     TEXT_MAX_LENGTH = 100
     TEXT_VERBOSE_NAME = "Описание или текст письма"
+    UID = "uid"
+    UID_DESCENDING = "-uid"
+    UID_VERBOSE_NAME = "UID письма на IMAP-сервере"
+    IN_REPLY_TO_VERBOSE_NAME = "Ответ на сообщение"
+    REFERENCES = "references"
+    REFERENCES_VERBOSE_NAME = "Предыдущие сообщения цепочки"
+    THREAD_VERBOSE_NAME = "Цепочка писем"
+
+
+class SyncStateConfig:
+    """Настройки для модели SyncState."""
+
+    ACCOUNT_FOLDER_UNIQUE_NAME = "unique_sync_state_account_folder"
+    PK = "pk"
+    STR_FORMAT = "{account} {folder}: {last_uid}"
+    UPDATED_AT_VERBOSE_NAME = "Дата обновления контрольной точки"
+
+
+class ThreadConfig:
+    """Настройки для моделей Thread и ThreadReference."""
+
+    ACCOUNT_LATEST_INDEX_NAME = "thread_account_latest_idx"
+    ACCOUNT_MESSAGE_ID_UNIQUE_NAME = "unique_thread_reference_message"
+    ACCOUNT_SUBJECT_INDEX_NAME = "thread_account_subject_idx"
+    ID_DESCENDING = "-id"
+    LATEST_DATE = "latest_date"
+    LATEST_DATE_DESCENDING = "-latest_date"
+    LATEST_DATE_VERBOSE_NAME = "Дата последнего письма"
+    LATEST_EMAIL = "latest_email"
+    LATEST_EMAIL_VERBOSE_NAME = "Последнее письмо"
+    MESSAGE_COUNT = "message_count"
+    MESSAGE_COUNT_VERBOSE_NAME = "Количество писем"
+    MESSAGE_ID = "message_id"
+    PAGE_SIZE_MAX = 500
+    REFERENCES_LIMIT = 50
+    SEEN_VERBOSE_NAME = "Письмо с этим Message-ID сохранено"
+    STR_FORMAT = "{subject} ({count})"
+    SUBJECT = "subject"
+    SUBJECT_VERBOSE_NAME = "Тема цепочки без префиксов Re и Fwd"
+    THREAD_ID = "thread_id"
+
+
+class ImapConfig:
+    """Настройки устойчивости IMAP-соединений."""
+
+    COMPRESS_DEFLATE = "COMPRESS=DEFLATE"
+    DEFLATE = "DEFLATE"
+    # RFC 4978: поток deflate без заголовка и контрольной суммы zlib.
+    DEFLATE_WBITS = -15
+    FETCH_BATCH = 500
+    HEDGE = "hedge"
+    HEDGE_MIN_SAMPLES = 20
+    HEDGE_WINDOW = 200
+    PRIMARY = "primary"
+
+
+class KnownMessagesConfig:
+    """Настройки фильтра Блума по Message-ID сохраненных писем."""
+
+    CHUNK_SIZE = 2000
+    DIGEST_SIZE = 16
+    FALSE_POSITIVE = "false_positive"
+    GROWTH = 2
+    HASH_ENCODING = "utf-8"
+    HASH_ERRORS = "surrogatepass"
+    MIN_CAPACITY = 1024
+    SKIPPED = "skipped"
+
+
+class SerializationConfig:
+    """Настройки сериализации кадров в JSON."""
+
+    FRAME_END = "}"
+    HIT = "hit"
+    MISS = "miss"
+    SEPARATORS = (",", ":")
 
 
 class EmailAccountConfig:
@@ -150,3 +520,146 @@ class EmailAccountFormConfig:
     PASSWORD_LABEL = "Пароль приложения от почты"
     PASSWORD_HELP_TEXT = "Введите пароль приложения от почты"
     PASSWORD_VALIDATOR_MESSAGE = "Пароль должен быть не менее 8 символов"
+
+
+class SearchFilterConfig:
+    """Фильтры поиска писем в запросе fetch_emails."""
+
+    BEFORE = "before"
+    FROM = "from"
+    LARGER = "larger"
+    SINCE = "since"
+    SMALLER = "smaller"
+    SUBJECT = "subject"
+    UNSEEN = "unseen"
+
+
+class ExportConfig:
+    """Настройки выгрузки почтового ящика."""
+
+    ACCEPT_RANGES = "Accept-Ranges"
+    ATTACHMENT = "attachment"
+    BASE64 = "base64"
+    BASE64_LINE_BYTES = 57
+    BYTES = "bytes"
+    CONTENT_LENGTH = "Content-Length"
+    CONTENT_RANGE = "Content-Range"
+    CONTENT_RANGE_FORMAT = "bytes {start}-{end}/{length}"
+    CONTENT_RANGE_UNSATISFIED_FORMAT = "bytes */{length}"
+    DATE = "Date"
+    ETAG = "ETag"
+    ETAG_ENTRY_FORMAT = "{name}\0{size}\0{modified}\n"
+    ETAG_FORMAT = '"{digest}"'
+    FILE_CHANGED_ERROR_MESSAGE = "Файл {path} изменился во время выгрузки"
+    FOLDER = "X-Folder"
+    FORMAT = "format"
+    FORMAT_INVALID_ERROR_MESSAGE = "Неподдерживаемый формат выгрузки: {format}"
+    FROM = "From"
+    IF_RANGE = "If-Range"
+    MBOX = "mbox"
+    MBOX_CONTENT_TYPE = "application/mbox"
+    MBOX_FILENAME = "{email}.mbox"
+    MBOX_FROM_LINE = "From MAILER-DAEMON {date}\n"
+    MIME_VERSION = "MIME-Version"
+    MIME_VERSION_VALUE = "1.0"
+    MULTIPART_BOUNDARY = "--{boundary}\n"
+    MULTIPART_CLOSE = "--{boundary}--\n"
+    MULTIPART_MIXED = 'multipart/mixed; boundary="{boundary}"'
+    NONE = "none"
+    OCTET_STREAM = "application/octet-stream"
+    RANGE = "Range"
+    SUBJECT = "Subject"
+    ZIP = "zip"
+    ZIP_CONTENT_TYPE = "application/zip"
+    ZIP_FILENAME = "{email}-attachments.zip"
+
+
+class BenchmarkConfig:
+    """Настройки для замеров производительности."""
+
+    ATTACHMENT_FILENAME = "attachment_{index}.bin"
+    ATTACHMENT_MEDIAN_SIZE = 32 * 1024
+    ATTACHMENT_RATIO = 0.3
+    CHARSETS = {"utf-8": 0.6, "koi8-r": 0.2, "cp1251": 0.2}
+    CORPUS_DIR = "corpus"
+    EMAIL = "bench@bench.local"
+    EML_EXTENSION = ".eml"
+    FAULT_COMMANDS = ("FETCH",)
+    FAULT_DROP = "drop"
+    FAULT_STALL = "stall"
+    FOLDER = "Folder {index}"
+    FOLDERS = 1
+    HOST = "127.0.0.1"
+    HTML_SHARE = 0.5
+    HTML_TEMPLATE = "<html><body><p>{text}</p></body></html>"
+    FRAMES_SHARE = 0.95
+    IN_MEMORY_CHANNEL_LAYER = {
+        "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
+    }
+    LAG_INTERVAL = 0.01
+    LARGE_FILENAME = "large_{index}.bin"
+    LARGE_RATIO = 0.0
+    LARGE_SIZE = 8 * 1024 * 1024
+    MAIL_FROM = "Sender {index} <sender{index}@bench.local>"
+    MEDIAN_SIZE = 4 * 1024
+    MESSAGE_ID = "<bench-{seed}-{index}@bench.local>"
+    MESSAGE_ID_DOMAIN = "@bench.local>"
+    MESSAGES = 200
+    PARSE_DATES_CASE = "parse_dates"
+    PASSWORD = "bench-password"
+    PROC_STATM = "/proc/self/statm"
+    RECEIVED = "from bench.local by imap.bench.local; {date} (UTC)"
+    READ_SIZE = 64 * 1024
+    SEED = 0
+    SENT_AT = "bench_sent_at"
+    SIZE_SIGMA = 1.0
+    STARTUP_DEFERRED_MODULES = ("bs4", "chardet")
+    STARTUP_REPEAT = 5
+    STARTUP_SERVE = "serve"
+    STARTUP_SERVE_BUDGET = 1.0
+    STARTUP_SETUP = "setup"
+    STARTUP_SETUP_BUDGET = 0.8
+    STARTUP_TARGETS = {
+        STARTUP_SETUP: "import django; django.setup()",
+        STARTUP_SERVE: (
+            "import django; django.setup(); "
+            "from channels.routing import get_default_application; "
+            "get_default_application()"
+        ),
+    }
+    STARTUP_TOP = 10
+    UIDVALIDITY = 1
+    UTILS_ATTEMPTS = 2
+    UTILS_BASELINE = "utils_baseline.json"
+    UTILS_CALIBRATION_RUNS = 5
+    UTILS_MEASURE_SECONDS = 0.05
+    UTILS_NUMBER = 1
+    UTILS_REPEAT = 21
+    UTILS_TOLERANCE = 0.2
+    WEBSOCKET_CLIENTS = "1,10,50"
+    WEBSOCKET_EMAIL = "bench-ws-{index}@bench.local"
+    WEBSOCKET_MESSAGES = 50
+    WEBSOCKET_PATH = "/ws/email_list/"
+    WEBSOCKET_TIMEOUT = 60.0
+
+
+class RetentionConfig:
+    """Настройки удаления устаревших писем и файлов вложений."""
+
+    KEEP_ID = "keep_id"
+    SEARCH_ALL = "ALL"
+
+
+class ImportConfig:
+    """Настройки импорта архивов писем."""
+
+    BATCH_SIZE = 200
+    CHECKPOINT_SUFFIX = ".import-checkpoint.json"
+    DONE = "done"
+    EML_EXTENSION = ".eml"
+    FAILED = "failed"
+    KEY = "key"
+    MAILDIR_SUBDIRS = ("cur", "new")
+    MAILDIR_SUBFOLDER_PREFIX = "."
+    MESSAGE_ID = "<{digest}@import.local>"
+    TEMPORARY_SUFFIX = ".tmp"
@@ -0,0 +1,216 @@
+"""
+Маршрутизация запросов ORM между основной базой данных и репликами.
+
+Все запросы по умолчанию выполняются в основной базе данных. Запросы
+списков, постраничной выдачи и выгрузки явно выбирают базу функцией
+read_database (aread_database в асинхронном коде) и выполняются в реплике,
+если учетная запись не записывала письма в последние
+DATABASE_REPLICA_STICKY_SECONDS секунд: так клиент сразу видит результаты
+своей синхронизации, несмотря на отставание реплики.
+
+Отметка о записи хранится в кеше Redis, общем для всех воркеров, поэтому
+запрос, попавший в другой процесс, тоже читает из основной базы данных.
+"""
+
+import math
+import random
+import time
+
+from core.constants import DATABASE_REPLICA_STICKY_KEY
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from redis.exceptions import RedisError
+
+# Время последней записи писем учетной записи в этом процессе. Позволяет не
+# обращаться к Redis после собственной записи и заменяет кеш, если Redis
+# недоступен.
+_written_at: dict[int, float] = {}
+
+
+def mark_written(email_account_id: int) -> None:
+    """
+    Отметка записи писем учетной записи в основную базу данных.
+
+    Отметка сохраняется в кеше на DATABASE_REPLICA_STICKY_SECONDS секунд.
+
+    Аргументы:
+        email_account_id (int): Идентификатор учетной записи.
+    """
+    _written_at[email_account_id] = time.monotonic()
+    try:
+        cache.set(
+            DATABASE_REPLICA_STICKY_KEY.format(account=email_account_id),
+            True,
+            math.ceil(settings.DATABASE_REPLICA_STICKY_SECONDS),
+        )
+    except RedisError:
+        pass
+
+
+async def amark_written(email_account_id: int) -> None:
+    """
+    Асинхронная отметка записи писем учетной записи в основную базу данных.
+
+    В отличие от mark_written не блокирует цикл событий обращением к Redis.
+
+    Аргументы:
+        email_account_id (int): Идентификатор учетной записи.
+    """
+    _written_at[email_account_id] = time.monotonic()
+    try:
+        await cache.aset(
+            DATABASE_REPLICA_STICKY_KEY.format(account=email_account_id),
+            True,
+            math.ceil(settings.DATABASE_REPLICA_STICKY_SECONDS),
+        )
+    except RedisError:
+        pass
+
+
+def written_here(email_account_id: int) -> bool:
+    """
+    Проверка, записывала ли учетная запись письма недавно в этом процессе.
+
+    Аргументы:
+        email_account_id (int): Идентификатор учетной записи.
+
+    Возвращает:
+        bool: True, если запись была в последние
+    DATABASE_REPLICA_STICKY_SECONDS секунд.
+    """
+    written_at = _written_at.get(email_account_id)
+    return (
+        written_at is not None
+        and time.monotonic() - written_at
+        < settings.DATABASE_REPLICA_STICKY_SECONDS
+    )
+
+
+def recently_written(email_account_id: int) -> bool:
+    """
+    Проверка, записывала ли учетная запись письма недавно.
+
+    Запись учитывается в течение DATABASE_REPLICA_STICKY_SECONDS секунд в
+    любом процессе.
+
+    Аргументы:
+        email_account_id (int): Идентификатор учетной записи.
+
+    Возвращает:
+        bool: True, если запись была недавно. Если Redis недоступен,
+    учитываются только записи этого процесса.
+    """
+    if written_here(email_account_id):
+        return True
+    try:
+        return bool(
+            cache.get(
+                DATABASE_REPLICA_STICKY_KEY.format(account=email_account_id)
+            )
+        )
+    except RedisError:
+        return False
+
+
+async def arecently_written(email_account_id: int) -> bool:
+    """
+    Асинхронная проверка, записывала ли учетная запись письма недавно.
+
+    Аргументы:
+        email_account_id (int): Идентификатор учетной записи.
+
+    Возвращает:
+        bool: То же, что и recently_written, без блокировки цикла событий
+    обращением к Redis.
+    """
+    if written_here(email_account_id):
+        return True
+    try:
+        return bool(
+            await cache.aget(
+                DATABASE_REPLICA_STICKY_KEY.format(account=email_account_id)
+            )
+        )
+    except RedisError:
+        return False
+
+
+def read_database(email_account_id: int | None = None) -> str:
+    """
+    Выбор базы данных для запроса только на чтение.
+
+    В асинхронном коде для запросов учетной записи используется
+    aread_database.
+
+    Аргументы:
+        email_account_id (int | None): Идентификатор учетной записи, данные
+    которой читаются, или None, если запрос не относится к учетной записи.
+
+    Возвращает:
+        str: Псевдоним реплики или основной базы данных, если реплик нет
+    или учетная запись недавно записывала письма. Учетная запись всегда
+    читает из одной и той же реплики, поэтому повторные запросы, например
+    докачка архива, видят одно и то же отставание.
+    """
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas:
+        return DEFAULT_DB_ALIAS
+    if email_account_id is None:
+        return random.choice(replicas)
+    if recently_written(email_account_id):
+        return DEFAULT_DB_ALIAS
+    return replicas[email_account_id % len(replicas)]
+
+
+async def aread_database(email_account_id: int) -> str:
+    """
+    Асинхронный выбор базы данных для запроса учетной записи.
+
+    Аргументы:
+        email_account_id (int): Идентификатор учетной записи, данные
+    которой читаются.
+
+    Возвращает:
+        str: То же, что и read_database, без блокировки цикла событий
+    обращением к Redis.
+    """
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas:
+        return DEFAULT_DB_ALIAS
+    if await arecently_written(email_account_id):
+        return DEFAULT_DB_ALIAS
+    return replicas[email_account_id % len(replicas)]
+
+
+class ReplicaRouter:
+    """
+    Маршрутизатор, оставляющий реплики только для явных запросов.
+
+    Запись всегда выполняется в основной базе данных, даже для объектов,
+    загруженных из реплики. Чтение связанных объектов выполняется в той же
+    реплике, что и чтение исходного объекта, остальное чтение — в основной
+    базе данных. Реплики заполняются репликацией, а не миграциями.
+    """
+
+    def db_for_read(self, model, **hints) -> str:
+        """Реплика связанного объекта или основная база данных."""
+        instance = hints.get("instance")
+        if (
+            instance is not None
+            and instance._state.db in settings.DATABASE_REPLICAS
+        ):
+            return instance._state.db
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints) -> str:
+        """Основная база данных."""
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints) -> bool:
+        """Реплики содержат те же данные, что и основная база данных."""
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints) -> bool:
+        """Миграции применяются только к основной базе данных."""
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,128 @@
+"""Метрики Prometheus для синхронизации почтовых ящиков."""
+
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+BYTES_BUCKETS = (
+    1024,
+    8 * 1024,
+    64 * 1024,
+    256 * 1024,
+    1024 * 1024,
+    4 * 1024 * 1024,
+    16 * 1024 * 1024,
+    64 * 1024 * 1024,
+)
+
+IMAP_COMMAND_SECONDS = Histogram(
+    "mail_imap_command_seconds",
+    "Время выполнения команд IMAP",
+    ["command"],
+)
+IMAP_TIMEOUTS = Counter(
+    "mail_imap_timeouts",
+    "Количество команд IMAP, не уложившихся в срок",
+    ["command"],
+)
+IMAP_RECONNECTS = Counter(
+    "mail_imap_reconnects",
+    "Количество переподключений к IMAP-серверу во время синхронизации",
+)
+IMAP_HEDGES = Counter(
+    "mail_imap_hedges",
+    "Количество повторных FETCH через запасное соединение",
+    ["winner"],
+)
+IMAP_COMPRESSED_BYTES = Counter(
+    "mail_imap_compressed_bytes",
+    "Объем данных сжатых IMAP-соединений на проводе",
+    ["direction"],
+)
+IMAP_UNCOMPRESSED_BYTES = Counter(
+    "mail_imap_uncompressed_bytes",
+    "Объем данных сжатых IMAP-соединений до сжатия",
+    ["direction"],
+)
+IMAP_COMPRESSION_SECONDS = Counter(
+    "mail_imap_compression_seconds",
+    "Время сжатия и распаковки данных IMAP-соединений",
+    ["direction"],
+)
+KNOWN_MESSAGES = Counter(
+    "mail_known_messages",
+    "Количество писем, найденных фильтром Блума перед загрузкой с сервера",
+    ["result"],
+)
+PARSE_SECONDS = Histogram(
+    "mail_parse_seconds",
+    "Время разбора одного письма",
+)
+DB_SAVE_SECONDS = Histogram(
+    "mail_db_save_seconds",
+    "Время сохранения одного письма и его вложений",
+)
+ATTACHMENT_BYTES = Histogram(
+    "mail_attachment_bytes",
+    "Размер записанных вложений в байтах",
+    buckets=BYTES_BUCKETS,
+)
+SERIALIZATION_CACHE = Counter(
+    "mail_serialization_cache",
+    "Количество обращений к кешу сериализованных писем",
+    ["result"],
+)
+WEBSOCKET_SEND_SECONDS = Histogram(
+    "mail_websocket_send_seconds",
+    "Время отправки кадра клиенту через WebSocket",
+    ["type"],
+)
+EMAILS_SYNCED = Counter(
+    "mail_emails_synced",
+    "Количество отправленных клиентам писем",
+)
+ACTIVE_SYNCS = Gauge(
+    "mail_active_syncs",
+    "Количество выполняющихся синхронизаций",
+    multiprocess_mode="livesum",
+)
+SYNC_FOLLOWERS = Gauge(
+    "mail_sync_followers",
+    "Количество клиентов, получающих письма чужой синхронизации",
+    multiprocess_mode="livesum",
+)
+OUTBOUND_REPLAYS = Counter(
+    "mail_outbound_replays",
+    "Количество переполнений очереди отправки писем медленному клиенту",
+)
+QUEUE_DEPTH = Gauge(
+    "mail_queue_depth",
+    "Количество элементов, ожидающих обработки",
+    ["queue"],
+    multiprocess_mode="livesum",
+)
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """
+    Формирование текстового представления метрик для Prometheus.
+
+    Если задана переменная окружения PROMETHEUS_MULTIPROC_DIR, метрики
+    собираются со всех процессов сервера.
+
+    Возвращает:
+        tuple[bytes, str]: Тело ответа и его тип содержимого.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,216 @@
+"""Профилирование отдельных синхронизаций почтовых ящиков."""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from types import FrameType
+
+from core.constants import (
+    PROFILE_ALLOCATIONS_HEADER,
+    PROFILE_ALLOCATIONS_SHARED,
+    PROFILE_ALLOCATIONS_SKIPPED,
+    PROFILE_FILENAME,
+    PROFILE_FOLDED_EXTENSION,
+    PROFILE_SAMPLER_THREAD_NAME,
+    PROFILE_TIMESTAMP_FORMAT,
+    PROFILE_TOP_EXTENSION,
+)
+from core.utils import sanitize_and_truncate_filename
+from django.conf import settings
+
+# tracemalloc один на процесс: память отслеживает только один профиль.
+_tracing_lock = threading.Lock()
+_tracing_owner = None
+
+
+def format_stack(frame: FrameType) -> str:
+    """
+    Преобразование стека вызовов в строку формата folded stacks.
+
+    Аргументы:
+        frame (FrameType): Верхний кадр стека.
+
+    Возвращает:
+        str: Кадры от корня к вершине, разделенные точкой с запятой.
+    """
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(
+            "%s (%s:%d)"
+            % (
+                code.co_name,
+                os.path.basename(code.co_filename),
+                frame.f_lineno or 0,
+            )
+        )
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class SyncProfiler:
+    """
+    Сэмплирующий профилировщик и снимок памяти одной синхронизации.
+
+    Отдельный поток с заданным интервалом снимает стек потока, в котором
+    выполняется синхронизация, а tracemalloc отслеживает выделения памяти.
+    При выходе из контекста в SYNC_PROFILE_DIR записываются стеки в формате
+    folded stacks (совместим с flamegraph.pl и speedscope) и список мест с
+    наибольшим выделением памяти. Стеки включают все корутины цикла событий,
+    выполнявшиеся в момент снятия.
+
+    Отслеживание памяти глобально для процесса, поэтому его ведет только
+    один профиль: если tracemalloc уже запущен другим профилем или
+    приложением, отчет содержит только стеки, а в отчете профиля, который
+    отслеживает память, отмечается, что снимок включает выделения других
+    синхронизаций. В асинхронном коде
+    профилировщик используется через async with: результаты записываются
+    на диск в отдельном потоке, не блокируя цикл событий.
+
+    Атрибуты:
+        label (str): Метка профиля, например адрес почтового ящика.
+        samples (Counter): Количество попаданий каждого стека.
+        path (str): Путь к записанным результатам без расширения.
+        shared (bool): Выполнялись ли одновременно другие профили.
+    """
+
+    def __init__(
+        self,
+        label: str,
+        output_dir: str = None,
+        interval: float = None,
+        top_allocations: int = None,
+    ) -> None:
+        """
+        Инициализация профилировщика.
+
+        Аргументы:
+            label (str): Метка профиля.
+            output_dir (str): Каталог для записи результатов.
+            interval (float): Интервал снятия стека в секундах.
+            top_allocations (int): Количество мест выделения памяти в отчете.
+        """
+        self.label = label
+        self.output_dir = output_dir or settings.SYNC_PROFILE_DIR
+        self.interval = interval or settings.SYNC_PROFILE_INTERVAL
+        self.top_allocations = (
+            top_allocations or settings.SYNC_PROFILE_TOP_ALLOCATIONS
+        )
+        self.samples = Counter()
+        self._thread_id = None
+        self._stopped = threading.Event()
+        self._sampler = None
+        self._started_at = None
+        self._start = None
+        self.shared = False
+        self._snapshot = None
+        self._duration = None
+        self.path = None
+
+    def _sample(self) -> None:
+        """Снятие стеков профилируемого потока до остановки."""
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is not None:
+                self.samples[format_stack(frame)] += 1
+
+    def __enter__(self) -> "SyncProfiler":
+        """Запуск сэмплирования и отслеживания памяти."""
+        self._thread_id = threading.get_ident()
+        self._started_at = datetime.now()
+        self._start = time.perf_counter()
+        global _tracing_owner
+        with _tracing_lock:
+            if _tracing_owner is not None:
+                _tracing_owner.shared = True
+            elif not tracemalloc.is_tracing():
+                tracemalloc.start()
+                _tracing_owner = self
+        self._sampler = threading.Thread(
+            target=self._sample,
+            name=PROFILE_SAMPLER_THREAD_NAME,
+            daemon=True,
+        )
+        self._sampler.start()
+        return self
+
+    def stop(self) -> None:
+        """Остановка сэмплирования и снятие снимка памяти."""
+        self._duration = time.perf_counter() - self._start
+        self._stopped.set()
+        self._sampler.join()
+        global _tracing_owner
+        with _tracing_lock:
+            if _tracing_owner is not self:
+                return
+            try:
+                self._snapshot = tracemalloc.take_snapshot()
+            finally:
+                tracemalloc.stop()
+                _tracing_owner = None
+
+    def __exit__(self, *exc_info) -> None:
+        """Остановка профилирования и запись результатов на диск."""
+        self.stop()
+        self.write(self._snapshot, self._duration)
+
+    async def __aenter__(self) -> "SyncProfiler":
+        """Запуск сэмплирования и отслеживания памяти."""
+        return self.__enter__()
+
+    async def __aexit__(self, *exc_info) -> None:
+        """Остановка профилирования и запись результатов в потоке."""
+        self.stop()
+        await asyncio.to_thread(self.write, self._snapshot, self._duration)
+
+    def write(
+        self, snapshot: tracemalloc.Snapshot | None, duration: float
+    ) -> str:
+        """
+        Запись стеков и мест выделения памяти на диск.
+
+        Аргументы:
+            snapshot (tracemalloc.Snapshot | None): Снимок памяти или None,
+        если память не отслеживалась.
+            duration (float): Длительность синхронизации в секундах.
+
+        Возвращает:
+            str: Путь к файлу без расширения.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(
+            self.output_dir,
+            PROFILE_FILENAME.format(
+                label=sanitize_and_truncate_filename(self.label, 100),
+                started=self._started_at.strftime(PROFILE_TIMESTAMP_FORMAT),
+                duration=duration,
+            ),
+        )
+        with open(path + PROFILE_FOLDED_EXTENSION, "w") as file:
+            for stack, count in self.samples.most_common():
+                file.write("%s %d\n" % (stack, count))
+        with open(path + PROFILE_TOP_EXTENSION, "w") as file:
+            file.write(
+                PROFILE_ALLOCATIONS_HEADER.format(
+                    label=self.label,
+                    started=self._started_at.isoformat(),
+                    duration=duration,
+                    samples=sum(self.samples.values()),
+                )
+            )
+            if snapshot is None:
+                file.write(PROFILE_ALLOCATIONS_SKIPPED)
+            else:
+                if self.shared:
+                    file.write(PROFILE_ALLOCATIONS_SHARED)
+                for stat in snapshot.statistics("lineno")[
+                    : self.top_allocations
+                ]:
+                    file.write("%s\n" % stat)
+        self.path = path
+        return path
@@ -0,0 +1,92 @@
+"""
+Функции преобразования значений переменных окружения.
+
+Модуль импортируется из config/settings.py при каждом запуске Django,
+поэтому не зависит от модулей разбора писем.
+"""
+
+import ipaddress
+import os
+
+
+def cast_redis_hosts(value: str) -> tuple:
+    """
+    Преобразует строку в кортеж, содержащий хост и порт Redis.
+
+    Аргументы:
+    - value (str): Строка, содержащая хост и порт, разделенные запятой и
+    пробелом.
+
+    Возвращает:
+    - tuple: Кортеж, содержащий хост (str) и порт (int).
+    """
+    host, port = value.split(", ")
+    return tuple([host, int(port)])
+
+
+def cast_networks(
+    value: str,
+) -> tuple[ipaddress.IPv4Network | ipaddress.IPv6Network, ...]:
+    """
+    Преобразует строку вида "127.0.0.1/32, 10.0.0.0/8" в сети IP-адресов.
+
+    Аргументы:
+    - value (str): Сети или отдельные адреса, разделенные запятой.
+
+    Возвращает:
+    - tuple: Сети IPv4 и IPv6.
+    """
+    return tuple(
+        ipaddress.ip_network(item.strip())
+        for item in value.split(",")
+        if item.strip()
+    )
+
+
+def cast_timeouts(value: str) -> dict[str, float]:
+    """
+    Преобразует строку вида "login=15, fetch=60" в сроки команд IMAP.
+
+    Аргументы:
+    - value (str): Пары команда=секунды, разделенные запятой.
+
+    Возвращает:
+    - dict[str, float]: Срок выполнения в секундах для каждой команды.
+    """
+    timeouts = {}
+    for item in value.split(","):
+        if item.strip():
+            command, seconds = item.split("=")
+            timeouts[command.strip().lower()] = float(seconds)
+    return timeouts
+
+
+def replica_databases(
+    default: dict, replicas: list[str], base_dir: str
+) -> dict[str, dict]:
+    """
+    Формирует настройки реплик по настройкам основной базы данных.
+
+    Для SQLite реплика задается путем к файлу относительно base_dir, для
+    остальных СУБД — хостом и необязательным портом через двоеточие.
+    Реплики используют тестовую базу данных основной базы.
+
+    Аргументы:
+    - default (dict): Настройки основной базы данных.
+    - replicas (list[str]): Файлы или хосты реплик.
+    - base_dir (str): Каталог, относительно которого заданы файлы SQLite.
+
+    Возвращает:
+    - dict[str, dict]: Настройки реплик с псевдонимами replica_1, replica_2…
+    """
+    databases = {}
+    for index, replica in enumerate(replicas, start=1):
+        database = {**default, "TEST": {"MIRROR": "default"}}
+        if default["ENGINE"].endswith("sqlite3"):
+            database["NAME"] = os.path.join(base_dir, replica)
+        else:
+            host, _, port = replica.partition(":")
+            database["HOST"] = host
+            database["PORT"] = port or default.get("PORT", "")
+        databases["replica_%d" % index] = database
+    return databases
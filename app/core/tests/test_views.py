@@ -0,0 +1,35 @@
+"""Тесты доступа к метрикам."""
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.urls import reverse
+
+OUTSIDE = "203.0.113.7"
+
+
+class MetricsTests(TestCase):
+    """Доступ к /metrics по адресу клиента и правам пользователя."""
+
+    def test_allowed_network(self) -> None:
+        """Клиент из разрешенной сети получает метрики."""
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_outside_network(self) -> None:
+        """Клиенту из другой сети доступ запрещен."""
+        response = self.client.get(
+            reverse("metrics"),
+            REMOTE_ADDR=OUTSIDE,
+            HTTP_X_FORWARDED_FOR="127.0.0.1",
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_staff_user(self) -> None:
+        """Сотрудник получает метрики из любой сети."""
+        self.client.force_login(
+            get_user_model().objects.create_user(
+                "staff", password="password", is_staff=True
+            )
+        )
+        response = self.client.get(reverse("metrics"), REMOTE_ADDR=OUTSIDE)
+        self.assertEqual(response.status_code, 200)
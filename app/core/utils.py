@@ -1,24 +1,83 @@
-"""Функции для получения корректных данных из электронных писем."""
+"""
+Функции для получения корректных данных из электронных писем.
 
+Модули chardet и bs4 импортируются при первом разборе письма, которому они
+нужны: их загрузка заметно замедляет запуск Django, а большинству команд и
+воркеров без разбора писем они не требуются.
+"""
+
+import binascii
 import hashlib
+import quopri
+import re
+from datetime import date, datetime
+from email import policy
+from email.headerregistry import BaseHeader, HeaderRegistry
 from email.message import Message
-from typing import Any
 
-import chardet
-from bs4 import BeautifulSoup
 from core.constants import (
     BS4_PARSER,
-    CONTENT,
     CONTENT_DISPOSITION,
+    DATETIME_FORMAT,
     ENCODING,
-    FILENAME,
     HASHED_SUBJECT_MAX_LENGTH,
+    IMAP_DATE_FORMAT,
+    IMAP_MONTHS,
     MULTIPART,
+    PREVIEW_BASE64,
+    PREVIEW_QUOTED_PRINTABLE,
     TEXT_HTML,
     TEXT_PLANE,
 )
 
 
+class CachedHeaderRegistry(HeaderRegistry):
+    """
+    Реестр заголовков, переиспользующий созданные классы заголовков.
+
+    Стандартный HeaderRegistry при каждом обращении к заголовку создает
+    новый класс через type(). Классы образуют циклические ссылки, поэтому
+    каждое разобранное письмо оставляет после себя десятки объектов для
+    сборщика мусора. Здесь класс создается один раз для каждого класса
+    заголовка из реестра, число которых ограничено.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        """Инициализация реестра с пустым кешем классов."""
+        super().__init__(*args, **kwargs)
+        self.header_classes = {}
+
+    def map_to_type(self, name: str, cls: type) -> None:
+        """
+        Регистрация класса заголовка со сбросом кеша.
+
+        Аргументы:
+            name (str): Имя заголовка.
+            cls (type): Класс заголовка.
+        """
+        super().map_to_type(name, cls)
+        self.header_classes.clear()
+
+    def __getitem__(self, name: str) -> type[BaseHeader]:
+        """
+        Получение класса заголовка по его имени.
+
+        Аргументы:
+            name (str): Имя заголовка.
+
+        Возвращает:
+            type[BaseHeader]: Класс заголовка.
+        """
+        cls = self.registry.get(name.lower(), self.default_class)
+        header_class = self.header_classes.get(cls)
+        if header_class is None:
+            header_class = self.header_classes[cls] = super().__getitem__(name)
+        return header_class
+
+
+email_policy = policy.default.clone(header_factory=CachedHeaderRegistry())
+
+
 def add_text_from_part(str_obj: str, part: Message = None) -> str:
     """
     Получение текста из части сообщения и добавление его к существующей строке.
@@ -35,38 +94,61 @@ def add_text_from_part(str_obj: str, part: Message = None) -> str:
     return str_obj
 
 
-def cast_redis_hosts(value: str) -> tuple:
+def decode_text(payload: bytes) -> str:
     """
-    Преобразует строку в кортеж, содержащий хост и порт Redis.
+    Декодирует текст с автоматическим определением кодировки.
 
     Аргументы:
-    - value (str): Строка, содержащая хост и порт, разделенные запятой и
-    пробелом.
+        payload (bytes): Байтовый массив текста.
 
     Возвращает:
-    - tuple: Кортеж, содержащий хост (str) и порт (int).
+        str: Декодированный текст.
     """
-    host, port = value.split(", ")
-    return tuple([host, int(port)])
+    try:
+        return payload.decode()
+    except UnicodeDecodeError:
+        import chardet
 
+        return payload.decode(chardet.detect(payload)[ENCODING])
 
-def decode_text(payload: bytes) -> str:
+
+QP_INCOMPLETE_ESCAPE_PATTERN = re.compile(rb"=[0-9A-Fa-f]?$")
+
+
+def decode_partial_text(
+    payload: bytes, encoding: str, charset: str | None
+) -> str:
     """
-    Декодирует текст с автоматическим определением кодировки.
+    Декодирует начало текстовой части письма, полученное частичным FETCH.
+
+    Обрезанные на границе диапазона группы base64 и escape-последовательности
+    quoted-printable отбрасываются, а неполный символ многобайтовой
+    кодировки в конце игнорируется.
 
     Аргументы:
-        payload (bytes): Байтовый массив текста.
+        payload (bytes): Начало части в кодировании передачи.
+        encoding (str): Кодирование передачи (base64, quoted-printable и т.д.).
+        charset (str | None): Кодировка текста из BODYSTRUCTURE.
 
     Возвращает:
         str: Декодированный текст.
     """
-    try:
-        return payload.decode()
-    except UnicodeDecodeError:
-        return payload.decode(chardet.detect(payload)[ENCODING])
+    if encoding == PREVIEW_BASE64:
+        payload = b"".join(payload.split())
+        payload = binascii.a2b_base64(payload[: len(payload) // 4 * 4])
+    elif encoding == PREVIEW_QUOTED_PRINTABLE:
+        payload = quopri.decodestring(
+            QP_INCOMPLETE_ESCAPE_PATTERN.sub(b"", payload)
+        )
+    if charset:
+        try:
+            return payload.decode(charset, errors="ignore")
+        except LookupError:
+            pass
+    return decode_text(payload)
 
 
-def get_attachments_from_message(message: Message) -> list[dict[str, Any]]:
+def get_attachments_from_message(message: Message) -> list[tuple[str, bytes]]:
     """
     Извлечение прикреплённых файлов из сообщения.
 
@@ -74,11 +156,10 @@ def get_attachments_from_message(message: Message) -> list[dict[str, Any]]:
         message (Message): Объект сообщения электронной почты.
 
     Возвращает:
-        List[Dict[str, Any]]: Список словарей, каждый из которых содержит
-        информацию о прикреплённом файле.
-            Каждый словарь содержит следующие ключи:
-            - 'filename' (str): Имя файла.
-            - 'content' (bytes): Содержимое файла в виде байтового массива.
+        list[tuple[str, bytes]]: Список прикреплённых файлов, каждый из
+        которых представлен кортежем:
+            - Имя файла.
+            - Содержимое файла в виде байтового массива.
     """
     attachments = []
     for part in message.walk():
@@ -88,13 +169,7 @@ def get_attachments_from_message(message: Message) -> list[dict[str, Any]]:
             continue
         filename = part.get_filename()
         if filename:
-            content = part.get_payload(decode=True)
-            attachments.append(
-                {
-                    FILENAME: filename,
-                    CONTENT: content,
-                }
-            )
+            attachments.append((filename, part.get_payload(decode=True)))
     return attachments
 
 
@@ -124,11 +199,110 @@ def extract_text_from_message(message: Message) -> str:
         elif content_type == TEXT_HTML:
             html += add_text_from_part(text, message)
     if html:
+        from bs4 import BeautifulSoup
+
         soup = BeautifulSoup(html, BS4_PARSER)
         text += soup.get_text()
+        soup.decompose()
     return " ".join(text.strip().split())
 
 
+def format_imap_date(value: date) -> str:
+    """
+    Преобразование даты в формат критериев поиска IMAP (01-Jan-2024).
+
+    Названия месяцев не зависят от локали, как того требует RFC 3501.
+
+    Аргументы:
+        value (date): Дата.
+
+    Возвращает:
+        str: Дата в формате IMAP.
+    """
+    return IMAP_DATE_FORMAT.format(
+        day=value.day, month=IMAP_MONTHS[value.month - 1], year=value.year
+    )
+
+
+def parse_email_date(value: str | None) -> datetime | None:
+    """
+    Получение даты отправки письма из заголовка Date.
+
+    Аргументы:
+        value (str | None): Значение заголовка Date.
+
+    Возвращает:
+        datetime | None: Дата отправки письма или None, если заголовка нет.
+
+    Вызывает ошибку:
+        ValueError: Если дата не соответствует формату DATETIME_FORMAT.
+    """
+    if not value:
+        return None
+    return datetime.strptime(value, DATETIME_FORMAT)
+
+
+def parse_received_date(value: str | None) -> datetime | None:
+    """
+    Получение даты получения письма из заголовка Received.
+
+    Аргументы:
+        value (str | None): Значение заголовка Received.
+
+    Возвращает:
+        datetime | None: Дата получения письма или None, если заголовка нет.
+
+    Вызывает ошибку:
+        IndexError: Если в заголовке нет даты после точки с запятой.
+        ValueError: Если дата не соответствует формату DATETIME_FORMAT.
+    """
+    if not value:
+        return None
+    return datetime.strptime(
+        value.split(";")[1].strip().split(" (")[0], DATETIME_FORMAT
+    )
+
+
+MESSAGE_ID_PATTERN = re.compile(r"<[^<>\s]+>")
+REPLY_PREFIX_PATTERN = re.compile(
+    r"^\s*(?:(?:re|fwd?|aw|ответ|отв)\s*(?:\[\d+\])?\s*:\s*)+",
+    re.IGNORECASE,
+)
+
+
+def parse_message_ids(value: str | None) -> list[str]:
+    """
+    Получение идентификаторов сообщений из заголовка.
+
+    Заголовки In-Reply-To и References часто содержат комментарии и
+    адреса помимо идентификаторов, поэтому берутся только значения в
+    угловых скобках.
+
+    Аргументы:
+        value (str | None): Значение заголовка In-Reply-To или References.
+
+    Возвращает:
+        list[str]: Идентификаторы сообщений в порядке следования.
+    """
+    return MESSAGE_ID_PATTERN.findall(str(value or ""))
+
+
+def normalize_subject(subject: str | None) -> tuple[str, bool]:
+    """
+    Тема письма без префиксов ответа и пересылки.
+
+    Аргументы:
+        subject (str | None): Тема письма.
+
+    Возвращает:
+        tuple[str, bool]: Тема в нижнем регистре с одиночными пробелами и
+    признак того, что у темы был префикс Re, Fwd или аналогичный.
+    """
+    subject = str(subject or "")
+    stripped = REPLY_PREFIX_PATTERN.sub("", subject)
+    return " ".join(stripped.lower().split()), stripped != subject
+
+
 def sanitize_and_truncate_filename(filename: str, max_length: int) -> str:
     """
     Создание имени файла, не превышающего заданную максимальную длину.
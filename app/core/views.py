@@ -0,0 +1,52 @@
+"""Представления для приложения core."""
+
+import ipaddress
+
+from core.metrics import render_metrics
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
+
+
+def metrics_allowed(request) -> bool:
+    """
+    Проверка доступа к метрикам.
+
+    Адрес клиента берется из REMOTE_ADDR, а не из заголовков прокси,
+    которые клиент может подделать. Через nginx метрики не отдаются.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса Django.
+
+    Возвращает:
+        bool: True для сотрудников и адресов из METRICS_ALLOWED_NETWORKS.
+    """
+    if request.user.is_staff:
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(
+        address in network for network in settings.METRICS_ALLOWED_NETWORKS
+    )
+
+
+def metrics(request):
+    """
+    Отдает метрики синхронизации в формате Prometheus.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса Django.
+
+    Возвращает:
+        HttpResponse: Ответ с метриками в текстовом формате Prometheus.
+
+    Вызывает ошибку:
+        PermissionDenied: Если клиент не сотрудник и его адреса нет в
+    METRICS_ALLOWED_NETWORKS.
+    """
+    if not metrics_allowed(request):
+        raise PermissionDenied
+    body, content_type = render_metrics()
+    return HttpResponse(body, content_type=content_type)
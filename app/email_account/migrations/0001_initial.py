@@ -0,0 +1,43 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="EmailAccount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "email",
+                    models.EmailField(
+                        help_text="Введите адрес электронной почты",
+                        max_length=254,
+                        verbose_name="Электронная почта",
+                    ),
+                ),
+                (
+                    "password",
+                    models.CharField(
+                        help_text="Введите пароль от электронной почты",
+                        max_length=128,
+                        verbose_name="Пароль",
+                    ),
+                ),
+            ],
+        ),
+    ]
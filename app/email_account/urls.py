@@ -8,6 +8,8 @@ URL-адреса:
 - `"email_list/"`: Страница со списком email-сообщений.
 - `"attachments/(?P<filename>.*)$"`: Маршрут для скачивания вложений, где
 `filename` - имя файла вложения.
+- `"export/<email>/"`: Потоковая выгрузка всех вложений (ZIP) или писем
+(mbox) учетной записи.
 
 Дополнительная информация об этом файле доступна по ссылке
     https://docs.djangoproject.com/en/stable/topics/http/urls/
@@ -15,7 +17,7 @@ URL-адреса:
 
 from django.urls import path, re_path
 from email_account.views import add_email_account
-from mail_recipient.views import download_file, email_list
+from mail_recipient.views import download_file, email_list, export_mailbox
 
 urlpatterns = [
     path("", add_email_account, name="add_email_account"),
@@ -25,4 +27,5 @@ urlpatterns = [
         download_file,
         name="download_file",
     ),
+    path("export/<str:email>/", export_mailbox, name="export_mailbox"),
 ]
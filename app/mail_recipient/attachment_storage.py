@@ -0,0 +1,219 @@
+"""Модуль attachment_storage."""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from urllib.parse import urljoin
+
+from core.constants import (
+    ATTACHMENT_WRITES,
+    ATTACHMENTS_STORAGE_THREAD_NAME_PREFIX,
+    FILE_PATH,
+    FILENAME,
+    URL,
+    AttachmentConfig,
+)
+from core.metrics import ATTACHMENT_BYTES, QUEUE_DEPTH
+from core.utils import generate_subfolder_name, sanitize_and_truncate_filename
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils.encoding import filepath_to_uri
+from email_account.models import EmailAccount
+
+
+class AttachmentStorage:
+    """
+    Асинхронное хранилище вложений электронных писем.
+
+    Все вложения одного письма записываются параллельно через ограниченный
+    пул потоков, а URL-адреса вычисляются без обращения к хранилищу. Для
+    локальной файловой системы файл создается атомарно (O_CREAT | O_EXCL),
+    поэтому отдельная проверка существования файла не требуется.
+
+    Атрибуты:
+        storage (Storage): Хранилище файлов Django.
+        executor (ThreadPoolExecutor): Пул потоков для записи файлов.
+    """
+
+    def __init__(
+        self,
+        storage: Any = default_storage,
+        max_workers: int = settings.ATTACHMENTS_STORAGE_MAX_WORKERS,
+    ) -> None:
+        """
+        Инициализация хранилища вложений.
+
+        Аргументы:
+            storage (Storage): Хранилище файлов Django.
+            max_workers (int): Максимальное количество потоков записи.
+        """
+        self.storage = storage
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix=ATTACHMENTS_STORAGE_THREAD_NAME_PREFIX,
+        )
+
+    def build_file_path(
+        self, email_account: EmailAccount, subject: str, filename: str
+    ) -> tuple[str, str]:
+        """
+        Формирование безопасного имени и пути файла вложения.
+
+        Аргументы:
+            email_account (EmailAccount): Учетная запись электронной почты.
+            subject (str): Тема письма.
+            filename (str): Исходное имя файла вложения.
+
+        Возвращает:
+            tuple[str, str]: Безопасное имя файла и путь к нему в хранилище.
+        """
+        subfolder = generate_subfolder_name(subject)
+        safe_filename_max_length = (
+            AttachmentConfig.ATTACHMENT_FILENAME_MAX_LENGTH
+            - sum(
+                len(obj)
+                for obj in [
+                    settings.ATTACHMENTS_URL,
+                    email_account.email,
+                    subfolder,
+                ]
+            )
+        )
+        safe_filename = sanitize_and_truncate_filename(
+            filename, max_length=safe_filename_max_length
+        )
+        file_path = os.path.join(
+            settings.ATTACHMENTS_URL,
+            email_account.email,
+            subfolder,
+            safe_filename,
+        )
+        return safe_filename, file_path
+
+    def url(self, file_path: str) -> str:
+        """
+        Вычисление URL-адреса файла без обращения к хранилищу.
+
+        Аргументы:
+            file_path (str): Путь к файлу в хранилище.
+
+        Возвращает:
+            str: URL-адрес файла.
+        """
+        base_url = getattr(self.storage, "base_url", None)
+        if base_url is None:
+            return self.storage.url(file_path)
+        return urljoin(base_url, filepath_to_uri(file_path).lstrip("/"))
+
+    def write(self, file_path: str, content: bytes) -> bool:
+        """
+        Запись файла вложения, если его еще нет в хранилище.
+
+        Для локальной файловой системы файл создается атомарно, для прочих
+        хранилищ выполняется проверка существования и сохранение в одном
+        потоке.
+
+        Аргументы:
+            file_path (str): Путь к файлу в хранилище.
+            content (bytes): Содержимое файла.
+
+        Возвращает:
+            bool: True, если файл был создан, иначе False.
+        """
+        try:
+            created = self._write(file_path, content)
+        finally:
+            QUEUE_DEPTH.labels(ATTACHMENT_WRITES).dec()
+        if created:
+            ATTACHMENT_BYTES.observe(len(content or b""))
+        return created
+
+    def _write(self, file_path: str, content: bytes) -> bool:
+        """
+        Запись файла вложения без учета метрик.
+
+        Аргументы:
+            file_path (str): Путь к файлу в хранилище.
+            content (bytes): Содержимое файла.
+
+        Возвращает:
+            bool: True, если файл был создан, иначе False.
+        """
+        if not isinstance(self.storage, FileSystemStorage):
+            if self.storage.exists(file_path):
+                return False
+            self.storage.save(file_path, ContentFile(content))
+            return True
+        full_path = self.storage.path(file_path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        try:
+            fd = os.open(
+                full_path,
+                os.O_WRONLY
+                | os.O_CREAT
+                | os.O_EXCL
+                | getattr(os, "O_BINARY", 0),
+                self.storage.file_permissions_mode or 0o666,
+            )
+        except FileExistsError:
+            return False
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(content or b"")
+        except BaseException:
+            os.unlink(full_path)
+            raise
+        return True
+
+    async def save_attachments(
+        self,
+        email_account: EmailAccount,
+        subject: str,
+        attachments: list[tuple[str, bytes]],
+    ) -> list[dict[str, str]]:
+        """
+        Сохранение всех вложений письма в хранилище.
+
+        Аргументы:
+            email_account (EmailAccount): Учетная запись электронной почты.
+            subject (str): Тема письма.
+            attachments (list[tuple[str, bytes]]): Список вложений в виде
+        кортежей из имени файла и содержимого.
+
+        Возвращает:
+            list[dict[str, str]]: Список вложений с ключами FILENAME,
+        FILE_PATH и URL.
+        """
+        saved_attachments = []
+        for filename, _ in attachments:
+            safe_filename, file_path = self.build_file_path(
+                email_account, subject, filename
+            )
+            saved_attachments.append(
+                {
+                    FILENAME: safe_filename,
+                    FILE_PATH: file_path,
+                    URL: self.url(file_path),
+                }
+            )
+        loop = asyncio.get_running_loop()
+        QUEUE_DEPTH.labels(ATTACHMENT_WRITES).inc(len(attachments))
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(
+                    self.executor,
+                    self.write,
+                    saved_attachment[FILE_PATH],
+                    content,
+                )
+                for saved_attachment, (_, content) in zip(
+                    saved_attachments, attachments
+                )
+            )
+        )
+        return saved_attachments
+
+
+attachment_storage = AttachmentStorage()
@@ -1,20 +1,28 @@
 """Модуль consumers."""
 
 import asyncio
-import json
 import logging
+from collections import Counter
+from contextlib import suppress
 from datetime import datetime, timedelta
-from typing import Any, Coroutine
+from functools import partial
+from typing import Any, Coroutine, Iterable
 
 import aioimaplib
 from channels.generic.websocket import AsyncWebsocketConsumer
 from core.constants import (
     ACTION,
     ALL_EMAILS_ID_RECEIVED_LOGGER_INFO,
+    BACKFILL,
+    BACKFILL_STARTED_LOGGER_MESSAGE,
     CHECKED,
+    CHECKED_BYTES,
     CHECKED_EMAIL_LOGGER_INFO_MESSAGE,
     CLOSE_CONNECTION,
     CONSUMER,
+    CREDIT,
+    CREDITS,
+    CREDITS_INVALID_ERROR_MESSAGE,
     CURRENT_GMT,
     EMAIL,
     EMAIL_ACCOUNT_NOT_FOUND_ERROR_MESSAGE,
@@ -27,30 +35,130 @@ from core.constants import (
     FETCH_EMAILS,
     FETCH_EMAILS_CANCELLED_LOGGER_MESSAGE,
     FETCH_EMAILS_COMPLETE_LOGGER_MESSAGE,
+    FETCH_THREADS,
+    FILTERS,
+    FOLDERS,
+    FOLDERS_DISCOVERED_LOGGER_MESSAGE,
+    FOLDERS_INVALID_ERROR_MESSAGE,
+    INBOX,
+    LARGE_MESSAGES,
+    LARGE_MESSAGES_STARTED_LOGGER_MESSAGE,
+    LIMIT,
     MESSAGE,
     MESSAGE_ID,
     NEW_EMAIL,
+    NEWEST,
+    OFFSET,
+    ORDERING,
+    ORDERINGS,
+    PENDING_EMAILS,
+    POSITION,
+    PREVIEW,
+    PROFILE,
+    PROFILE_NOT_ALLOWED_LOGGER_WARNING_MESSAGE,
+    PROFILE_SAVED_LOGGER_MESSAGE,
     PROGRESS,
+    SYNC_FINISHED,
+    SYNC_FOLLOWER_ATTACHED_LOGGER_MESSAGE,
+    SYNC_FRAME,
+    SYNC_GROUP,
+    SYNC_LEADER_LOGGER_MESSAGE,
+    SYNC_LEASE_LOST_LOGGER_MESSAGE,
+    SYNC_LEASE_UNAVAILABLE_LOGGER_MESSAGE,
+    SYNC_OPTIONS,
+    SYNC_RELEASED,
+    SYNCED_EMAILS_SENT_LOGGER_MESSAGE,
+    TEXT,
+    THREADS,
+    THREADS_PAGE_INVALID_ERROR_MESSAGE,
+    THREADS_SENT_LOGGER_MESSAGE,
     TIMEOUT_ERROR_MESSAGE,
     TIMEOUT_LOGGER_ERROR_MESSAGE,
     TOTAL,
+    TOTAL_BYTES,
     TOTAL_EMAILS,
     TYPE,
     UNEXPECTED_ERROR_MESSAGE,
     UNEXPECTED_LOGGER_ERROR_MESSAGE,
     UNSUPPORTED_ACTION_ERROR_MESSAGE,
     UNSUPPORTED_ACTION_LOGGER_ERROR_MESSAGE,
+    UNSUPPORTED_ORDERING_ERROR_MESSAGE,
+    USER,
+    WINDOW_COMPLETE,
+    WINDOW_DAYS,
+    WINDOW_MESSAGES,
+    WINDOW_NEGATIVE_ERROR_MESSAGE,
+    ThreadConfig,
 )
+from core.db_router import read_database
+from core.metrics import (
+    ACTIVE_SYNCS,
+    EMAILS_SYNCED,
+    QUEUE_DEPTH,
+    SYNC_FOLLOWERS,
+    WEBSOCKET_SEND_SECONDS,
+)
+from core.profiling import SyncProfiler
+from django.conf import settings
 from email_account.models import EmailAccount
 from mail_recipient.fetch_emails import (
     check_email,
-    connect_and_get_emails,
+    check_email_preview,
+    fetch_message_sizes,
+    get_folder_emails,
+    list_folders,
     read_email,
+    select_folder,
+    split_large_messages,
+    split_sync_window,
+)
+from mail_recipient.flow_control import OutboundWindow, email_position
+from mail_recipient.imap_pool import ImapConnectionPool
+from mail_recipient.save_email import serialize_thread
+from mail_recipient.search_filters import build_search_criteria
+from mail_recipient.serialization import (
+    EmailData,
+    dump_position,
+    dumps,
+    encode_frame,
+    load_position,
+    loads,
+)
+from mail_recipient.sync_lease import SyncLease
+from mail_recipient.sync_state import (
+    FolderQueue,
+    iter_synced_emails,
+    partition_synced_uids,
+    synced_folders,
 )
+from mail_recipient.threads import list_threads
+from prometheus_client import Gauge
+from redis.exceptions import RedisError
 
 consumer_logger = logging.getLogger(CONSUMER)
 
 
+async def run_concurrently(coroutines: Iterable[Coroutine]) -> list[Any]:
+    """
+    Параллельное выполнение корутин в группе задач.
+
+    Если одна из корутин завершилась ошибкой, остальные отменяются, а
+    ошибка пробрасывается как есть, без обертки в ExceptionGroup.
+
+    Аргументы:
+        coroutines (Iterable[Coroutine]): Выполняемые корутины.
+
+    Возвращает:
+        list[Any]: Результаты корутин в исходном порядке.
+    """
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(coroutine) for coroutine in coroutines]
+    except BaseExceptionGroup as error:
+        raise error.exceptions[0] from error
+    return [task.result() for task in tasks]
+
+
 class EmailListConsumer(AsyncWebsocketConsumer):
     """
     Асинхронный WebSocket consumer для обработки запросов.
@@ -65,16 +173,38 @@ class EmailListConsumer(AsyncWebsocketConsumer):
     - disconnect: Закрывает WebSocket-соединение.
     - process_email: Обрабатывает и отправляет данные электронных писем
     клиенту.
+
+    Одновременно синхронизацию учетной записи с одними параметрами
+    выполняет только один consumer в кластере — владелец аренды SyncLease.
+    Остальные consumer'ы той же учетной записи с теми же параметрами
+    подписываются на группу канального слоя и
+    пересылают своим клиентам кадры владельца, а при освобождении аренды
+    один из них продолжает синхронизацию с контрольной точки.
     """
 
     def __init__(self, *args, **kwargs):
         """
         Инициализация экземпляра EmailListConsumer.
 
-        Инициализирует атрибут для хранения задачи выборки электронных писем.
+        Инициализирует атрибут для хранения задачи выборки электронных писем,
+        счетчики обработанных писем и байт, размеры писем синхронизации и
+        состояние аренды синхронизации.
         """
         super().__init__(*args, **kwargs)
         self.fetch_task = None
+        self.checked_email_counter = 0
+        self.synced_email_counter = 0
+        self.checked_bytes = 0
+        self.message_sizes = {}
+        self.dequeued = Counter()
+        self.lease = None
+        self.lease_task = None
+        self.is_leader = False
+        self.following = False
+        self.sync_group = None
+        self.sent_message_ids = set()
+        self.lease_released = asyncio.Event()
+        self.window = None
 
     async def connect(self) -> Coroutine[Any, Any, None]:
         """
@@ -94,8 +224,8 @@ class EmailListConsumer(AsyncWebsocketConsumer):
 
         Этот метод вызывается при получении сообщения от клиента. Он
         обрабатывает сообщение, проверяет наличие необходимых данных и
-        выполняет соответствующие действия, такие как получение списка
-        электронных писем.
+        выполняет соответствующие действия: синхронизацию и получение списка
+        электронных писем или получение страницы цепочек писем.
 
         Аргументы:
             text_data (Any): Текстовые данные, полученные от клиента.
@@ -112,12 +242,15 @@ class EmailListConsumer(AsyncWebsocketConsumer):
             Exception: Если возникает неожиданная ошибка.
         """
         try:
-            text_data_json = json.loads(text_data)
+            text_data_json = loads(text_data)
             action = text_data_json.get(ACTION)
             if action == CLOSE_CONNECTION:
                 await self.close()
                 return
-            if action != FETCH_EMAILS:
+            if action == CREDIT:
+                self.grant_credits(text_data_json)
+                return
+            if action not in (FETCH_EMAILS, FETCH_THREADS):
                 consumer_logger.error(
                     UNSUPPORTED_ACTION_LOGGER_ERROR_MESSAGE, action
                 )
@@ -128,40 +261,32 @@ class EmailListConsumer(AsyncWebsocketConsumer):
                     EMAIL_REQUIRED_LOGGER_ERROR_MESSAGE, email
                 )
                 raise ValueError(EMAIL_REQUIRED_ERROR_MESSAGE)
-            email_account = await EmailAccount.objects.filter(
-                email=email
-            ).afirst()
+            accounts = EmailAccount.objects.filter(email=email)
+            # Только что созданной учетной записи может еще не быть в реплике.
+            email_account = (
+                await accounts.using(read_database()).afirst()
+                or await accounts.afirst()
+            )
             if not email_account:
                 consumer_logger.error(
                     EMAIL_ACCOUNT_NOT_FOUND_LOGGER_ERROR_MESSAGE, email_account
                 )
                 raise ValueError(EMAIL_ACCOUNT_NOT_FOUND_ERROR_MESSAGE)
-            imap, total_emails, emails_id = await connect_and_get_emails(
-                email_account=email_account,
-            )
-            await self.send(
-                text_data=json.dumps({TYPE: TOTAL_EMAILS, TOTAL: total_emails})
-            )
-            consumer_logger.info(ALL_EMAILS_ID_RECEIVED_LOGGER_INFO)
-            self.fetch_task = asyncio.create_task(
-                self.process_email(
-                    imap=imap, email_account=email_account, emails_id=emails_id
-                )
-            )
+            if action == FETCH_THREADS:
+                await self.send_threads(email_account, text_data_json)
+                return
+            await self.open_window(email_account, text_data_json)
+            await self.join_sync(email_account, text_data_json)
         except TimeoutError:
             consumer_logger.error(TIMEOUT_LOGGER_ERROR_MESSAGE, exc_info=True)
-            return await self.send(
-                text_data=json.dumps(
-                    {TYPE: ERROR, MESSAGE: TIMEOUT_ERROR_MESSAGE}
-                )
+            return await self.send_data(
+                {TYPE: ERROR, MESSAGE: TIMEOUT_ERROR_MESSAGE}
             )
         except Exception as e:
             consumer_logger.error(
                 UNEXPECTED_LOGGER_ERROR_MESSAGE, str(e), exc_info=True
             )
-            return await self.send(
-                text_data=json.dumps({TYPE: ERROR, MESSAGE: str(e)})
-            )
+            return await self.send_data({TYPE: ERROR, MESSAGE: str(e)})
 
     async def disconnect(self, close_code: int) -> None:
         """
@@ -175,54 +300,1013 @@ class EmailListConsumer(AsyncWebsocketConsumer):
         """
         if self.fetch_task:
             self.fetch_task.cancel()
+        if self.window is not None:
+            await self.window.close()
+        await self.stop_following()
+        if self.lease is not None and not self.is_leader:
+            await self.lease.close()
         await self.close(close_code)
 
-    async def process_email(
-        self,
-        imap: aioimaplib.IMAP4_SSL,
-        email_account: EmailAccount,
-        emails_id: list,
+    async def join_sync(
+        self, email_account: EmailAccount, text_data_json: dict[str, Any]
     ) -> None:
         """
-        Обрабатывает и отправляет данные электронных писем клиенту.
+        Запускает синхронизацию учетной записи или подключается к ней.
 
-        Этот метод вызывается для каждого идентификатора электронного письма
-        и отправляет данные письма обратно клиенту через WebSocket.
+        Если аренда синхронизации свободна, consumer захватывает ее и
+        становится владельцем, иначе подключается к синхронизации владельца.
+        Аренда и группа канального слоя выбираются по порядку писем, окну и
+        режиму предпросмотра, поэтому клиент с другими параметрами не
+        получает письма чужой синхронизации, а запускает свою. Поиск с
+        фильтрами и синхронизация отдельных папок выполняются без
+        аренды, так же как и при выключенной настройке SYNC_SINGLE_FLIGHT,
+        отсутствии канального слоя или недоступности Redis.
 
         Аргументы:
-            imap: Объект IMAP-соединения.
-            email_account: Учетная запись электронной почты.
-            emails_id: Список идентификаторов электронных писем.
+            email_account (EmailAccount): Учетная запись электронной почты.
+            text_data_json (dict[str, Any]): Данные запроса клиента.
+
+        Вызывает ошибку:
+            ValueError: Если параметры синхронизации некорректны.
         """
+        if (
+            not settings.SYNC_SINGLE_FLIGHT
+            or getattr(self, "channel_layer", None) is None
+            or text_data_json.get(FILTERS)
+            or text_data_json.get(FOLDERS)
+        ):
+            await self.start_sync(email_account, text_data_json)
+            return
+        ordering, window_days, window_messages, preview = (
+            self.get_sync_options(text_data_json)
+        )
+        options = SYNC_OPTIONS.format(
+            ordering=ordering,
+            window_days=window_days,
+            window_messages=window_messages,
+            preview=preview,
+        )
+        lease = SyncLease(email_account.pk, options)
         try:
-            checked_emails_data = []
-            checked_email_counter = 0
-            for email_id in emails_id:
-                checked_email_data = await check_email(imap, email_id)
-                checked_emails_data.append(checked_email_data)
-                checked_email_counter += 1
-                consumer_logger.info(
-                    CHECKED_EMAIL_LOGGER_INFO_MESSAGE, email_id
-                )
-                await self.send(
-                    text_data=json.dumps(
-                        {TYPE: PROGRESS, CHECKED: checked_email_counter}
+            acquired = await lease.acquire()
+        except RedisError as e:
+            consumer_logger.warning(
+                SYNC_LEASE_UNAVAILABLE_LOGGER_MESSAGE, email_account.email, e
+            )
+            await lease.close()
+            await self.start_sync(email_account, text_data_json)
+            return
+        self.lease = lease
+        self.sync_group = SYNC_GROUP.format(
+            account=email_account.pk, options=options
+        )
+        if acquired:
+            await self.lead_sync(email_account, text_data_json)
+        else:
+            await self.follow_sync(email_account, text_data_json)
+
+    async def lead_sync(
+        self, email_account: EmailAccount, text_data_json: dict[str, Any]
+    ) -> None:
+        """
+        Запускает синхронизацию как владелец аренды.
+
+        Аргументы:
+            email_account (EmailAccount): Учетная запись электронной почты.
+            text_data_json (dict[str, Any]): Данные запроса клиента.
+        """
+        consumer_logger.info(SYNC_LEADER_LOGGER_MESSAGE, email_account.email)
+        self.is_leader = True
+        self.lease_task = asyncio.create_task(
+            self.keep_lease(email_account.email)
+        )
+        try:
+            await self.start_sync(email_account, text_data_json)
+        except BaseException:
+            await self.release_lease(finished=False)
+            raise
+
+    async def keep_lease(self, email: str) -> None:
+        """
+        Продлевает аренду каждую треть ее срока.
+
+        Кратковременная недоступность Redis не прерывает синхронизацию. Если
+        аренда истекла и ее захватил другой consumer, синхронизация
+        останавливается, чтобы письма не получались дважды.
+
+        Аргументы:
+            email (str): Адрес синхронизируемого почтового ящика.
+        """
+        while True:
+            await asyncio.sleep(self.lease.ttl / 3)
+            try:
+                renewed = await self.lease.renew()
+            except RedisError:
+                continue
+            if not renewed:
+                consumer_logger.warning(SYNC_LEASE_LOST_LOGGER_MESSAGE, email)
+                self.is_leader = False
+                if self.fetch_task:
+                    self.fetch_task.cancel()
+                return
+
+    async def release_lease(self, finished: bool) -> None:
+        """
+        Освобождает аренду владельца и сообщает об этом подписчикам.
+
+        Аргументы:
+            finished (bool): Завершилась ли синхронизация полностью. Иначе
+        подписчики попытаются продолжить ее сами.
+        """
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        self.lease_task.cancel()
+        with suppress(RedisError):
+            await self.lease.release()
+            await self.channel_layer.group_send(
+                self.sync_group,
+                {TYPE: SYNC_FINISHED if finished else SYNC_RELEASED},
+            )
+        await self.lease.close()
+        self.lease = None
+
+    async def follow_sync(
+        self, email_account: EmailAccount, text_data_json: dict[str, Any]
+    ) -> None:
+        """
+        Подключается к синхронизации, которую выполняет владелец аренды.
+
+        Клиент получает сохраненный владельцем кадр TOTAL_EMAILS, а затем в
+        фоновой задаче watch_lease уже сохраненные письма и кадры владельца.
+
+        Аргументы:
+            email_account (EmailAccount): Учетная запись электронной почты.
+            text_data_json (dict[str, Any]): Данные запроса клиента.
+        """
+        consumer_logger.info(
+            SYNC_FOLLOWER_ATTACHED_LOGGER_MESSAGE, email_account.email
+        )
+        self.following = True
+        SYNC_FOLLOWERS.inc()
+        await self.channel_layer.group_add(self.sync_group, self.channel_name)
+        total = await self.lease.get_total()
+        if total is not None:
+            await self.send(text_data=total)
+        self.fetch_task = asyncio.create_task(
+            self.watch_lease(email_account, text_data_json)
+        )
+
+    async def stop_following(self) -> None:
+        """Отписывается от кадров синхронизации владельца аренды."""
+        if not self.following:
+            return
+        self.following = False
+        SYNC_FOLLOWERS.dec()
+        self.lease_released.set()
+        await self.channel_layer.group_discard(
+            self.sync_group, self.channel_name
+        )
+
+    async def watch_lease(
+        self, email_account: EmailAccount, text_data_json: dict[str, Any]
+    ) -> None:
+        """
+        Отправляет клиенту сохраненные письма и ожидает освобождения аренды.
+
+        Аренда проверяется при получении кадра SYNC_RELEASED и каждую треть
+        ее срока, чтобы заметить аварийное завершение владельца. Захватив
+        аренду, consumer сам продолжает синхронизацию с контрольной точки.
+
+        Аргументы:
+            email_account (EmailAccount): Учетная запись электронной почты.
+            text_data_json (dict[str, Any]): Данные запроса клиента.
+        """
+        try:
+            ordering, _, _, preview = self.get_sync_options(text_data_json)
+            await self.replay_emails(
+                email_account,
+                [
+                    (folder, None)
+                    for folder in await synced_folders(email_account)
+                ],
+                ordering,
+                preview,
+            )
+            while self.following:
+                with suppress(TimeoutError):
+                    await asyncio.wait_for(
+                        self.lease_released.wait(), self.lease.ttl / 3
                     )
+                self.lease_released.clear()
+                if self.following and await self.lease.acquire():
+                    await self.stop_following()
+                    await self.lead_sync(email_account, text_data_json)
+        except Exception as e:
+            consumer_logger.error(
+                UNEXPECTED_LOGGER_ERROR_MESSAGE, str(e), exc_info=True
+            )
+            await self.send_data({TYPE: ERROR, MESSAGE: str(e)})
+
+    async def sync_frame(self, event: dict[str, Any]) -> None:
+        """
+        Пересылает клиенту кадр синхронизации владельца аренды.
+
+        Письма, уже отправленные клиенту из базы данных, пропускаются, а при
+        управлении потоком письма и прогресс проходят через очередь отправки.
+
+        Аргументы:
+            event (dict[str, Any]): Сообщение группы с кадром в ключе TEXT.
+        """
+        message_id = event.get(MESSAGE_ID)
+        if message_id is not None:
+            if message_id in self.sent_message_ids:
+                return
+            self.sent_message_ids.add(message_id)
+        if self.window is not None:
+            data = loads(event[TEXT])
+            if data[TYPE] == NEW_EMAIL:
+                data[EMAIL_DATA] = EmailData(
+                    data[EMAIL_DATA],
+                    position=load_position(event.get(POSITION)),
                 )
-            for checked_email_data in checked_emails_data:
-                email_data = await read_email(
-                    imap=imap,
+            if self.hold(data):
+                return
+        await self.send(text_data=event[TEXT])
+
+    async def sync_released(self, event: dict[str, Any]) -> None:
+        """
+        Будит задачу watch_lease после освобождения аренды владельцем.
+
+        Аргументы:
+            event (dict[str, Any]): Сообщение группы.
+        """
+        self.lease_released.set()
+
+    async def sync_finished(self, event: dict[str, Any]) -> None:
+        """
+        Завершает подписку после полной синхронизации владельцем.
+
+        Аргументы:
+            event (dict[str, Any]): Сообщение группы.
+        """
+        await self.stop_following()
+
+    async def start_sync(
+        self, email_account: EmailAccount, text_data_json: dict[str, Any]
+    ) -> None:
+        """
+        Планирует синхронизацию папок учетной записи и запускает ее.
+
+        Папки находятся командой LIST, после чего очереди всех папок
+        формируются параллельно через пул соединений. Клиенту отправляется
+        кадр TOTAL_EMAILS со списком папок, а письма загружаются в фоновой
+        задаче process_email. Владелец аренды также сохраняет кадр
+        TOTAL_EMAILS для подписчиков, подключившихся позже.
+
+        Аргументы:
+            email_account (EmailAccount): Учетная запись электронной почты.
+            text_data_json (dict[str, Any]): Данные запроса клиента.
+
+        Вызывает ошибку:
+            ValueError: Если параметры синхронизации некорректны.
+            aioimaplib.Error: В случае ошибки IMAP-сервера.
+        """
+        ordering, window_days, window_messages, preview = (
+            self.get_sync_options(text_data_json)
+        )
+        criteria = build_search_criteria(text_data_json.get(FILTERS, {}))
+        patterns = self.get_folder_patterns(text_data_json)
+        pool = ImapConnectionPool(email_account)
+        try:
+            folders = await pool.run(partial(list_folders, patterns=patterns))
+            consumer_logger.info(FOLDERS_DISCOVERED_LOGGER_MESSAGE, folders)
+            queues = await run_concurrently(
+                self.plan_folder(
+                    pool=pool,
                     email_account=email_account,
-                    email_data=checked_email_data,
+                    folder=folder,
+                    ordering=ordering,
+                    criteria=criteria,
+                    window_days=window_days,
+                    window_messages=window_messages,
+                    preview=preview,
                 )
-                await self.send(
-                    text_data=json.dumps(
-                        {TYPE: NEW_EMAIL, EMAIL_DATA: email_data}
-                    )
+                for folder in folders
+            )
+        except BaseException:
+            await pool.close()
+            raise
+        total_frame = {
+            TYPE: TOTAL_EMAILS,
+            TOTAL: sum(queue.total for queue in queues),
+            TOTAL_BYTES: sum(sum(queue.sizes.values()) for queue in queues),
+            BACKFILL: sum(len(queue.backfill) for queue in queues),
+            FOLDERS: folders,
+        }
+        await self.send_data(total_frame, broadcast=True)
+        if self.is_leader:
+            await self.lease.publish_total(dumps(total_frame))
+        consumer_logger.info(ALL_EMAILS_ID_RECEIVED_LOGGER_INFO)
+        self.fetch_task = asyncio.create_task(
+            self.process_email(
+                pool=pool,
+                email_account=email_account,
+                queues=queues,
+                ordering=ordering,
+                preview=preview,
+                profile=self.is_profile_requested(text_data_json),
+            )
+        )
+
+    async def plan_folder(
+        self,
+        pool: ImapConnectionPool,
+        email_account: EmailAccount,
+        folder: str,
+        ordering: str,
+        criteria: list[str],
+        window_days: int,
+        window_messages: int,
+        preview: bool,
+    ) -> FolderQueue:
+        """
+        Формирует очередь синхронизации одной папки.
+
+        Для писем окна и догрузки запрашиваются размеры (RFC822.SIZE): по
+        ним крупные письма загружаются отдельно, а прогресс считается также
+        в байтах.
+
+        Аргументы:
+            pool: Пул IMAP-соединений учетной записи.
+            email_account: Учетная запись электронной почты.
+            folder: Имя папки на IMAP-сервере.
+            ordering: Порядок писем (NEWEST или OLDEST).
+            criteria: Критерии поиска IMAP из фильтров клиента.
+            window_days: Размер начального окна в днях.
+            window_messages: Размер начального окна в письмах.
+            preview: Выполняется ли синхронизация в режиме предпросмотра.
+
+        Возвращает:
+            FolderQueue: Очередь синхронизации папки.
+        """
+
+        async def plan(imap: aioimaplib.IMAP4_SSL) -> FolderQueue:
+            total, emails_id = await get_folder_emails(
+                imap, email_account, folder, ordering, criteria, preview
+            )
+            replay_uids = None
+            if criteria:
+                replay_uids, emails_id = await partition_synced_uids(
+                    email_account, emails_id, preview, folder
+                )
+            window, backfill = await split_sync_window(
+                imap, emails_id, window_days, window_messages
+            )
+            return FolderQueue(
+                folder,
+                total,
+                window,
+                backfill,
+                replay_uids,
+                await fetch_message_sizes(imap, emails_id),
+            )
+
+        return await pool.run(plan)
+
+    def get_sync_options(
+        self, text_data_json: dict[str, Any]
+    ) -> tuple[str, int, int, bool]:
+        """
+        Получение параметров синхронизации из запроса клиента.
+
+        Значения, не переданные клиентом, берутся из настроек SYNC_ORDERING,
+        SYNC_WINDOW_DAYS, SYNC_WINDOW_MESSAGES и SYNC_PREVIEW.
+
+        Аргументы:
+            text_data_json (dict[str, Any]): Данные запроса клиента.
+
+        Возвращает:
+            tuple[str, int, int, bool]: Порядок писем, размер окна в днях и
+        в письмах и режим предпросмотра.
+
+        Вызывает ошибку:
+            ValueError: Если порядок не поддерживается или размер окна
+        некорректен.
+        """
+        ordering = text_data_json.get(ORDERING, settings.SYNC_ORDERING)
+        if ordering not in ORDERINGS:
+            raise ValueError(UNSUPPORTED_ORDERING_ERROR_MESSAGE, ordering)
+        window_days = int(
+            text_data_json.get(WINDOW_DAYS, settings.SYNC_WINDOW_DAYS)
+        )
+        window_messages = int(
+            text_data_json.get(WINDOW_MESSAGES, settings.SYNC_WINDOW_MESSAGES)
+        )
+        if window_days < 0 or window_messages < 0:
+            raise ValueError(
+                WINDOW_NEGATIVE_ERROR_MESSAGE,
+                min(window_days, window_messages),
+            )
+        preview = bool(text_data_json.get(PREVIEW, settings.SYNC_PREVIEW))
+        return ordering, window_days, window_messages, preview
+
+    def get_thread_page(
+        self, text_data_json: dict[str, Any]
+    ) -> tuple[int, int]:
+        """
+        Получение страницы цепочек писем из запроса клиента.
+
+        Аргументы:
+            text_data_json (dict[str, Any]): Данные запроса клиента.
+
+        Возвращает:
+            tuple[int, int]: Количество пропускаемых цепочек и размер
+        страницы. По умолчанию первая страница из THREADS_PAGE_SIZE цепочек.
+
+        Вызывает ошибку:
+            ValueError: Если смещение отрицательное или размер страницы вне
+        диапазона от 1 до ThreadConfig.PAGE_SIZE_MAX.
+        """
+        offset = int(text_data_json.get(OFFSET, 0))
+        limit = int(text_data_json.get(LIMIT, settings.THREADS_PAGE_SIZE))
+        if offset < 0 or not 0 < limit <= ThreadConfig.PAGE_SIZE_MAX:
+            raise ValueError(THREADS_PAGE_INVALID_ERROR_MESSAGE, offset, limit)
+        return offset, limit
+
+    async def send_threads(
+        self, email_account: EmailAccount, text_data_json: dict[str, Any]
+    ) -> None:
+        """
+        Отправляет клиенту страницу цепочек писем учетной записи.
+
+        Цепочки отдаются из базы данных без синхронизации: с количеством
+        писем и последним письмом, от новых к старым.
+
+        Аргументы:
+            email_account: Учетная запись электронной почты.
+            text_data_json: Данные запроса клиента с полями offset и limit.
+        """
+        offset, limit = self.get_thread_page(text_data_json)
+        threads = await list_threads(email_account, offset, limit)
+        await self.send_data(
+            {
+                TYPE: THREADS,
+                OFFSET: offset,
+                THREADS: [serialize_thread(thread) for thread in threads],
+            }
+        )
+        consumer_logger.info(THREADS_SENT_LOGGER_MESSAGE, len(threads))
+
+    def get_folder_patterns(
+        self, text_data_json: dict[str, Any]
+    ) -> list[str] | None:
+        """
+        Получение шаблонов синхронизируемых папок из запроса клиента.
+
+        Аргументы:
+            text_data_json (dict[str, Any]): Данные запроса клиента.
+
+        Возвращает:
+            list[str] | None: Шаблоны имен папок или None, если клиент их не
+        передал и используется настройка SYNC_FOLDERS.
+
+        Вызывает ошибку:
+            ValueError: Если список папок некорректен.
+        """
+        patterns = text_data_json.get(FOLDERS)
+        if patterns is None:
+            return None
+        if not isinstance(patterns, list) or not all(
+            isinstance(pattern, str) and pattern for pattern in patterns
+        ):
+            raise ValueError(FOLDERS_INVALID_ERROR_MESSAGE, patterns)
+        return patterns
+
+    def is_profile_requested(self, text_data_json: dict[str, Any]) -> bool:
+        """
+        Проверяет, нужно ли профилировать синхронизацию.
+
+        Профилирование включается переменной окружения SYNC_PROFILE или
+        флагом PROFILE в запросе, если пользователь является администратором.
+
+        Аргументы:
+            text_data_json (dict[str, Any]): Данные запроса клиента.
+
+        Возвращает:
+            bool: True, если синхронизацию нужно профилировать.
+        """
+        if settings.SYNC_PROFILE:
+            return True
+        if not text_data_json.get(PROFILE):
+            return False
+        user = self.scope.get(USER)
+        if user is not None and user.is_staff:
+            return True
+        consumer_logger.warning(
+            PROFILE_NOT_ALLOWED_LOGGER_WARNING_MESSAGE, user
+        )
+        return False
+
+    async def open_window(
+        self, email_account: EmailAccount, text_data_json: dict[str, Any]
+    ) -> None:
+        """
+        Включает управление потоком, если клиент выдал начальные кредиты.
+
+        Клиенты, не передающие поле credits, получают письма без ограничений.
+
+        Аргументы:
+            email_account (EmailAccount): Учетная запись электронной почты.
+            text_data_json (dict[str, Any]): Данные запроса клиента.
+        """
+        if text_data_json.get(CREDITS) is None:
+            return
+        credits = self.get_credits(text_data_json)
+        if self.window is not None:
+            await self.window.close()
+        self.window = OutboundWindow(
+            self.transmit,
+            email_account,
+            credits,
+            settings.OUTBOUND_QUEUE_SIZE,
+        )
+
+    def get_credits(self, text_data_json: dict[str, Any]) -> int:
+        """
+        Получение количества кредитов из запроса клиента.
+
+        Аргументы:
+            text_data_json (dict[str, Any]): Данные запроса клиента.
+
+        Возвращает:
+            int: Количество писем, которые клиент готов принять.
+
+        Вызывает ошибку:
+            ValueError: Если количество кредитов отрицательное.
+        """
+        credits = int(text_data_json.get(CREDITS, 0))
+        if credits < 0:
+            raise ValueError(CREDITS_INVALID_ERROR_MESSAGE, credits)
+        return credits
+
+    def grant_credits(self, text_data_json: dict[str, Any]) -> None:
+        """
+        Добавляет кредиты, выданные клиентом после обработки писем.
+
+        Аргументы:
+            text_data_json (dict[str, Any]): Данные запроса клиента.
+        """
+        credits = self.get_credits(text_data_json)
+        if self.window is not None:
+            self.window.grant(credits)
+
+    def hold(self, data: dict[str, Any]) -> bool:
+        """
+        Передает письмо или прогресс в очередь отправки.
+
+        Аргументы:
+            data (dict[str, Any]): Данные кадра с ключом TYPE.
+
+        Возвращает:
+            bool: True, если кадр отправит очередь, и False, если его нужно
+        отправить сразу.
+        """
+        if self.window is None:
+            return False
+        if data[TYPE] == NEW_EMAIL:
+            self.window.offer(data[EMAIL_DATA])
+            return True
+        if data[TYPE] == PROGRESS:
+            self.window.set_progress(data)
+            return True
+        return False
+
+    async def transmit(self, data: dict[str, Any]) -> None:
+        """
+        Сериализует данные в JSON и отправляет их клиенту.
+
+        Аргументы:
+            data (dict[str, Any]): Данные кадра с ключом TYPE.
+        """
+        text_data = encode_frame(data)
+        with WEBSOCKET_SEND_SECONDS.labels(data[TYPE]).time():
+            await self.send(text_data=text_data)
+
+    async def send_data(
+        self, data: dict[str, Any], broadcast: bool = False
+    ) -> None:
+        """
+        Отправляет кадр клиенту сразу или через очередь отправки.
+
+        Аргументы:
+            data (dict[str, Any]): Данные кадра с ключом TYPE.
+            broadcast (bool): Отправить ли кадр также подписчикам
+        синхронизации, если consumer владеет арендой.
+        """
+        if not self.hold(data):
+            await self.transmit(data)
+        if broadcast and self.is_leader:
+            await self.channel_layer.group_send(
+                self.sync_group,
+                {
+                    TYPE: SYNC_FRAME,
+                    TEXT: encode_frame(data),
+                    MESSAGE_ID: data.get(EMAIL_DATA, {}).get(MESSAGE_ID),
+                    POSITION: dump_position(
+                        email_position(data.get(EMAIL_DATA, {}))
+                    ),
+                },
+            )
+
+    async def replay_emails(
+        self,
+        email_account: EmailAccount,
+        replays: list[tuple[str, list[int] | None]],
+        ordering: str = NEWEST,
+        preview: bool = False,
+    ) -> None:
+        """
+        Отправляет клиенту уже синхронизированные письма из базы данных.
+
+        Письма, которые клиент уже получил от владельца аренды, пропускаются.
+        При управлении потоком письма читаются из базы данных со скоростью
+        клиента.
+
+        Аргументы:
+            email_account: Учетная запись электронной почты.
+            replays: Папки и UID писем, которые нужно отправить. None
+        означает все сохраненные письма папки.
+            ordering: Порядок писем (NEWEST или OLDEST).
+            preview: Отправлять ли письма, сохраненные в режиме предпросмотра.
+        """
+        for folder, uids in replays:
+            async for email_data in iter_synced_emails(
+                email_account, ordering, uids, preview, folder
+            ):
+                self.checked_email_counter += 1
+                message_id = email_data[MESSAGE_ID]
+                if message_id in self.sent_message_ids:
+                    continue
+                if self.following:
+                    self.sent_message_ids.add(message_id)
+                if self.window is not None:
+                    await self.window.put(email_data)
+                    continue
+                await self.send_data({TYPE: NEW_EMAIL, EMAIL_DATA: email_data})
+        consumer_logger.info(
+            SYNCED_EMAILS_SENT_LOGGER_MESSAGE, self.checked_email_counter
+        )
+
+    async def sync_email(
+        self,
+        pool: ImapConnectionPool,
+        imap: aioimaplib.IMAP4_SSL,
+        email_account: EmailAccount,
+        email_id: int,
+        queue_depth: Gauge,
+        preview: bool = False,
+        folder: str = INBOX,
+    ) -> None:
+        """
+        Получает с сервера, сохраняет и отправляет клиенту одно письмо.
+
+        Аргументы:
+            pool: Пул IMAP-соединений учетной записи.
+            imap: Объект IMAP-соединения с выбранной папкой письма.
+            email_account: Учетная запись электронной почты.
+            email_id: UID письма.
+            queue_depth: Метрика очереди, из которой взято письмо.
+            preview: Получить только заголовки и начало текста письма.
+            folder: Имя папки на IMAP-сервере.
+        """
+        fetched = await pool.fetch(
+            imap,
+            folder,
+            partial(
+                check_email_preview if preview else check_email,
+                email_id=email_id,
+                folder=folder,
+            ),
+            email_id,
+        )
+        self.checked_email_counter += 1
+        self.checked_bytes += self.message_sizes.get(folder, {}).get(
+            email_id, 0
+        )
+        consumer_logger.debug(CHECKED_EMAIL_LOGGER_INFO_MESSAGE, email_id)
+        await self.send_data(
+            {
+                TYPE: PROGRESS,
+                CHECKED: self.checked_email_counter,
+                CHECKED_BYTES: self.checked_bytes,
+            },
+            broadcast=True,
+        )
+        email_data = await read_email(
+            imap=imap,
+            email_account=email_account,
+            fetched=fetched,
+        )
+        self.synced_email_counter += 1
+        queue_depth.dec()
+        self.dequeued[queue_depth] += 1
+        await self.send_data(
+            {TYPE: NEW_EMAIL, EMAIL_DATA: email_data}, broadcast=True
+        )
+        EMAILS_SYNCED.inc()
+        consumer_logger.debug(
+            EMAIL_DATA_SEND_LOGGER_MESSAGE, email_data.get(MESSAGE_ID)
+        )
+
+    async def sync_folder(
+        self,
+        pool: ImapConnectionPool,
+        email_account: EmailAccount,
+        folder: str,
+        emails_id: list[int],
+        queue_depth: Gauge,
+        preview: bool = False,
+        delay: float = 0.0,
+    ) -> None:
+        """
+        Получает письма одной папки через соединение из пула.
+
+        При разрыве соединения или истечении срока команды пул открывает
+        новое соединение, папка выбирается заново, и загрузка продолжается
+        с письма, следующего за последним сохраненным.
+
+        Аргументы:
+            pool: Пул IMAP-соединений учетной записи.
+            email_account: Учетная запись электронной почты.
+            folder: Имя папки на IMAP-сервере.
+            emails_id: Список UID писем папки.
+            queue_depth: Метрика очереди, из которой взяты письма.
+            preview: Получать только заголовки и начало текста писем.
+            delay: Пауза перед каждым письмом в секундах.
+        """
+        position = 0
+
+        async def sync_remaining(imap: aioimaplib.IMAP4_SSL) -> None:
+            nonlocal position
+            await select_folder(imap, folder)
+            while position < len(emails_id):
+                if delay:
+                    await asyncio.sleep(delay)
+                await self.sync_email(
+                    pool,
+                    imap,
+                    email_account,
+                    emails_id[position],
+                    queue_depth,
+                    preview,
+                    folder,
                 )
-                consumer_logger.info(
-                    EMAIL_DATA_SEND_LOGGER_MESSAGE, email_data.get(MESSAGE_ID)
+                position += 1
+
+        await pool.run(sync_remaining, progress=lambda: position)
+
+    async def sync_folders(
+        self,
+        pool: ImapConnectionPool,
+        email_account: EmailAccount,
+        folder_emails: list[tuple[str, list[int]]],
+        queue_depth: Gauge,
+        preview: bool = False,
+        delay: float = 0.0,
+    ) -> None:
+        """
+        Параллельно получает письма нескольких папок.
+
+        Количество одновременно синхронизируемых папок ограничено размером
+        пула соединений, поэтому время синхронизации определяется самой
+        большой папкой, а не суммой всех папок.
+
+        Аргументы:
+            pool: Пул IMAP-соединений учетной записи.
+            email_account: Учетная запись электронной почты.
+            folder_emails: Папки и списки UID их писем.
+            queue_depth: Метрика очереди, из которой взяты письма.
+            preview: Получать только заголовки и начало текста писем.
+            delay: Пауза перед каждым письмом в секундах.
+        """
+        await run_concurrently(
+            self.sync_folder(
+                pool,
+                email_account,
+                folder,
+                emails_id,
+                queue_depth,
+                preview,
+                delay,
+            )
+            for folder, emails_id in folder_emails
+            if emails_id
+        )
+
+    def split_lanes(
+        self, queues: list[FolderQueue], preview: bool = False
+    ) -> dict[str, list[tuple[str, list[int]]]]:
+        """
+        Распределяет письма очередей папок по полосам загрузки.
+
+        Письма больше SYNC_LARGE_MESSAGE_BYTES из окна и догрузки попадают
+        в полосу LARGE_MESSAGES: сначала письма окна, затем догрузки. В
+        режиме предпросмотра размер письма на загрузку не влияет, поэтому
+        крупные письма не выделяются.
+
+        Аргументы:
+            queues: Очереди синхронизации папок.
+            preview: Получать только заголовки и начало текста писем.
+
+        Возвращает:
+            dict[str, list[tuple[str, list[int]]]]: Папки и UID их писем для
+        полос PENDING_EMAILS (окно), BACKFILL (догрузка) и LARGE_MESSAGES.
+        """
+        threshold = 0 if preview else settings.SYNC_LARGE_MESSAGE_BYTES
+        lanes = {PENDING_EMAILS: [], BACKFILL: [], LARGE_MESSAGES: []}
+        for queue in queues:
+            window, window_large = split_large_messages(
+                queue.window, queue.sizes, threshold
+            )
+            backfill, backfill_large = split_large_messages(
+                queue.backfill, queue.sizes, threshold
+            )
+            lanes[PENDING_EMAILS].append((queue.folder, window))
+            lanes[BACKFILL].append((queue.folder, backfill))
+            lanes[LARGE_MESSAGES].append(
+                (queue.folder, window_large + backfill_large)
+            )
+        return lanes
+
+    async def sync_window_and_backfill(
+        self,
+        pool: ImapConnectionPool,
+        email_account: EmailAccount,
+        queues: list[FolderQueue],
+        lanes: dict[str, list[tuple[str, list[int]]]],
+        depths: dict[str, Gauge],
+        ordering: str = NEWEST,
+        preview: bool = False,
+    ) -> None:
+        """
+        Отправляет сохраненные письма и загружает окно, а затем догрузку.
+
+        Аргументы:
+            pool: Пул IMAP-соединений учетной записи.
+            email_account: Учетная запись электронной почты.
+            queues: Очереди синхронизации папок.
+            lanes: Полосы загрузки из split_lanes.
+            depths: Метрики очередей полос.
+            ordering: Порядок писем (NEWEST или OLDEST).
+            preview: Получать только заголовки и начало текста писем.
+        """
+        await run_concurrently(
+            [
+                self.replay_emails(
+                    email_account,
+                    [(queue.folder, queue.replay_uids) for queue in queues],
+                    ordering,
+                    preview,
+                ),
+                self.sync_folders(
+                    pool,
+                    email_account,
+                    lanes[PENDING_EMAILS],
+                    depths[PENDING_EMAILS],
+                    preview,
+                ),
+            ]
+        )
+        backfill_count = sum(len(queue.backfill) for queue in queues)
+        if not backfill_count:
+            return
+        await self.send_data({TYPE: WINDOW_COMPLETE}, broadcast=True)
+        consumer_logger.info(BACKFILL_STARTED_LOGGER_MESSAGE, backfill_count)
+        await self.sync_folders(
+            pool,
+            email_account,
+            lanes[BACKFILL],
+            depths[BACKFILL],
+            preview,
+            settings.SYNC_BACKFILL_DELAY,
+        )
+
+    async def sync_large_messages(
+        self,
+        pool: ImapConnectionPool,
+        email_account: EmailAccount,
+        folder_emails: list[tuple[str, list[int]]],
+        queue_depth: Gauge,
+    ) -> None:
+        """
+        Загружает крупные письма через отдельный пул соединений.
+
+        Количество одновременно загружаемых крупных писем ограничено
+        размером пула SYNC_LARGE_MESSAGE_CONNECTIONS, а соединения
+        обычных писем они не занимают.
+
+        Аргументы:
+            pool: Пул IMAP-соединений для крупных писем.
+            email_account: Учетная запись электронной почты.
+            folder_emails: Папки и UID их крупных писем.
+            queue_depth: Метрика очереди крупных писем.
+        """
+        count = sum(len(emails_id) for _, emails_id in folder_emails)
+        if not count:
+            return
+        consumer_logger.info(
+            LARGE_MESSAGES_STARTED_LOGGER_MESSAGE,
+            count,
+            settings.SYNC_LARGE_MESSAGE_BYTES,
+        )
+        await self.sync_folders(
+            pool, email_account, folder_emails, queue_depth
+        )
+
+    async def process_email(
+        self,
+        pool: ImapConnectionPool,
+        email_account: EmailAccount,
+        queues: list[FolderQueue],
+        ordering: str = NEWEST,
+        preview: bool = False,
+        profile: bool = False,
+    ) -> None:
+        """
+        Обрабатывает и отправляет данные электронных писем клиенту.
+
+        Клиенту отправляются уже синхронизированные письма из базы данных, а
+        одновременно с этим письма начального окна всех папок параллельно
+        получаются с сервера, сохраняются и отправляются клиенту, поэтому
+        медленный клиент не задерживает загрузку с сервера. Письма
+        сохраняются по одному, поэтому при разрыве соединения синхронизация
+        продолжится с первого несохраненного письма. После окна клиенту
+        отправляется кадр WINDOW_COMPLETE и с паузой SYNC_BACKFILL_DELAY
+        между письмами догружается история, уступая цикл событий другим
+        синхронизациям. Письма больше SYNC_LARGE_MESSAGE_BYTES все это время
+        загружаются в фоне через отдельный пул соединений, поэтому несколько
+        огромных писем не задерживают остальные. По завершении соединения
+        пулов закрываются, а аренда синхронизации освобождается.
+
+        Аргументы:
+            pool: Пул IMAP-соединений учетной записи.
+            email_account: Учетная запись электронной почты.
+            queues: Очереди синхронизации папок.
+            ordering: Порядок писем (NEWEST или OLDEST).
+            preview: Получать только заголовки и начало текста писем.
+            profile: Профилировать ли синхронизацию с помощью SyncProfiler.
+        """
+        if profile:
+            async with SyncProfiler(email_account.email) as profiler:
+                await self.process_email(
+                    pool=pool,
+                    email_account=email_account,
+                    queues=queues,
+                    ordering=ordering,
+                    preview=preview,
                 )
+            consumer_logger.info(PROFILE_SAVED_LOGGER_MESSAGE, profiler.path)
+            return
+        ACTIVE_SYNCS.inc()
+        lanes = self.split_lanes(queues, preview)
+        depths = {lane: QUEUE_DEPTH.labels(lane) for lane in lanes}
+        counts = {
+            lane: sum(len(emails_id) for _, emails_id in folder_emails)
+            for lane, folder_emails in lanes.items()
+        }
+        for lane, count in counts.items():
+            depths[lane].inc(count)
+        self.checked_email_counter = 0
+        self.synced_email_counter = 0
+        self.checked_bytes = 0
+        self.message_sizes = {queue.folder: queue.sizes for queue in queues}
+        self.dequeued = Counter()
+        large_pool = ImapConnectionPool(
+            email_account, settings.SYNC_LARGE_MESSAGE_CONNECTIONS
+        )
+        completed = False
+        try:
+            await run_concurrently(
+                [
+                    self.sync_window_and_backfill(
+                        pool,
+                        email_account,
+                        queues,
+                        lanes,
+                        depths,
+                        ordering,
+                        preview,
+                    ),
+                    self.sync_large_messages(
+                        large_pool,
+                        email_account,
+                        lanes[LARGE_MESSAGES],
+                        depths[LARGE_MESSAGES],
+                    ),
+                ]
+            )
+            completed = True
         except asyncio.CancelledError:
             consumer_logger.info(FETCH_EMAILS_CANCELLED_LOGGER_MESSAGE)
         except Exception as e:
@@ -231,6 +1315,12 @@ class EmailListConsumer(AsyncWebsocketConsumer):
             )
             raise Exception(UNEXPECTED_ERROR_MESSAGE, str(e))
         finally:
+            for lane, queue_depth in depths.items():
+                queue_depth.dec(counts[lane] - self.dequeued[queue_depth])
+            ACTIVE_SYNCS.dec()
+            await large_pool.close()
+            await pool.close()
+            await self.release_lease(finished=completed)
             consumer_logger.info(
                 FETCH_EMAILS_COMPLETE_LOGGER_MESSAGE,
                 datetime.utcnow() + timedelta(hours=CURRENT_GMT),
@@ -0,0 +1,349 @@
+"""Модуль export."""
+
+import asyncio
+import base64
+import mimetypes
+import os
+import re
+from email import policy
+from email.message import EmailMessage
+from email.utils import format_datetime
+from typing import AsyncIterator
+from uuid import uuid4
+
+from core.constants import (
+    ATTACHMENTS,
+    CONTENT_DISPOSITION,
+    CONTENT_TRANSFER_ENCODING,
+    CONTENT_TYPE,
+    IN_REPLY_TO,
+    MESSAGE_ID,
+    REFERENCES,
+    SYNCED_EMAILS_CHUNK_SIZE,
+    AttachmentConfig,
+    EmailConfig,
+    ExportConfig,
+)
+from core.db_router import aread_database, read_database
+from django.conf import settings
+from email_account.models import EmailAccount
+from mail_recipient.attachment_storage import attachment_storage
+from mail_recipient.models import Attachment, Email
+from mail_recipient.zip_stream import ZipEntry, ZipLayout
+
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)")
+MBOX_FROM_PATTERN = re.compile(rb"^(>*From )", re.MULTILINE)
+
+
+def parse_range(header: str | None, length: int) -> tuple[int, int] | None:
+    """
+    Разбор заголовка Range с одним диапазоном байт.
+
+    Несколько диапазонов и некорректный заголовок игнорируются, как
+    разрешает RFC 9110, и клиент получает весь ответ.
+
+    Аргументы:
+        header (str | None): Значение заголовка Range.
+        length (int): Размер ответа в байтах.
+
+    Возвращает:
+        tuple[int, int] | None: Первый и последний байт диапазона
+    включительно или None, если нужно отдать весь ответ.
+
+    Вызывает ошибку:
+        ValueError: Если диапазон не пересекается с ответом.
+    """
+    match = RANGE_PATTERN.fullmatch((header or "").strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        if int(last) == 0 or length == 0:
+            raise ValueError(header)
+        return max(length - int(last), 0), length - 1
+    if last and int(last) < int(first):
+        return None
+    if int(first) >= length:
+        raise ValueError(header)
+    end = min(int(last), length - 1) if last else length - 1
+    return int(first), end
+
+
+def build_zip_layout(email_account: EmailAccount) -> ZipLayout:
+    """
+    Раскладка архива вложений учетной записи.
+
+    Вложение, сохраненное для нескольких писем (например, одно письмо в
+    нескольких папках), попадает в архив один раз, а вложения, файлов
+    которых уже нет в хранилище, пропускаются. Файлы упорядочены по пути,
+    поэтому раскладка не меняется, пока не изменятся сами вложения.
+
+    Аргументы:
+        email_account (EmailAccount): Учетная запись электронной почты.
+
+    Возвращает:
+        ZipLayout: Раскладка архива.
+    """
+    storage = attachment_storage.storage
+    prefix = os.path.join(settings.ATTACHMENTS_URL, email_account.email, "")
+    entries = []
+    previous = None
+    for path, crc32 in (
+        Attachment.objects.using(read_database(email_account.pk))
+        .filter(email__email_account=email_account)
+        .order_by(AttachmentConfig.FILE)
+        .values_list(AttachmentConfig.FILE, AttachmentConfig.CRC32)
+        .iterator(chunk_size=SYNCED_EMAILS_CHUNK_SIZE)
+    ):
+        if path == previous:
+            continue
+        previous = path
+        try:
+            size = storage.size(path)
+            modified = storage.get_modified_time(path)
+        except OSError:
+            continue
+        entries.append(
+            ZipEntry(
+                name=path.removeprefix(prefix).replace(os.sep, "/"),
+                path=path,
+                size=size,
+                modified=modified,
+                crc32=crc32,
+            )
+        )
+    return ZipLayout(entries, storage, settings.EXPORT_CHUNK_SIZE)
+
+
+async def buffer_chunks(
+    parts: AsyncIterator[bytes], chunk_size: int
+) -> AsyncIterator[bytes]:
+    """
+    Объединение мелких частей ответа в блоки около chunk_size.
+
+    Заголовки архива и писем занимают десятки байт, и без объединения
+    каждый из них отправлялся бы клиенту отдельным сообщением ASGI.
+
+    Аргументы:
+        parts (AsyncIterator[bytes]): Части ответа.
+        chunk_size (int): Размер блока в байтах.
+
+    Возвращает:
+        AsyncIterator[bytes]: Блоки ответа.
+    """
+    buffer = bytearray()
+    async for part in parts:
+        if len(part) >= chunk_size:
+            if buffer:
+                yield bytes(buffer)
+                buffer.clear()
+            yield part
+            continue
+        buffer += part
+        if len(buffer) >= chunk_size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+async def stream_zip(
+    layout: ZipLayout, start: int, end: int
+) -> AsyncIterator[bytes]:
+    """
+    Выгрузка диапазона байт архива вложений.
+
+    Контрольные суммы, вычисленные при выгрузке, сохраняются в базу данных,
+    чтобы при докачке архива не читать файлы повторно.
+
+    Аргументы:
+        layout (ZipLayout): Раскладка архива.
+        start (int): Первый байт диапазона.
+        end (int): Последний байт диапазона включительно.
+
+    Возвращает:
+        AsyncIterator[bytes]: Блоки архива.
+    """
+    async for chunk in buffer_chunks(
+        layout.stream(start, end), layout.chunk_size
+    ):
+        yield chunk
+    for entry in layout.entries:
+        if entry.crc_computed:
+            await Attachment.objects.filter(file=entry.path).aupdate(
+                crc32=entry.crc32
+            )
+
+
+def fold_headers(message: EmailMessage) -> bytes:
+    """
+    Заголовки письма без тела.
+
+    Аргументы:
+        message (EmailMessage): Письмо или часть письма.
+
+    Возвращает:
+        bytes: Заголовки и пустая строка после них.
+    """
+    return (
+        b"".join(
+            message.policy.fold_binary(name, value)
+            for name, value in message.items()
+        )
+        + b"\n"
+    )
+
+
+def build_mbox_headers(email: Email) -> EmailMessage:
+    """
+    Заголовки письма, восстановленные из базы данных.
+
+    Аргументы:
+        email (Email): Сохраненное письмо.
+
+    Возвращает:
+        EmailMessage: Письмо с заголовками и без тела.
+    """
+    message = EmailMessage(policy=policy.default)
+    message[ExportConfig.FROM] = email.mail_from or ""
+    message[ExportConfig.SUBJECT] = email.subject
+    if email.date:
+        message[ExportConfig.DATE] = format_datetime(email.date)
+    message[MESSAGE_ID] = email.message_id
+    if email.in_reply_to:
+        message[IN_REPLY_TO] = email.in_reply_to
+    if email.references:
+        message[REFERENCES] = email.references
+    message[ExportConfig.FOLDER] = email.folder
+    return message
+
+
+async def stream_base64(path: str) -> AsyncIterator[bytes]:
+    """
+    Чтение файла вложения блоками в кодировке base64.
+
+    Блоки кратны 57 байтам, поэтому строки base64 разных блоков имеют
+    одинаковую длину 76 символов.
+
+    Аргументы:
+        path (str): Путь к файлу в хранилище.
+
+    Возвращает:
+        AsyncIterator[bytes]: Строки base64.
+    """
+    chunk_size = (
+        max(settings.EXPORT_CHUNK_SIZE // ExportConfig.BASE64_LINE_BYTES, 1)
+        * ExportConfig.BASE64_LINE_BYTES
+    )
+    storage = attachment_storage.storage
+    file = await asyncio.to_thread(storage.open, path, "rb")
+    try:
+        while chunk := await asyncio.to_thread(file.read, chunk_size):
+            yield base64.encodebytes(chunk)
+    finally:
+        await asyncio.to_thread(file.close)
+
+
+async def stream_mbox_attachment(
+    attachment: Attachment, boundary: str
+) -> AsyncIterator[bytes]:
+    """
+    Часть письма с вложением.
+
+    Аргументы:
+        attachment (Attachment): Вложение письма.
+        boundary (str): Разделитель частей письма.
+
+    Возвращает:
+        AsyncIterator[bytes]: Заголовки части и содержимое в base64.
+    """
+    path = attachment.file.name
+    if not await asyncio.to_thread(attachment_storage.storage.exists, path):
+        return
+    part = EmailMessage(policy=policy.default)
+    part[CONTENT_TYPE] = (
+        mimetypes.guess_type(attachment.filename)[0]
+        or ExportConfig.OCTET_STREAM
+    )
+    part[CONTENT_TRANSFER_ENCODING] = ExportConfig.BASE64
+    part.add_header(
+        CONTENT_DISPOSITION,
+        ExportConfig.ATTACHMENT,
+        filename=attachment.filename,
+    )
+    yield ExportConfig.MULTIPART_BOUNDARY.format(boundary=boundary).encode()
+    yield fold_headers(part)
+    async for chunk in stream_base64(path):
+        yield chunk
+
+
+async def stream_mbox_message(email: Email) -> AsyncIterator[bytes]:
+    """
+    Письмо в формате mboxrd.
+
+    Строки тела, начинающиеся с From, экранируются символом >. Вложения
+    читаются из хранилища блоками, поэтому письмо целиком в памяти не
+    собирается.
+
+    Аргументы:
+        email (Email): Сохраненное письмо с предзагруженными вложениями.
+
+    Возвращает:
+        AsyncIterator[bytes]: Части письма.
+    """
+    date = email.received or email.date
+    yield ExportConfig.MBOX_FROM_LINE.format(
+        date=date.ctime() if date else ""
+    ).encode()
+    message = build_mbox_headers(email)
+    attachments = list(email.attachments.all())
+    if not attachments:
+        message.set_content(email.text or "")
+        yield MBOX_FROM_PATTERN.sub(rb">\1", message.as_bytes()) + b"\n"
+        return
+    boundary = uuid4().hex
+    message[ExportConfig.MIME_VERSION] = ExportConfig.MIME_VERSION_VALUE
+    message[CONTENT_TYPE] = ExportConfig.MULTIPART_MIXED.format(
+        boundary=boundary
+    )
+    text = EmailMessage(policy=policy.default)
+    text.set_content(email.text or "")
+    yield fold_headers(message)
+    yield ExportConfig.MULTIPART_BOUNDARY.format(boundary=boundary).encode()
+    yield MBOX_FROM_PATTERN.sub(rb">\1", text.as_bytes())
+    for attachment in attachments:
+        async for chunk in stream_mbox_attachment(attachment, boundary):
+            yield chunk
+    yield ExportConfig.MULTIPART_CLOSE.format(boundary=boundary).encode()
+    yield b"\n"
+
+
+async def stream_mbox(email_account: EmailAccount) -> AsyncIterator[bytes]:
+    """
+    Выгрузка всех писем учетной записи в формате mboxrd.
+
+    Письма выбираются из базы данных порциями, поэтому память не зависит
+    от размера почтового ящика.
+
+    Аргументы:
+        email_account (EmailAccount): Учетная запись электронной почты.
+
+    Возвращает:
+        AsyncIterator[bytes]: Блоки файла mbox.
+    """
+
+    async def parts() -> AsyncIterator[bytes]:
+        emails = (
+            Email.objects.using(await aread_database(email_account.pk))
+            .filter(email_account=email_account)
+            .order_by(EmailConfig.FOLDER, EmailConfig.UID)
+            .prefetch_related(ATTACHMENTS)
+        )
+        async for email in emails.aiterator(
+            chunk_size=SYNCED_EMAILS_CHUNK_SIZE
+        ):
+            async for part in stream_mbox_message(email):
+                yield part
+
+    async for chunk in buffer_chunks(parts(), settings.EXPORT_CHUNK_SIZE):
+        yield chunk
@@ -1,133 +1,639 @@
 """Модуль fetch_emails."""
 
 import logging
-from datetime import datetime
-from email import policy
-from email.parser import BytesParser
-from typing import Tuple
+import re
+from datetime import date, timedelta
+from email.parser import BytesParser, Parser
+from typing import Any, Tuple
 
 import aioimaplib
+from asgiref.sync import sync_to_async
 from core.constants import (
-    ALL,
+    ASCII,
     AT,
-    ATTACHMENTS,
     AUTH_FAILED_ERROR_MESSAGE,
     AUTH_FAILED_LOGGER_ERROR_MESSAGE,
     BAD,
+    BODY_HEADER,
+    BODYSTRUCTURE,
+    CONNECT,
+    CONTENT_TRANSFER_ENCODING,
+    CONTENT_TYPE,
     DATE,
-    DATETIME_FORMAT,
+    FETCH,
+    FETCH_UID,
+    FOLDER_PATTERN_WILDCARD,
+    FOLDER_PATTERN_WILDCARD_REGEX,
     FROM,
     IMAP_DOMAIN_SERVER,
+    IN_REPLY_TO,
     INBOX,
     INDEX,
+    KNOWN_MESSAGES_SKIPPED_LOGGER_MESSAGE,
+    LIST,
+    LIST_ALL_FOLDERS,
+    LIST_FOLDERS_ERROR_MESSAGE,
+    LIST_FOLDERS_LOGGER_ERROR_MESSAGE,
+    LIST_REFERENCE,
+    LOGIN,
     MESSAGE_ID,
-    NEW_DATETIME_FORMAT,
+    MESSAGE_ID_FETCH_FORMAT,
+    MESSAGE_ID_FETCH_KEY,
+    MESSAGE_SIZE_FETCH_FORMAT,
+    NEWEST,
     NO_DATA_IN_MAIL_LOGGER_ERROR_MESSAGE,
     NO_MESSAGE_TO_PROCESS_ERROR_MESSAGE,
     NO_MESSAGE_TO_PROCESS_LOGGER_ERROR_MESSAGE,
     OK,
     PARSING_MAIL_LOGGER_ERROR_MESSAGE,
+    PREVIEW_SECTION_FORMAT,
+    PREVIEW_SECTION_KEY,
+    PREVIEW_STRUCTURE_FORMAT,
+    PREVIEW_SUBTYPES,
     RECEIVE_MAIL_LOGGER_ERROR_MESSAGE,
     RECEIVED,
+    REFERENCES,
     RFC822_FORMAT,
+    RFC822_SIZE,
+    SEARCH,
     SEARCH_MAILS_ERROR_MESSAGE,
     SEARCH_MAILS_LOGGER_ERROR_MESSAGE,
+    SEARCH_SINCE,
+    SELECT,
     SELECT_INBOX_ERROR_MESSAGE,
     SELECT_INBOX_LOGGER_ERROR_MESSAGE,
     SUBJECT,
-    TEXT,
+    SURROGATEESCAPE,
+    UID_RANGE_SEARCH,
+    UID_SET_RANGE,
+    ImapConfig,
+    KnownMessagesConfig,
 )
-from core.utils import extract_text_from_message, get_attachments_from_message
+from core.metrics import DB_SAVE_SECONDS, KNOWN_MESSAGES, PARSE_SECONDS
+from core.utils import (
+    decode_partial_text,
+    email_policy,
+    extract_text_from_message,
+    format_imap_date,
+    get_attachments_from_message,
+    parse_email_date,
+    parse_message_ids,
+    parse_received_date,
+)
+from django.conf import settings
 from email_account.models import EmailAccount
-from mail_recipient.models import Email
-from mail_recipient.save_email import save_email
+from mail_recipient.imap_client import (
+    ImapClient,
+    ImapSslClient,
+    client_timeout,
+    close_transport,
+    enable_compression,
+    imap_command,
+)
+from mail_recipient.imap_response import (
+    find_text_section,
+    iter_fetch_responses,
+    parse_fetch_response,
+    parse_list_response,
+    quote_string,
+)
+from mail_recipient.known_messages import (
+    adopt_known_emails,
+    load_known_messages,
+)
+from mail_recipient.records import FetchedMessage, ParsedMessage
+from mail_recipient.save_email import save_email, serialize_email
+from mail_recipient.sync_state import (
+    get_sync_state,
+    parse_uidvalidity,
+    plan_sync,
+)
 
 fetch_emails_logger = logging.getLogger("fetch_emails")
 
 
-async def connect_and_get_emails(
-    email_account: EmailAccount,
-) -> Tuple[aioimaplib.IMAP4_SSL, int, list]:
+def create_imap_client(email_account: EmailAccount) -> aioimaplib.IMAP4:
     """
-    Подключение к почтовому серверу и получение данных электронных писем.
+    Создание клиента IMAP для учетной записи электронной почты.
 
-    Эта функция выполняет следующие действия:
-    1. Подключается к почтовому серверу IMAP.
-    2. Аутентифицирует пользователя с использованием предоставленных учетных
-    данных.
-    3. Выбирает папку "INBOX".
-    4. Ищет все письма в папке "INBOX".
-    5. Сохраняет общее количество писем и их идентификаторы.
-    6. Логирует результаты выполнения.
+    Если в настройках задан IMAP_HOST, клиент подключается к нему вместо
+    сервера почтового домена (например, к локальному тестовому серверу).
+    Клиент отслеживает разрыв соединения, а срок каждой команды задает
+    imap_command.
+
+    Аргументы:
+        email_account (EmailAccount): Объект учетной записи электронной почты.
+
+    Возвращает:
+        aioimaplib.IMAP4: Объект IMAP-соединения.
+    """
+    timeout = client_timeout()
+    if not settings.IMAP_HOST:
+        return ImapSslClient(
+            host=IMAP_DOMAIN_SERVER.get(
+                email_account.email.split(AT)[1], None
+            ),
+            timeout=timeout,
+        )
+    if settings.IMAP_USE_SSL:
+        return ImapSslClient(
+            host=settings.IMAP_HOST, port=settings.IMAP_PORT, timeout=timeout
+        )
+    return ImapClient(
+        host=settings.IMAP_HOST, port=settings.IMAP_PORT, timeout=timeout
+    )
+
+
+async def search_uids(imap: aioimaplib.IMAP4_SSL, *criteria: str) -> list[int]:
+    """
+    Поиск писем командой UID SEARCH.
+
+    Аргументы:
+        imap (aioimaplib.IMAP4_SSL): Объект IMAP-соединения.
+        *criteria (str): Критерии поиска IMAP.
+
+    Возвращает:
+        list[int]: UID найденных писем.
+
+    Вызывает ошибку:
+        aioimaplib.Error: В случае ошибки поиска писем.
+        TimeoutError: Если поиск не уложился в срок.
+    """
+    search_result = await imap_command(
+        imap, SEARCH, imap.uid_search(*criteria)
+    )
+    if search_result[0] != OK:
+        fetch_emails_logger.error(
+            SEARCH_MAILS_LOGGER_ERROR_MESSAGE, search_result[0]
+        )
+        raise aioimaplib.Error(SEARCH_MAILS_ERROR_MESSAGE)
+    return [int(uid) for uid in search_result[1][0].split()]
+
+
+async def connect_imap(email_account: EmailAccount) -> aioimaplib.IMAP4_SSL:
+    """
+    Подключение к почтовому серверу и аутентификация пользователя.
+
+    Если включен IMAP_COMPRESS и сервер поддерживает COMPRESS=DEFLATE,
+    после входа включается сжатие трафика.
 
     Аргументы:
         email_account (EmailAccount): Объект, содержащий данные учетной записи
     электронной почты.
 
     Возвращает:
-        Tuple[aioimaplib.IMAP4_SSL, int, list]: Кортеж, содержащий:
-            - Объект IMAP-соединения.
-            - Количество найденных писем.
-            - Список идентификаторов писем.
+        aioimaplib.IMAP4_SSL: Объект IMAP-соединения.
 
     Вызывает ошибку:
-        aioimaplib.Error: В случае ошибки аутентификации, выбора папки или
-    поиска писем.
+        aioimaplib.Error: В случае ошибки аутентификации.
+        TimeoutError: Если подключение или вход не уложились в срок.
+    """
+    imap = create_imap_client(email_account)
+    try:
+        await imap_command(imap, CONNECT, imap.wait_hello_from_server())
+        login_result = await imap_command(
+            imap,
+            LOGIN,
+            imap.login(email_account.email, email_account.password),
+        )
+        if login_result[0] != OK:
+            fetch_emails_logger.error(
+                AUTH_FAILED_LOGGER_ERROR_MESSAGE, login_result[1]
+            )
+            raise aioimaplib.Error(AUTH_FAILED_ERROR_MESSAGE)
+        if settings.IMAP_COMPRESS:
+            await enable_compression(imap)
+        await imap_command(imap, SELECT, imap.select(INDEX))
+    except BaseException:
+        close_transport(imap)
+        raise
+    return imap
+
+
+def match_folder(folder: str, patterns: list[str]) -> bool:
+    """
+    Проверка имени папки по шаблонам вида "INBOX", "Work/*" или "*".
+
+    Специальным символом шаблона является только "*" (любая
+    последовательность символов): квадратные скобки в именах папок Gmail,
+    например "[Gmail]/All Mail", сравниваются как есть.
+
+    Аргументы:
+        folder (str): Имя папки на IMAP-сервере.
+        patterns (list[str]): Шаблоны имен папок.
+
+    Возвращает:
+        bool: True, если имя подходит хотя бы под один шаблон.
     """
-    imap_server = IMAP_DOMAIN_SERVER.get(
-        email_account.email.split(AT)[1], None
+    return any(
+        re.fullmatch(
+            FOLDER_PATTERN_WILDCARD_REGEX.join(
+                re.escape(part)
+                for part in pattern.split(FOLDER_PATTERN_WILDCARD)
+            ),
+            folder,
+            re.DOTALL,
+        )
+        for pattern in patterns
     )
-    imap = aioimaplib.IMAP4_SSL(host=imap_server)
-    await imap.wait_hello_from_server()
-    login_result = await imap.login(
-        email_account.email, email_account.password
+
+
+async def list_folders(
+    imap: aioimaplib.IMAP4_SSL, patterns: list[str] = None
+) -> list[str]:
+    """
+    Получение списка папок для синхронизации командой LIST.
+
+    Папка синхронизируется, если ее имя подходит под шаблоны patterns (по
+    умолчанию SYNC_FOLDERS) и не подходит под шаблоны SYNC_FOLDERS_EXCLUDE.
+    Исключение позволяет не загружать большие папки, дублирующие остальные,
+    например "[Gmail]/All Mail".
+
+    Аргументы:
+        imap (aioimaplib.IMAP4_SSL): Объект IMAP-соединения.
+        patterns (list[str]): Шаблоны имен синхронизируемых папок.
+
+    Возвращает:
+        list[str]: Имена папок в порядке ответа сервера.
+
+    Вызывает ошибку:
+        aioimaplib.Error: В случае ошибки получения списка папок.
+        TimeoutError: Если команда LIST не уложилась в срок.
+    """
+    list_result = await imap_command(
+        imap, LIST, imap.list(LIST_REFERENCE, LIST_ALL_FOLDERS)
     )
-    if login_result[0] != OK:
+    if list_result[0] != OK:
         fetch_emails_logger.error(
-            AUTH_FAILED_LOGGER_ERROR_MESSAGE, login_result[1]
+            LIST_FOLDERS_LOGGER_ERROR_MESSAGE, list_result[1]
         )
-        raise aioimaplib.Error(AUTH_FAILED_ERROR_MESSAGE)
-    await imap.select(INDEX)
-    select_result = await imap.select(INBOX)
+        raise aioimaplib.Error(LIST_FOLDERS_ERROR_MESSAGE)
+    return [
+        folder
+        for folder in parse_list_response(list_result[1][:-1])
+        if match_folder(folder, patterns or settings.SYNC_FOLDERS)
+        and not match_folder(folder, settings.SYNC_FOLDERS_EXCLUDE)
+    ]
+
+
+async def select_folder(
+    imap: aioimaplib.IMAP4_SSL, folder: str = INBOX
+) -> int | None:
+    """
+    Выбор папки командой SELECT.
+
+    Аргументы:
+        imap (aioimaplib.IMAP4_SSL): Объект IMAP-соединения.
+        folder (str): Имя папки на IMAP-сервере.
+
+    Возвращает:
+        int | None: UIDVALIDITY папки или None, если сервер его не передал.
+
+    Вызывает ошибку:
+        aioimaplib.Error: В случае ошибки выбора папки.
+        TimeoutError: Если выбор папки не уложился в срок.
+    """
+    select_result = await imap_command(
+        imap, SELECT, imap.select(quote_string(folder))
+    )
     if select_result[0] != OK:
         fetch_emails_logger.error(
-            SELECT_INBOX_LOGGER_ERROR_MESSAGE, select_result[1]
+            SELECT_INBOX_LOGGER_ERROR_MESSAGE, folder, select_result[1]
         )
         raise aioimaplib.Error(SELECT_INBOX_ERROR_MESSAGE)
-    search_result = await imap.search(ALL)
-    if search_result[0] != OK:
-        fetch_emails_logger.error(
-            SEARCH_MAILS_LOGGER_ERROR_MESSAGE, search_result[0]
+    return parse_uidvalidity(select_result[1])
+
+
+async def get_folder_emails(
+    imap: aioimaplib.IMAP4_SSL,
+    email_account: EmailAccount,
+    folder: str = INBOX,
+    ordering: str = NEWEST,
+    criteria: list[str] = None,
+    preview: bool = False,
+) -> Tuple[int, list]:
+    """
+    Получение очереди синхронизации папки.
+
+    Эта функция выполняет следующие действия:
+    1. Выбирает папку.
+    2. Загружает контрольную точку синхронизации папки.
+    3. Ищет в папке письма с UID больше последнего поставленного в очередь.
+    4. Формирует очередь из новых и не сохраненных ранее писем в заданном
+    порядке.
+    5. Исключает из очереди письма, уже сохраненные в другой папке или под
+    прежним UID, восстанавливая их без загрузки с сервера.
+    Если переданы критерии поиска, возвращаются все подходящие под них
+    письма, а контрольная точка не меняется.
+
+    Аргументы:
+        imap (aioimaplib.IMAP4_SSL): Объект IMAP-соединения.
+        email_account (EmailAccount): Объект учетной записи электронной почты.
+        folder (str): Имя папки на IMAP-сервере.
+        ordering (str): Порядок загрузки писем (NEWEST или OLDEST).
+        criteria (list[str]): Критерии поиска IMAP из фильтров клиента.
+        preview (bool): Выполняется ли синхронизация в режиме предпросмотра.
+
+    Возвращает:
+        Tuple[int, list]: Кортеж, содержащий:
+            - Общее количество писем папки с учетом уже сохраненных.
+            - Список UID писем, которые нужно получить с сервера.
+
+    Вызывает ошибку:
+        aioimaplib.Error: В случае ошибки выбора папки или поиска писем.
+    """
+    sync_state = await get_sync_state(
+        email_account, await select_folder(imap, folder), folder
+    )
+    if criteria:
+        emails_uid = sorted(
+            await search_uids(imap, *criteria), reverse=ordering == NEWEST
         )
-        raise aioimaplib.Error(SEARCH_MAILS_ERROR_MESSAGE)
-    all_emails_id = search_result[1][0].split()
-    return imap, len(all_emails_id), all_emails_id
+        return len(emails_uid), emails_uid
+    emails_uid, synced_count = await plan_sync(
+        sync_state,
+        await search_uids(
+            imap, UID_RANGE_SEARCH.format(start=sync_state.last_uid + 1)
+        ),
+        ordering,
+        preview,
+    )
+    return synced_count + len(emails_uid), await skip_known_messages(
+        imap, email_account, emails_uid, folder, preview
+    )
 
 
-async def check_email(
+async def split_sync_window(
     imap: aioimaplib.IMAP4_SSL,
-    email_id: bytes,
-) -> list[bytes, bytearray, bytes, bytes]:
+    emails_id: list[int],
+    window_days: int = 0,
+    window_messages: int = 0,
+) -> tuple[list[int], list[int]]:
     """
-    Проверка и получение данных электронного письма по его идентификатору.
+    Разделение очереди синхронизации на начальное окно и догрузку истории.
+
+    В окно попадают письма за последние window_days дней (поиск SINCE) и
+    не больше window_messages самых новых из них. Нулевое значение снимает
+    соответствующее ограничение. Порядок очереди в обеих частях сохраняется.
 
     Аргументы:
         imap (aioimaplib.IMAP4_SSL): Объект IMAP-соединения.
-        email_id (bytes): Идентификатор письма.
+        emails_id (list[int]): Очередь UID писем.
+        window_days (int): Размер окна в днях.
+        window_messages (int): Размер окна в письмах.
 
     Возвращает:
-        list[bytes, bytearray, bytes, bytes]: Данные письма.
+        tuple[list[int], list[int]]: UID писем начального окна и UID писем
+    для догрузки.
 
     Вызывает ошибку:
-        aioimaplib.Error: В случае отсутствия письма или ошибки при получении
-    данных письма.
+        aioimaplib.Error: В случае ошибки поиска писем.
     """
-    if email_id == b"":
-        fetch_emails_logger.error(
-            NO_MESSAGE_TO_PROCESS_LOGGER_ERROR_MESSAGE, email_id
+    window = set(emails_id)
+    if window and window_days:
+        since = date.today() - timedelta(days=window_days)
+        window &= set(
+            await search_uids(imap, SEARCH_SINCE, format_imap_date(since))
         )
-        raise aioimaplib.Error(NO_MESSAGE_TO_PROCESS_ERROR_MESSAGE)
-    status, email_data = await imap.fetch(email_id.decode(), RFC822_FORMAT)
+    if window_messages:
+        window = set(sorted(window)[-window_messages:])
+    return (
+        [uid for uid in emails_id if uid in window],
+        [uid for uid in emails_id if uid not in window],
+    )
+
+
+def format_uid_set(uids: list[int]) -> str:
+    """
+    Запись UID набором сообщений IMAP с диапазонами ("1:5,7,9:12").
+
+    Аргументы:
+        uids (list[int]): UID писем.
+
+    Возвращает:
+        str: Набор сообщений.
+    """
+    ranges = []
+    for uid in sorted(uids):
+        if ranges and uid == ranges[-1][1] + 1:
+            ranges[-1][1] = uid
+        else:
+            ranges.append([uid, uid])
+    return ",".join(
+        (
+            str(start)
+            if start == end
+            else UID_SET_RANGE.format(start=start, end=end)
+        )
+        for start, end in ranges
+    )
+
+
+async def fetch_batched(
+    imap: aioimaplib.IMAP4_SSL, emails_id: list[int], items: str
+) -> list[dict[str, Any]]:
+    """
+    Получение элементов FETCH для многих писем без загрузки их текста.
+
+    Элементы запрашиваются командой UID FETCH сразу для
+    ImapConfig.FETCH_BATCH писем. Пакет, на который сервер ответил
+    ошибкой, пропускается.
+
+    Аргументы:
+        imap (aioimaplib.IMAP4_SSL): Объект IMAP-соединения с выбранной
+    папкой.
+        emails_id (list[int]): UID писем.
+        items (str): Запрашиваемые элементы FETCH.
+
+    Возвращает:
+        list[dict[str, Any]]: Элементы ответа каждого письма.
+
+    Вызывает ошибку:
+        TimeoutError: Если получение элементов не уложилось в срок.
+    """
+    responses = []
+    for start in range(0, len(emails_id), ImapConfig.FETCH_BATCH):
+        end = start + ImapConfig.FETCH_BATCH
+        status, lines = await imap_command(
+            imap,
+            FETCH,
+            imap.uid(FETCH, format_uid_set(emails_id[start:end]), items),
+        )
+        if status == OK:
+            responses.extend(iter_fetch_responses(lines[:-1]))
+    return responses
+
+
+async def fetch_message_ids(
+    imap: aioimaplib.IMAP4_SSL, emails_id: list[int]
+) -> dict[int, str]:
+    """
+    Получение Message-ID писем без загрузки их текста.
+
+    Заголовок Message-ID разбирается так же, как при разборе полного
+    письма в parse_email.
+
+    Аргументы:
+        imap (aioimaplib.IMAP4_SSL): Объект IMAP-соединения с выбранной
+    папкой.
+        emails_id (list[int]): UID писем.
+
+    Возвращает:
+        dict[int, str]: Message-ID по UID. Письма без Message-ID и письма,
+    которые сервер не вернул, в словаре отсутствуют.
+
+    Вызывает ошибку:
+        TimeoutError: Если получение заголовков не уложилось в срок.
+    """
+    message_ids = {}
+    parser = BytesParser(policy=email_policy)
+    for response in await fetch_batched(
+        imap, emails_id, MESSAGE_ID_FETCH_FORMAT
+    ):
+        header = response.get(MESSAGE_ID_FETCH_KEY)
+        if FETCH_UID not in response or not header:
+            continue
+        message_id = parser.parsebytes(header, headersonly=True)[MESSAGE_ID]
+        if message_id:
+            message_ids[int(response[FETCH_UID])] = str(message_id)
+    return message_ids
+
+
+async def fetch_message_sizes(
+    imap: aioimaplib.IMAP4_SSL, emails_id: list[int]
+) -> dict[int, int]:
+    """
+    Получение размеров писем (RFC822.SIZE) без загрузки их текста.
+
+    Аргументы:
+        imap (aioimaplib.IMAP4_SSL): Объект IMAP-соединения с выбранной
+    папкой.
+        emails_id (list[int]): UID писем.
+
+    Возвращает:
+        dict[int, int]: Размер письма в байтах по UID. Письма, которые
+    сервер не вернул, в словаре отсутствуют.
+
+    Вызывает ошибку:
+        TimeoutError: Если получение размеров не уложилось в срок.
+    """
+    return {
+        int(response[FETCH_UID]): int(response[RFC822_SIZE])
+        for response in await fetch_batched(
+            imap, emails_id, MESSAGE_SIZE_FETCH_FORMAT
+        )
+        if FETCH_UID in response and RFC822_SIZE in response
+    }
+
+
+def split_large_messages(
+    emails_id: list[int], sizes: dict[int, int], threshold: int
+) -> tuple[list[int], list[int]]:
+    """
+    Разделение очереди синхронизации на обычные и крупные письма.
+
+    Крупными считаются письма больше threshold байт. Порядок обычных писем
+    сохраняется, а крупные упорядочиваются по возрастанию размера, чтобы
+    несколько огромных писем не задерживали остальные крупные. Нулевое
+    значение threshold отключает разделение.
+
+    Аргументы:
+        emails_id (list[int]): Очередь UID писем.
+        sizes (dict[int, int]): Размеры писем в байтах по UID. Письма без
+    размера считаются обычными.
+        threshold (int): Наибольший размер обычного письма в байтах.
+
+    Возвращает:
+        tuple[list[int], list[int]]: UID обычных и крупных писем.
+    """
+    if not threshold:
+        return emails_id, []
+    large = {uid for uid in emails_id if sizes.get(uid, 0) > threshold}
+    return (
+        [uid for uid in emails_id if uid not in large],
+        sorted(large, key=lambda uid: (sizes[uid], uid)),
+    )
+
+
+async def skip_known_messages(
+    imap: aioimaplib.IMAP4_SSL,
+    email_account: EmailAccount,
+    emails_id: list[int],
+    folder: str = INBOX,
+    preview: bool = False,
+) -> list[int]:
+    """
+    Исключение из очереди уже сохраненных писем.
+
+    Письмо могло быть сохранено в другой папке, например под другим ярлыком
+    Gmail, или в той же папке под прежним UID до смены UIDVALIDITY.
+    Message-ID писем очереди запрашиваются одним проходом по заголовкам и
+    проверяются фильтром Блума учетной записи. Только положительные ответы
+    фильтра проверяются по базе данных, и найденные письма восстанавливаются
+    в папке функцией adopt_known_emails без загрузки текста. Клиент получает
+    их из базы данных вместе с остальными сохраненными письмами папки.
+
+    Аргументы:
+        imap (aioimaplib.IMAP4_SSL): Объект IMAP-соединения с выбранной
+    папкой.
+        email_account (EmailAccount): Объект учетной записи электронной почты.
+        emails_id (list[int]): Очередь UID писем.
+        folder (str): Имя папки на IMAP-сервере.
+        preview (bool): Выполняется ли синхронизация в режиме предпросмотра.
+
+    Возвращает:
+        list[int]: Очередь UID писем, которые нужно получить с сервера.
+    """
+    if not settings.SYNC_SKIP_KNOWN or not emails_id:
+        return emails_id
+    known = await sync_to_async(load_known_messages)(email_account.pk)
+    if not known.loaded:
+        return emails_id
+    candidates = {
+        uid: message_id
+        for uid, message_id in (
+            await fetch_message_ids(imap, emails_id)
+        ).items()
+        if message_id in known.filter
+    }
+    if not candidates:
+        return emails_id
+    adopted, missing = await sync_to_async(adopt_known_emails)(
+        email_account.pk, folder, candidates, preview
+    )
+    KNOWN_MESSAGES.labels(KnownMessagesConfig.SKIPPED).inc(len(adopted))
+    KNOWN_MESSAGES.labels(KnownMessagesConfig.FALSE_POSITIVE).inc(missing)
+    fetch_emails_logger.info(
+        KNOWN_MESSAGES_SKIPPED_LOGGER_MESSAGE,
+        folder,
+        email_account.email,
+        len(adopted),
+        missing,
+    )
+    return [uid for uid in emails_id if uid not in adopted]
+
+
+async def fetch_checked(
+    imap: aioimaplib.IMAP4_SSL, email_id: int, items: str
+) -> list[bytes | bytearray]:
+    """
+    Выполнение UID FETCH для одного письма с проверкой ответа.
+
+    Аргументы:
+        imap (aioimaplib.IMAP4_SSL): Объект IMAP-соединения.
+        email_id (int): UID письма.
+        items (str): Запрашиваемые элементы FETCH.
+
+    Возвращает:
+        list[bytes | bytearray]: Строки ответа и литералы.
+
+    Вызывает ошибку:
+        aioimaplib.Error: В случае ошибки при получении данных письма.
+        TimeoutError: Если получение письма не уложилось в срок.
+    """
+    status, email_data = await imap_command(
+        imap, FETCH, imap.uid(FETCH, str(email_id), items)
+    )
     if status == BAD:
         fetch_emails_logger.error(
             RECEIVE_MAIL_LOGGER_ERROR_MESSAGE, email_id, email_data[1]
@@ -141,10 +647,142 @@ async def check_email(
     return email_data
 
 
+async def check_email(
+    imap: aioimaplib.IMAP4_SSL,
+    email_id: int,
+    folder: str = INBOX,
+) -> FetchedMessage:
+    """
+    Проверка и получение данных электронного письма по его UID.
+
+    Аргументы:
+        imap (aioimaplib.IMAP4_SSL): Объект IMAP-соединения.
+        email_id (int): UID письма.
+        folder (str): Выбранная папка на IMAP-сервере.
+
+    Возвращает:
+        FetchedMessage: Письмо, ссылающееся на литерал ответа IMAP без
+    копирования.
+
+    Вызывает ошибку:
+        aioimaplib.Error: В случае отсутствия письма или ошибки при получении
+    данных письма.
+    """
+    if not email_id:
+        fetch_emails_logger.error(
+            NO_MESSAGE_TO_PROCESS_LOGGER_ERROR_MESSAGE, email_id
+        )
+        raise aioimaplib.Error(NO_MESSAGE_TO_PROCESS_ERROR_MESSAGE)
+    email_data = await fetch_checked(imap, email_id, RFC822_FORMAT)
+    return FetchedMessage(email_id, memoryview(email_data[1]), folder)
+
+
+async def check_email_preview(
+    imap: aioimaplib.IMAP4_SSL,
+    email_id: int,
+    folder: str = INBOX,
+) -> FetchedMessage:
+    """
+    Получение заголовков и начала текста письма без вложений.
+
+    Сначала запрашиваются BODYSTRUCTURE и заголовки письма, затем только
+    первые SYNC_PREVIEW_BYTES байт текстовой части (text/plain, иначе
+    text/html) командой BODY.PEEK[<часть>]<0.<размер>>. Из заголовков и
+    декодированного начала текста собирается письмо из одной текстовой
+    части, поэтому дальнейший разбор в parse_email не отличается от разбора
+    полного письма.
+
+    Аргументы:
+        imap (aioimaplib.IMAP4_SSL): Объект IMAP-соединения.
+        email_id (int): UID письма.
+        folder (str): Выбранная папка на IMAP-сервере.
+
+    Возвращает:
+        FetchedMessage: Письмо из одной текстовой части.
+
+    Вызывает ошибку:
+        aioimaplib.Error: В случае отсутствия письма или ошибки при получении
+    данных письма.
+    """
+    if not email_id:
+        fetch_emails_logger.error(
+            NO_MESSAGE_TO_PROCESS_LOGGER_ERROR_MESSAGE, email_id
+        )
+        raise aioimaplib.Error(NO_MESSAGE_TO_PROCESS_ERROR_MESSAGE)
+    structure_data = await fetch_checked(
+        imap, email_id, PREVIEW_STRUCTURE_FORMAT
+    )
+    response = parse_fetch_response(structure_data)
+    message = BytesParser(policy=email_policy).parsebytes(
+        response[BODY_HEADER], headersonly=True
+    )
+    text, subtype = "", PREVIEW_SUBTYPES[0]
+    text_section = find_text_section(response[BODYSTRUCTURE])
+    if text_section:
+        section, subtype, encoding, charset = text_section
+        section_data = await fetch_checked(
+            imap,
+            email_id,
+            PREVIEW_SECTION_FORMAT.format(
+                section=section, size=settings.SYNC_PREVIEW_BYTES
+            ),
+        )
+        text = decode_partial_text(
+            parse_fetch_response(section_data).get(
+                PREVIEW_SECTION_KEY.format(section=section)
+            )
+            or b"",
+            encoding,
+            charset,
+        )
+    del message[CONTENT_TYPE]
+    del message[CONTENT_TRANSFER_ENCODING]
+    message.set_content(text, subtype=subtype)
+    return FetchedMessage(
+        email_id, memoryview(message.as_bytes()), folder, is_preview=True
+    )
+
+
+def parse_email(fetched: FetchedMessage) -> ParsedMessage:
+    """
+    Разбор письма без обращения к базе данных.
+
+    Письмо декодируется из памяти литерала напрямую, так же как это делает
+    BytesParser.parsebytes, но без промежуточной копии в bytes.
+
+    Письмо без заголовка Received, например отправленное или
+    импортированное из архива, получает дату получения из заголовка Date.
+
+    Аргументы:
+        fetched (FetchedMessage): Письмо, полученное с IMAP-сервера.
+
+    Возвращает:
+        ParsedMessage: Разобранное письмо с текстом и вложениями.
+    """
+    message = Parser(policy=email_policy).parsestr(
+        str(fetched.raw, ASCII, SURROGATEESCAPE)
+    )
+    date = parse_email_date(message[DATE.title()])
+    return ParsedMessage(
+        uid=fetched.uid,
+        folder=fetched.folder,
+        is_preview=fetched.is_preview,
+        message_id=message[MESSAGE_ID],
+        subject=message[SUBJECT.title()],
+        mail_from=message[FROM.title()],
+        date=date,
+        received=parse_received_date(message[RECEIVED.title()]) or date,
+        text=extract_text_from_message(message),
+        attachments=get_attachments_from_message(message),
+        in_reply_to=next(iter(parse_message_ids(message[IN_REPLY_TO])), None),
+        references=parse_message_ids(message[REFERENCES]),
+    )
+
+
 async def read_email(
     imap: aioimaplib.IMAP4_SSL,
     email_account: EmailAccount,
-    email_data: list[bytes, bytearray, bytes, bytes],
+    fetched: FetchedMessage,
 ) -> dict[str, str | list]:
     """
     Чтение и обработка данных электронного письма.
@@ -159,7 +797,7 @@ async def read_email(
     Аргументы:
         imap (aioimaplib.IMAP4_SSL): Объект IMAP-соединения.
         email_account (EmailAccount): Объект учетной записи электронной почты.
-        email_data (list[bytes, bytearray, bytes, bytes]): Данные письма.
+        fetched (FetchedMessage): Письмо, полученное с IMAP-сервера.
 
     Возвращает:
         dict[str, str | list]: Словарь с данными письма.
@@ -168,41 +806,15 @@ async def read_email(
         IndexError: В случае ошибок при парсинге письма.
     """
     try:
-        email_decoded_data = BytesParser(policy=policy.default).parsebytes(
-            email_data[1]
-        )
-        email, attachments = await save_email(
-            email=Email(
-                message_id=email_decoded_data[MESSAGE_ID],
-                subject=email_decoded_data[SUBJECT.title()],
-                mail_from=email_decoded_data[FROM.title()],
-                date=datetime.strptime(
-                    email_decoded_data[DATE.title()], DATETIME_FORMAT
-                ),
-                received=datetime.strptime(
-                    email_decoded_data[RECEIVED.title()]
-                    .split(";")[1]
-                    .strip()
-                    .split(" (")[0],
-                    DATETIME_FORMAT,
-                ),
-                text=extract_text_from_message(email_decoded_data),
-            ),
-            attachments=get_attachments_from_message(email_decoded_data),
-            email_account=email_account,
-        )
-        email_data = {
-            MESSAGE_ID: email.message_id,
-            SUBJECT: email.subject,
-            FROM: email.mail_from,
-            DATE: email.date.strftime(NEW_DATETIME_FORMAT),
-            RECEIVED: email.received.strftime(NEW_DATETIME_FORMAT),
-            TEXT: email.text,
-            ATTACHMENTS: attachments,
-        }
-        return email_data
+        with PARSE_SECONDS.time():
+            parsed = parse_email(fetched)
+        with DB_SAVE_SECONDS.time():
+            email, attachments = await save_email(
+                parsed=parsed, email_account=email_account
+            )
+        return serialize_email(email, attachments)
     except IndexError as e:
         fetch_emails_logger.error(
-            PARSING_MAIL_LOGGER_ERROR_MESSAGE, email_data, str(e)
+            PARSING_MAIL_LOGGER_ERROR_MESSAGE, fetched.uid, str(e)
         )
     await imap.logout()
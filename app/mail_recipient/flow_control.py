@@ -0,0 +1,280 @@
+"""Модуль flow_control."""
+
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import suppress
+from datetime import datetime
+from typing import Any, Awaitable, Callable
+
+from core.constants import (
+    CONSUMER,
+    EMAIL_DATA,
+    FOLDER,
+    MESSAGE_ID,
+    NEW_EMAIL,
+    OUTBOUND,
+    OUTBOUND_HISTORY_QUEUES,
+    OUTBOUND_REPLAY_LOGGER_MESSAGE,
+    TYPE,
+)
+from core.metrics import OUTBOUND_REPLAYS, QUEUE_DEPTH
+from django.utils import timezone
+from email_account.models import EmailAccount
+from mail_recipient.sync_state import email_cursor, emails_saved_after
+
+flow_control_logger = logging.getLogger(CONSUMER)
+
+
+def email_key(email_data: dict[str, Any]) -> tuple[str, str]:
+    """
+    Ключ письма для отсева повторной отправки.
+
+    Аргументы:
+        email_data (dict[str, Any]): Данные письма.
+
+    Возвращает:
+        tuple[str, str]: Папка и Message-ID письма.
+    """
+    return email_data[FOLDER], email_data[MESSAGE_ID]
+
+
+def email_position(email_data: dict[str, Any]) -> tuple[datetime, int] | None:
+    """
+    Позиция письма в порядке сохранения писем учетной записи.
+
+    Аргументы:
+        email_data (dict[str, Any]): Данные письма.
+
+    Возвращает:
+        tuple[datetime, int] | None: Дата сохранения и идентификатор письма
+    или None, если данные письма не содержат позиции.
+    """
+    return getattr(email_data, "position", None)
+
+
+class OutboundWindow:
+    """
+    Очередь отправки писем клиенту с управлением потоком по кредитам.
+
+    Клиент выдает кредиты — количество писем, которые он готов принять, и
+    каждое отправленное письмо расходует один кредит. Письма без кредита
+    ждут в очереди длиной не больше queue_size. Если очередь заполнена,
+    новые письма в памяти не копятся: они уже сохранены в базе данных,
+    поэтому запоминается только самая ранняя позиция недоставленного
+    письма, а когда клиент выдаст кредиты, письма догружаются из базы
+    данных страницами в порядке сохранения. Папки синхронизируются
+    параллельно, и письмо может попасть в очередь позже писем, сохраненных
+    после него, поэтому догрузка начинается с самого раннего отброшенного
+    письма, даже если она уже прошла эту позицию. Письма, которые уже
+    стояли в очереди в той же версии, при догрузке пропускаются. Память
+    соединения ограничена размером очереди при любой скорости клиента, а
+    синхронизация с IMAP-сервером клиента не ждет.
+
+    Кадры прогресса кредиты не расходуют: хранится только последний из них,
+    и он отправляется, как только у клиента появятся кредиты.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[dict[str, Any]], Awaitable[None]],
+        email_account: EmailAccount,
+        credits: int,
+        queue_size: int,
+    ) -> None:
+        """
+        Инициализация очереди и запуск задачи отправки.
+
+        Аргументы:
+            send (Callable[[dict[str, Any]], Awaitable[None]]): Отправка
+        кадра клиенту.
+            email_account (EmailAccount): Учетная запись электронной почты.
+            credits (int): Начальное количество кредитов клиента.
+            queue_size (int): Наибольшая длина очереди писем.
+        """
+        self.send = send
+        self.email_account = email_account
+        self.credits = credits
+        self.queue_size = max(queue_size, 1)
+        self.queue = deque()
+        self.progress = None
+        self.overflow = None
+        self.overflow_at = None
+        self.cursor = None
+        self.replay_from = None
+        self.dirty = False
+        self.queued = OrderedDict()
+        self.has_room = asyncio.Event()
+        self.has_room.set()
+        self.wakeup = asyncio.Event()
+        self.depth = QUEUE_DEPTH.labels(OUTBOUND)
+        self.task = asyncio.create_task(self.drain())
+
+    def grant(self, credits: int) -> None:
+        """
+        Добавление кредитов, выданных клиентом.
+
+        Аргументы:
+            credits (int): Количество писем, обработанных клиентом.
+        """
+        self.credits += credits
+        self.wakeup.set()
+
+    def set_progress(self, data: dict[str, Any]) -> None:
+        """
+        Замена неотправленного кадра прогресса более свежим.
+
+        Аргументы:
+            data (dict[str, Any]): Кадр прогресса.
+        """
+        self.progress = data
+        self.wakeup.set()
+
+    def append(self, email_data: dict[str, Any]) -> None:
+        """
+        Добавление письма в очередь.
+
+        Аргументы:
+            email_data (dict[str, Any]): Кадр письма.
+        """
+        key = email_key(email_data)
+        self.queued.pop(key, None)
+        self.queued[key] = email_position(email_data)
+        if len(self.queued) > self.queue_size * OUTBOUND_HISTORY_QUEUES:
+            self.queued.popitem(last=False)
+        self.queue.append(email_data)
+        self.depth.inc()
+        if len(self.queue) >= self.queue_size:
+            self.has_room.clear()
+        self.wakeup.set()
+
+    def was_queued(self, email_data: dict[str, Any]) -> bool:
+        """
+        Проверка, стояло ли письмо в очереди в той же версии.
+
+        Аргументы:
+            email_data (dict[str, Any]): Кадр письма.
+
+        Возвращает:
+            bool: True, если письмо с той же позицией уже было в очереди.
+        """
+        key = email_key(email_data)
+        return key in self.queued and self.queued[key] == email_position(
+            email_data
+        )
+
+    def drop(self, email_data: dict[str, Any]) -> None:
+        """
+        Отбрасывание письма с запоминанием позиции для догрузки.
+
+        Аргументы:
+            email_data (dict[str, Any]): Кадр письма.
+        """
+        position = email_position(email_data)
+        if position is None:
+            return
+        synced_at, email_id = position
+        start = (synced_at, email_id - 1)
+        if self.replay_from is None or start < self.replay_from:
+            self.replay_from = start
+
+    def offer(self, email_data: dict[str, Any]) -> None:
+        """
+        Постановка в очередь только что сохраненного письма без ожидания.
+
+        Если очередь заполнена или письма уже догружаются из базы данных,
+        письмо отбрасывается: оно будет отправлено при догрузке.
+
+        Аргументы:
+            email_data (dict[str, Any]): Кадр письма.
+        """
+        if self.was_queued(email_data):
+            return
+        if self.overflow is not None:
+            self.dirty = True
+            self.drop(email_data)
+            return
+        if len(self.queue) < self.queue_size:
+            self.append(email_data)
+            return
+        self.drop(email_data)
+        self.overflow = email_key(email_data)
+        self.overflow_at = timezone.now()
+        OUTBOUND_REPLAYS.inc()
+        flow_control_logger.info(
+            OUTBOUND_REPLAY_LOGGER_MESSAGE, self.email_account.email
+        )
+
+    async def put(self, email_data: dict[str, Any]) -> None:
+        """
+        Постановка в очередь письма из базы данных с ожиданием места.
+
+        Используется при отправке ранее синхронизированных писем: их чтение
+        из базы данных идет со скоростью клиента.
+
+        Аргументы:
+            email_data (dict[str, Any]): Кадр письма.
+        """
+        await self.has_room.wait()
+        self.append(email_data)
+
+    async def refill(self) -> None:
+        """
+        Догрузка недоставленных писем из базы данных.
+
+        Догрузка продолжается с самой ранней позиции отброшенного письма,
+        если она раньше курсора. Письма, отброшенные во время запроса,
+        помечают очередь флагом dirty, и догрузка продолжается, пока
+        страница не окажется неполной при неизменном флаге. Письма, уже
+        стоявшие в очереди в той же версии, пропускаются, в том числе
+        письмо, сохраненное до запроса, а в очередь предложенное после
+        окончания догрузки.
+        """
+        if self.cursor is None and self.replay_from is None:
+            self.replay_from = await email_cursor(
+                self.email_account, *self.overflow
+            ) or (self.overflow_at, 0)
+        if self.replay_from is not None and (
+            self.cursor is None or self.replay_from < self.cursor
+        ):
+            self.cursor = self.replay_from
+        self.replay_from = None
+        self.dirty = False
+        page = await emails_saved_after(
+            self.email_account, self.cursor, self.queue_size
+        )
+        for cursor, email_data in page:
+            self.cursor = cursor
+            if not self.was_queued(email_data):
+                self.append(email_data)
+        if len(page) < self.queue_size and not self.dirty:
+            self.overflow = self.cursor = None
+
+    async def drain(self) -> None:
+        """Отправка писем клиенту, пока у него есть кредиты."""
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while self.credits > 0:
+                if self.progress is not None:
+                    data, self.progress = self.progress, None
+                    await self.send(data)
+                elif self.queue:
+                    self.credits -= 1
+                    self.depth.dec()
+                    self.has_room.set()
+                    await self.send(
+                        {TYPE: NEW_EMAIL, EMAIL_DATA: self.queue.popleft()}
+                    )
+                elif self.overflow is not None:
+                    await self.refill()
+                else:
+                    break
+
+    async def close(self) -> None:
+        """Остановка задачи отправки и очистка очереди."""
+        self.task.cancel()
+        with suppress(asyncio.CancelledError, Exception):
+            await self.task
+        self.depth.dec(len(self.queue))
+        self.queue.clear()
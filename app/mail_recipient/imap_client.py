@@ -0,0 +1,345 @@
+"""Модуль imap_client."""
+
+import asyncio
+import logging
+import ssl
+import time
+import zlib
+from collections import deque
+from typing import Any, Awaitable, TypeVar
+
+import aioimaplib
+from core.constants import (
+    CAPABILITY,
+    COMPRESS,
+    COMPRESS_DISABLED_LOGGER_MESSAGE,
+    FETCH_EMAILS,
+    IMAP_COMMAND_TIMEOUT_ERROR_MESSAGE,
+    IMAP_CONNECTION_LOST_ERROR_MESSAGE,
+    IMAP_LINE_END,
+    OK,
+    RECEIVED,
+    SENT,
+    ImapConfig,
+)
+from core.metrics import (
+    IMAP_COMMAND_SECONDS,
+    IMAP_COMPRESSED_BYTES,
+    IMAP_COMPRESSION_SECONDS,
+    IMAP_TIMEOUTS,
+    IMAP_UNCOMPRESSED_BYTES,
+)
+from django.conf import settings
+
+T = TypeVar("T")
+
+imap_client_logger = logging.getLogger(FETCH_EMAILS)
+
+
+class LiteralProtocol(aioimaplib.IMAP4ClientProtocol):
+    """
+    Протокол aioimaplib с отправкой литералов {n} в любой команде.
+
+    aioimaplib отправляет литерал только в команде APPEND, а строки других
+    команд записывает целиком. Здесь строка команды делится по переводам
+    строки после размеров литералов (RFC 3501, раздел 4.3): первая часть
+    отправляется сразу, а каждая следующая - литерал с продолжением
+    команды - только после ответа сервера "+".
+
+    Атрибуты:
+        pending_literals (deque[str]): Части команды, ожидающие ответа
+    сервера "+".
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        """Инициализация протокола без ожидающих литералов."""
+        super().__init__(*args, **kwargs)
+        self.pending_literals = deque()
+
+    def send(self, line: str, scrub: str | None = None) -> None:
+        """
+        Отправка команды до первого литерала.
+
+        Аргументы:
+            line (str): Строка команды с литералами.
+            scrub (str | None): Значение, скрываемое в журнале.
+        """
+        line, *literals = line.split(IMAP_LINE_END)
+        self.pending_literals = deque(literals)
+        super().send(line, scrub)
+
+    def _continuation(self, line: bytes) -> None:
+        """
+        Отправка следующего литерала в ответ на продолжение сервера.
+
+        Аргументы:
+            line (bytes): Строка продолжения "+".
+        """
+        if not self.pending_literals:
+            super()._continuation(line)
+            return
+        literal = self.pending_literals.popleft() + IMAP_LINE_END
+        self.transport.write(literal.encode())
+
+
+class ConnectionWatchMixin:
+    """
+    Отслеживание разрыва соединения с IMAP-сервером.
+
+    aioimaplib не завершает ожидающие команды при разрыве соединения, и они
+    ждут ответа до истечения таймаута бездействия. Событие closed
+    устанавливается сразу при разрыве, поэтому imap_command прерывает
+    команду, не дожидаясь срока. Соединение использует LiteralProtocol,
+    чтобы критерии поиска не в ASCII отправлялись литералами.
+
+    Атрибуты:
+        closed (asyncio.Event): Установлено, если соединение разорвано.
+    """
+
+    def create_client(
+        self,
+        host: str,
+        port: int,
+        loop: asyncio.AbstractEventLoop,
+        conn_lost_cb=None,
+        ssl_context=None,
+    ) -> None:
+        """Создание соединения с обработчиком его разрыва."""
+        loop = loop if loop is not None else asyncio.get_running_loop()
+        self.closed = asyncio.Event()
+        self.protocol = LiteralProtocol(loop, lambda error: self.closed.set())
+        loop.create_task(
+            loop.create_connection(
+                lambda: self.protocol, host, port, ssl=ssl_context
+            )
+        )
+
+
+class ImapClient(ConnectionWatchMixin, aioimaplib.IMAP4):
+    """IMAP-соединение без шифрования с отслеживанием разрыва."""
+
+
+class ImapSslClient(ConnectionWatchMixin, aioimaplib.IMAP4_SSL):
+    """IMAP-соединение через SSL с отслеживанием разрыва."""
+
+    def create_client(
+        self,
+        host: str,
+        port: int,
+        loop: asyncio.AbstractEventLoop,
+        conn_lost_cb=None,
+        ssl_context=None,
+    ) -> None:
+        """Создание соединения с проверкой сертификата сервера."""
+        if ssl_context is None:
+            ssl_context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH)
+        super().create_client(host, port, loop, conn_lost_cb, ssl_context)
+
+
+class DeflateTransport:
+    """
+    Транспорт, сжимающий исходящие данные потоком deflate (RFC 4978).
+
+    Остальные методы передаются исходному транспорту без изменений.
+
+    Атрибуты:
+        transport (asyncio.Transport): Исходный транспорт соединения.
+    """
+
+    def __init__(self, transport: asyncio.Transport) -> None:
+        """
+        Инициализация сжатия поверх транспорта.
+
+        Аргументы:
+            transport (asyncio.Transport): Исходный транспорт соединения.
+        """
+        self.transport = transport
+        self._compressor = zlib.compressobj(wbits=ImapConfig.DEFLATE_WBITS)
+
+    def write(self, data: bytes) -> None:
+        """
+        Сжатие и отправка данных.
+
+        Каждая запись завершается Z_SYNC_FLUSH, чтобы сервер мог разобрать
+        команду, не дожидаясь следующих данных.
+
+        Аргументы:
+            data (bytes): Отправляемые данные.
+        """
+        start = time.process_time()
+        compressed = self._compressor.compress(data)
+        compressed += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        IMAP_COMPRESSION_SECONDS.labels(SENT).inc(time.process_time() - start)
+        IMAP_UNCOMPRESSED_BYTES.labels(SENT).inc(len(data))
+        IMAP_COMPRESSED_BYTES.labels(SENT).inc(len(compressed))
+        self.transport.write(compressed)
+
+    def __getattr__(self, name: str) -> Any:
+        """Доступ к остальным методам исходного транспорта."""
+        return getattr(self.transport, name)
+
+
+class InflateProtocol(asyncio.Protocol):
+    """
+    Протокол, распаковывающий входящие данные для протокола aioimaplib.
+
+    Атрибуты:
+        protocol (aioimaplib.IMAP4ClientProtocol): Протокол соединения.
+    """
+
+    def __init__(self, protocol: aioimaplib.IMAP4ClientProtocol) -> None:
+        """
+        Инициализация распаковки перед протоколом aioimaplib.
+
+        Аргументы:
+            protocol (aioimaplib.IMAP4ClientProtocol): Протокол соединения.
+        """
+        self.protocol = protocol
+        self._decompressor = zlib.decompressobj(wbits=ImapConfig.DEFLATE_WBITS)
+
+    def data_received(self, data: bytes) -> None:
+        """
+        Распаковка полученных данных и передача их протоколу.
+
+        Аргументы:
+            data (bytes): Сжатые данные.
+        """
+        start = time.process_time()
+        inflated = self._decompressor.decompress(data)
+        IMAP_COMPRESSION_SECONDS.labels(RECEIVED).inc(
+            time.process_time() - start
+        )
+        IMAP_COMPRESSED_BYTES.labels(RECEIVED).inc(len(data))
+        IMAP_UNCOMPRESSED_BYTES.labels(RECEIVED).inc(len(inflated))
+        if inflated:
+            self.protocol.data_received(inflated)
+
+    def eof_received(self) -> bool | None:
+        """Передача конца потока протоколу."""
+        return self.protocol.eof_received()
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        """Передача разрыва соединения протоколу."""
+        self.protocol.connection_lost(exc)
+
+
+async def enable_compression(imap: aioimaplib.IMAP4) -> bool:
+    """
+    Включение сжатия COMPRESS=DEFLATE, если сервер его поддерживает.
+
+    Возможности сервера после входа могут отличаться от объявленных при
+    подключении, поэтому, если LOGIN не вернул COMPRESS=DEFLATE, список
+    запрашивается повторно. Сервер начинает сжатие сразу после ответа OK, а
+    клиент до этого ответа ничего не отправляет, поэтому обертки
+    устанавливаются сразу после завершения команды.
+
+    Аргументы:
+        imap (aioimaplib.IMAP4): Объект IMAP-соединения после входа.
+
+    Возвращает:
+        bool: Включено ли сжатие.
+
+    Вызывает ошибку:
+        TimeoutError: Если команда не уложилась в срок.
+    """
+    protocol = imap.protocol
+    if ImapConfig.COMPRESS_DEFLATE not in protocol.capabilities:
+        await imap_command(imap, CAPABILITY, protocol.capability())
+    if ImapConfig.COMPRESS_DEFLATE not in protocol.capabilities:
+        return False
+    command = aioimaplib.Command(
+        COMPRESS.upper(),
+        protocol.new_tag(),
+        ImapConfig.DEFLATE,
+        loop=protocol.loop,
+    )
+    response = await imap_command(imap, COMPRESS, protocol.execute(command))
+    if response.result != OK:
+        imap_client_logger.warning(
+            COMPRESS_DISABLED_LOGGER_MESSAGE, response.lines
+        )
+        return False
+    transport = protocol.transport
+    transport.set_protocol(InflateProtocol(protocol))
+    protocol.transport = DeflateTransport(transport)
+    return True
+
+
+def client_timeout() -> float:
+    """
+    Таймаут бездействия aioimaplib для создаваемых соединений.
+
+    Срок каждой команды задает imap_command, поэтому собственный таймаут
+    aioimaplib не должен быть короче самого долгого из сроков IMAP_TIMEOUTS.
+
+    Возвращает:
+        float: Таймаут в секундах.
+    """
+    return max(
+        settings.IMAP_TIMEOUTS.values(),
+        default=aioimaplib.IMAP4.TIMEOUT_SECONDS,
+    )
+
+
+def close_transport(imap: aioimaplib.IMAP4) -> None:
+    """
+    Закрытие сокета соединения без команды LOGOUT.
+
+    Аргументы:
+        imap (aioimaplib.IMAP4): Объект IMAP-соединения.
+    """
+    transport = imap.protocol.transport
+    if transport is not None:
+        transport.close()
+
+
+async def imap_command(
+    imap: aioimaplib.IMAP4, command: str, operation: Awaitable[T]
+) -> T:
+    """
+    Выполнение команды IMAP со сроком из IMAP_TIMEOUTS.
+
+    Команда прерывается, если не уложилась в срок или соединение разорвано.
+    После прерывания состояние соединения неизвестно, поэтому его нужно
+    закрыть, а не переиспользовать.
+
+    Аргументы:
+        imap (aioimaplib.IMAP4): Объект IMAP-соединения.
+        command (str): Имя команды для срока и метрик.
+        operation (Awaitable[T]): Вызов команды aioimaplib.
+
+    Возвращает:
+        T: Ответ сервера.
+
+    Вызывает ошибку:
+        TimeoutError: Если команда не уложилась в срок.
+        ConnectionResetError: Если соединение разорвано.
+    """
+    task = asyncio.ensure_future(operation)
+    closed = asyncio.ensure_future(imap.closed.wait())
+    try:
+        with IMAP_COMMAND_SECONDS.labels(command).time():
+            done, _ = await asyncio.wait(
+                {task, closed},
+                timeout=settings.IMAP_TIMEOUTS.get(command),
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+    finally:
+        closed.cancel()
+        task.cancel()
+    if task in done:
+        try:
+            return task.result()
+        except aioimaplib.CommandTimeout as error:
+            IMAP_TIMEOUTS.labels(command).inc()
+            raise TimeoutError(
+                IMAP_COMMAND_TIMEOUT_ERROR_MESSAGE.format(command=command)
+            ) from error
+    if closed in done:
+        raise ConnectionResetError(
+            IMAP_CONNECTION_LOST_ERROR_MESSAGE.format(command=command)
+        )
+    IMAP_TIMEOUTS.labels(command).inc()
+    raise TimeoutError(
+        IMAP_COMMAND_TIMEOUT_ERROR_MESSAGE.format(command=command)
+    )
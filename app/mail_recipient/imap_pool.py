@@ -0,0 +1,302 @@
+"""Модуль imap_pool."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager, suppress
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
+
+import aioimaplib
+from core.constants import (
+    FETCH_EMAILS,
+    IMAP_HEDGE_LOGGER_MESSAGE,
+    IMAP_RECONNECT_LOGGER_MESSAGE,
+    LOGOUT,
+    ImapConfig,
+)
+from core.metrics import IMAP_HEDGES, IMAP_RECONNECTS
+from django.conf import settings
+from email_account.models import EmailAccount
+from mail_recipient.fetch_emails import connect_imap, select_folder
+from mail_recipient.imap_client import close_transport, imap_command
+
+T = TypeVar("T")
+
+# TimeoutError и ConnectionError — подклассы OSError.
+RECONNECT_ERRORS = (OSError, aioimaplib.Abort)
+
+imap_pool_logger = logging.getLogger(FETCH_EMAILS)
+
+
+class ImapConnectionPool:
+    """
+    Пул IMAP-соединений одной учетной записи.
+
+    Соединения открываются по мере необходимости, но не больше size
+    одновременно, и переиспользуются синхронизациями разных папок. Папку
+    нужно выбирать заново после каждого получения соединения из пула.
+    Соединение, при работе с которым возникла ошибка, закрывается, а не
+    возвращается в пул. Если соединение разорвано, команда не уложилась в
+    срок или была отменена, сокет закрывается без LOGOUT: ответ на
+    прерванную команду может не прийти никогда.
+
+    Если включен IMAP_HEDGE, пул замеряет время получения писем, и FETCH,
+    не завершившийся за перцентиль IMAP_HEDGE_PERCENTILE этого времени,
+    повторяется через одно запасное соединение сверх size.
+
+    Атрибуты:
+        email_account (EmailAccount): Учетная запись электронной почты.
+        size (int): Наибольшее количество открытых соединений.
+        latencies (deque[float]): Время последних получений писем.
+    """
+
+    def __init__(self, email_account: EmailAccount, size: int = None) -> None:
+        """
+        Инициализация пустого пула.
+
+        Аргументы:
+            email_account (EmailAccount): Учетная запись электронной почты.
+            size (int): Наибольшее количество открытых соединений, по
+        умолчанию SYNC_FOLDER_CONNECTIONS.
+        """
+        self.email_account = email_account
+        self.size = max(size or settings.SYNC_FOLDER_CONNECTIONS, 1)
+        self.latencies = deque(maxlen=ImapConfig.HEDGE_WINDOW)
+        self._semaphore = asyncio.Semaphore(self.size)
+        self._idle = []
+        self._spare = None
+        self._spare_folder = None
+        self._spare_lock = asyncio.Lock()
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[aioimaplib.IMAP4_SSL]:
+        """
+        Получение соединения из пула на время блока async with.
+
+        Возвращает:
+            AsyncIterator[aioimaplib.IMAP4_SSL]: Объект IMAP-соединения.
+
+        Вызывает ошибку:
+            aioimaplib.Error: В случае ошибки аутентификации.
+        """
+        async with self._semaphore:
+            imap = (
+                self._idle.pop()
+                if self._idle
+                else await connect_imap(self.email_account)
+            )
+            try:
+                yield imap
+            except (*RECONNECT_ERRORS, asyncio.CancelledError):
+                close_transport(imap)
+                raise
+            except BaseException:
+                await self.logout(imap)
+                raise
+            self._idle.append(imap)
+
+    async def run(
+        self,
+        operation: Callable[[aioimaplib.IMAP4_SSL], Awaitable[T]],
+        progress: Callable[[], Any] = None,
+    ) -> T:
+        """
+        Выполнение операции на соединении пула с переподключением.
+
+        Если соединение разорвано или команда не уложилась в срок,
+        соединение закрывается, и операция повторяется на новом соединении
+        после паузы IMAP_RECONNECT_BACKOFF, удваивающейся с каждой попыткой.
+        Операция должна сама выбирать папку и продолжать работу с места
+        обрыва. Попытки считаются подряд: если значение progress изменилось
+        за время попытки, счетчик сбрасывается.
+
+        Аргументы:
+            operation (Callable[[aioimaplib.IMAP4_SSL], Awaitable[T]]):
+        Операция над соединением.
+            progress (Callable[[], Any]): Показатель продвижения операции,
+        например количество полученных писем.
+
+        Возвращает:
+            T: Результат операции.
+
+        Вызывает ошибку:
+            OSError: Если переподключения подряд не помогли.
+            aioimaplib.Error: В случае ошибки IMAP-сервера.
+        """
+        failures = 0
+        while True:
+            mark = progress() if progress else None
+            try:
+                async with self.acquire() as imap:
+                    return await operation(imap)
+            except RECONNECT_ERRORS as error:
+                if progress and progress() != mark:
+                    failures = 0
+                failures += 1
+                if failures > settings.IMAP_RECONNECT_ATTEMPTS:
+                    raise
+                delay = settings.IMAP_RECONNECT_BACKOFF * 2 ** (failures - 1)
+                IMAP_RECONNECTS.inc()
+                imap_pool_logger.warning(
+                    IMAP_RECONNECT_LOGGER_MESSAGE,
+                    error,
+                    failures,
+                    settings.IMAP_RECONNECT_ATTEMPTS,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+
+    def hedge_delay(self) -> float | None:
+        """
+        Время, после которого FETCH повторяется через запасное соединение.
+
+        Возвращает:
+            float | None: Перцентиль IMAP_HEDGE_PERCENTILE времени последних
+        получений писем, но не меньше IMAP_HEDGE_MIN_DELAY, или None, если
+        повтор выключен или замеров еще мало.
+        """
+        if (
+            not settings.IMAP_HEDGE
+            or len(self.latencies) < ImapConfig.HEDGE_MIN_SAMPLES
+        ):
+            return None
+        ordered = sorted(self.latencies)
+        index = min(
+            int(len(ordered) * settings.IMAP_HEDGE_PERCENTILE),
+            len(ordered) - 1,
+        )
+        return max(ordered[index], settings.IMAP_HEDGE_MIN_DELAY)
+
+    async def fetch(
+        self,
+        imap: aioimaplib.IMAP4_SSL,
+        folder: str,
+        operation: Callable[[aioimaplib.IMAP4_SSL], Awaitable[T]],
+        email_id: int,
+    ) -> T:
+        """
+        Получение письма с повтором зависшего запроса.
+
+        Если FETCH не завершился за hedge_delay, тот же запрос отправляется
+        через запасное соединение, и используется первый успешный ответ.
+        Второй запрос отменяется. Если не ответило основное соединение, оно
+        закрывается: ответ на прерванный запрос может прийти позже, и
+        следующая команда на этом соединении вызовет переподключение.
+
+        Аргументы:
+            imap (aioimaplib.IMAP4_SSL): Соединение с выбранной папкой.
+            folder (str): Имя папки на IMAP-сервере.
+            operation (Callable[[aioimaplib.IMAP4_SSL], Awaitable[T]]):
+        Получение письма через соединение.
+            email_id (int): UID письма.
+
+        Возвращает:
+            T: Результат первого успешного запроса.
+        """
+        if not settings.IMAP_HEDGE:
+            return await operation(imap)
+        delay = self.hedge_delay()
+        start = time.perf_counter()
+        primary = asyncio.ensure_future(operation(imap))
+        hedge = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                result = primary.result()
+                self.latencies.append(time.perf_counter() - start)
+                return result
+            imap_pool_logger.info(
+                IMAP_HEDGE_LOGGER_MESSAGE, email_id, folder, delay
+            )
+            hedge = asyncio.ensure_future(self.run_spare(folder, operation))
+            winner = await self.first_success(primary, hedge)
+            IMAP_HEDGES.labels(
+                ImapConfig.PRIMARY if winner is primary else ImapConfig.HEDGE
+            ).inc()
+            return winner.result()
+        finally:
+            if not primary.done():
+                close_transport(imap)
+            for task in filter(None, (primary, hedge)):
+                task.cancel()
+                if task.done() and not task.cancelled():
+                    task.exception()
+
+    @staticmethod
+    async def first_success(*tasks: asyncio.Future) -> asyncio.Future:
+        """
+        Ожидание первой успешно завершившейся задачи.
+
+        Аргументы:
+            *tasks (asyncio.Future): Задачи, выполняющие один и тот же запрос.
+
+        Возвращает:
+            asyncio.Future: Успешная задача или, если успешных нет, последняя
+        завершившаяся с ошибкой.
+        """
+        pending = set(tasks)
+        while True:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task
+            if not pending:
+                return task
+
+    async def run_spare(
+        self,
+        folder: str,
+        operation: Callable[[aioimaplib.IMAP4_SSL], Awaitable[T]],
+    ) -> T:
+        """
+        Выполнение операции через запасное соединение.
+
+        Запасное соединение открывается при первом повторе и выбирает папку
+        только при ее смене. При разрыве или истечении срока оно закрывается
+        и будет открыто заново при следующем повторе.
+
+        Аргументы:
+            folder (str): Имя папки на IMAP-сервере.
+            operation (Callable[[aioimaplib.IMAP4_SSL], Awaitable[T]]):
+        Операция над соединением.
+
+        Возвращает:
+            T: Результат операции.
+        """
+        async with self._spare_lock:
+            try:
+                if self._spare is None:
+                    self._spare = await connect_imap(self.email_account)
+                    self._spare_folder = None
+                if self._spare_folder != folder:
+                    await select_folder(self._spare, folder)
+                    self._spare_folder = folder
+                return await operation(self._spare)
+            except RECONNECT_ERRORS:
+                spare, self._spare = self._spare, None
+                if spare is not None:
+                    close_transport(spare)
+                raise
+
+    @staticmethod
+    async def logout(imap: aioimaplib.IMAP4_SSL) -> None:
+        """
+        Завершение сеанса без проверки ответа сервера и закрытие сокета.
+
+        Аргументы:
+            imap (aioimaplib.IMAP4_SSL): Объект IMAP-соединения.
+        """
+        with suppress(aioimaplib.Error, OSError):
+            await imap_command(imap, LOGOUT, imap.logout())
+        close_transport(imap)
+
+    async def close(self) -> None:
+        """Закрытие свободных и запасного соединений пула."""
+        idle, self._idle = self._idle, []
+        if self._spare is not None:
+            idle.append(self._spare)
+            self._spare = None
+        await asyncio.gather(*(self.logout(imap) for imap in idle))
@@ -0,0 +1,249 @@
+"""Модуль imap_response."""
+
+import re
+from typing import Any, Iterator
+
+from core.constants import (
+    IMAP_ATTACHMENT,
+    IMAP_CHARSET,
+    IMAP_DEFAULT_ENCODING,
+    IMAP_LITERAL,
+    IMAP_NIL,
+    IMAP_NOT_SELECTABLE_FLAGS,
+    IMAP_RESPONSE_PARSE_ERROR_MESSAGE,
+    IMAP_TEXT,
+    PREVIEW_SUBTYPES,
+)
+
+LITERAL_PATTERN = re.compile(rb"\{(\d+)\}$")
+TOKEN_PATTERN = re.compile(
+    rb'\(|\)|"(?:[^"\\]|\\.)*"|[^\s()\[]+(?:\[[^\]]*\][^\s()]*)?'
+)
+QUOTED_ESCAPE_PATTERN = re.compile(rb"\\(.)")
+
+
+def quote_string(value: str) -> str:
+    """
+    Преобразование строки в строку IMAP в кавычках.
+
+    Аргументы:
+        value (str): Строка без символов перевода строки и NUL.
+
+    Возвращает:
+        str: Строка в кавычках с экранированными кавычками и обратной косой
+    чертой.
+    """
+    return '"%s"' % value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def literal_string(value: str) -> str:
+    """
+    Преобразование строки в литерал IMAP {n} (RFC 3501, раздел 4.3).
+
+    Строку в кавычках можно использовать только для ASCII, поэтому
+    остальные значения отправляются литералом. Длина литерала указывается
+    в байтах UTF-8, в которой aioimaplib кодирует команду.
+
+    Аргументы:
+        value (str): Строка без символов перевода строки и NUL.
+
+    Возвращает:
+        str: Размер литерала, перевод строки и сама строка.
+    """
+    return IMAP_LITERAL % len(value.encode()) + value
+
+
+def tokenize(lines: list[bytes | bytearray]) -> Iterator[Any]:
+    """
+    Разбиение ответа IMAP на лексемы.
+
+    Строки ответа aioimaplib чередуются с литералами: строка, которая
+    заканчивается на {n}, предшествует литералу длиной n байт.
+
+    Аргументы:
+        lines (list[bytes | bytearray]): Строки ответа и литералы.
+
+    Возвращает:
+        Iterator[Any]: Скобки, атомы и строки (bytes) и литералы
+    (bytearray).
+    """
+    literal_expected = False
+    for line in lines:
+        if literal_expected:
+            literal_expected = False
+            yield bytearray(line)
+            continue
+        literal = LITERAL_PATTERN.search(line)
+        if literal:
+            line = line[: literal.start()]
+            literal_expected = True
+        for token in TOKEN_PATTERN.findall(bytes(line)):
+            if token.startswith(b'"'):
+                yield bytearray(QUOTED_ESCAPE_PATTERN.sub(rb"\1", token[1:-1]))
+            else:
+                yield token
+
+
+def parse_list(tokens: Iterator[Any]) -> list[Any]:
+    """
+    Сборка вложенных списков из лексем до закрывающей скобки.
+
+    Аргументы:
+        tokens (Iterator[Any]): Лексемы после открывающей скобки.
+
+    Возвращает:
+        list[Any]: Список, где атом NIL заменен на None, а строки и
+    литералы представлены как bytes.
+    """
+    result = []
+    for token in tokens:
+        if isinstance(token, bytearray):
+            result.append(bytes(token))
+        elif token == b"(":
+            result.append(parse_list(tokens))
+        elif token == b")":
+            return result
+        else:
+            result.append(None if token == IMAP_NIL else token)
+    return result
+
+
+def iter_fetch_responses(
+    lines: list[bytes | bytearray],
+) -> Iterator[dict[str, Any]]:
+    """
+    Разбор ответа на команду FETCH для нескольких писем.
+
+    Аргументы:
+        lines (list[bytes | bytearray]): Строки ответа aioimaplib без
+    строки завершения команды.
+
+    Возвращает:
+        Iterator[dict[str, Any]]: Элементы ответа каждого письма, например
+    {"UID": b"5", "BODY[HEADER]": b"...", "BODYSTRUCTURE": [...]}.
+    """
+    tokens = tokenize(lines)
+    for token in tokens:
+        if token == b"(" and not isinstance(token, bytearray):
+            items = parse_list(tokens)
+            yield {
+                items[index].decode().upper(): items[index + 1]
+                for index in range(0, len(items) - 1, 2)
+            }
+
+
+def parse_fetch_response(lines: list[bytes | bytearray]) -> dict[str, Any]:
+    """
+    Разбор ответа на команду FETCH для одного письма.
+
+    Аргументы:
+        lines (list[bytes | bytearray]): Строки ответа aioimaplib без
+    строки завершения команды.
+
+    Возвращает:
+        dict[str, Any]: Элементы ответа письма.
+
+    Вызывает ошибку:
+        ValueError: Если ответ не содержит списка элементов FETCH.
+    """
+    for response in iter_fetch_responses(lines):
+        return response
+    raise ValueError(IMAP_RESPONSE_PARSE_ERROR_MESSAGE, lines)
+
+
+def parse_list_response(lines: list[bytes | bytearray]) -> list[str]:
+    """
+    Разбор ответа на команду LIST.
+
+    Каждая строка ответа имеет вид (флаги) "разделитель" имя. Папки с
+    флагами Noselect и NonExistent пропускаются: их нельзя выбрать
+    командой SELECT.
+
+    Аргументы:
+        lines (list[bytes | bytearray]): Строки ответа и литералы.
+
+    Возвращает:
+        list[str]: Имена папок в порядке ответа сервера.
+    """
+    folders = []
+    tokens = tokenize(lines)
+    for token in tokens:
+        if token != b"(" or isinstance(token, bytearray):
+            continue
+        flags = [flag.lower() for flag in parse_list(tokens)]
+        next(tokens, None)
+        name = next(tokens, None)
+        if name is None or any(
+            flag in IMAP_NOT_SELECTABLE_FLAGS for flag in flags
+        ):
+            continue
+        folders.append(bytes(name).decode())
+    return folders
+
+
+def find_text_section(
+    structure: list[Any], section: str = ""
+) -> tuple[str, str, str, str | None] | None:
+    """
+    Поиск текстовой части письма в BODYSTRUCTURE.
+
+    Предпочтение отдается первой части text/plain, иначе берется первая
+    часть text/html. Части, помеченные как вложения, пропускаются.
+
+    Аргументы:
+        structure (list[Any]): Разобранный BODYSTRUCTURE.
+        section (str): Номер раздела родительской части.
+
+    Возвращает:
+        tuple[str, str, str, str | None] | None: Номер раздела, подтип
+    (plain или html), кодирование передачи и кодировка текста, либо None,
+    если текстовой части нет.
+    """
+    candidates = list(iter_text_sections(structure, section))
+    for subtype in PREVIEW_SUBTYPES:
+        for candidate in candidates:
+            if candidate[1] == subtype:
+                return candidate
+    return None
+
+
+def iter_text_sections(
+    structure: list[Any], section: str
+) -> Iterator[tuple[str, str, str, str | None]]:
+    """
+    Перебор текстовых частей BODYSTRUCTURE в порядке следования.
+
+    Аргументы:
+        structure (list[Any]): Разобранный BODYSTRUCTURE или его часть.
+        section (str): Номер раздела этой части.
+
+    Возвращает:
+        Iterator[tuple[str, str, str, str | None]]: Номер раздела, подтип,
+    кодирование передачи и кодировка текста.
+    """
+    if structure and isinstance(structure[0], list):
+        for index, part in enumerate(structure, 1):
+            if not isinstance(part, list):
+                break
+            yield from iter_text_sections(
+                part, "%s.%d" % (section, index) if section else str(index)
+            )
+        return
+    if len(structure) < 7 or (structure[0] or b"").lower() != IMAP_TEXT:
+        return
+    disposition = structure[9] if len(structure) > 9 else None
+    if isinstance(disposition, list) and (
+        (disposition[0] or b"").lower() == IMAP_ATTACHMENT
+    ):
+        return
+    params = structure[2] or []
+    charset = None
+    for index in range(0, len(params) - 1, 2):
+        if params[index].lower() == IMAP_CHARSET:
+            charset = params[index + 1].decode()
+    yield (
+        section or "1",
+        structure[1].decode().lower(),
+        (structure[5] or IMAP_DEFAULT_ENCODING).decode().lower(),
+        charset,
+    )
@@ -0,0 +1,305 @@
+"""Модуль known_messages."""
+
+import hashlib
+import math
+from dataclasses import dataclass
+from typing import Iterator
+
+from core.constants import (
+    ATTACHMENTS,
+    DATE,
+    IS_PREVIEW,
+    MAIL_FROM,
+    RECEIVED,
+    SUBJECT,
+    TEXT,
+    EmailConfig,
+    KnownMessagesConfig,
+)
+from core.db_router import mark_written
+from django.conf import settings
+from django.db import transaction
+from mail_recipient.models import Attachment, Email
+from mail_recipient.threads import link_threads
+
+COPIED_FIELDS = (
+    SUBJECT,
+    MAIL_FROM,
+    DATE,
+    RECEIVED,
+    TEXT,
+    IS_PREVIEW,
+    EmailConfig.IN_REPLY_TO,
+    EmailConfig.REFERENCES,
+)
+
+
+class BloomFilter:
+    """
+    Фильтр Блума для строк.
+
+    Отвечает, что строка точно не добавлялась или, с вероятностью ложного
+    срабатывания error_rate, добавлялась. Позиции битов вычисляются двойным
+    хешированием по одному дайджесту BLAKE2b.
+
+    Атрибуты:
+        capacity (int): Количество строк, на которое рассчитан фильтр.
+        size (int): Количество битов.
+        hashes (int): Количество хеш-функций.
+        bits (bytearray): Битовый массив.
+    """
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        """
+        Инициализация пустого фильтра.
+
+        Аргументы:
+            capacity (int): Количество строк, на которое рассчитан фильтр.
+            error_rate (float): Доля ложных срабатываний при заполнении
+        фильтра capacity строками.
+        """
+        self.capacity = max(capacity, 1)
+        self.size = max(
+            math.ceil(
+                -self.capacity * math.log(error_rate) / math.log(2) ** 2
+            ),
+            8,
+        )
+        self.hashes = max(round(self.size / self.capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def positions(self, value: str) -> Iterator[int]:
+        """
+        Позиции битов строки.
+
+        Аргументы:
+            value (str): Строка.
+
+        Возвращает:
+            Iterator[int]: Номера битов.
+        """
+        digest = hashlib.blake2b(
+            value.encode(
+                KnownMessagesConfig.HASH_ENCODING,
+                KnownMessagesConfig.HASH_ERRORS,
+            ),
+            digest_size=KnownMessagesConfig.DIGEST_SIZE,
+        ).digest()
+        middle = KnownMessagesConfig.DIGEST_SIZE // 2
+        first = int.from_bytes(digest[:middle], "little")
+        second = int.from_bytes(digest[middle:], "little") | 1
+        for index in range(self.hashes):
+            yield (first + index * second) % self.size
+
+    def add(self, value: str) -> None:
+        """
+        Добавление строки в фильтр.
+
+        Аргументы:
+            value (str): Строка.
+        """
+        for position in self.positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value: str) -> bool:
+        """
+        Проверка, могла ли строка быть добавлена в фильтр.
+
+        Аргументы:
+            value (str): Строка.
+
+        Возвращает:
+            bool: False, если строка точно не добавлялась.
+        """
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self.positions(value)
+        )
+
+
+@dataclass
+class KnownMessages:
+    """
+    Фильтр Message-ID сохраненных писем учетной записи.
+
+    Атрибуты:
+        filter (BloomFilter): Фильтр Блума.
+        last_id (int): Наибольший идентификатор письма, загруженного в
+    фильтр из базы данных.
+        loaded (int): Количество писем, загруженных в фильтр из базы данных.
+    """
+
+    filter: BloomFilter
+    last_id: int = 0
+    loaded: int = 0
+
+
+# Фильтры учетных записей в памяти процесса.
+_known_messages: dict[int, KnownMessages] = {}
+
+
+def load_known_messages(email_account_id: int) -> KnownMessages:
+    """
+    Фильтр Message-ID сохраненных писем учетной записи.
+
+    Фильтр строится из таблицы Email при первом обращении с запасом
+    KnownMessagesConfig.GROWTH и перестраивается, когда писем становится
+    больше, чем он рассчитан. При каждом обращении в фильтр догружаются
+    письма, сохраненные после предыдущего обращения, в том числе другими
+    процессами. Удаленные письма из фильтра не убираются: положительный
+    ответ фильтра все равно проверяется по базе данных.
+
+    Аргументы:
+        email_account_id (int): Идентификатор учетной записи.
+
+    Возвращает:
+        KnownMessages: Фильтр Message-ID учетной записи.
+    """
+    known = _known_messages.get(email_account_id)
+    emails = Email.objects.filter(email_account_id=email_account_id)
+    if known is None or known.loaded > known.filter.capacity:
+        count = emails.count()
+        known = KnownMessages(
+            BloomFilter(
+                max(
+                    count * KnownMessagesConfig.GROWTH,
+                    KnownMessagesConfig.MIN_CAPACITY,
+                ),
+                settings.SYNC_KNOWN_ERROR_RATE,
+            )
+        )
+        _known_messages[email_account_id] = known
+    for email_id, message_id in (
+        emails.filter(pk__gt=known.last_id)
+        .order_by(EmailConfig.ID)
+        .values_list(EmailConfig.ID, EmailConfig.MESSAGE_ID)
+        .iterator(chunk_size=KnownMessagesConfig.CHUNK_SIZE)
+    ):
+        if message_id:
+            known.filter.add(message_id)
+        known.last_id = email_id
+        known.loaded += 1
+    return known
+
+
+def remember_message_ids(email_account_id: int, message_ids: list) -> None:
+    """
+    Добавление Message-ID только что сохраненных писем в фильтр.
+
+    Аргументы:
+        email_account_id (int): Идентификатор учетной записи.
+        message_ids (list): Message-ID сохраненных писем.
+    """
+    known = _known_messages.get(email_account_id)
+    if known is None:
+        return
+    for message_id in filter(None, message_ids):
+        known.filter.add(message_id)
+
+
+def find_sources(
+    email_account_id: int, folder: str, message_ids: set[str], preview: bool
+) -> dict[str, Email | None]:
+    """
+    Сохраненные письма, которые можно использовать вместо загрузки.
+
+    Письмо той же папки используется само, если его не нужно загружать
+    заново целиком, иначе Message-ID сопоставляется None. Для Message-ID без
+    письма в папке подходит письмо другой папки; при полной синхронизации
+    письма, сохраненные в режиме предпросмотра, не подходят.
+
+    Аргументы:
+        email_account_id (int): Идентификатор учетной записи.
+        folder (str): Папка на IMAP-сервере.
+        message_ids (set[str]): Message-ID, найденные фильтром.
+        preview (bool): Выполняется ли синхронизация в режиме предпросмотра.
+
+    Возвращает:
+        dict[str, Email | None]: Письма по Message-ID. Message-ID, которых
+    нет в базе данных, в словаре отсутствуют.
+    """
+    sources, local = {}, set()
+    for email in Email.objects.filter(
+        email_account_id=email_account_id, message_id__in=message_ids
+    ).prefetch_related(ATTACHMENTS):
+        usable = preview or not email.is_preview
+        if email.folder == folder:
+            local.add(email.message_id)
+            sources[email.message_id] = email if usable else None
+        elif (
+            usable
+            and email.message_id not in local
+            and sources.get(email.message_id) is None
+        ):
+            sources[email.message_id] = email
+        else:
+            sources.setdefault(email.message_id, None)
+    return sources
+
+
+@transaction.atomic
+def adopt_known_emails(
+    email_account_id: int,
+    folder: str,
+    candidates: dict[int, str],
+    preview: bool = False,
+) -> tuple[set[int], int]:
+    """
+    Восстановление писем папки из уже сохраненных без загрузки с сервера.
+
+    Письму той же папки, например после смены UIDVALIDITY, возвращается UID,
+    а письмо другой папки, например под другим ярлыком Gmail, копируется в
+    папку вместе с записями о вложениях, которые ссылаются на те же файлы.
+    Копии добавляются в цепочки так же, как при сохранении.
+
+    Аргументы:
+        email_account_id (int): Идентификатор учетной записи.
+        folder (str): Папка на IMAP-сервере.
+        candidates (dict[int, str]): Message-ID писем папки по UID, которые
+    фильтр считает сохраненными.
+        preview (bool): Выполняется ли синхронизация в режиме предпросмотра.
+
+    Возвращает:
+        tuple[set[int], int]: UID восстановленных писем и количество
+    Message-ID, которых нет в базе данных (ложных срабатываний фильтра).
+    """
+    message_ids = set(candidates.values())
+    sources = find_sources(email_account_id, folder, message_ids, preview)
+    missing = len(message_ids - sources.keys())
+    adopted, updated, copies = set(), [], []
+    for uid, message_id in candidates.items():
+        source = sources.pop(message_id, None)
+        if source is None:
+            continue
+        adopted.add(uid)
+        if source.folder == folder:
+            source.uid = uid
+            updated.append(source)
+            continue
+        copy = Email(
+            email_account_id=email_account_id,
+            folder=folder,
+            message_id=message_id,
+            uid=uid,
+            thread_id=source.thread_id,
+            **{name: getattr(source, name) for name in COPIED_FIELDS},
+        )
+        copies.append((copy, source))
+    Email.objects.bulk_update(updated, fields=[EmailConfig.UID])
+    Email.objects.bulk_create([copy for copy, _ in copies])
+    Attachment.objects.bulk_create(
+        [
+            Attachment(
+                email=copy,
+                file=attachment.file,
+                filename=attachment.filename,
+                url=attachment.url,
+            )
+            for copy, source in copies
+            for attachment in source.attachments.all()
+        ]
+    )
+    link_threads([copy for copy, _ in copies])
+    if adopted:
+        mark_written(email_account_id)
+    return adopted, missing
@@ -0,0 +1,477 @@
+"""Модуль mail_import."""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import mmap
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import astuple, dataclass
+from operator import attrgetter
+from typing import Callable, Iterator
+
+import django
+from core.constants import (
+    IMPORT_CHECKPOINT_IGNORED_LOGGER_MESSAGE,
+    IMPORT_PARSE_FAILED_LOGGER_MESSAGE,
+    INBOX,
+    MAIL_IMPORT,
+    ImportConfig,
+)
+from email_account.models import EmailAccount
+from mail_recipient.fetch_emails import parse_email
+from mail_recipient.records import FetchedMessage, ParsedMessage
+from mail_recipient.save_email import save_emails
+
+mail_import_logger = logging.getLogger(MAIL_IMPORT)
+
+MBOX_SEPARATOR = b"\nFrom "
+MBOX_QUOTED_FROM_PATTERN = re.compile(rb"^>(>*From )", re.MULTILINE)
+
+
+@dataclass(slots=True)
+class MessageSpan:
+    """
+    Положение письма в файле архива.
+
+    Атрибуты:
+        path (str): Путь к файлу .eml, mbox или письму Maildir.
+        start (int): Смещение начала письма в файле.
+        end (int): Смещение конца письма в файле.
+        folder (str): Папка, в которую импортируется письмо.
+        mbox (bool): Находится ли письмо в файле mbox, где строки From в
+    теле экранированы символом >.
+    """
+
+    path: str
+    start: int
+    end: int
+    folder: str
+    mbox: bool = False
+
+
+@dataclass(slots=True)
+class ImportProgress:
+    """
+    Ход импорта.
+
+    Атрибуты:
+        done (int): Количество обработанных писем, включая пропущенные по
+    контрольной точке.
+        imported (int): Количество писем, сохраненных в этом запуске.
+        failed (int): Количество писем, которые не удалось разобрать в этом
+    запуске.
+        seconds (float): Время импорта в этом запуске.
+    """
+
+    done: int = 0
+    imported: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+    @property
+    def per_minute(self) -> float:
+        """Скорость импорта в письмах в минуту."""
+        return self.imported / self.seconds * 60 if self.seconds else 0.0
+
+
+def file_span(path: str, folder: str) -> Iterator[MessageSpan]:
+    """
+    Письмо, занимающее файл целиком (.eml или письмо Maildir).
+
+    Аргументы:
+        path (str): Путь к файлу.
+        folder (str): Папка, в которую импортируется письмо.
+
+    Возвращает:
+        Iterator[MessageSpan]: Письмо или ничего для пустого файла.
+    """
+    size = os.path.getsize(path)
+    if size:
+        yield MessageSpan(path, 0, size, folder)
+
+
+def iter_mbox_spans(path: str, folder: str) -> Iterator[MessageSpan]:
+    """
+    Поиск писем в файле mbox без чтения файла в память.
+
+    Файл отображается в память, а разделители From ищутся методом find,
+    поэтому сканирование многогигабайтного архива занимает секунды.
+
+    Аргументы:
+        path (str): Путь к файлу mbox.
+        folder (str): Папка, в которую импортируются письма.
+
+    Возвращает:
+        Iterator[MessageSpan]: Письма файла по порядку.
+    """
+    with open(path, "rb") as file:
+        if not os.fstat(file.fileno()).st_size:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            separator = 0 if data[:5] == MBOX_SEPARATOR[1:] else -1
+            while separator != -1:
+                start = data.find(b"\n", separator) + 1
+                if not start:
+                    return
+                separator = data.find(MBOX_SEPARATOR, start - 1)
+                end = separator + 1 if separator != -1 else len(data)
+                yield MessageSpan(path, start, end, folder, mbox=True)
+                if separator != -1:
+                    separator += 1
+
+
+def is_maildir(path: str) -> bool:
+    """
+    Проверка, является ли каталог каталогом Maildir.
+
+    Аргументы:
+        path (str): Путь к каталогу.
+
+    Возвращает:
+        bool: True, если в каталоге есть подкаталоги cur и new.
+    """
+    return all(
+        os.path.isdir(os.path.join(path, subdir))
+        for subdir in ImportConfig.MAILDIR_SUBDIRS
+    )
+
+
+def iter_maildir_spans(path: str, folder: str) -> Iterator[MessageSpan]:
+    """
+    Письма каталога Maildir и его подпапок в формате Maildir++.
+
+    Подпапка .Sent импортируется в папку Sent, а .Archive.2023 — в папку
+    Archive/2023.
+
+    Аргументы:
+        path (str): Путь к каталогу Maildir.
+        folder (str): Папка для писем корневого каталога.
+
+    Возвращает:
+        Iterator[MessageSpan]: Письма в порядке имен файлов.
+    """
+    for subdir in ImportConfig.MAILDIR_SUBDIRS:
+        directory = os.path.join(path, subdir)
+        for name in sorted(os.listdir(directory)):
+            yield from file_span(os.path.join(directory, name), folder)
+    for name in sorted(os.listdir(path)):
+        subfolder = os.path.join(path, name)
+        if name.startswith(ImportConfig.MAILDIR_SUBFOLDER_PREFIX) and (
+            is_maildir(subfolder)
+        ):
+            yield from iter_maildir_spans(
+                subfolder, name[1:].replace(".", "/")
+            )
+
+
+def iter_spans(
+    source: str, folder: str | None = None
+) -> Iterator[MessageSpan]:
+    """
+    Письма архива в детерминированном порядке.
+
+    Источником может быть файл .eml, файл mbox, каталог Maildir или
+    каталог, содержащий их в любой вложенности. Письма файла mbox
+    импортируются в папку с именем файла без расширения, письма Maildir —
+    в INBOX и папки Maildir++, файлы .eml — в INBOX.
+
+    Аргументы:
+        source (str): Путь к архиву.
+        folder (str | None): Папка для всех писем архива вместо папок по
+    умолчанию.
+
+    Возвращает:
+        Iterator[MessageSpan]: Письма архива.
+    """
+    if os.path.isdir(source):
+        if is_maildir(source):
+            spans = iter_maildir_spans(source, INBOX)
+        else:
+            spans = itertools.chain.from_iterable(
+                iter_spans(os.path.join(source, name))
+                for name in sorted(os.listdir(source))
+            )
+    elif source.endswith(ImportConfig.EML_EXTENSION):
+        spans = file_span(source, INBOX)
+    else:
+        spans = iter_mbox_spans(
+            source, os.path.splitext(os.path.basename(source))[0]
+        )
+    for span in spans:
+        if folder:
+            span.folder = folder
+        yield span
+
+
+def parse_span(data: mmap.mmap, span: MessageSpan) -> ParsedMessage:
+    """
+    Разбор одного письма тем же кодом, что и при синхронизации.
+
+    Письмо передается в parse_email как представление отображенного в
+    память файла без копирования. Копия создается только для писем mbox,
+    в которых нужно снять экранирование строк From. Письму без Message-ID
+    присваивается идентификатор из хеша его содержимого, чтобы повторный
+    импорт не создавал дубликатов.
+
+    Аргументы:
+        data (mmap.mmap): Отображенный в память файл.
+        span (MessageSpan): Положение письма в файле.
+
+    Возвращает:
+        ParsedMessage: Разобранное письмо.
+    """
+    start, end = span.start, span.end
+    if span.mbox and data.find(b"\n>", start, end) != -1:
+        raw = memoryview(MBOX_QUOTED_FROM_PATTERN.sub(rb"\1", data[start:end]))
+    else:
+        raw = memoryview(data)[start:end]
+    try:
+        parsed = parse_email(FetchedMessage(None, raw, span.folder))
+        if not parsed.message_id:
+            parsed.message_id = ImportConfig.MESSAGE_ID.format(
+                digest=hashlib.sha1(raw).hexdigest()
+            )
+    finally:
+        raw.release()
+    return parsed
+
+
+def parse_spans(
+    spans: list[MessageSpan],
+) -> tuple[list[ParsedMessage], list[MessageSpan]]:
+    """
+    Разбор пакета писем в процессе пула.
+
+    Аргументы:
+        spans (list[MessageSpan]): Письма пакета.
+
+    Возвращает:
+        tuple[list[ParsedMessage], list[MessageSpan]]: Разобранные письма и
+    письма, которые не удалось разобрать.
+    """
+    parsed_messages = []
+    failed = []
+    for path, group in itertools.groupby(spans, key=attrgetter("path")):
+        with open(path, "rb") as file, mmap.mmap(
+            file.fileno(), 0, access=mmap.ACCESS_READ
+        ) as data:
+            for span in group:
+                try:
+                    parsed_messages.append(parse_span(data, span))
+                except Exception as e:
+                    failed.append(span)
+                    mail_import_logger.warning(
+                        IMPORT_PARSE_FAILED_LOGGER_MESSAGE, path, span.start, e
+                    )
+    return parsed_messages, failed
+
+
+class MailImporter:
+    """
+    Импорт архива писем в учетную запись.
+
+    Письма разбираются пакетами в пуле процессов и сохраняются функцией
+    save_emails в порядке пакетов, пока следующие пакеты уже разбираются.
+    После каждого сохраненного пакета в файл контрольной точки
+    записывается количество обработанных писем, и прерванный импорт
+    продолжается с первого несохраненного пакета. Письма, которые не
+    удалось разобрать, записываются в контрольную точку отдельно и
+    разбираются заново при следующем запуске. Повторное сохранение письма
+    обновляет его, а не создает дубликат.
+
+    Атрибуты:
+        email_account (EmailAccount): Учетная запись электронной почты.
+        source (str): Абсолютный путь к архиву.
+        folder (str | None): Папка для всех писем архива.
+        workers (int): Количество процессов разбора.
+        batch_size (int): Количество писем в пакете.
+        checkpoint (str): Путь к файлу контрольной точки.
+        progress (ImportProgress): Ход импорта.
+        retry (list[MessageSpan]): Письма из контрольной точки, которые не
+    удалось разобрать в прошлых запусках и которые еще не разобраны
+    заново.
+        failed (list[MessageSpan]): Письма, которые не удалось разобрать в
+    этом запуске.
+        on_progress (Callable | None): Функция, вызываемая после каждого
+    сохраненного пакета.
+        started (float): Время начала импорта по time.perf_counter.
+    """
+
+    def __init__(
+        self,
+        email_account: EmailAccount,
+        source: str,
+        folder: str | None = None,
+        workers: int | None = None,
+        batch_size: int = ImportConfig.BATCH_SIZE,
+        checkpoint: str | None = None,
+    ) -> None:
+        """
+        Инициализация импорта.
+
+        Аргументы:
+            email_account (EmailAccount): Учетная запись электронной почты.
+            source (str): Путь к архиву.
+            folder (str | None): Папка для всех писем архива.
+            workers (int | None): Количество процессов разбора, по умолчанию
+        количество процессоров.
+            batch_size (int): Количество писем в пакете.
+            checkpoint (str | None): Путь к файлу контрольной точки, по
+        умолчанию рядом с архивом.
+        """
+        self.email_account = email_account
+        self.source = os.path.abspath(source)
+        self.folder = folder
+        self.workers = max(workers or os.cpu_count() or 1, 1)
+        self.batch_size = max(batch_size, 1)
+        self.checkpoint = checkpoint or (
+            self.source.rstrip(os.sep) + ImportConfig.CHECKPOINT_SUFFIX
+        )
+        self.progress = ImportProgress()
+        self.retry = []
+        self.failed = []
+        self.on_progress = None
+        self.started = 0.0
+
+    def load_checkpoint(self) -> int:
+        """
+        Чтение количества обработанных писем из контрольной точки.
+
+        Письма, которые не удалось разобрать, сохраняются в retry.
+        Контрольная точка другого архива, учетной записи или папки
+        игнорируется.
+
+        Возвращает:
+            int: Количество писем, которые нужно пропустить.
+        """
+        try:
+            with open(self.checkpoint) as file:
+                checkpoint = json.load(file)
+        except (OSError, ValueError):
+            return 0
+        if checkpoint.get(ImportConfig.KEY) != self.checkpoint_key():
+            mail_import_logger.warning(
+                IMPORT_CHECKPOINT_IGNORED_LOGGER_MESSAGE, self.checkpoint
+            )
+            return 0
+        self.retry = [
+            MessageSpan(*values)
+            for values in checkpoint.get(ImportConfig.FAILED, [])
+        ]
+        return int(checkpoint.get(ImportConfig.DONE, 0))
+
+    def save_checkpoint(self) -> None:
+        """Атомарная запись количества обработанных и неразобранных писем."""
+        temporary = self.checkpoint + ImportConfig.TEMPORARY_SUFFIX
+        with open(temporary, "w") as file:
+            json.dump(
+                {
+                    ImportConfig.KEY: self.checkpoint_key(),
+                    ImportConfig.DONE: self.progress.done,
+                    ImportConfig.FAILED: [
+                        astuple(span) for span in self.retry + self.failed
+                    ],
+                },
+                file,
+            )
+        os.replace(temporary, self.checkpoint)
+
+    def checkpoint_key(self) -> list[str | None]:
+        """Архив, учетная запись и папка, к которым относится импорт."""
+        return [self.source, self.email_account.email, self.folder]
+
+    def iter_batches(
+        self, skip: int, retry: list[MessageSpan]
+    ) -> Iterator[tuple[list[MessageSpan], bool]]:
+        """
+        Пакеты писем для повторного разбора и писем после контрольной точки.
+
+        Аргументы:
+            skip (int): Количество уже обработанных писем.
+            retry (list[MessageSpan]): Письма для повторного разбора.
+
+        Возвращает:
+            Iterator[tuple[list[MessageSpan], bool]]: Пакеты не больше
+        batch_size писем и признак повторного разбора.
+        """
+        retry_spans = iter(retry)
+        while batch := list(itertools.islice(retry_spans, self.batch_size)):
+            yield batch, True
+        spans = itertools.islice(
+            iter_spans(self.source, self.folder), skip, None
+        )
+        while batch := list(itertools.islice(spans, self.batch_size)):
+            yield batch, False
+
+    async def save_batch(
+        self, size: int, retry: bool, parsing: asyncio.Future
+    ) -> None:
+        """
+        Сохранение разобранного пакета и запись контрольной точки.
+
+        Аргументы:
+            size (int): Количество писем пакета.
+            retry (bool): Разбираются ли письма пакета повторно. Такие
+        письма уже учтены в количестве обработанных.
+            parsing (asyncio.Future): Результат parse_spans для пакета.
+        """
+        parsed_messages, failed = await parsing
+        await save_emails(parsed_messages, self.email_account)
+        if retry:
+            del self.retry[:size]
+        else:
+            self.progress.done += size
+        self.progress.imported += len(parsed_messages)
+        self.progress.failed += len(failed)
+        self.failed.extend(failed)
+        await asyncio.to_thread(self.save_checkpoint)
+        self.progress.seconds = time.perf_counter() - self.started
+        if self.on_progress:
+            self.on_progress(self.progress)
+
+    async def run(
+        self, on_progress: Callable[[ImportProgress], None] | None = None
+    ) -> ImportProgress:
+        """
+        Выполнение импорта.
+
+        В работе одновременно не больше двух пакетов на процесс, поэтому
+        память не зависит от размера архива.
+
+        Аргументы:
+            on_progress (Callable[[ImportProgress], None] | None): Функция,
+        вызываемая после каждого сохраненного пакета.
+
+        Возвращает:
+            ImportProgress: Итог импорта.
+        """
+        self.progress.done = self.load_checkpoint()
+        self.on_progress = on_progress
+        self.started = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        pending = deque()
+        with ProcessPoolExecutor(
+            max_workers=self.workers, initializer=django.setup
+        ) as executor:
+            for batch, retry in self.iter_batches(
+                self.progress.done, list(self.retry)
+            ):
+                pending.append(
+                    (
+                        len(batch),
+                        retry,
+                        loop.run_in_executor(executor, parse_spans, batch),
+                    )
+                )
+                if len(pending) < self.workers * 2:
+                    continue
+                await self.save_batch(*pending.popleft())
+            while pending:
+                await self.save_batch(*pending.popleft())
+        return self.progress
@@ -0,0 +1,81 @@
+"""Команда импорта архивов писем."""
+
+import asyncio
+import os
+
+from core.constants import (
+    IMPORT_ACCOUNT_NOT_FOUND_ERROR_MESSAGE,
+    IMPORT_MAIL_HELP,
+    IMPORT_PROGRESS_MESSAGE,
+    IMPORT_SOURCE_NOT_FOUND_ERROR_MESSAGE,
+    ImportConfig,
+)
+from django.core.management.base import BaseCommand, CommandError
+from email_account.models import EmailAccount
+from mail_recipient.mail_import import ImportProgress, MailImporter
+
+
+class Command(BaseCommand):
+    """
+    Импорт писем из файлов .eml, mbox и каталогов Maildir.
+
+    Файлы читаются через mmap, письма разбираются в пуле процессов тем же
+    кодом, что и при синхронизации, и сохраняются пакетами. После каждого
+    пакета обновляется контрольная точка, и повторный запуск продолжает
+    импорт с места остановки.
+    """
+
+    help = IMPORT_MAIL_HELP
+
+    def add_arguments(self, parser) -> None:
+        """Добавление параметров импорта."""
+        parser.add_argument("email")
+        parser.add_argument("source")
+        parser.add_argument("--folder")
+        parser.add_argument("--workers", type=int)
+        parser.add_argument(
+            "--batch-size", type=int, default=ImportConfig.BATCH_SIZE
+        )
+        parser.add_argument("--checkpoint")
+
+    def report(self, progress: ImportProgress) -> None:
+        """Вывод хода импорта."""
+        self.stdout.write(
+            IMPORT_PROGRESS_MESSAGE.format(
+                done=progress.done,
+                imported=progress.imported,
+                failed=progress.failed,
+                per_minute=progress.per_minute,
+            )
+        )
+
+    async def import_mail(self, options: dict) -> None:
+        """Поиск учетной записи и запуск импорта."""
+        email_account = await EmailAccount.objects.filter(
+            email=options["email"]
+        ).afirst()
+        if email_account is None:
+            raise CommandError(
+                IMPORT_ACCOUNT_NOT_FOUND_ERROR_MESSAGE.format(
+                    email=options["email"]
+                )
+            )
+        importer = MailImporter(
+            email_account,
+            options["source"],
+            folder=options["folder"],
+            workers=options["workers"],
+            batch_size=options["batch_size"],
+            checkpoint=options["checkpoint"],
+        )
+        self.report(await importer.run(on_progress=self.report))
+
+    def handle(self, *args, **options) -> None:
+        """Запуск импорта."""
+        if not os.path.exists(options["source"]):
+            raise CommandError(
+                IMPORT_SOURCE_NOT_FOUND_ERROR_MESSAGE.format(
+                    source=options["source"]
+                )
+            )
+        asyncio.run(self.import_mail(options))
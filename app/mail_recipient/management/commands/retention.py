@@ -0,0 +1,94 @@
+"""Команда удаления устаревших писем и файлов вложений."""
+
+import asyncio
+import time
+
+from core.constants import (
+    RETENTION_ACCOUNT_NOT_FOUND_ERROR_MESSAGE,
+    RETENTION_HELP,
+    RETENTION_REPORT_MESSAGE,
+)
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from email_account.models import EmailAccount
+from mail_recipient.retention import (
+    RetentionReport,
+    delete_duplicate_attachments,
+    prune_account,
+    sweep_orphan_files,
+)
+
+
+class Command(BaseCommand):
+    """
+    Удаление данных, которых больше нет на IMAP-сервере.
+
+    Письма сравниваются со списком UID папок на сервере, и удаленные там
+    письма удаляются из базы данных пакетами. Затем удаляются повторяющиеся
+    записи о вложениях и файлы вложений, на которые не осталось записей.
+    С --interval команда повторяется с заданным периодом и может работать
+    отдельным процессом.
+    """
+
+    help = RETENTION_HELP
+
+    def add_arguments(self, parser) -> None:
+        """Добавление параметров удаления."""
+        parser.add_argument("emails", nargs="*")
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.RETENTION_BATCH_SIZE
+        )
+        parser.add_argument(
+            "--grace", type=int, default=settings.RETENTION_ORPHAN_GRACE
+        )
+        parser.add_argument(
+            "--interval", type=int, default=settings.RETENTION_INTERVAL
+        )
+        parser.add_argument("--skip-server", action="store_true")
+
+    async def prune(
+        self, emails: list[str], batch_size: int, report: RetentionReport
+    ) -> None:
+        """Удаление писем, удаленных на сервере, по учетным записям."""
+        accounts = EmailAccount.objects.order_by(EmailAccount._meta.pk.name)
+        if emails:
+            accounts = accounts.filter(email__in=emails)
+            found = {account.email async for account in accounts}
+            missing = [email for email in emails if email not in found]
+            if missing:
+                raise CommandError(
+                    RETENTION_ACCOUNT_NOT_FOUND_ERROR_MESSAGE.format(
+                        email=", ".join(missing)
+                    )
+                )
+        async for email_account in accounts:
+            await prune_account(email_account, batch_size, report)
+
+    def run_once(self, options: dict) -> None:
+        """Однократное удаление устаревших данных и вывод итогов."""
+        report = RetentionReport()
+        if not options["skip_server"]:
+            asyncio.run(
+                self.prune(options["emails"], options["batch_size"], report)
+            )
+        report.attachments += delete_duplicate_attachments(
+            options["batch_size"]
+        )
+        sweep_orphan_files(options["batch_size"], options["grace"], report)
+        self.stdout.write(
+            RETENTION_REPORT_MESSAGE.format(
+                emails=report.emails,
+                attachments=report.attachments,
+                files=report.files,
+                bytes=report.bytes,
+                skipped=report.skipped,
+            )
+        )
+
+    def handle(self, *args, **options) -> None:
+        """Запуск удаления однократно или с периодом --interval."""
+        while True:
+            self.run_once(options)
+            if options["interval"] <= 0:
+                return
+            time.sleep(options["interval"])
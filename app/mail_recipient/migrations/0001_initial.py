@@ -0,0 +1,101 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="Email",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("message_id", models.CharField(max_length=255, unique=True)),
+                (
+                    "subject",
+                    models.CharField(
+                        max_length=255, verbose_name="Тема сообщения"
+                    ),
+                ),
+                (
+                    "mail_from",
+                    models.CharField(
+                        blank=True,
+                        max_length=255,
+                        null=True,
+                        verbose_name="Отправитель",
+                    ),
+                ),
+                (
+                    "date",
+                    models.DateTimeField(
+                        blank=True,
+                        null=True,
+                        verbose_name="Дата получения письма",
+                    ),
+                ),
+                (
+                    "received",
+                    models.DateTimeField(
+                        blank=True,
+                        null=True,
+                        verbose_name="Дата отправки письма",
+                    ),
+                ),
+                (
+                    "text",
+                    models.TextField(
+                        blank=True,
+                        max_length=100,
+                        null=True,
+                        verbose_name="Описание или текст письма",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Attachment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "file",
+                    models.FileField(
+                        max_length=150,
+                        upload_to="attachments",
+                        verbose_name="Вложение",
+                    ),
+                ),
+                ("filename", models.CharField(max_length=255)),
+                ("url", models.URLField()),
+                (
+                    "email",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attachments",
+                        to="mail_recipient.email",
+                    ),
+                ),
+            ],
+        ),
+    ]
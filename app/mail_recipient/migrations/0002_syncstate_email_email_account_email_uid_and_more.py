@@ -0,0 +1,78 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("email_account", "0001_initial"),
+        ("mail_recipient", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SyncState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "uidvalidity",
+                    models.PositiveBigIntegerField(blank=True, null=True),
+                ),
+                ("last_uid", models.PositiveIntegerField(default=0)),
+                ("pending_uids", models.JSONField(blank=True, default=list)),
+                (
+                    "updated_at",
+                    models.DateTimeField(
+                        auto_now=True,
+                        verbose_name="Дата обновления контрольной точки",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="email",
+            name="email_account",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="emails",
+                to="email_account.emailaccount",
+                verbose_name="Учетная запись электронной почты",
+            ),
+        ),
+        migrations.AddField(
+            model_name="email",
+            name="uid",
+            field=models.PositiveIntegerField(
+                blank=True,
+                null=True,
+                verbose_name="UID письма на IMAP-сервере",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="email",
+            index=models.Index(
+                fields=["email_account", "uid"], name="email_account_uid_idx"
+            ),
+        ),
+        migrations.AddField(
+            model_name="syncstate",
+            name="email_account",
+            field=models.OneToOneField(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="sync_state",
+                to="email_account.emailaccount",
+            ),
+        ),
+    ]
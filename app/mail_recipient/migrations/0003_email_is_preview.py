@@ -0,0 +1,24 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "mail_recipient",
+            "0002_syncstate_email_email_account_email_uid_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="email",
+            name="is_preview",
+            field=models.BooleanField(
+                default=False,
+                verbose_name="Сохранено только начало текста письма",
+            ),
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("email_account", "0001_initial"),
+        ("mail_recipient", "0003_email_is_preview"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="email",
+            name="email_account_uid_idx",
+        ),
+        migrations.AddField(
+            model_name="email",
+            name="folder",
+            field=models.CharField(
+                default="INBOX",
+                max_length=255,
+                verbose_name="Папка на IMAP-сервере",
+            ),
+        ),
+        migrations.AddField(
+            model_name="syncstate",
+            name="folder",
+            field=models.CharField(
+                default="INBOX",
+                max_length=255,
+                verbose_name="Папка на IMAP-сервере",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="email",
+            name="message_id",
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name="syncstate",
+            name="email_account",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="sync_states",
+                to="email_account.emailaccount",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="email",
+            index=models.Index(
+                fields=["email_account", "folder", "uid"],
+                name="email_account_folder_uid_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="email",
+            constraint=models.UniqueConstraint(
+                fields=("email_account", "folder", "message_id"),
+                name="unique_account_folder_message",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="syncstate",
+            constraint=models.UniqueConstraint(
+                fields=("email_account", "folder"),
+                name="unique_sync_state_account_folder",
+            ),
+        ),
+    ]
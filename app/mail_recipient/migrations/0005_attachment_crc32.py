@@ -0,0 +1,25 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "mail_recipient",
+            "0004_remove_email_email_account_uid_idx_email_folder_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="attachment",
+            name="crc32",
+            field=models.PositiveBigIntegerField(
+                blank=True,
+                null=True,
+                verbose_name="Контрольная сумма CRC-32 файла",
+            ),
+        ),
+    ]
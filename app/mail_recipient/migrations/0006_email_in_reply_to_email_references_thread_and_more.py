@@ -0,0 +1,160 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("email_account", "0001_initial"),
+        ("mail_recipient", "0005_attachment_crc32"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="email",
+            name="in_reply_to",
+            field=models.CharField(
+                blank=True,
+                max_length=255,
+                null=True,
+                verbose_name="Ответ на сообщение",
+            ),
+        ),
+        migrations.AddField(
+            model_name="email",
+            name="references",
+            field=models.TextField(
+                blank=True,
+                null=True,
+                verbose_name="Предыдущие сообщения цепочки",
+            ),
+        ),
+        migrations.CreateModel(
+            name="Thread",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "subject",
+                    models.CharField(
+                        blank=True,
+                        max_length=255,
+                        verbose_name="Тема цепочки без префиксов Re и Fwd",
+                    ),
+                ),
+                (
+                    "message_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Количество писем"
+                    ),
+                ),
+                (
+                    "latest_date",
+                    models.DateTimeField(
+                        blank=True,
+                        null=True,
+                        verbose_name="Дата последнего письма",
+                    ),
+                ),
+                (
+                    "email_account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="threads",
+                        to="email_account.emailaccount",
+                    ),
+                ),
+                (
+                    "latest_email",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="mail_recipient.email",
+                        verbose_name="Последнее письмо",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="email",
+            name="thread",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="emails",
+                to="mail_recipient.thread",
+                verbose_name="Цепочка писем",
+            ),
+        ),
+        migrations.CreateModel(
+            name="ThreadReference",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("message_id", models.CharField(max_length=255)),
+                (
+                    "seen",
+                    models.BooleanField(
+                        default=False,
+                        verbose_name="Письмо с этим Message-ID сохранено",
+                    ),
+                ),
+                (
+                    "email_account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="thread_references",
+                        to="email_account.emailaccount",
+                    ),
+                ),
+                (
+                    "thread",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="thread_references",
+                        to="mail_recipient.thread",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="thread",
+            index=models.Index(
+                fields=["email_account", "-latest_date", "-id"],
+                name="thread_account_latest_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="thread",
+            index=models.Index(
+                fields=["email_account", "subject"],
+                name="thread_account_subject_idx",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="threadreference",
+            constraint=models.UniqueConstraint(
+                fields=("email_account", "message_id"),
+                name="unique_thread_reference_message",
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-19 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("email_account", "0001_initial"),
+        (
+            "mail_recipient",
+            "0006_email_in_reply_to_email_references_thread_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="email",
+            name="synced_at",
+            field=models.DateTimeField(
+                auto_now=True, verbose_name="Дата последнего сохранения письма"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="email",
+            index=models.Index(
+                fields=["email_account", "synced_at", "id"],
+                name="email_account_synced_at_idx",
+            ),
+        ),
+    ]
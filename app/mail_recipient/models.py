@@ -1,7 +1,19 @@
 """Модель Email."""
 
-from core.constants import ATTACHMENTS, AttachmentConfig, EmailConfig
+from core.constants import (
+    ATTACHMENTS,
+    EMAILS,
+    INBOX,
+    SYNC_STATES,
+    THREAD_REFERENCES,
+    THREADS,
+    AttachmentConfig,
+    EmailConfig,
+    SyncStateConfig,
+    ThreadConfig,
+)
 from django.db import models
+from email_account.models import EmailAccount
 
 # from mail_recipient.custom_storage import CustomStorage
 
@@ -11,17 +23,46 @@ class Email(models.Model):
     Модель для хранения текстовой информации о полученных электронных письмах.
 
     Атрибуты:
-        message_id (CharField): Уникальный идентификатор сообщения.
+        email_account (ForeignKey): Учетная запись, с которой получено письмо.
+        folder (CharField): Папка на IMAP-сервере, в которой найдено письмо.
+        uid (PositiveIntegerField): UID письма в папке на IMAP-сервере.
+        message_id (CharField): Идентификатор сообщения, уникальный в
+    пределах папки учетной записи.
         subject (CharField): Тема письма.
         mail_from (CharField): Отправитель письма.
         date (DateTimeField): Дата отправки письма.
         received (DateTimeField): Дата получения письма.
         text (TextField): Текст письма.
+        is_preview (BooleanField): Письмо получено в режиме предпросмотра:
+    сохранено только начало текста, без вложений.
+        in_reply_to (CharField): Message-ID письма, на которое отвечает
+    это письмо.
+        references (TextField): Message-ID предыдущих писем цепочки из
+    заголовка References через пробел.
+        thread (ForeignKey): Цепочка, в которую входит письмо.
+        synced_at (DateTimeField): Дата последнего сохранения письма. По ней
+    письма, не доставленные медленному клиенту, догружаются из базы данных.
     """
 
-    message_id = models.CharField(
-        max_length=EmailConfig.MESSAGE_ID_MAX_LENGTH, unique=True
+    email_account = models.ForeignKey(
+        EmailAccount,
+        related_name=EMAILS,
+        on_delete=models.CASCADE,
+        verbose_name=EmailConfig.EMAIL_ACCOUNT_VERBOSE_NAME,
+        null=True,
+        blank=True,
+    )
+    folder = models.CharField(
+        max_length=EmailConfig.FOLDER_MAX_LENGTH,
+        default=INBOX,
+        verbose_name=EmailConfig.FOLDER_VERBOSE_NAME,
+    )
+    uid = models.PositiveIntegerField(
+        verbose_name=EmailConfig.UID_VERBOSE_NAME,
+        null=True,
+        blank=True,
     )
+    message_id = models.CharField(max_length=EmailConfig.MESSAGE_ID_MAX_LENGTH)
     subject = models.CharField(
         max_length=EmailConfig.SUBJECT_MAX_LENGTH,
         verbose_name=EmailConfig.SUBJECT_VERBOSE_NAME,
@@ -48,6 +89,72 @@ class Email(models.Model):
         null=True,
         blank=True,
     )
+    is_preview = models.BooleanField(
+        default=False, verbose_name=EmailConfig.IS_PREVIEW_VERBOSE_NAME
+    )
+    in_reply_to = models.CharField(
+        max_length=EmailConfig.MESSAGE_ID_MAX_LENGTH,
+        verbose_name=EmailConfig.IN_REPLY_TO_VERBOSE_NAME,
+        null=True,
+        blank=True,
+    )
+    references = models.TextField(
+        verbose_name=EmailConfig.REFERENCES_VERBOSE_NAME,
+        null=True,
+        blank=True,
+    )
+    thread = models.ForeignKey(
+        "Thread",
+        related_name=EMAILS,
+        on_delete=models.SET_NULL,
+        verbose_name=EmailConfig.THREAD_VERBOSE_NAME,
+        null=True,
+        blank=True,
+    )
+    synced_at = models.DateTimeField(
+        auto_now=True, verbose_name=EmailConfig.SYNCED_AT_VERBOSE_NAME
+    )
+
+    class Meta:
+        """
+        Уникальность писем и индексы для выборки писем.
+
+        Письма папки выбираются в порядке UID, а письма учетной записи — в
+        порядке сохранения.
+
+        Одно и то же сообщение может лежать в нескольких папках (например,
+        под несколькими ярлыками Gmail), поэтому Message-ID уникален только в
+        пределах папки учетной записи.
+        """
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=(
+                    EmailConfig.EMAIL_ACCOUNT,
+                    EmailConfig.FOLDER,
+                    EmailConfig.MESSAGE_ID,
+                ),
+                name=EmailConfig.ACCOUNT_FOLDER_MESSAGE_ID_UNIQUE_NAME,
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=(
+                    EmailConfig.EMAIL_ACCOUNT,
+                    EmailConfig.FOLDER,
+                    EmailConfig.UID,
+                ),
+                name=EmailConfig.ACCOUNT_FOLDER_UID_INDEX_NAME,
+            ),
+            models.Index(
+                fields=(
+                    EmailConfig.EMAIL_ACCOUNT,
+                    EmailConfig.SYNCED_AT,
+                    EmailConfig.ID,
+                ),
+                name=EmailConfig.ACCOUNT_SYNCED_AT_INDEX_NAME,
+            ),
+        ]
 
     def __str__(self):
         """
@@ -69,6 +176,8 @@ class Attachment(models.Model):
         file (FileField): Поле для хранения файла вложения.
         filename (CharField): Имя файла вложения.
         url (URLField): URL-адрес для доступа к файлу вложения.
+        crc32 (PositiveBigIntegerField): Контрольная сумма файла, вычисленная
+    при первой выгрузке архива вложений.
     """
 
     email = models.ForeignKey(
@@ -83,6 +192,9 @@ class Attachment(models.Model):
         max_length=AttachmentConfig.ATTACHMENT_FILENAME_MAX_LENGTH
     )
     url = models.URLField()
+    crc32 = models.PositiveBigIntegerField(
+        null=True, blank=True, verbose_name=AttachmentConfig.CRC32_VERBOSE_NAME
+    )
 
     def __str__(self):
         """
@@ -92,3 +204,181 @@ class Attachment(models.Model):
             str: Имя файла вложения, обрезанное до максимальной длины.
         """
         return self.filename[: AttachmentConfig.ATTACHMENT_FILENAME_MAX_LENGTH]
+
+
+class Thread(models.Model):
+    """
+    Модель для хранения цепочки писем учетной записи.
+
+    Цепочка обновляется при сохранении каждого письма, поэтому список
+    цепочек с количеством писем и последним письмом выбирается одним
+    запросом по индексу, без группировки писем.
+
+    Атрибуты:
+        email_account (ForeignKey): Учетная запись электронной почты.
+        subject (CharField): Тема цепочки без префиксов Re и Fwd в нижнем
+    регистре для объединения писем без заголовков References.
+        message_count (PositiveIntegerField): Количество разных писем
+    цепочки. Письмо, лежащее в нескольких папках, учитывается один раз.
+        latest_date (DateTimeField): Дата отправки последнего письма.
+        latest_email (ForeignKey): Последнее письмо цепочки.
+    """
+
+    email_account = models.ForeignKey(
+        EmailAccount, related_name=THREADS, on_delete=models.CASCADE
+    )
+    subject = models.CharField(
+        max_length=EmailConfig.SUBJECT_MAX_LENGTH,
+        verbose_name=ThreadConfig.SUBJECT_VERBOSE_NAME,
+        blank=True,
+    )
+    message_count = models.PositiveIntegerField(
+        default=0, verbose_name=ThreadConfig.MESSAGE_COUNT_VERBOSE_NAME
+    )
+    latest_date = models.DateTimeField(
+        verbose_name=ThreadConfig.LATEST_DATE_VERBOSE_NAME,
+        null=True,
+        blank=True,
+    )
+    latest_email = models.ForeignKey(
+        Email,
+        related_name="+",
+        on_delete=models.SET_NULL,
+        verbose_name=ThreadConfig.LATEST_EMAIL_VERBOSE_NAME,
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        """Индексы для списка цепочек и поиска цепочки по теме."""
+
+        indexes = [
+            models.Index(
+                fields=(
+                    EmailConfig.EMAIL_ACCOUNT,
+                    ThreadConfig.LATEST_DATE_DESCENDING,
+                    ThreadConfig.ID_DESCENDING,
+                ),
+                name=ThreadConfig.ACCOUNT_LATEST_INDEX_NAME,
+            ),
+            models.Index(
+                fields=(EmailConfig.EMAIL_ACCOUNT, ThreadConfig.SUBJECT),
+                name=ThreadConfig.ACCOUNT_SUBJECT_INDEX_NAME,
+            ),
+        ]
+
+    def __str__(self):
+        """
+        Возвращает строковое представление объекта Thread.
+
+        Возвращает:
+            str: Тема цепочки и количество писем.
+        """
+        return ThreadConfig.STR_FORMAT.format(
+            subject=self.subject, count=self.message_count
+        )
+
+
+class ThreadReference(models.Model):
+    """
+    Модель для хранения принадлежности Message-ID цепочке писем.
+
+    Запись создается для Message-ID каждого сохраненного письма и для
+    каждого Message-ID из его заголовков In-Reply-To и References, в том
+    числе для писем, которых еще нет в базе данных. Письмо, ссылающееся на
+    Message-ID из разных цепочек, объединяет их в одну.
+
+    Атрибуты:
+        email_account (ForeignKey): Учетная запись электронной почты.
+        message_id (CharField): Идентификатор сообщения.
+        thread (ForeignKey): Цепочка писем.
+        seen (BooleanField): Сохранено ли письмо с этим Message-ID.
+    """
+
+    email_account = models.ForeignKey(
+        EmailAccount, related_name=THREAD_REFERENCES, on_delete=models.CASCADE
+    )
+    message_id = models.CharField(max_length=EmailConfig.MESSAGE_ID_MAX_LENGTH)
+    thread = models.ForeignKey(
+        Thread, related_name=THREAD_REFERENCES, on_delete=models.CASCADE
+    )
+    seen = models.BooleanField(
+        default=False, verbose_name=ThreadConfig.SEEN_VERBOSE_NAME
+    )
+
+    class Meta:
+        """Один Message-ID принадлежит одной цепочке учетной записи."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=(EmailConfig.EMAIL_ACCOUNT, ThreadConfig.MESSAGE_ID),
+                name=ThreadConfig.ACCOUNT_MESSAGE_ID_UNIQUE_NAME,
+            )
+        ]
+
+    def __str__(self):
+        """
+        Возвращает строковое представление объекта ThreadReference.
+
+        Возвращает:
+            str: Идентификатор сообщения.
+        """
+        return self.message_id
+
+
+class SyncState(models.Model):
+    """
+    Модель для хранения контрольной точки синхронизации папки учетной записи.
+
+    Письма сохраняются по одному, поэтому прерванная синхронизация
+    продолжается с неполученных писем из pending_uids и новых писем с UID
+    больше last_uid, а уже сохраненные письма отдаются из базы данных.
+
+    Атрибуты:
+        email_account (ForeignKey): Учетная запись электронной почты.
+        folder (CharField): Папка на IMAP-сервере.
+        uidvalidity (PositiveBigIntegerField): UIDVALIDITY папки на момент
+    синхронизации. При его изменении контрольная точка сбрасывается.
+        last_uid (PositiveIntegerField): Наибольший UID, поставленный в
+    очередь синхронизации.
+        pending_uids (JSONField): UID писем текущей очереди синхронизации.
+        updated_at (DateTimeField): Дата последнего обновления.
+    """
+
+    email_account = models.ForeignKey(
+        EmailAccount, related_name=SYNC_STATES, on_delete=models.CASCADE
+    )
+    folder = models.CharField(
+        max_length=EmailConfig.FOLDER_MAX_LENGTH,
+        default=INBOX,
+        verbose_name=EmailConfig.FOLDER_VERBOSE_NAME,
+    )
+    uidvalidity = models.PositiveBigIntegerField(null=True, blank=True)
+    last_uid = models.PositiveIntegerField(default=0)
+    pending_uids = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(
+        auto_now=True, verbose_name=SyncStateConfig.UPDATED_AT_VERBOSE_NAME
+    )
+
+    class Meta:
+        """Одна контрольная точка на папку учетной записи."""
+
+        constraints = [
+            models.UniqueConstraint(
+                fields=(EmailConfig.EMAIL_ACCOUNT, EmailConfig.FOLDER),
+                name=SyncStateConfig.ACCOUNT_FOLDER_UNIQUE_NAME,
+            )
+        ]
+
+    def __str__(self):
+        """
+        Возвращает строковое представление объекта SyncState.
+
+        Возвращает:
+            str: Учетная запись, папка и последний UID.
+        """
+        return SyncStateConfig.STR_FORMAT.format(
+            account=self.email_account_id,
+            folder=self.folder,
+            last_uid=self.last_uid,
+        )
@@ -0,0 +1,60 @@
+"""Модуль records."""
+
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from core.constants import INBOX
+
+
+@dataclass(slots=True)
+class FetchedMessage:
+    """
+    Письмо, полученное с IMAP-сервера.
+
+    Атрибуты:
+        uid (int): UID письма в папке на IMAP-сервере.
+        raw (memoryview): Письмо в формате RFC 822. Для полного письма это
+    представление литерала из ответа IMAP без копирования.
+        folder (str): Папка на IMAP-сервере.
+        is_preview (bool): Получено ли письмо в режиме предпросмотра.
+    """
+
+    uid: int
+    raw: memoryview
+    folder: str = INBOX
+    is_preview: bool = False
+
+
+@dataclass(slots=True)
+class ParsedMessage:
+    """
+    Разобранное письмо до сохранения в базу данных.
+
+    Атрибуты:
+        uid (int): UID письма в папке на IMAP-сервере.
+        folder (str): Папка на IMAP-сервере.
+        is_preview (bool): Получено ли письмо в режиме предпросмотра.
+        message_id (str): Идентификатор сообщения.
+        subject (str): Тема письма.
+        mail_from (str): Отправитель письма.
+        date (datetime): Дата отправки письма.
+        received (datetime): Дата получения письма.
+        text (str): Текст письма.
+        attachments (list[tuple[str, bytes]]): Имена и содержимое вложений.
+        in_reply_to (str | None): Message-ID письма, на которое отвечает
+    это письмо.
+        references (list[str]): Message-ID предыдущих писем цепочки.
+    """
+
+    uid: int
+    folder: str
+    is_preview: bool
+    message_id: str
+    subject: str
+    mail_from: str
+    date: datetime | None
+    received: datetime | None
+    text: str
+    attachments: list[tuple[str, bytes]]
+    in_reply_to: str | None = None
+    references: list[str] = field(default_factory=list)
@@ -0,0 +1,316 @@
+"""Модуль retention."""
+
+import itertools
+import logging
+import os
+import time
+from dataclasses import dataclass
+from functools import reduce
+from operator import or_
+from typing import Iterator
+
+import aioimaplib
+from asgiref.sync import sync_to_async
+from core.constants import (
+    RETENTION,
+    RETENTION_FOLDER_SKIPPED_LOGGER_MESSAGE,
+    RETENTION_STORAGE_SKIPPED_LOGGER_MESSAGE,
+    RETENTION_UIDVALIDITY_CHANGED_MESSAGE,
+    AttachmentConfig,
+    EmailConfig,
+    RetentionConfig,
+    ThreadConfig,
+)
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from email_account.models import EmailAccount
+from mail_recipient.fetch_emails import search_uids, select_folder
+from mail_recipient.imap_pool import ImapConnectionPool
+from mail_recipient.models import Attachment, Email, SyncState, Thread
+from mail_recipient.threads import refresh_threads
+
+retention_logger = logging.getLogger(RETENTION)
+
+
+@dataclass(slots=True)
+class RetentionReport:
+    """
+    Итоги удаления устаревших данных.
+
+    Атрибуты:
+        emails (int): Количество удаленных писем.
+        attachments (int): Количество удаленных записей о вложениях.
+        files (int): Количество удаленных файлов вложений.
+        bytes (int): Объем удаленных файлов в байтах.
+        skipped (int): Количество пропущенных папок.
+    """
+
+    emails: int = 0
+    attachments: int = 0
+    files: int = 0
+    bytes: int = 0
+    skipped: int = 0
+
+
+@transaction.atomic
+def delete_emails(
+    email_account_id: int, email_ids: list[int]
+) -> tuple[int, int]:
+    """
+    Удаление писем учетной записи вместе с записями о вложениях.
+
+    QuerySet.delete загружает удаляемые объекты в память, чтобы обработать
+    каскады и сигналы, поэтому письма и вложения удаляются запросами DELETE
+    по списку идентификаторов (_raw_delete), а связи обновляются явно:
+    ссылки цепочек на последнее письмо очищаются, и цепочки пересчитываются.
+    Файлы вложений удаляет sweep_orphan_files, поскольку один файл может
+    принадлежать нескольким письмам.
+
+    Аргументы:
+        email_account_id (int): Идентификатор учетной записи.
+        email_ids (list[int]): Идентификаторы удаляемых писем.
+
+    Возвращает:
+        tuple[int, int]: Количество удаленных писем и записей о вложениях.
+    """
+    emails = Email.objects.filter(
+        email_account_id=email_account_id, pk__in=email_ids
+    )
+    rows = list(
+        emails.values_list(EmailConfig.MESSAGE_ID, ThreadConfig.THREAD_ID)
+    )
+    attachments = Attachment.objects.filter(email_id__in=email_ids)
+    attachments_deleted = attachments._raw_delete(attachments.db)
+    Thread.objects.filter(latest_email_id__in=email_ids).update(
+        latest_email=None
+    )
+    emails_deleted = emails._raw_delete(emails.db)
+    refresh_threads(
+        email_account_id,
+        {thread_id for _, thread_id in rows if thread_id is not None},
+        {message_id for message_id, _ in rows},
+    )
+    return emails_deleted, attachments_deleted
+
+
+async def prune_folder(
+    pool: ImapConnectionPool,
+    state: SyncState,
+    batch_size: int,
+    report: RetentionReport,
+) -> None:
+    """
+    Удаление писем папки, которых больше нет на IMAP-сервере.
+
+    UID писем папки запрашиваются командой UID SEARCH ALL, а сохраненные
+    письма просматриваются пакетами по batch_size в порядке первичного
+    ключа. Папка пропускается, если ее UIDVALIDITY изменился: сохраненные UID
+    тогда недействительны до следующей синхронизации. Письма с UID больше
+    last_uid контрольной точки, прочитанной до поиска, и больше наибольшего
+    UID на сервере не удаляются, поскольку могли прийти после поиска. Письма
+    без UID, например импортированные, не проверяются.
+
+    Аргументы:
+        pool (ImapConnectionPool): Пул IMAP-соединений учетной записи.
+        state (SyncState): Контрольная точка синхронизации папки.
+        batch_size (int): Количество писем в одном пакете.
+        report (RetentionReport): Итоги удаления.
+    """
+
+    async def server_uids(imap: aioimaplib.IMAP4_SSL) -> set[int] | None:
+        if await select_folder(imap, state.folder) != state.uidvalidity:
+            return None
+        return set(await search_uids(imap, RetentionConfig.SEARCH_ALL))
+
+    try:
+        uids = await pool.run(server_uids)
+    except (aioimaplib.Error, OSError) as error:
+        uids, reason = None, error
+    else:
+        reason = RETENTION_UIDVALIDITY_CHANGED_MESSAGE
+    if uids is None:
+        retention_logger.warning(
+            RETENTION_FOLDER_SKIPPED_LOGGER_MESSAGE,
+            state.folder,
+            pool.email_account.email,
+            reason,
+        )
+        report.skipped += 1
+        return
+    limit = max(max(uids, default=0), state.last_uid)
+    last_id = 0
+    while True:
+        rows = [
+            row
+            async for row in Email.objects.filter(
+                email_account_id=state.email_account_id,
+                folder=state.folder,
+                uid__lte=limit,
+                pk__gt=last_id,
+            )
+            .order_by(EmailConfig.ID)
+            .values_list(EmailConfig.ID, EmailConfig.UID)[:batch_size]
+        ]
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        stale = [email_id for email_id, uid in rows if uid not in uids]
+        if stale:
+            emails, attachments = await sync_to_async(delete_emails)(
+                state.email_account_id, stale
+            )
+            report.emails += emails
+            report.attachments += attachments
+
+
+async def prune_account(
+    email_account: EmailAccount, batch_size: int, report: RetentionReport
+) -> None:
+    """
+    Удаление писем учетной записи, удаленных на IMAP-сервере.
+
+    Проверяются папки с контрольной точкой синхронизации через одно
+    IMAP-соединение.
+
+    Аргументы:
+        email_account (EmailAccount): Учетная запись электронной почты.
+        batch_size (int): Количество писем в одном пакете.
+        report (RetentionReport): Итоги удаления.
+    """
+    states = [
+        state
+        async for state in SyncState.objects.filter(
+            email_account=email_account, uidvalidity__isnull=False
+        )
+    ]
+    pool = ImapConnectionPool(email_account, size=1)
+    try:
+        for state in states:
+            await prune_folder(pool, state, batch_size, report)
+    finally:
+        await pool.close()
+
+
+def delete_duplicate_attachments(batch_size: int) -> int:
+    """
+    Удаление повторяющихся записей о вложениях.
+
+    Из записей одного письма с одним и тем же файлом остается запись с
+    наименьшим идентификатором. Группы повторов находятся одним запросом с
+    группировкой, а лишние записи удаляются одним запросом на batch_size
+    групп.
+
+    Аргументы:
+        batch_size (int): Количество групп повторов в одном пакете.
+
+    Возвращает:
+        int: Количество удаленных записей.
+    """
+    groups = list(
+        Attachment.objects.values(
+            AttachmentConfig.EMAIL_ID, AttachmentConfig.FILE
+        )
+        .annotate(keep_id=Min(EmailConfig.ID), count=Count(EmailConfig.ID))
+        .filter(count__gt=1)
+        .order_by()
+        .values_list(
+            AttachmentConfig.EMAIL_ID,
+            AttachmentConfig.FILE,
+            RetentionConfig.KEEP_ID,
+        )
+    )
+    deleted = 0
+    for start in range(0, len(groups), batch_size):
+        end = start + batch_size
+        duplicates = Attachment.objects.filter(
+            reduce(
+                or_,
+                (
+                    Q(email_id=email_id, file=file) & ~Q(pk=keep_id)
+                    for email_id, file, keep_id in groups[start:end]
+                ),
+            )
+        )
+        deleted += duplicates._raw_delete(duplicates.db)
+    return deleted
+
+
+def iter_files(root: str) -> Iterator[os.DirEntry]:
+    """
+    Обход файлов каталога и его подкаталогов без построения списка.
+
+    Каталоги читаются os.scandir по одному, а тип файла берется из записи
+    каталога без отдельного вызова stat.
+
+    Аргументы:
+        root (str): Корневой каталог.
+
+    Возвращает:
+        Iterator[os.DirEntry]: Записи обычных файлов.
+    """
+    directories = [root]
+    while directories:
+        with os.scandir(directories.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    directories.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    yield entry
+
+
+def sweep_orphan_files(
+    batch_size: int,
+    grace: int,
+    report: RetentionReport,
+    storage: FileSystemStorage = default_storage,
+) -> None:
+    """
+    Удаление файлов вложений, на которые нет записей в базе данных.
+
+    Каталог вложений обходится потоково, и для каждых batch_size файлов
+    одним запросом проверяется, какие из них упоминаются в записях о
+    вложениях. Файлы моложе grace секунд не удаляются: файл записывается
+    раньше, чем создается запись о нем.
+
+    Аргументы:
+        batch_size (int): Количество файлов в одном пакете.
+        grace (int): Наименьший возраст удаляемого файла в секундах.
+        report (RetentionReport): Итоги удаления.
+        storage (FileSystemStorage): Хранилище файлов вложений.
+    """
+    if not isinstance(storage, FileSystemStorage):
+        retention_logger.warning(
+            RETENTION_STORAGE_SKIPPED_LOGGER_MESSAGE, type(storage).__name__
+        )
+        return
+    root = storage.path(settings.ATTACHMENTS_URL)
+    if not os.path.isdir(root):
+        return
+    cutoff = time.time() - grace
+    files = iter_files(root)
+    while batch := list(itertools.islice(files, batch_size)):
+        names = {
+            os.path.relpath(entry.path, storage.location).replace(
+                os.sep, "/"
+            ): entry
+            for entry in batch
+        }
+        referenced = set(
+            Attachment.objects.filter(file__in=names).values_list(
+                AttachmentConfig.FILE, flat=True
+            )
+        )
+        for name, entry in names.items():
+            if name in referenced:
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime > cutoff:
+                continue
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                continue
+            report.files += 1
+            report.bytes += stat.st_size
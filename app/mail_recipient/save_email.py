@@ -1,53 +1,161 @@
 """Модуль save_email."""
 
+import asyncio
 import logging
-import os
 
 from asgiref.sync import sync_to_async
 from core.constants import (
-    CONTENT,
+    ATTACHMENTS,
+    COUNT,
     DATE,
+    FILE_PATH,
     FILENAME,
+    FOLDER,
+    FROM,
+    IS_PREVIEW,
+    LATEST,
     MAIL_FROM,
+    MESSAGE_ID,
+    NEW_DATETIME_FORMAT,
     NO_SUBJECT,
     RECEIVED,
     SAVE_EMAIL_ATTACHMENTS_TO_DB_SUCCESS,
     SAVE_EMAIL_TO_DB,
     SAVE_EMAIL_TO_DB_SUCCESS,
+    SAVE_EMAILS_TO_DB_SUCCESS,
     SUBJECT,
     TEXT,
+    THREAD,
     URL,
     AttachmentConfig,
+    EmailConfig,
+    ThreadConfig,
 )
-from core.utils import generate_subfolder_name, sanitize_and_truncate_filename
-from django.conf import settings
-from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
+from core.db_router import amark_written
+from django.utils import timezone
 from email_account.models import EmailAccount
-from mail_recipient.models import Attachment, Email
+from mail_recipient.attachment_storage import attachment_storage
+from mail_recipient.known_messages import remember_message_ids
+from mail_recipient.models import Attachment, Email, Thread
+from mail_recipient.records import ParsedMessage
+from mail_recipient.serialization import EmailData
+from mail_recipient.threads import link_threads
 
 save_email_to_db_logger = logging.getLogger(SAVE_EMAIL_TO_DB)
 
 
+def serialize_email(email: Email, attachments: list) -> EmailData:
+    """
+    Преобразование письма в словарь для отправки клиенту.
+
+    Версия словаря для кеша сериализации меняется при каждом сохранении
+    письма (synced_at), переносе в другую цепочку и полной загрузке письма
+    после предпросмотра. Позиция письма — дата сохранения и идентификатор.
+
+    Аргументы:
+        email (Email): Объект электронного письма.
+        attachments (list): Список вложений с ключами FILENAME и URL.
+
+    Возвращает:
+        EmailData: Словарь с данными письма.
+    """
+    version = email.pk and (
+        email.pk,
+        email.synced_at,
+        email.thread_id,
+        email.is_preview,
+        len(attachments),
+    )
+    fields = {
+        MESSAGE_ID: email.message_id,
+        SUBJECT: email.subject,
+        FROM: email.mail_from,
+        DATE: email.date and email.date.strftime(NEW_DATETIME_FORMAT),
+        RECEIVED: email.received
+        and email.received.strftime(NEW_DATETIME_FORMAT),
+        TEXT: email.text,
+        ATTACHMENTS: attachments,
+        IS_PREVIEW: email.is_preview,
+        FOLDER: email.folder,
+        THREAD: email.thread_id,
+    }
+    return EmailData(
+        fields, version, (email.synced_at, email.pk) if email.pk else None
+    )
+
+
+def serialize_thread(thread: Thread) -> dict[str, object]:
+    """
+    Преобразование цепочки писем в словарь для отправки клиенту.
+
+    Аргументы:
+        thread (Thread): Цепочка с загруженным последним письмом.
+
+    Возвращает:
+        dict[str, object]: Идентификатор, тема и количество писем цепочки и
+    последнее письмо без вложений.
+    """
+    latest = thread.latest_email
+    return {
+        THREAD: thread.pk,
+        SUBJECT: latest.subject if latest else thread.subject,
+        COUNT: thread.message_count,
+        LATEST: latest and serialize_email(latest, []),
+    }
+
+
+def build_email_fields(parsed: ParsedMessage) -> dict[str, object]:
+    """
+    Поля письма, которые обновляются при повторном сохранении.
+
+    UID входит в поля, только если письмо получено с IMAP-сервера:
+    импортированное из архива письмо не должно стирать UID уже
+    синхронизированного письма.
+
+    Аргументы:
+        parsed (ParsedMessage): Разобранное письмо.
+
+    Возвращает:
+        dict[str, object]: Имена и значения полей модели Email.
+    """
+    start = max(len(parsed.references) - ThreadConfig.REFERENCES_LIMIT, 0)
+    fields = {
+        SUBJECT: parsed.subject or NO_SUBJECT,
+        MAIL_FROM: parsed.mail_from,
+        DATE: parsed.date,
+        RECEIVED: parsed.received,
+        TEXT: parsed.text,
+        IS_PREVIEW: parsed.is_preview,
+        EmailConfig.IN_REPLY_TO: parsed.in_reply_to,
+        EmailConfig.REFERENCES: " ".join(parsed.references[start:]),
+    }
+    if parsed.uid is not None:
+        fields[EmailConfig.UID] = parsed.uid
+    return fields
+
+
 async def save_email(
-    email: Email,
-    attachments: list,
+    parsed: ParsedMessage,
     email_account: EmailAccount,
 ) -> tuple[Email, list]:
     """
     Сохранение электронного письма в базу данных и на локальный диск.
 
     Эта функция выполняет следующие действия:
-    1. Создает или обновляет запись электронного письма в базе данных.
-    2. Сохраняет вложения письма на локальный диск и создает записи о них в
-    базе данных.
-    3. Возвращает объект Email и список вложений с URL.
+    1. Создает или обновляет запись электронного письма в папке учетной
+    записи в базе данных.
+    2. Добавляет письмо в цепочку писем.
+    3. Сохраняет вложения письма на локальный диск и создает записи о них в
+    базе данных. Записи о вложениях, которые уже есть у обновляемого письма,
+    повторно не создаются.
+    4. Отмечает запись писем учетной записи, чтобы ее чтение некоторое
+    время выполнялось в основной базе данных, а не в отстающей реплике.
+    5. Добавляет Message-ID письма в фильтр сохраненных писем.
+    6. Возвращает объект Email и список вложений с URL.
 
     Аргументы:
-        email (Email): Объект электронного письма, содержащий данные для
+        parsed (ParsedMessage): Разобранное письмо, содержащее данные для
     сохранения.
-        attachments (list): Список вложений письма, где каждое вложение
-    представлено словарем с ключами FILENAME и CONTENT.
         email_account (EmailAccount): Объект учетной записи электронной почты,
     от имени которой сохраняется письмо.
 
@@ -57,69 +165,182 @@ async def save_email(
             - Список вложений с URL, где каждое вложение представлено словарем
         с ключами FILENAME и URL.
     """
-    if not email.subject:
-        email.subject = NO_SUBJECT
+    fields = build_email_fields(parsed)
     email_instance, created = await Email.objects.aget_or_create(
-        message_id=email.message_id,
-        defaults={
-            SUBJECT: email.subject,
-            MAIL_FROM: email.mail_from,
-            DATE: email.date,
-            RECEIVED: email.received,
-            TEXT: email.text,
-        },
+        message_id=parsed.message_id,
+        email_account=email_account,
+        folder=parsed.folder,
+        defaults=fields,
     )
+    known_files = set()
     if not created:
-        email_instance.message_id = email.message_id
-        email_instance.subject = email.subject
-        email_instance.mail_from = email.mail_from
-        email_instance.date = email.date
-        email_instance.received = email.received
-        email_instance.text = email.text
+        for name, value in fields.items():
+            setattr(email_instance, name, value)
         await sync_to_async(email_instance.save)()
+        known_files = {
+            file
+            async for file in email_instance.attachments.values_list(
+                AttachmentConfig.FILE, flat=True
+            )
+        }
+    await sync_to_async(link_threads)([email_instance])
     attachments_with_url = []
-    if attachments:
-        for attachment in attachments:
-            subfolder = generate_subfolder_name(email_instance.subject)
-            safe_filename_max_length = (
-                AttachmentConfig.ATTACHMENT_FILENAME_MAX_LENGTH
-                - sum(
-                    len(obj)
-                    for obj in [
-                        settings.ATTACHMENTS_URL,
-                        email_account.email,
-                        subfolder,
-                    ]
+    if parsed.attachments:
+        saved_attachments = await attachment_storage.save_attachments(
+            email_account=email_account,
+            subject=email_instance.subject,
+            attachments=parsed.attachments,
+        )
+        await Attachment.objects.abulk_create(
+            [
+                Attachment(
+                    email=email_instance,
+                    file=saved_attachment[FILE_PATH],
+                    filename=saved_attachment[FILENAME],
+                    url=saved_attachment[URL],
                 )
+                for saved_attachment in saved_attachments
+                if saved_attachment[FILE_PATH] not in known_files
+            ]
+        )
+        for saved_attachment in saved_attachments:
+            attachments_with_url.append(
+                {
+                    FILENAME: saved_attachment[FILENAME],
+                    URL: saved_attachment[URL],
+                }
             )
-            safe_filename = sanitize_and_truncate_filename(
-                attachment[FILENAME], max_length=safe_filename_max_length
-            )
-            file_path = os.path.join(
-                settings.ATTACHMENTS_URL,
-                email_account.email,
-                subfolder,
-                safe_filename,
+            save_email_to_db_logger.debug(
+                SAVE_EMAIL_ATTACHMENTS_TO_DB_SUCCESS,
+                saved_attachment[FILENAME],
+                parsed.message_id,
             )
-            if not await sync_to_async(default_storage.exists)(file_path):
-                content_file = ContentFile(attachment[CONTENT])
-                await sync_to_async(default_storage.save)(
-                    file_path, content_file
+    await amark_written(email_account.pk)
+    remember_message_ids(email_account.pk, [parsed.message_id])
+    save_email_to_db_logger.debug(SAVE_EMAIL_TO_DB_SUCCESS, parsed.message_id)
+    return email_instance, attachments_with_url
+
+
+async def save_emails(
+    parsed_messages: list[ParsedMessage], email_account: EmailAccount
+) -> int:
+    """
+    Пакетное сохранение писем с той же семантикой, что и у save_email.
+
+    Письмо ищется по Message-ID в папке учетной записи: новые письма
+    создаются одним запросом INSERT, найденные обновляются одним запросом
+    UPDATE, а цепочки писем пакета обновляются в одной транзакции. Вложения
+    всех писем пакета записываются в хранилище параллельно, а записи о них
+    создаются одним запросом. Вложения, которые уже есть у обновляемого
+    письма, повторно не создаются, поэтому пакет можно безопасно сохранить
+    еще раз.
+
+    Аргументы:
+        parsed_messages (list[ParsedMessage]): Разобранные письма. Из писем
+    с одинаковым Message-ID в одной папке сохраняется последнее.
+        email_account (EmailAccount): Объект учетной записи электронной почты.
+
+    Возвращает:
+        int: Количество сохраненных писем.
+    """
+    unique = {
+        (parsed.folder, parsed.message_id): parsed
+        for parsed in parsed_messages
+    }
+    existing = {
+        (email.folder, email.message_id): email
+        async for email in Email.objects.filter(
+            email_account=email_account,
+            folder__in={folder for folder, _ in unique},
+            message_id__in={message_id for _, message_id in unique},
+        )
+    }
+    created, updated = [], []
+    # bulk_update не заполняет поля с auto_now, поэтому synced_at
+    # обновляется явно: по нему сбрасывается кеш сериализации и догружаются
+    # изменившиеся письма.
+    update_fields = {EmailConfig.SYNCED_AT}
+    synced_at = timezone.now()
+    for key, parsed in unique.items():
+        fields = build_email_fields(parsed)
+        email = existing.get(key)
+        if email is None:
+            created.append(
+                Email(
+                    email_account=email_account,
+                    folder=parsed.folder,
+                    message_id=parsed.message_id,
+                    **fields,
                 )
-            file_url = await sync_to_async(default_storage.url)(file_path)
-            await sync_to_async(Attachment.objects.create)(
-                email=email_instance,
-                file=file_path,
-                filename=safe_filename,
-                url=file_url,
             )
-            attachments_with_url.append(
-                {FILENAME: safe_filename, URL: file_url}
+            continue
+        for name, value in fields.items():
+            setattr(email, name, value)
+        email.synced_at = synced_at
+        update_fields.update(fields)
+        updated.append(email)
+    await Email.objects.abulk_create(created)
+    if updated:
+        await Email.objects.abulk_update(updated, fields=sorted(update_fields))
+    await sync_to_async(link_threads)(created + updated)
+    await save_batch_attachments(
+        [
+            (email, unique[(email.folder, email.message_id)].attachments)
+            for email in created + updated
+        ],
+        email_account,
+    )
+    await amark_written(email_account.pk)
+    remember_message_ids(
+        email_account.pk, [message_id for _, message_id in unique]
+    )
+    save_email_to_db_logger.debug(SAVE_EMAILS_TO_DB_SUCCESS, len(unique))
+    return len(unique)
+
+
+async def save_batch_attachments(
+    emails: list[tuple[Email, list[tuple[str, bytes]]]],
+    email_account: EmailAccount,
+) -> None:
+    """
+    Сохранение вложений пакета писем.
+
+    Аргументы:
+        emails (list[tuple[Email, list[tuple[str, bytes]]]]): Сохраненные
+    письма и их вложения в виде кортежей из имени файла и содержимого.
+        email_account (EmailAccount): Объект учетной записи электронной почты.
+    """
+    emails = [
+        (email, attachments) for email, attachments in emails if attachments
+    ]
+    if not emails:
+        return
+    known_files = {
+        (email_id, file)
+        async for email_id, file in Attachment.objects.filter(
+            email__in=[email for email, _ in emails]
+        ).values_list(AttachmentConfig.EMAIL_ID, AttachmentConfig.FILE)
+    }
+    saved = await asyncio.gather(
+        *(
+            attachment_storage.save_attachments(
+                email_account=email_account,
+                subject=email.subject,
+                attachments=attachments,
             )
-            save_email_to_db_logger.info(
-                SAVE_EMAIL_ATTACHMENTS_TO_DB_SUCCESS,
-                safe_filename,
-                email.message_id,
+            for email, attachments in emails
+        )
+    )
+    await Attachment.objects.abulk_create(
+        [
+            Attachment(
+                email=email,
+                file=saved_attachment[FILE_PATH],
+                filename=saved_attachment[FILENAME],
+                url=saved_attachment[URL],
             )
-    save_email_to_db_logger.info(SAVE_EMAIL_TO_DB_SUCCESS, email.message_id)
-    return email_instance, attachments_with_url
+            for (email, _), saved_attachments in zip(emails, saved)
+            for saved_attachment in saved_attachments
+            if (email.pk, saved_attachment[FILE_PATH]) not in known_files
+        ]
+    )
@@ -0,0 +1,126 @@
+"""Модуль search_filters."""
+
+from datetime import date
+from typing import Any
+
+from core.constants import (
+    SEARCH_FILTER_INVALID_ERROR_MESSAGE,
+    SEARCH_FILTER_UNSAFE_ERROR_MESSAGE,
+    SEARCH_FILTER_UNSUPPORTED_ERROR_MESSAGE,
+    SearchFilterConfig,
+)
+from core.utils import format_imap_date
+from mail_recipient.imap_response import literal_string, quote_string
+
+UNSAFE_SEARCH_CHARACTERS = ("\r", "\n", "\0")
+
+
+def quote_search_string(value: Any) -> str:
+    """
+    Преобразование значения фильтра в строку для команды SEARCH.
+
+    Значения в ASCII отправляются в кавычках с экранированием обратной
+    косой черты и кавычек, остальные - литералом {n} в UTF-8, которую
+    aioimaplib объявляет в CHARSET. Символы перевода строки и NUL
+    запрещены, чтобы значение не могло завершить команду и добавить к ней
+    новую.
+
+    Аргументы:
+        value (Any): Значение фильтра.
+
+    Возвращает:
+        str: Строка в кавычках или литерал.
+
+    Вызывает ошибку:
+        ValueError: Если значение не строка, пустое или содержит
+    запрещенные символы.
+    """
+    if not isinstance(value, str) or not value:
+        raise ValueError(SEARCH_FILTER_INVALID_ERROR_MESSAGE, value)
+    if any(char in value for char in UNSAFE_SEARCH_CHARACTERS):
+        raise ValueError(SEARCH_FILTER_UNSAFE_ERROR_MESSAGE, value)
+    if not value.isascii():
+        return literal_string(value)
+    return quote_string(value)
+
+
+def format_search_date(value: Any) -> str:
+    """
+    Преобразование даты фильтра в формате ISO (2024-01-31) в формат IMAP.
+
+    Аргументы:
+        value (Any): Дата в формате ISO.
+
+    Возвращает:
+        str: Дата в формате IMAP.
+
+    Вызывает ошибку:
+        ValueError: Если значение не является датой в формате ISO.
+    """
+    if not isinstance(value, str):
+        raise ValueError(SEARCH_FILTER_INVALID_ERROR_MESSAGE, value)
+    return format_imap_date(date.fromisoformat(value))
+
+
+def format_search_size(value: Any) -> str:
+    """
+    Проверка размера письма в байтах для критериев LARGER и SMALLER.
+
+    Аргументы:
+        value (Any): Размер в байтах.
+
+    Возвращает:
+        str: Размер в виде строки.
+
+    Вызывает ошибку:
+        ValueError: Если значение не является неотрицательным целым числом.
+    """
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise ValueError(SEARCH_FILTER_INVALID_ERROR_MESSAGE, value)
+    return str(value)
+
+
+SEARCH_FILTER_FORMATTERS = {
+    SearchFilterConfig.FROM: quote_search_string,
+    SearchFilterConfig.SUBJECT: quote_search_string,
+    SearchFilterConfig.SINCE: format_search_date,
+    SearchFilterConfig.BEFORE: format_search_date,
+    SearchFilterConfig.LARGER: format_search_size,
+    SearchFilterConfig.SMALLER: format_search_size,
+}
+
+
+def build_search_criteria(filters: dict[str, Any]) -> list[str]:
+    """
+    Преобразование фильтров клиента в критерии команды IMAP SEARCH.
+
+    Поддерживаются фильтры from, subject, since, before (даты в формате
+    ISO), larger, smaller (размер в байтах) и unseen. Все критерии
+    объединяются через AND. Значения никогда не подставляются в команду
+    без проверки и экранирования.
+
+    Аргументы:
+        filters (dict[str, Any]): Фильтры из запроса fetch_emails.
+
+    Возвращает:
+        list[str]: Критерии поиска. Пустой список, если фильтров нет.
+
+    Вызывает ошибку:
+        ValueError: Если фильтр не поддерживается или его значение
+    некорректно.
+    """
+    if not isinstance(filters, dict):
+        raise ValueError(SEARCH_FILTER_INVALID_ERROR_MESSAGE, filters)
+    criteria = []
+    for key, value in filters.items():
+        if key == SearchFilterConfig.UNSEEN:
+            if value is True:
+                criteria.append(SearchFilterConfig.UNSEEN.upper())
+            elif value is not False:
+                raise ValueError(SEARCH_FILTER_INVALID_ERROR_MESSAGE, value)
+            continue
+        formatter = SEARCH_FILTER_FORMATTERS.get(key)
+        if formatter is None:
+            raise ValueError(SEARCH_FILTER_UNSUPPORTED_ERROR_MESSAGE, key)
+        criteria.extend((key.upper(), formatter(value)))
+    return criteria
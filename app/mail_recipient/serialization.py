@@ -0,0 +1,246 @@
+"""Модуль serialization."""
+
+import json
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Hashable
+
+from core.constants import EMAIL_DATA, NEW_EMAIL, TYPE, SerializationConfig
+from core.metrics import SERIALIZATION_CACHE
+from django.conf import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(data: Any) -> str:
+    """
+    Сериализация данных в JSON.
+
+    Используется orjson, а если он не установлен — стандартный модуль json
+    с тем же компактным форматом без экранирования не-ASCII символов.
+
+    Аргументы:
+        data (Any): Данные кадра.
+
+    Возвращает:
+        str: Строка JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(
+        data, ensure_ascii=False, separators=SerializationConfig.SEPARATORS
+    )
+
+
+def loads(text: str | bytes) -> Any:
+    """
+    Разбор строки JSON.
+
+    Аргументы:
+        text (str | bytes): Строка JSON.
+
+    Возвращает:
+        Any: Разобранные данные.
+
+    Вызывает ошибку:
+        json.JSONDecodeError: Если строка не является JSON. Ошибка orjson
+    наследуется от нее.
+    """
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+class EmailData(dict):
+    """
+    Данные письма для отправки клиенту с версией строки Email.
+
+    Ведет себя как обычный словарь, а версия служит ключом кеша
+    сериализации: письма с одинаковой версией сериализуются одинаково.
+    Позиция письма в порядке сохранения позволяет очереди отправки
+    догрузить из базы данных письмо, которое она отбросила.
+
+    Атрибуты:
+        version (Hashable | None): Версия строки Email или None, если
+    письмо не нужно кешировать.
+        position (tuple[datetime, int] | None): Дата сохранения и
+    идентификатор строки Email или None, если письмо не сохранено.
+    """
+
+    __slots__ = ("version", "position")
+
+    def __init__(
+        self,
+        fields: dict[str, Any],
+        version: Hashable | None = None,
+        position: tuple[datetime, int] | None = None,
+    ) -> None:
+        """
+        Инициализация данных письма.
+
+        Аргументы:
+            fields (dict[str, Any]): Данные письма.
+            version (Hashable | None): Версия строки Email.
+            position (tuple[datetime, int] | None): Дата сохранения и
+        идентификатор строки Email.
+        """
+        super().__init__(fields)
+        self.version = version
+        self.position = position
+
+
+def dump_position(
+    position: tuple[datetime, int] | None,
+) -> list[str | int] | None:
+    """
+    Позиция письма в виде, который можно передать через канальный слой.
+
+    Аргументы:
+        position (tuple[datetime, int] | None): Дата сохранения и
+    идентификатор строки Email.
+
+    Возвращает:
+        list[str | int] | None: Дата в формате ISO 8601 и идентификатор.
+    """
+    if position is None:
+        return None
+    synced_at, email_id = position
+    return [synced_at.isoformat(), email_id]
+
+
+def load_position(
+    value: list[str | int] | None,
+) -> tuple[datetime, int] | None:
+    """
+    Позиция письма, полученная через канальный слой.
+
+    Аргументы:
+        value (list[str | int] | None): Результат dump_position.
+
+    Возвращает:
+        tuple[datetime, int] | None: Дата сохранения и идентификатор строки
+    Email.
+    """
+    if value is None:
+        return None
+    synced_at, email_id = value
+    return datetime.fromisoformat(synced_at), email_id
+
+
+class EncodedCache:
+    """
+    LRU-кеш строк JSON, ограниченный их суммарной длиной.
+
+    Атрибуты:
+        max_size (int): Наибольшая суммарная длина строк в символах.
+        size (int): Текущая суммарная длина строк.
+        entries (OrderedDict): Строки по ключам от давно использованных к
+    недавно использованным.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """
+        Инициализация пустого кеша.
+
+        Аргументы:
+            max_size (int): Наибольшая суммарная длина строк в символах.
+        """
+        self.max_size = max_size
+        self.size = 0
+        self.entries = OrderedDict()
+
+    def get(self, key: Hashable) -> str | None:
+        """
+        Строка по ключу с отметкой о недавнем использовании.
+
+        Аргументы:
+            key (Hashable): Ключ строки.
+
+        Возвращает:
+            str | None: Строка или None, если ее нет в кеше.
+        """
+        text = self.entries.get(key)
+        if text is not None:
+            self.entries.move_to_end(key)
+        return text
+
+    def put(self, key: Hashable, text: str) -> None:
+        """
+        Добавление строки с вытеснением давно использованных.
+
+        Строки длиннее всего кеша не сохраняются.
+
+        Аргументы:
+            key (Hashable): Ключ строки.
+            text (str): Строка JSON.
+        """
+        if len(text) > self.max_size:
+            return
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.size -= len(previous)
+        self.entries[key] = text
+        self.size += len(text)
+        while self.size > self.max_size:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted)
+
+
+# Сериализованные письма в памяти процесса.
+_encoded_emails = EncodedCache(settings.SERIALIZATION_CACHE_SIZE)
+# Начало кадра NEW_EMAIL до данных письма.
+_NEW_EMAIL_PREFIX = dumps({TYPE: NEW_EMAIL, EMAIL_DATA: None}).removesuffix(
+    dumps(None) + SerializationConfig.FRAME_END
+)
+
+
+def encode_email(email_data: dict[str, Any]) -> str:
+    """
+    Сериализация данных письма с кешированием по версии строки Email.
+
+    Одно и то же письмо отправляется многим клиентам: подписчикам
+    синхронизации, другим вкладкам и при догрузке из базы данных. Письмо с
+    версией сериализуется один раз, а данные без версии — каждый раз.
+
+    Аргументы:
+        email_data (dict[str, Any]): Данные письма.
+
+    Возвращает:
+        str: Строка JSON.
+    """
+    version = email_data.version if isinstance(email_data, EmailData) else None
+    if version is None:
+        return dumps(email_data)
+    text = _encoded_emails.get(version)
+    if text is not None:
+        SERIALIZATION_CACHE.labels(SerializationConfig.HIT).inc()
+        return text
+    SERIALIZATION_CACHE.labels(SerializationConfig.MISS).inc()
+    text = dumps(email_data)
+    _encoded_emails.put(version, text)
+    return text
+
+
+def encode_frame(data: dict[str, Any]) -> str:
+    """
+    Сериализация кадра для отправки клиенту.
+
+    Кадр NEW_EMAIL собирается из готового начала и сериализованного письма,
+    остальные кадры сериализуются целиком.
+
+    Аргументы:
+        data (dict[str, Any]): Данные кадра с ключом TYPE.
+
+    Возвращает:
+        str: Строка JSON.
+    """
+    if list(data) == [TYPE, EMAIL_DATA] and data[TYPE] == NEW_EMAIL:
+        return (
+            _NEW_EMAIL_PREFIX
+            + encode_email(data[EMAIL_DATA])
+            + SerializationConfig.FRAME_END
+        )
+    return dumps(data)
@@ -0,0 +1,123 @@
+"""Модуль sync_lease."""
+
+from uuid import uuid4
+
+from core.constants import (
+    SYNC_LEASE_KEY,
+    SYNC_LEASE_RELEASE_SCRIPT,
+    SYNC_LEASE_RENEW_SCRIPT,
+    SYNC_LEASE_TOTAL_KEY,
+)
+from django.conf import settings
+from redis.asyncio import Redis
+
+
+class SyncLease:
+    """
+    Аренда синхронизации учетной записи в Redis.
+
+    Синхронизацию учетной записи с одними параметрами во всем кластере
+    выполняет только владелец аренды. Аренда захватывается командой SET NX
+    PX со случайным токеном и продлевается владельцем, пока синхронизация
+    выполняется. Продление и освобождение выполняются Lua-скриптами,
+    которые сравнивают токен, чтобы процесс не мог продлить или удалить
+    чужую аренду. Если владелец завершился аварийно, аренда истекает через
+    ttl секунд, и ее захватывает другой процесс.
+
+    Вместе с арендой хранится последний кадр TOTAL_EMAILS владельца, чтобы
+    подключившиеся позже клиенты получили общее количество писем.
+
+    Атрибуты:
+        key (str): Ключ аренды в Redis.
+        total_key (str): Ключ кадра TOTAL_EMAILS в Redis.
+        token (str): Токен этого претендента на аренду.
+        ttl (float): Срок аренды в секундах.
+    """
+
+    def __init__(
+        self,
+        email_account_id: int,
+        options: str,
+        ttl: float = None,
+        redis: Redis = None,
+    ) -> None:
+        """
+        Инициализация аренды.
+
+        Аргументы:
+            email_account_id (int): Идентификатор учетной записи.
+            options (str): Параметры синхронизации в формате SYNC_OPTIONS.
+            ttl (float): Срок аренды в секундах, по умолчанию SYNC_LEASE_TTL.
+            redis (Redis): Клиент Redis, по умолчанию подключение к
+        REDIS_HOSTS.
+        """
+        self.key = SYNC_LEASE_KEY.format(
+            account=email_account_id, options=options
+        )
+        self.total_key = SYNC_LEASE_TOTAL_KEY.format(
+            account=email_account_id, options=options
+        )
+        self.token = uuid4().hex
+        self.ttl = ttl or settings.SYNC_LEASE_TTL
+        host, port = settings.REDIS_HOSTS
+        self.redis = redis or Redis(host=host, port=port)
+        self._renew = self.redis.register_script(SYNC_LEASE_RENEW_SCRIPT)
+        self._release = self.redis.register_script(SYNC_LEASE_RELEASE_SCRIPT)
+
+    @property
+    def ttl_ms(self) -> int:
+        """Срок аренды в миллисекундах."""
+        return int(self.ttl * 1000)
+
+    async def acquire(self) -> bool:
+        """
+        Попытка захватить аренду.
+
+        Возвращает:
+            bool: True, если аренда захвачена этим претендентом.
+        """
+        return bool(
+            await self.redis.set(self.key, self.token, nx=True, px=self.ttl_ms)
+        )
+
+    async def renew(self) -> bool:
+        """
+        Продление аренды, если она все еще принадлежит этому претенденту.
+
+        Возвращает:
+            bool: True, если аренда продлена, и False, если она потеряна.
+        """
+        return bool(
+            await self._renew(
+                keys=[self.key, self.total_key],
+                args=[self.token, self.ttl_ms],
+            )
+        )
+
+    async def release(self) -> None:
+        """Освобождение аренды, если она принадлежит этому претенденту."""
+        await self._release(keys=[self.key, self.total_key], args=[self.token])
+
+    async def publish_total(self, frame: str) -> None:
+        """
+        Сохранение кадра TOTAL_EMAILS владельца аренды.
+
+        Аргументы:
+            frame (str): Кадр в формате JSON.
+        """
+        await self.redis.set(self.total_key, frame, px=self.ttl_ms)
+
+    async def get_total(self) -> str | None:
+        """
+        Получение кадра TOTAL_EMAILS владельца аренды.
+
+        Возвращает:
+            str | None: Кадр в формате JSON или None, если владелец его еще
+        не сохранил.
+        """
+        frame = await self.redis.get(self.total_key)
+        return frame.decode() if frame is not None else None
+
+    async def close(self) -> None:
+        """Закрытие подключения к Redis."""
+        await self.redis.aclose()
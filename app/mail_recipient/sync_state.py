@@ -0,0 +1,369 @@
+"""Модуль sync_state."""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator
+
+from core.constants import (
+    ATTACHMENTS,
+    FILENAME,
+    INBOX,
+    IS_PREVIEW,
+    NEWEST,
+    SYNC_STATE,
+    SYNC_STATE_RESET_LOGGER_MESSAGE,
+    SYNCED_EMAILS_CHUNK_SIZE,
+    URL,
+    EmailConfig,
+    SyncStateConfig,
+)
+from core.db_router import aread_database
+from django.db.models import Q, QuerySet
+from email_account.models import EmailAccount
+from mail_recipient.models import Email, SyncState
+from mail_recipient.save_email import serialize_email
+
+sync_state_logger = logging.getLogger(SYNC_STATE)
+
+UIDVALIDITY_PATTERN = re.compile(rb"\[UIDVALIDITY (\d+)\]")
+
+
+@dataclass
+class FolderQueue:
+    """
+    Очередь синхронизации одной папки.
+
+    Атрибуты:
+        folder (str): Папка на IMAP-сервере.
+        total (int): Количество писем папки с учетом уже сохраненных.
+        window (list[int]): UID писем начального окна.
+        backfill (list[int]): UID писем для догрузки истории.
+        replay_uids (list[int] | None): UID писем, которые нужно отдать из
+    базы данных при поиске с фильтрами. None означает все сохраненные
+    письма папки.
+        sizes (dict[int, int]): Размеры писем окна и догрузки в байтах по
+    UID.
+    """
+
+    folder: str
+    total: int
+    window: list[int]
+    backfill: list[int] = field(default_factory=list)
+    replay_uids: list[int] | None = None
+    sizes: dict[int, int] = field(default_factory=dict)
+
+
+def parse_uidvalidity(lines: list[bytes]) -> int | None:
+    """
+    Извлечение UIDVALIDITY из ответа на команду SELECT.
+
+    Аргументы:
+        lines (list[bytes]): Строки ответа IMAP-сервера.
+
+    Возвращает:
+        int | None: Значение UIDVALIDITY или None, если сервер его не
+    передал.
+    """
+    for line in lines:
+        match = UIDVALIDITY_PATTERN.search(line)
+        if match:
+            return int(match.group(1))
+    return None
+
+
+async def get_sync_state(
+    email_account: EmailAccount, uidvalidity: int | None, folder: str = INBOX
+) -> SyncState:
+    """
+    Получение контрольной точки синхронизации папки учетной записи.
+
+    Если UIDVALIDITY папки изменился, ранее сохраненные UID писем больше не
+    действительны: контрольная точка сбрасывается, а у сохраненных писем
+    очищается UID, чтобы они были получены заново и обновлены по Message-ID.
+
+    Аргументы:
+        email_account (EmailAccount): Объект учетной записи электронной почты.
+        uidvalidity (int | None): UIDVALIDITY выбранной папки.
+        folder (str): Папка на IMAP-сервере.
+
+    Возвращает:
+        SyncState: Контрольная точка синхронизации.
+    """
+    state, _ = await SyncState.objects.aget_or_create(
+        email_account=email_account, folder=folder
+    )
+    if state.uidvalidity != uidvalidity:
+        if state.uidvalidity is not None:
+            sync_state_logger.warning(
+                SYNC_STATE_RESET_LOGGER_MESSAGE,
+                folder,
+                email_account.email,
+                state.uidvalidity,
+                uidvalidity,
+            )
+        await Email.objects.filter(
+            email_account=email_account, folder=folder
+        ).aupdate(uid=None)
+        state.uidvalidity = uidvalidity
+        state.last_uid = 0
+        state.pending_uids = []
+        await state.asave()
+    return state
+
+
+def synced_emails(
+    email_account_id: int, preview: bool = False, folder: str = INBOX
+) -> QuerySet:
+    """
+    Письма папки учетной записи, которые не нужно получать с сервера заново.
+
+    При полной синхронизации письма, сохраненные в режиме предпросмотра,
+    считаются несохраненными и получаются заново целиком.
+
+    Аргументы:
+        email_account_id (int): Идентификатор учетной записи.
+        preview (bool): Выполняется ли синхронизация в режиме предпросмотра.
+        folder (str): Папка на IMAP-сервере.
+
+    Возвращает:
+        QuerySet: Сохраненные письма с известным UID.
+    """
+    queryset = Email.objects.filter(
+        email_account_id=email_account_id, folder=folder, uid__isnull=False
+    )
+    if not preview:
+        queryset = queryset.filter(is_preview=False)
+    return queryset
+
+
+async def plan_sync(
+    state: SyncState,
+    new_uids: list[int],
+    ordering: str = NEWEST,
+    preview: bool = False,
+) -> tuple[list[int], int]:
+    """
+    Формирование очереди синхронизации и сохранение контрольной точки.
+
+    В очередь попадают письма прерванной синхронизации, которые еще не
+    сохранены в базе данных, и новые письма с UID больше last_uid. UID
+    растут по мере поступления писем в папку, поэтому очередь упорядочена
+    по UID: по убыванию для NEWEST и по возрастанию для OLDEST. При полной
+    синхронизации в очередь также попадают письма, сохраненные ранее в
+    режиме предпросмотра.
+
+    Аргументы:
+        state (SyncState): Контрольная точка синхронизации.
+        new_uids (list[int]): UID писем, найденных на сервере начиная с
+    last_uid + 1.
+        ordering (str): Порядок загрузки писем (NEWEST или OLDEST).
+        preview (bool): Выполняется ли синхронизация в режиме предпросмотра.
+
+    Возвращает:
+        tuple[list[int], int]: Кортеж, содержащий:
+            - UID писем, которые нужно получить с сервера.
+            - Количество уже сохраненных писем учетной записи.
+    """
+    synced_uids = set()
+    preview_uids = set()
+    async for uid, is_preview in (
+        synced_emails(
+            state.email_account_id, preview=True, folder=state.folder
+        )
+        .using(await aread_database(state.email_account_id))
+        .values_list(EmailConfig.UID, IS_PREVIEW)
+    ):
+        if is_preview and not preview:
+            preview_uids.add(uid)
+        else:
+            synced_uids.add(uid)
+    queue = sorted(
+        {
+            uid
+            for uid in state.pending_uids
+            + [uid for uid in new_uids if uid > state.last_uid]
+            if uid not in synced_uids
+        }
+        | preview_uids,
+        reverse=ordering == NEWEST,
+    )
+    state.pending_uids = queue
+    state.last_uid = max([state.last_uid, *new_uids])
+    await state.asave()
+    return queue, len(synced_uids)
+
+
+async def partition_synced_uids(
+    email_account: EmailAccount,
+    uids: list[int],
+    preview: bool = False,
+    folder: str = INBOX,
+) -> tuple[list[int], list[int]]:
+    """
+    Разделение UID писем на уже сохраненные и еще не полученные.
+
+    Используется для поиска с фильтрами: такой поиск не меняет контрольную
+    точку, но сохраненные ранее письма все равно отдаются из базы данных.
+
+    Аргументы:
+        email_account (EmailAccount): Объект учетной записи электронной почты.
+        uids (list[int]): UID найденных писем.
+        preview (bool): Выполняется ли синхронизация в режиме предпросмотра.
+        folder (str): Папка на IMAP-сервере.
+
+    Возвращает:
+        tuple[list[int], list[int]]: UID сохраненных и несохраненных писем
+    в исходном порядке.
+    """
+    synced_uids = {
+        uid
+        async for uid in synced_emails(email_account.pk, preview, folder)
+        .filter(uid__in=uids)
+        .values_list(EmailConfig.UID, flat=True)
+    }
+    return (
+        [uid for uid in uids if uid in synced_uids],
+        [uid for uid in uids if uid not in synced_uids],
+    )
+
+
+async def synced_folders(email_account: EmailAccount) -> list[str]:
+    """
+    Папки учетной записи, у которых есть контрольная точка синхронизации.
+
+    Аргументы:
+        email_account (EmailAccount): Объект учетной записи электронной почты.
+
+    Возвращает:
+        list[str]: Имена папок на IMAP-сервере.
+    """
+    return [
+        folder
+        async for folder in SyncState.objects.filter(
+            email_account=email_account
+        )
+        .order_by(SyncStateConfig.PK)
+        .values_list(EmailConfig.FOLDER, flat=True)
+    ]
+
+
+async def iter_synced_emails(
+    email_account: EmailAccount,
+    ordering: str = NEWEST,
+    uids: list[int] | None = None,
+    preview: bool = False,
+    folder: str = INBOX,
+) -> AsyncIterator[dict[str, str | list]]:
+    """
+    Получение уже синхронизированных писем папки из базы данных.
+
+    Аргументы:
+        email_account (EmailAccount): Объект учетной записи электронной почты.
+        ordering (str): Порядок писем (NEWEST или OLDEST).
+        uids (list[int] | None): UID писем, которые нужно отдать. None
+    означает все сохраненные письма папки.
+        preview (bool): Отдавать ли письма, сохраненные в режиме
+    предпросмотра.
+        folder (str): Папка на IMAP-сервере.
+
+    Возвращает:
+        AsyncIterator[dict[str, str | list]]: Данные писем в порядке UID в
+    том же виде, что и у только что полученных писем.
+    """
+    queryset = synced_emails(email_account.pk, preview, folder).using(
+        await aread_database(email_account.pk)
+    )
+    if uids is not None:
+        queryset = queryset.filter(uid__in=uids)
+    queryset = queryset.order_by(
+        EmailConfig.UID_DESCENDING if ordering == NEWEST else EmailConfig.UID
+    ).prefetch_related(ATTACHMENTS)
+    async for email in queryset.aiterator(chunk_size=SYNCED_EMAILS_CHUNK_SIZE):
+        yield serialize_synced_email(email)
+
+
+def serialize_synced_email(email: Email) -> dict[str, str | list]:
+    """
+    Преобразование сохраненного письма в словарь для отправки клиенту.
+
+    Аргументы:
+        email (Email): Письмо с предзагруженными вложениями.
+
+    Возвращает:
+        dict[str, str | list]: Данные письма в том же виде, что и у только
+    что полученных писем.
+    """
+    return serialize_email(
+        email,
+        [
+            {FILENAME: attachment.filename, URL: attachment.url}
+            for attachment in email.attachments.all()
+        ],
+    )
+
+
+async def email_cursor(
+    email_account: EmailAccount, folder: str, message_id: str
+) -> tuple[datetime, int] | None:
+    """
+    Позиция письма в порядке сохранения писем учетной записи.
+
+    Аргументы:
+        email_account (EmailAccount): Объект учетной записи электронной почты.
+        folder (str): Папка на IMAP-сервере.
+        message_id (str): Идентификатор сообщения.
+
+    Возвращает:
+        tuple[datetime, int] | None: Позиция непосредственно перед письмом,
+    так что письмо попадает в выборку emails_saved_after, или None, если
+    письма нет в базе данных.
+    """
+    position = (
+        await Email.objects.filter(
+            email_account=email_account, folder=folder, message_id=message_id
+        )
+        .values_list(EmailConfig.SYNCED_AT, EmailConfig.ID)
+        .afirst()
+    )
+    if position is None:
+        return None
+    synced_at, email_id = position
+    return synced_at, email_id - 1
+
+
+async def emails_saved_after(
+    email_account: EmailAccount, cursor: tuple[datetime, int], limit: int
+) -> list[tuple[tuple[datetime, int], dict[str, str | list]]]:
+    """
+    Страница писем учетной записи, сохраненных после позиции cursor.
+
+    Письма упорядочены по дате сохранения и идентификатору и выбираются по
+    индексу, поэтому страницы можно запрашивать, пока синхронизация
+    продолжает сохранять новые письма.
+
+    Аргументы:
+        email_account (EmailAccount): Объект учетной записи электронной почты.
+        cursor (tuple[datetime, int]): Дата сохранения и идентификатор
+    последнего отданного письма.
+        limit (int): Размер страницы.
+
+    Возвращает:
+        list[tuple[tuple[datetime, int], dict[str, str | list]]]: Позиции и
+    данные писем.
+    """
+    synced_at, email_id = cursor
+    queryset = (
+        Email.objects.filter(
+            Q(synced_at__gt=synced_at)
+            | Q(synced_at=synced_at, id__gt=email_id),
+            email_account=email_account,
+        )
+        .order_by(EmailConfig.SYNCED_AT, EmailConfig.ID)
+        .prefetch_related(ATTACHMENTS)
+    )
+    return [
+        ((email.synced_at, email.pk), serialize_synced_email(email))
+        async for email in queryset[:limit]
+    ]
@@ -0,0 +1,19 @@
+"""Тесты выбора базы данных для чтения."""
+
+from core.db_router import amark_written, aread_database
+from django.db import DEFAULT_DB_ALIAS
+from django.test import SimpleTestCase, override_settings
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReadDatabaseTests(SimpleTestCase):
+    """Чтение из реплики и из основной базы данных после записи."""
+
+    async def test_replica_without_writes(self) -> None:
+        """Учетная запись без недавних записей читает из реплики."""
+        self.assertEqual(await aread_database(1001), "replica")
+
+    async def test_primary_after_write(self) -> None:
+        """Учетная запись после записи читает из основной базы данных."""
+        await amark_written(1002)
+        self.assertEqual(await aread_database(1002), DEFAULT_DB_ALIAS)
@@ -0,0 +1,84 @@
+"""Тесты очереди отправки с управлением потоком."""
+
+import asyncio
+from collections import Counter
+
+from core.constants import EMAIL_DATA
+from django.test import TestCase
+from email_account.models import EmailAccount
+from mail_recipient.flow_control import OutboundWindow, email_key
+from mail_recipient.models import Email
+from mail_recipient.sync_state import serialize_synced_email
+
+
+class OutboundWindowTests(TestCase):
+    """Догрузка писем, отброшенных очередью отправки."""
+
+    def setUp(self) -> None:
+        """Учетная запись и отправленные клиенту кадры."""
+        self.email_account = EmailAccount.objects.create(
+            email="flow@test.local", password="password"
+        )
+        self.sent = []
+
+    async def send(self, data: dict) -> None:
+        """Запоминание кадра, отправленного клиенту."""
+        self.sent.append(email_key(data[EMAIL_DATA]))
+
+    async def save(self, folder: str, index: int) -> dict:
+        """Сохранение письма и его данные для отправки клиенту."""
+        email = await Email.objects.acreate(
+            email_account=self.email_account,
+            folder=folder,
+            message_id=f"<{folder}-{index}@test.local>",
+            subject=str(index),
+        )
+        return await asyncio.to_thread(serialize_synced_email, email)
+
+    async def deliver(self, window: OutboundWindow, expected: int) -> None:
+        """Выдача кредитов и ожидание отправки писем клиенту."""
+        window.grant(expected * 2)
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if len(self.sent) >= expected:
+                break
+        await asyncio.sleep(0.05)
+
+    async def test_interleaved_folders_are_replayed(self) -> None:
+        """Догрузка письма, отброшенного после письма другой папки.
+
+        Письмо сохранено раньше писем другой папки, переполнивших очередь,
+        но предложено позже них и должно быть отправлено при догрузке.
+        """
+        window = OutboundWindow(self.send, self.email_account, 0, 2)
+        late = await self.save("INBOX", 0)
+        others = [await self.save("Sent", index) for index in range(3)]
+        for email_data in others:
+            window.offer(email_data)
+        window.offer(late)
+        await self.deliver(window, 4)
+        await window.close()
+        self.assertEqual(
+            Counter(self.sent),
+            Counter(email_key(email) for email in [late, *others]),
+        )
+
+    async def test_late_email_during_replay(self) -> None:
+        """Догрузка письма, отброшенного во время догрузки.
+
+        Письмо сохранено раньше курсора догрузки и должно быть отправлено,
+        а уже отправленные письма не должны повторяться.
+        """
+        window = OutboundWindow(self.send, self.email_account, 0, 2)
+        late = await self.save("INBOX", 0)
+        folders = [await self.save("Sent", index) for index in range(6)]
+        for email_data in folders:
+            window.offer(email_data)
+        await self.deliver(window, 4)
+        window.offer(late)
+        await self.deliver(window, 7)
+        await window.close()
+        self.assertEqual(
+            Counter(self.sent),
+            Counter(email_key(email) for email in [late, *folders]),
+        )
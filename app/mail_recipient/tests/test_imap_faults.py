@@ -0,0 +1,104 @@
+"""Тесты синхронизации при неисправностях IMAP-сервера."""
+
+import tempfile
+
+from benchmarks.fake_imap import FakeImapServer, FaultPlan
+from benchmarks.mailbox_generator import MailboxProfile, generate_mailbox
+from benchmarks.sync_benchmark import (
+    FrameCollector,
+    StageTimer,
+    run_sync_benchmark,
+    sync_mailbox,
+)
+from core.constants import INBOX, BenchmarkConfig, ImapConfig
+from django.test import TransactionTestCase, override_settings
+from email_account.models import EmailAccount
+from mail_recipient.models import Email, SyncState
+from prometheus_client import REGISTRY
+
+MESSAGES = 60
+PROFILE = MailboxProfile(messages=MESSAGES, attachment_ratio=0.0)
+
+
+def hedges_won() -> float:
+    """Количество FETCH, на которые первым ответило запасное соединение."""
+    return (
+        REGISTRY.get_sample_value(
+            "mail_imap_hedges_total", {"winner": ImapConfig.HEDGE}
+        )
+        or 0.0
+    )
+
+
+@override_settings(IMAP_RECONNECT_BACKOFF=0.01, IMAP_RECONNECT_ATTEMPTS=3)
+class ImapFaultTests(TransactionTestCase):
+    """Синхронизация локального почтового ящика с неисправностями."""
+
+    async def test_dropped_fetches_resume(self) -> None:
+        """Разрыв соединения на FETCH не приводит к повторной загрузке.
+
+        После переподключения синхронизация продолжается со следующего
+        несохраненного письма: каждый разрыв добавляет один FETCH.
+        """
+        report = await run_sync_benchmark(
+            PROFILE, folders=1, faults=FaultPlan(drop_rate=0.1)
+        )
+        drops = report["faults"][BenchmarkConfig.FAULT_DROP]
+        self.assertGreater(drops, 0)
+        self.assertEqual(report["saved"], MESSAGES)
+        self.assertEqual(report["stages"]["fetch"]["calls"], MESSAGES + drops)
+
+    @override_settings(IMAP_HEDGE=True, IMAP_HEDGE_MIN_DELAY=0.05)
+    async def test_stalled_fetches_hedged(self) -> None:
+        """Зависший FETCH повторяется через запасное соединение.
+
+        Синхронизация не ждет задержки ответа сервера, а зависшее
+        соединение не используется для следующих писем.
+        """
+        stall_seconds = 10.0
+        before = hedges_won()
+        report = await run_sync_benchmark(
+            PROFILE,
+            folders=1,
+            faults=FaultPlan(stall_rate=0.1, stall_seconds=stall_seconds),
+        )
+        self.assertGreater(report["faults"][BenchmarkConfig.FAULT_STALL], 0)
+        self.assertEqual(report["saved"], MESSAGES)
+        self.assertGreater(hedges_won(), before)
+        self.assertLess(report["seconds"], stall_seconds)
+
+    @override_settings(IMAP_RECONNECT_ATTEMPTS=0)
+    async def test_interrupted_sync_resumes_from_checkpoint(self) -> None:
+        """Повторная синхронизация загружает только несохраненные письма.
+
+        Синхронизация без переподключений прерывается разрывом соединения,
+        и следующая синхронизация продолжается с контрольной точки.
+        """
+        email_account = await EmailAccount.objects.acreate(
+            email=BenchmarkConfig.EMAIL, password=BenchmarkConfig.PASSWORD
+        )
+        server = FakeImapServer(
+            {INBOX: generate_mailbox(PROFILE)},
+            faults=FaultPlan(drop_rate=0.05),
+        )
+        timer = StageTimer()
+        async with server:
+            with override_settings(
+                IMAP_HOST=server.host,
+                IMAP_PORT=server.port,
+                IMAP_USE_SSL=False,
+                MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory()),
+            ):
+                with self.assertRaises(Exception):
+                    await sync_mailbox(email_account, False, FrameCollector())
+                saved = await Email.objects.acount()
+                state = await SyncState.objects.aget(
+                    email_account=email_account, folder=INBOX
+                )
+                self.assertGreater(saved, 0)
+                self.assertEqual(len(state.pending_uids), MESSAGES)
+                server.faults = FaultPlan()
+                with timer.instrument():
+                    await sync_mailbox(email_account, False, FrameCollector())
+        self.assertEqual(await Email.objects.acount(), MESSAGES)
+        self.assertEqual(timer.report()["fetch"]["calls"], MESSAGES - saved)
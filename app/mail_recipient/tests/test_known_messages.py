@@ -0,0 +1,116 @@
+"""Тесты фильтра Message-ID сохраненных писем."""
+
+from django.test import TestCase
+from email_account.models import EmailAccount
+from mail_recipient import known_messages
+from mail_recipient.known_messages import (
+    BloomFilter,
+    adopt_known_emails,
+    load_known_messages,
+)
+from mail_recipient.models import Attachment, Email
+from mail_recipient.threads import link_threads
+
+
+class BloomFilterTests(TestCase):
+    """Ответы фильтра Блума."""
+
+    def test_added_values_are_found(self) -> None:
+        """Добавленные строки всегда находятся в фильтре."""
+        bloom = BloomFilter(1000, 0.01)
+        values = [f"<{index}@test.local>" for index in range(1000)]
+        for value in values:
+            bloom.add(value)
+        self.assertTrue(all(value in bloom for value in values))
+
+    def test_false_positive_rate(self) -> None:
+        """Доля ложных срабатываний заполненного фильтра близка к заданной."""
+        bloom = BloomFilter(1000, 0.01)
+        for index in range(1000):
+            bloom.add(f"<{index}@test.local>")
+        false_positives = sum(
+            f"<{index}@other.local>" in bloom for index in range(10000)
+        )
+        self.assertLess(false_positives, 300)
+
+
+class KnownMessagesTests(TestCase):
+    """Восстановление писем папки из уже сохраненных писем."""
+
+    def setUp(self) -> None:
+        """Учетная запись с письмом во входящих."""
+        self.email_account = EmailAccount.objects.create(
+            email="known@test.local", password="password"
+        )
+        # Фильтр хранится в памяти процесса и переживает откат транзакции.
+        self.addCleanup(
+            known_messages._known_messages.pop, self.email_account.pk, None
+        )
+        self.inbox = self.save("INBOX", "<inbox@test.local>", uid=1)
+        Attachment.objects.create(
+            email=self.inbox,
+            file="attachments/report.pdf",
+            filename="report.pdf",
+            url="/media/attachments/report.pdf",
+        )
+
+    def save(self, folder: str, message_id: str, **fields) -> Email:
+        """Сохранение письма в цепочке, как при синхронизации."""
+        email = Email.objects.create(
+            email_account=self.email_account,
+            folder=folder,
+            message_id=message_id,
+            subject=message_id,
+            **fields,
+        )
+        link_threads([email])
+        return email
+
+    def test_filter_loads_emails_saved_elsewhere(self) -> None:
+        """Письма, сохраненные после построения фильтра, догружаются."""
+        load_known_messages(self.email_account.pk)
+        self.save("INBOX", "<later@test.local>")
+        known = load_known_messages(self.email_account.pk)
+        self.assertIn("<inbox@test.local>", known.filter)
+        self.assertIn("<later@test.local>", known.filter)
+
+    def test_same_folder_email_gets_new_uid(self) -> None:
+        """Письму той же папки возвращается UID без копирования."""
+        adopted, missing = adopt_known_emails(
+            self.email_account.pk, "INBOX", {7: "<inbox@test.local>"}
+        )
+        self.assertEqual((adopted, missing), ({7}, 0))
+        self.inbox.refresh_from_db()
+        self.assertEqual(self.inbox.uid, 7)
+        self.assertEqual(Email.objects.count(), 1)
+
+    def test_other_folder_email_is_copied(self) -> None:
+        """Письмо другой папки копируется с вложениями в ту же цепочку."""
+        adopted, missing = adopt_known_emails(
+            self.email_account.pk,
+            "Archive",
+            {3: "<inbox@test.local>", 4: "<unknown@test.local>"},
+        )
+        self.assertEqual((adopted, missing), ({3}, 1))
+        copy = Email.objects.get(folder="Archive")
+        self.assertEqual(copy.uid, 3)
+        self.assertEqual(copy.thread_id, self.inbox.thread_id)
+        self.assertEqual(
+            list(copy.attachments.values_list("file", flat=True)),
+            ["attachments/report.pdf"],
+        )
+
+    def test_preview_email_is_not_adopted_by_full_sync(self) -> None:
+        """Письмо, сохраненное в режиме предпросмотра, загружается заново."""
+        self.save("Sent", "<preview@test.local>", is_preview=True)
+        adopted, missing = adopt_known_emails(
+            self.email_account.pk, "Archive", {5: "<preview@test.local>"}
+        )
+        self.assertEqual((adopted, missing), (set(), 0))
+        adopted, _ = adopt_known_emails(
+            self.email_account.pk,
+            "Archive",
+            {5: "<preview@test.local>"},
+            preview=True,
+        )
+        self.assertEqual(adopted, {5})
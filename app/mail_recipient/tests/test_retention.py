@@ -0,0 +1,153 @@
+"""Тесты удаления устаревших писем и файлов вложений."""
+
+import os
+import tempfile
+import time
+
+from asgiref.sync import sync_to_async
+from benchmarks.fake_imap import FakeImapServer
+from benchmarks.mailbox_generator import MailboxProfile, generate_mailbox
+from core.constants import INBOX, BenchmarkConfig
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.test import TestCase, override_settings
+from email_account.models import EmailAccount
+from mail_recipient.imap_pool import ImapConnectionPool
+from mail_recipient.models import Attachment, Email, SyncState, Thread
+from mail_recipient.retention import (
+    RetentionReport,
+    delete_duplicate_attachments,
+    prune_folder,
+    sweep_orphan_files,
+)
+from mail_recipient.threads import link_threads
+
+
+class RetentionTests(TestCase):
+    """Удаление писем, повторов вложений и файлов без записей."""
+
+    def setUp(self) -> None:
+        """Учетная запись без писем."""
+        self.email_account = EmailAccount.objects.create(
+            email="retention@test.local", password="password"
+        )
+
+    def save(self, uid: int, **fields) -> Email:
+        """Сохранение письма папки INBOX в цепочке."""
+        email = Email.objects.create(
+            email_account=self.email_account,
+            folder=INBOX,
+            uid=uid,
+            message_id=f"<{uid}@test.local>",
+            subject="Re: Invoice",
+            **fields,
+        )
+        link_threads([email])
+        return email
+
+    def attach(self, email: Email, file: str) -> Attachment:
+        """Запись о вложении письма."""
+        return Attachment.objects.create(
+            email=email, file=file, filename=file, url="/media/" + file
+        )
+
+    async def asave(self, uid: int) -> Email:
+        """Асинхронное сохранение письма папки INBOX в цепочке."""
+        return await sync_to_async(self.save)(uid)
+
+    async def aattach(self, email: Email, file: str) -> Attachment:
+        """Асинхронное создание записи о вложении письма."""
+        return await sync_to_async(self.attach)(email, file)
+
+    async def prune(self, server_messages: int, **state) -> RetentionReport:
+        """Удаление писем, которых нет среди писем тестового сервера."""
+        report = RetentionReport()
+        state = await SyncState.objects.acreate(
+            email_account=self.email_account, folder=INBOX, **state
+        )
+        mailbox = generate_mailbox(MailboxProfile(messages=server_messages))
+        async with FakeImapServer({INBOX: mailbox}) as server:
+            with override_settings(
+                IMAP_HOST=server.host,
+                IMAP_PORT=server.port,
+                IMAP_USE_SSL=False,
+            ):
+                pool = ImapConnectionPool(self.email_account, size=1)
+                try:
+                    await prune_folder(pool, state, 2, report)
+                finally:
+                    await pool.close()
+        return report
+
+    async def test_prune_folder(self) -> None:
+        """Удаляются только письма, удаленные с сервера до поиска.
+
+        Письмо с UID больше last_uid и UID на сервере могло прийти после
+        поиска и остается. Записи о вложениях удаляются вместе с письмами, а
+        цепочка пересчитывается.
+        """
+        emails = {uid: await self.asave(uid) for uid in (1, 2, 3, 4, 9)}
+        await self.aattach(emails[3], "app/attachments/3.pdf")
+        report = await self.prune(
+            2, uidvalidity=BenchmarkConfig.UIDVALIDITY, last_uid=4
+        )
+        self.assertEqual(
+            (report.emails, report.attachments, report.skipped), (2, 1, 0)
+        )
+        self.assertEqual(
+            [uid async for uid in Email.objects.values_list("uid", flat=True)],
+            [1, 2, 9],
+        )
+        thread = await Thread.objects.aget()
+        self.assertEqual(thread.message_count, 3)
+
+    async def test_prune_folder_skips_changed_uidvalidity(self) -> None:
+        """Папка со сменившимся UIDVALIDITY пропускается."""
+        await self.asave(3)
+        report = await self.prune(
+            1, uidvalidity=BenchmarkConfig.UIDVALIDITY + 1, last_uid=3
+        )
+        self.assertEqual((report.emails, report.skipped), (0, 1))
+        self.assertTrue(await Email.objects.aexists())
+
+    def test_delete_duplicate_attachments(self) -> None:
+        """Из повторов одного файла письма остается первая запись."""
+        first, second = self.save(1), self.save(2)
+        kept = [
+            self.attach(first, "app/attachments/a.pdf"),
+            self.attach(first, "app/attachments/b.pdf"),
+            self.attach(second, "app/attachments/a.pdf"),
+        ]
+        for _ in range(3):
+            self.attach(first, "app/attachments/a.pdf")
+        self.attach(second, "app/attachments/a.pdf")
+        self.assertEqual(delete_duplicate_attachments(1), 4)
+        self.assertEqual(
+            set(Attachment.objects.values_list("pk", flat=True)),
+            {attachment.pk for attachment in kept},
+        )
+
+    def test_sweep_orphan_files(self) -> None:
+        """Удаляются только старые файлы без записей о вложениях."""
+        storage = FileSystemStorage(
+            location=self.enterContext(tempfile.TemporaryDirectory())
+        )
+        root = storage.path(settings.ATTACHMENTS_URL)
+        os.makedirs(os.path.join(root, "nested"))
+        old = time.time() - 3600
+        files = {}
+        for name in ("kept.pdf", "orphan.pdf", "nested/orphan.pdf", "new.pdf"):
+            path = os.path.join(root, name)
+            with open(path, "wb") as file:
+                file.write(b"data")
+            if name != "new.pdf":
+                os.utime(path, (old, old))
+            files[name] = path
+        self.attach(self.save(1), settings.ATTACHMENTS_URL + "kept.pdf")
+        report = RetentionReport()
+        sweep_orphan_files(2, 60, report, storage)
+        self.assertEqual((report.files, report.bytes), (2, 8))
+        self.assertEqual(
+            {name for name, path in files.items() if os.path.exists(path)},
+            {"kept.pdf", "new.pdf"},
+        )
@@ -0,0 +1,52 @@
+"""Тесты сохранения писем."""
+
+import tempfile
+
+from django.test import TestCase, override_settings
+from email_account.models import EmailAccount
+from mail_recipient.models import Attachment
+from mail_recipient.records import ParsedMessage
+from mail_recipient.save_email import save_email, save_emails
+
+
+class SaveEmailTests(TestCase):
+    """Повторное сохранение писем с вложениями."""
+
+    def setUp(self) -> None:
+        """Учетная запись и временный каталог вложений."""
+        self.email_account = EmailAccount.objects.create(
+            email="save@test.local", password="password"
+        )
+        self.enterContext(
+            override_settings(
+                MEDIA_ROOT=self.enterContext(tempfile.TemporaryDirectory())
+            )
+        )
+
+    def parsed(self) -> ParsedMessage:
+        """Разобранное письмо с одним вложением."""
+        return ParsedMessage(
+            uid=1,
+            folder="INBOX",
+            is_preview=False,
+            message_id="<save@test.local>",
+            subject="Report",
+            mail_from="sender@test.local",
+            date=None,
+            received=None,
+            text="Text",
+            attachments=[("report.pdf", b"data")],
+        )
+
+    async def test_save_email_again_keeps_attachments(self) -> None:
+        """Повторное сохранение письма не дублирует записи о вложениях."""
+        await save_email(self.parsed(), self.email_account)
+        _, attachments = await save_email(self.parsed(), self.email_account)
+        self.assertEqual(len(attachments), 1)
+        self.assertEqual(await Attachment.objects.acount(), 1)
+
+    async def test_save_emails_again_keeps_attachments(self) -> None:
+        """Повторное сохранение пакета не дублирует записи о вложениях."""
+        await save_email(self.parsed(), self.email_account)
+        await save_emails([self.parsed()], self.email_account)
+        self.assertEqual(await Attachment.objects.acount(), 1)
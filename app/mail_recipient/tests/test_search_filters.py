@@ -0,0 +1,105 @@
+"""Тесты преобразования фильтров поиска в критерии IMAP SEARCH."""
+
+import asyncio
+from email.message import EmailMessage
+from unittest import mock
+
+from benchmarks.fake_imap import FakeImapServer
+from core.constants import INBOX
+from django.test import SimpleTestCase, override_settings
+from email_account.models import EmailAccount
+from mail_recipient.fetch_emails import (
+    connect_imap,
+    search_uids,
+    select_folder,
+)
+from mail_recipient.imap_client import LiteralProtocol, close_transport
+from mail_recipient.search_filters import build_search_criteria
+
+
+def build_message(subject: str) -> bytes:
+    """Письмо с темой, закодированной по RFC 2047."""
+    message = EmailMessage()
+    message["From"] = "Иван Петров <ivan@test.local>"
+    message["Subject"] = subject
+    message.set_content("Текст письма")
+    return message.as_bytes()
+
+
+class SearchFiltersTests(SimpleTestCase):
+    """Строки в кавычках для ASCII и литералы для остальных значений."""
+
+    def test_ascii_value_is_quoted(self) -> None:
+        """Значение в ASCII отправляется строкой в кавычках."""
+        self.assertEqual(
+            build_search_criteria({"subject": 'Invoice "May"'}),
+            ["SUBJECT", '"Invoice \\"May\\""'],
+        )
+
+    def test_non_ascii_value_is_literal(self) -> None:
+        """Значение не в ASCII отправляется литералом с размером в байтах."""
+        self.assertEqual(
+            build_search_criteria({"from": "Иван", "unseen": True}),
+            ["FROM", "{8}\r\nИван", "UNSEEN"],
+        )
+
+    def test_unsafe_value_is_rejected(self) -> None:
+        """Перевод строки и NUL запрещены и в литералах."""
+        for value in ("Счет\r\nA1 LOGOUT", "Счет\0", "Invoice\n"):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    build_search_criteria({"subject": value})
+
+    async def test_literal_waits_for_continuation(self) -> None:
+        """Каждый литерал отправляется только после продолжения сервера."""
+        protocol = LiteralProtocol(asyncio.get_running_loop())
+        protocol.transport = mock.Mock()
+        criteria = build_search_criteria({"subject": "Счет", "from": "Иван"})
+        protocol.send(" ".join(["A1 UID SEARCH", *criteria]))
+        protocol._continuation(b"+ Ready")
+        protocol._continuation(b"+ Ready")
+        self.assertEqual(
+            [call.args[0] for call in protocol.transport.write.call_args_list],
+            [
+                b"A1 UID SEARCH SUBJECT {8}\r\n",
+                "Счет FROM {8}\r\n".encode(),
+                "Иван\r\n".encode(),
+            ],
+        )
+        self.assertFalse(protocol.pending_literals)
+
+    async def test_search_with_literals(self) -> None:
+        """Тестовый сервер находит письма по нескольким литералам.
+
+        Поиск проверяется без сжатия и с COMPRESS=DEFLATE, потому что
+        литералы отправляются отдельными записями в транспорт.
+        """
+        mailbox = [
+            build_message("Счет за май"),
+            build_message("Invoice"),
+            build_message("Счет за июнь"),
+        ]
+        criteria = build_search_criteria(
+            {"subject": "счет за", "from": "Петров"}
+        )
+        email_account = EmailAccount(
+            email="search@test.local", password="password"
+        )
+        for compress in (False, True):
+            with self.subTest(compress=compress):
+                async with FakeImapServer(
+                    {INBOX: mailbox}, compress=compress
+                ) as server:
+                    with override_settings(
+                        IMAP_HOST=server.host,
+                        IMAP_PORT=server.port,
+                        IMAP_USE_SSL=False,
+                        IMAP_COMPRESS=compress,
+                    ):
+                        imap = await connect_imap(email_account)
+                        try:
+                            await select_folder(imap)
+                            uids = await search_uids(imap, *criteria)
+                        finally:
+                            close_transport(imap)
+                self.assertEqual(uids, [1, 3])
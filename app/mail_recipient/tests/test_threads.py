@@ -0,0 +1,88 @@
+"""Тесты индекса цепочек писем."""
+
+from datetime import datetime, timedelta, timezone
+
+from django.test import TestCase
+from email_account.models import EmailAccount
+from mail_recipient.models import Email, Thread
+from mail_recipient.threads import link_threads
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class ThreadTests(TestCase):
+    """Добавление писем в цепочки и объединение цепочек."""
+
+    def setUp(self) -> None:
+        """Учетная запись без писем."""
+        self.email_account = EmailAccount.objects.create(
+            email="threads@test.local", password="password"
+        )
+        self.hours = 0
+
+    def save(self, message_id: str, subject: str = "Invoice", **fields):
+        """Сохранение письма на час позже предыдущего и его цепочка."""
+        self.hours += 1
+        email = Email.objects.create(
+            email_account=self.email_account,
+            folder="INBOX",
+            message_id=message_id,
+            subject=subject,
+            date=START + timedelta(hours=self.hours),
+            **fields,
+        )
+        link_threads([email])
+        return email
+
+    def test_reply_joins_thread(self) -> None:
+        """Ответ попадает в цепочку письма и становится последним."""
+        first = self.save("<a@test.local>")
+        reply = self.save(
+            "<b@test.local>", "Re: Invoice", in_reply_to="<a@test.local>"
+        )
+        thread = Thread.objects.get()
+        self.assertEqual(first.thread_id, reply.thread_id)
+        self.assertEqual(thread.message_count, 2)
+        self.assertEqual(thread.latest_email_id, reply.pk)
+
+    def test_reply_before_parent(self) -> None:
+        """Письмо, на которое уже ответили, попадает в цепочку ответа."""
+        reply = self.save("<b@test.local>", references="<a@test.local>")
+        first = self.save("<a@test.local>", "Other")
+        self.assertEqual(first.thread_id, reply.thread_id)
+        self.assertEqual(Thread.objects.get().message_count, 2)
+
+    def test_threads_merge(self) -> None:
+        """Письмо со ссылками на две цепочки объединяет их в большую."""
+        self.save("<a@test.local>", "First")
+        self.save("<b@test.local>", "Second")
+        larger = self.save(
+            "<c@test.local>", "Re: Second", in_reply_to="<b@test.local>"
+        ).thread_id
+        merged = self.save(
+            "<d@test.local>",
+            "Re: First",
+            references="<a@test.local> <b@test.local>",
+        )
+        thread = Thread.objects.get()
+        self.assertEqual(thread.pk, larger)
+        self.assertEqual(merged.thread_id, larger)
+        self.assertEqual(thread.message_count, 4)
+        self.assertEqual(thread.latest_email_id, merged.pk)
+        self.assertEqual(
+            set(Email.objects.values_list("thread", flat=True)), {larger}
+        )
+
+    def test_saving_again_keeps_count(self) -> None:
+        """Повторное сохранение письма не увеличивает цепочку."""
+        email = self.save("<a@test.local>")
+        link_threads([email])
+        self.assertEqual(Thread.objects.get().message_count, 1)
+
+    def test_subject_fallback(self) -> None:
+        """Ответ без заголовков цепочки присоединяется по теме."""
+        first = self.save("<a@test.local>")
+        reply = self.save("<b@test.local>", "RE: Invoice")
+        other = self.save("<c@test.local>")
+        self.assertEqual(first.thread_id, reply.thread_id)
+        self.assertNotEqual(first.thread_id, other.thread_id)
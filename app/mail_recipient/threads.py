@@ -0,0 +1,273 @@
+"""Модуль threads."""
+
+from datetime import datetime
+
+from core.constants import DATE, EmailConfig, ThreadConfig
+from core.db_router import aread_database
+from core.utils import normalize_subject
+from django.db import transaction
+from django.db.models import Count, F
+from email_account.models import EmailAccount
+from mail_recipient.models import Email, Thread, ThreadReference
+
+
+def is_later(date: datetime | None, latest: datetime | None) -> bool:
+    """
+    Проверка, что письмо отправлено позже последнего письма цепочки.
+
+    Аргументы:
+        date (datetime | None): Дата отправки письма.
+        latest (datetime | None): Дата последнего письма цепочки.
+
+    Возвращает:
+        bool: True, если дата письма известна и позже даты цепочки.
+    """
+    return date is not None and (latest is None or date > latest)
+
+
+def thread_message_ids(email: Email) -> list[str]:
+    """
+    Message-ID письма и писем, на которые оно ссылается.
+
+    Аргументы:
+        email (Email): Сохраненное письмо.
+
+    Возвращает:
+        list[str]: Message-ID без повторов, первым идет Message-ID письма.
+    """
+    message_ids = [email.message_id, email.in_reply_to]
+    message_ids.extend((email.references or "").split())
+    return list(dict.fromkeys(filter(None, message_ids)))
+
+
+def find_subject_thread(email: Email) -> Thread | None:
+    """
+    Поиск цепочки для ответа без заголовков In-Reply-To и References.
+
+    Некоторые почтовые клиенты не передают заголовки цепочки, поэтому
+    письмо с префиксом Re или Fwd в теме присоединяется к последней цепочке
+    с той же темой. Письма без префикса по теме не объединяются, иначе в
+    одну цепочку попадали бы разные письма с темой вроде «Счет».
+
+    Аргументы:
+        email (Email): Сохраненное письмо.
+
+    Возвращает:
+        Thread | None: Цепочка с той же темой или None.
+    """
+    subject, is_reply = normalize_subject(email.subject)
+    if not is_reply or not subject:
+        return None
+    return (
+        Thread.objects.select_for_update()
+        .filter(email_account_id=email.email_account_id, subject=subject)
+        .order_by(ThreadConfig.LATEST_DATE_DESCENDING)
+        .first()
+    )
+
+
+def merge_threads(threads: list[Thread]) -> Thread:
+    """
+    Объединение цепочек в одну.
+
+    Корнем становится цепочка с наибольшим количеством писем, поэтому
+    обновляется меньше записей (объединение по размеру). Ссылки и письма
+    остальных цепочек переносятся в корень одним запросом на таблицу, так
+    что каждая ссылка указывает сразу на корень, без промежуточных цепочек.
+
+    Аргументы:
+        threads (list[Thread]): Объединяемые цепочки, заблокированные для
+    обновления.
+
+    Возвращает:
+        Thread: Цепочка-корень с суммарным количеством писем.
+    """
+    root, *others = sorted(
+        threads, key=lambda thread: (-thread.message_count, thread.pk)
+    )
+    if not others:
+        return root
+    merged_ids = [thread.pk for thread in others]
+    ThreadReference.objects.filter(thread_id__in=merged_ids).update(
+        thread=root
+    )
+    Email.objects.filter(thread_id__in=merged_ids).update(thread=root)
+    for thread in others:
+        root.message_count += thread.message_count
+        if is_later(thread.latest_date, root.latest_date):
+            root.latest_date = thread.latest_date
+            root.latest_email_id = thread.latest_email_id
+    Thread.objects.filter(pk__in=merged_ids).delete()
+    return root
+
+
+def update_thread(email: Email) -> Thread:
+    """
+    Добавление письма в цепочку.
+
+    Message-ID письма и все Message-ID из его заголовков In-Reply-To и
+    References ищутся в таблице ThreadReference. Если они принадлежат
+    разным цепочкам, цепочки объединяются, если ни одной, письмо
+    присоединяется к цепочке по теме или начинает новую. Повторное
+    сохранение того же письма не меняет количество писем в цепочке.
+
+    Аргументы:
+        email (Email): Сохраненное письмо.
+
+    Возвращает:
+        Thread: Цепочка письма.
+    """
+    message_ids = thread_message_ids(email)
+    references = {
+        reference.message_id: reference
+        for reference in ThreadReference.objects.filter(
+            email_account_id=email.email_account_id,
+            message_id__in=message_ids,
+        )
+    }
+    threads = list(
+        Thread.objects.select_for_update().filter(
+            pk__in={reference.thread_id for reference in references.values()}
+        )
+    )
+    if not threads and len(message_ids) == 1:
+        threads = list(filter(None, [find_subject_thread(email)]))
+    thread = (
+        merge_threads(threads)
+        if threads
+        else Thread(
+            email_account_id=email.email_account_id,
+            subject=normalize_subject(email.subject)[0],
+        )
+    )
+    own = references.get(email.message_id)
+    if own is None or not own.seen:
+        thread.message_count += 1
+    if thread.latest_email_id is None or is_later(
+        email.date, thread.latest_date
+    ):
+        thread.latest_date = email.date
+        thread.latest_email = email
+    thread.save()
+    ThreadReference.objects.bulk_create(
+        [
+            ThreadReference(
+                email_account_id=email.email_account_id,
+                message_id=message_id,
+                thread=thread,
+                seen=message_id == email.message_id,
+            )
+            for message_id in message_ids
+            if message_id not in references
+        ],
+        ignore_conflicts=True,
+    )
+    if own is not None and not own.seen:
+        ThreadReference.objects.filter(pk=own.pk).update(seen=True)
+    if email.thread_id != thread.pk:
+        Email.objects.filter(pk=email.pk).update(thread=thread)
+        email.thread = thread
+    return thread
+
+
+@transaction.atomic
+def link_threads(emails: list[Email]) -> None:
+    """
+    Добавление сохраненных писем в цепочки в одной транзакции.
+
+    Аргументы:
+        emails (list[Email]): Сохраненные письма.
+    """
+    for email in emails:
+        update_thread(email)
+
+
+def refresh_threads(
+    email_account_id: int, thread_ids: set[int], message_ids: set[str]
+) -> None:
+    """
+    Обновление цепочек после удаления писем.
+
+    Message-ID удаленных писем, которых не осталось ни в одной папке, снова
+    считаются несохраненными. Количество писем цепочек пересчитывается
+    одним запросом, последнее письмо выбирается заново только у цепочек,
+    где оно было удалено, а цепочки без писем удаляются вместе со ссылками.
+    Вызывается в транзакции удаления, после которого у цепочек с удаленным
+    последним письмом latest_email равен None.
+
+    Аргументы:
+        email_account_id (int): Идентификатор учетной записи.
+        thread_ids (set[int]): Цепочки удаленных писем.
+        message_ids (set[str]): Message-ID удаленных писем.
+    """
+    remaining = Email.objects.filter(
+        email_account_id=email_account_id, message_id__in=message_ids
+    ).values(EmailConfig.MESSAGE_ID)
+    ThreadReference.objects.filter(
+        email_account_id=email_account_id,
+        message_id__in=message_ids,
+        seen=True,
+    ).exclude(message_id__in=remaining).update(seen=False)
+    counts = dict(
+        Email.objects.filter(thread_id__in=thread_ids)
+        .values_list(ThreadConfig.THREAD_ID)
+        .annotate(Count(EmailConfig.MESSAGE_ID, distinct=True))
+        .order_by()
+    )
+    threads, empty = [], []
+    for thread in Thread.objects.select_for_update().filter(pk__in=thread_ids):
+        thread.message_count = counts.get(thread.pk, 0)
+        if not thread.message_count:
+            empty.append(thread.pk)
+            continue
+        if thread.latest_email_id is None:
+            thread.latest_email = (
+                Email.objects.filter(thread_id=thread.pk)
+                .order_by(
+                    F(DATE).desc(nulls_last=True), ThreadConfig.ID_DESCENDING
+                )
+                .first()
+            )
+            thread.latest_date = thread.latest_email.date
+        threads.append(thread)
+    Thread.objects.bulk_update(
+        threads,
+        fields=(
+            ThreadConfig.MESSAGE_COUNT,
+            ThreadConfig.LATEST_EMAIL,
+            ThreadConfig.LATEST_DATE,
+        ),
+    )
+    Thread.objects.filter(pk__in=empty).delete()
+
+
+async def list_threads(
+    email_account: EmailAccount, offset: int, limit: int
+) -> list[Thread]:
+    """
+    Получение страницы цепочек учетной записи.
+
+    Цепочки упорядочены по дате последнего письма и выбираются одним
+    запросом по индексу вместе с последним письмом из реплики базы данных,
+    если она настроена.
+
+    Аргументы:
+        email_account (EmailAccount): Учетная запись электронной почты.
+        offset (int): Количество пропускаемых цепочек.
+        limit (int): Количество цепочек на странице.
+
+    Возвращает:
+        list[Thread]: Цепочки с загруженным последним письмом.
+    """
+    end = offset + limit
+    return [
+        thread
+        async for thread in Thread.objects.using(
+            await aread_database(email_account.pk)
+        )
+        .filter(email_account=email_account)
+        .select_related(ThreadConfig.LATEST_EMAIL)
+        .order_by(
+            ThreadConfig.LATEST_DATE_DESCENDING, ThreadConfig.ID_DESCENDING
+        )[offset:end]
+    ]
@@ -1,11 +1,34 @@
 """Представления для приложения Mail Recipient."""
 
 import os
+from http import HTTPStatus
 
-from core.constants import EMAIL_LIST_HTML, FILE_NOT_FOUND
+from asgiref.sync import sync_to_async
+from core.constants import (
+    CONTENT_DISPOSITION,
+    EMAIL_ACCOUNT_NOT_FOUND_ERROR_MESSAGE,
+    EMAIL_LIST_HTML,
+    FILE_NOT_FOUND,
+    ExportConfig,
+)
+from core.db_router import read_database
 from django.conf import settings
-from django.http import FileResponse, Http404
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render
+from django.utils.http import content_disposition_header
+from email_account.models import EmailAccount
+from mail_recipient.export import (
+    build_zip_layout,
+    parse_range,
+    stream_mbox,
+    stream_zip,
+)
 
 
 def email_list(request):
@@ -39,3 +62,111 @@ def download_file(request, filename):
         return FileResponse(open(file_path, "rb"), as_attachment=True)
     else:
         raise Http404(FILE_NOT_FOUND.format(filename=filename))
+
+
+async def export_mailbox(request, email):
+    """
+    Выгружает вложения или письма учетной записи одним файлом.
+
+    Параметр format выбирает ZIP-архив вложений (zip, по умолчанию) или
+    файл mbox со всеми письмами (mbox). Файл собирается на лету блоками
+    размером EXPORT_CHUNK_SIZE без временного файла на диске. Итератор
+    ответа асинхронный: синхронный итератор Django под ASGI сначала
+    целиком собирает в список.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса Django.
+        email (str): Адрес учетной записи электронной почты.
+
+    Возвращает:
+        HttpResponse: Потоковый ответ с файлом выгрузки.
+
+    Вызывает ошибку:
+        Http404: Если учетная запись не найдена.
+    """
+    accounts = EmailAccount.objects.filter(email=email)
+    # Только что созданной учетной записи может еще не быть в реплике.
+    email_account = (
+        await accounts.using(read_database()).afirst()
+        or await accounts.afirst()
+    )
+    if email_account is None:
+        raise Http404(EMAIL_ACCOUNT_NOT_FOUND_ERROR_MESSAGE)
+    export_format = request.GET.get(ExportConfig.FORMAT, ExportConfig.ZIP)
+    if export_format == ExportConfig.MBOX:
+        return StreamingHttpResponse(
+            stream_mbox(email_account),
+            content_type=ExportConfig.MBOX_CONTENT_TYPE,
+            headers={
+                ExportConfig.ACCEPT_RANGES: ExportConfig.NONE,
+                CONTENT_DISPOSITION: content_disposition_header(
+                    True, ExportConfig.MBOX_FILENAME.format(email=email)
+                ),
+            },
+        )
+    if export_format != ExportConfig.ZIP:
+        return HttpResponseBadRequest(
+            ExportConfig.FORMAT_INVALID_ERROR_MESSAGE.format(
+                format=export_format
+            )
+        )
+    return await export_zip(request, email_account)
+
+
+async def export_zip(request, email_account):
+    """
+    Выгружает архив вложений учетной записи с поддержкой докачки.
+
+    Размер архива известен заранее, поэтому ответ содержит Content-Length,
+    а запрос с заголовком Range получает ответ 206 с запрошенным
+    диапазоном. Если архив изменился после начала скачивания, ETag не
+    совпадет с заголовком If-Range, и клиент получит архив целиком.
+
+    Аргументы:
+        request (HttpRequest): Объект запроса Django.
+        email_account (EmailAccount): Учетная запись электронной почты.
+
+    Возвращает:
+        HttpResponse: Потоковый ответ с архивом или его частью.
+    """
+    layout = await sync_to_async(build_zip_layout)(email_account)
+    if_range = request.headers.get(ExportConfig.IF_RANGE)
+    byte_range = None
+    if if_range is None or if_range == layout.etag:
+        try:
+            byte_range = parse_range(
+                request.headers.get(ExportConfig.RANGE), layout.length
+            )
+        except ValueError:
+            return HttpResponse(
+                status=HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={
+                    ExportConfig.CONTENT_RANGE: (
+                        ExportConfig.CONTENT_RANGE_UNSATISFIED_FORMAT.format(
+                            length=layout.length
+                        )
+                    )
+                },
+            )
+    start, end = byte_range or (0, layout.length - 1)
+    response = StreamingHttpResponse(
+        stream_zip(layout, start, end),
+        status=HTTPStatus.PARTIAL_CONTENT if byte_range else HTTPStatus.OK,
+        content_type=ExportConfig.ZIP_CONTENT_TYPE,
+        headers={
+            ExportConfig.ACCEPT_RANGES: ExportConfig.BYTES,
+            ExportConfig.CONTENT_LENGTH: end - start + 1,
+            ExportConfig.ETAG: layout.etag,
+            CONTENT_DISPOSITION: content_disposition_header(
+                True,
+                ExportConfig.ZIP_FILENAME.format(email=email_account.email),
+            ),
+        },
+    )
+    if byte_range:
+        response[ExportConfig.CONTENT_RANGE] = (
+            ExportConfig.CONTENT_RANGE_FORMAT.format(
+                start=start, end=end, length=layout.length
+            )
+        )
+    return response
@@ -0,0 +1,454 @@
+"""Модуль zip_stream."""
+
+import asyncio
+import hashlib
+import struct
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator
+
+from core.constants import ExportConfig
+
+LOCAL_HEADER = struct.Struct("<4sHHHHHIIIHH")
+DATA_DESCRIPTOR = struct.Struct("<4sIII")
+DATA_DESCRIPTOR_ZIP64 = struct.Struct("<4sIQQ")
+CENTRAL_HEADER = struct.Struct("<4sHHHHHHIIIHHHHHII")
+END_OF_CENTRAL_DIRECTORY = struct.Struct("<4sHHHHIIH")
+ZIP64_END_OF_CENTRAL_DIRECTORY = struct.Struct("<4sQHHIIQQQQ")
+ZIP64_END_LOCATOR = struct.Struct("<4sIQI")
+ZIP64_EXTRA_HEADER = struct.Struct("<HH")
+
+LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+DATA_DESCRIPTOR_SIGNATURE = b"PK\x07\x08"
+CENTRAL_HEADER_SIGNATURE = b"PK\x01\x02"
+END_OF_CENTRAL_DIRECTORY_SIGNATURE = b"PK\x05\x06"
+ZIP64_END_OF_CENTRAL_DIRECTORY_SIGNATURE = b"PK\x06\x06"
+ZIP64_END_LOCATOR_SIGNATURE = b"PK\x06\x07"
+
+# Бит 3 — CRC и размеры записаны в дескрипторе после данных,
+# бит 11 — имена файлов в UTF-8.
+FLAGS = 0x0808
+STORED = 0
+VERSION = 20
+VERSION_ZIP64 = 45
+ZIP64_EXTRA_ID = 0x0001
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP64_COUNT_LIMIT = 0xFFFF
+DOS_EPOCH = datetime(1980, 1, 1)
+
+
+@dataclass(slots=True)
+class ZipEntry:
+    """
+    Файл архива.
+
+    Атрибуты:
+        name (str): Имя файла в архиве.
+        path (str): Путь к файлу в хранилище.
+        size (int): Размер файла в байтах.
+        modified (datetime): Дата изменения файла.
+        crc32 (int | None): Контрольная сумма файла, если она уже известна.
+        offset (int): Смещение локального заголовка файла в архиве.
+        crc_computed (bool): Вычислена ли контрольная сумма при выгрузке.
+    """
+
+    name: str
+    path: str
+    size: int
+    modified: datetime
+    crc32: int | None = None
+    offset: int = 0
+    crc_computed: bool = False
+
+    @property
+    def is_zip64(self) -> bool:
+        """Требует ли размер файла расширения ZIP64."""
+        return self.size >= ZIP64_LIMIT
+
+
+def dos_datetime(value: datetime) -> tuple[int, int]:
+    """
+    Преобразование даты в формат MS-DOS, принятый в ZIP.
+
+    Аргументы:
+        value (datetime): Дата.
+
+    Возвращает:
+        tuple[int, int]: Время и дата в формате MS-DOS.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    value = max(value, DOS_EPOCH)
+    return (
+        value.hour << 11 | value.minute << 5 | value.second // 2,
+        (value.year - 1980) << 9 | value.month << 5 | value.day,
+    )
+
+
+def clip(data: bytes, position: int, start: int, end: int) -> bytes:
+    """
+    Часть блока, попадающая в диапазон байт архива.
+
+    Аргументы:
+        data (bytes): Блок архива.
+        position (int): Смещение блока в архиве.
+        start (int): Первый байт диапазона.
+        end (int): Последний байт диапазона включительно.
+
+    Возвращает:
+        bytes: Часть блока внутри диапазона, возможно пустая.
+    """
+    first = max(start - position, 0)
+    last = max(end + 1 - position, 0)
+    return data[first:last]
+
+
+class ZipLayout:
+    """
+    Потоковый ZIP-архив с заранее известной раскладкой байт.
+
+    Файлы записываются без сжатия с дескриптором данных, поэтому положение
+    каждого байта архива определяется только именами и размерами файлов.
+    Это позволяет заранее указать Content-Length и отдать любой диапазон
+    байт без временного архива. Контрольные суммы нужны только для
+    дескрипторов и центрального каталога: они вычисляются при чтении файла
+    или, если файл в запрошенный диапазон не попал, отдельным проходом по
+    нему. Для архивов больше 4 ГБ используется расширение ZIP64.
+
+    Атрибуты:
+        entries (list[ZipEntry]): Файлы архива.
+        storage (Storage): Хранилище файлов Django.
+        chunk_size (int): Размер читаемого блока в байтах.
+        central_directory_offset (int): Смещение центрального каталога.
+        central_directory_size (int): Размер центрального каталога.
+        length (int): Размер архива в байтах.
+        etag (str): Сильный ETag, который меняется вместе с раскладкой.
+    """
+
+    def __init__(
+        self, entries: list[ZipEntry], storage: Any, chunk_size: int
+    ) -> None:
+        """
+        Вычисление раскладки архива.
+
+        Аргументы:
+            entries (list[ZipEntry]): Файлы архива.
+            storage (Storage): Хранилище файлов Django.
+            chunk_size (int): Размер читаемого блока в байтах.
+        """
+        self.entries = entries
+        self.storage = storage
+        self.chunk_size = chunk_size
+        digest = hashlib.sha1()
+        offset = 0
+        for entry in entries:
+            entry.offset = offset
+            offset += (
+                len(self.local_header(entry))
+                + entry.size
+                + self.descriptor_size(entry)
+            )
+            digest.update(
+                ExportConfig.ETAG_ENTRY_FORMAT.format(
+                    name=entry.name,
+                    size=entry.size,
+                    modified=entry.modified.timestamp(),
+                ).encode()
+            )
+        self.central_directory_offset = offset
+        self.central_directory_size = sum(
+            len(self.central_header(entry)) for entry in entries
+        )
+        self.length = (
+            self.central_directory_offset
+            + self.central_directory_size
+            + len(self.end_records())
+        )
+        self.etag = ExportConfig.ETAG_FORMAT.format(digest=digest.hexdigest())
+
+    @staticmethod
+    def descriptor_size(entry: ZipEntry) -> int:
+        """
+        Размер дескриптора данных файла.
+
+        Аргументы:
+            entry (ZipEntry): Файл архива.
+
+        Возвращает:
+            int: Размер дескриптора в байтах.
+        """
+        if entry.is_zip64:
+            return DATA_DESCRIPTOR_ZIP64.size
+        return DATA_DESCRIPTOR.size
+
+    def local_header(self, entry: ZipEntry) -> bytes:
+        """
+        Локальный заголовок файла.
+
+        Аргументы:
+            entry (ZipEntry): Файл архива.
+
+        Возвращает:
+            bytes: Заголовок с именем файла.
+        """
+        name = entry.name.encode()
+        extra = b""
+        size = 0
+        if entry.is_zip64:
+            extra = ZIP64_EXTRA_HEADER.pack(ZIP64_EXTRA_ID, 16) + bytes(16)
+            size = ZIP64_LIMIT
+        time, date = dos_datetime(entry.modified)
+        return (
+            LOCAL_HEADER.pack(
+                LOCAL_HEADER_SIGNATURE,
+                VERSION_ZIP64 if entry.is_zip64 else VERSION,
+                FLAGS,
+                STORED,
+                time,
+                date,
+                0,
+                size,
+                size,
+                len(name),
+                len(extra),
+            )
+            + name
+            + extra
+        )
+
+    def data_descriptor(self, entry: ZipEntry) -> bytes:
+        """
+        Дескриптор данных файла с контрольной суммой и размерами.
+
+        Аргументы:
+            entry (ZipEntry): Файл архива с известной контрольной суммой.
+
+        Возвращает:
+            bytes: Дескриптор данных.
+        """
+        descriptor = (
+            DATA_DESCRIPTOR_ZIP64 if entry.is_zip64 else DATA_DESCRIPTOR
+        )
+        return descriptor.pack(
+            DATA_DESCRIPTOR_SIGNATURE, entry.crc32 or 0, entry.size, entry.size
+        )
+
+    def central_header(self, entry: ZipEntry) -> bytes:
+        """
+        Заголовок файла в центральном каталоге.
+
+        Аргументы:
+            entry (ZipEntry): Файл архива.
+
+        Возвращает:
+            bytes: Заголовок с именем файла.
+        """
+        name = entry.name.encode()
+        zip64_fields = []
+        size = entry.size
+        offset = entry.offset
+        if entry.is_zip64:
+            zip64_fields += [entry.size, entry.size]
+            size = ZIP64_LIMIT
+        if entry.offset >= ZIP64_LIMIT:
+            zip64_fields.append(entry.offset)
+            offset = ZIP64_LIMIT
+        extra = b""
+        if zip64_fields:
+            extra = ZIP64_EXTRA_HEADER.pack(
+                ZIP64_EXTRA_ID, 8 * len(zip64_fields)
+            ) + struct.pack(f"<{len(zip64_fields)}Q", *zip64_fields)
+        version = VERSION_ZIP64 if zip64_fields else VERSION
+        time, date = dos_datetime(entry.modified)
+        return (
+            CENTRAL_HEADER.pack(
+                CENTRAL_HEADER_SIGNATURE,
+                version,
+                version,
+                FLAGS,
+                STORED,
+                time,
+                date,
+                entry.crc32 or 0,
+                size,
+                size,
+                len(name),
+                len(extra),
+                0,
+                0,
+                0,
+                0,
+                offset,
+            )
+            + name
+            + extra
+        )
+
+    def end_records(self) -> bytes:
+        """
+        Записи конца центрального каталога.
+
+        Возвращает:
+            bytes: Запись конца каталога, при необходимости вместе с записью
+        и указателем ZIP64.
+        """
+        count = len(self.entries)
+        offset = self.central_directory_offset
+        size = self.central_directory_size
+        records = b""
+        if (
+            count >= ZIP64_COUNT_LIMIT
+            or offset >= ZIP64_LIMIT
+            or size >= ZIP64_LIMIT
+        ):
+            records = ZIP64_END_OF_CENTRAL_DIRECTORY.pack(
+                ZIP64_END_OF_CENTRAL_DIRECTORY_SIGNATURE,
+                ZIP64_END_OF_CENTRAL_DIRECTORY.size - 12,
+                VERSION_ZIP64,
+                VERSION_ZIP64,
+                0,
+                0,
+                count,
+                count,
+                size,
+                offset,
+            ) + ZIP64_END_LOCATOR.pack(
+                ZIP64_END_LOCATOR_SIGNATURE, 0, offset + size, 1
+            )
+            count = min(count, ZIP64_COUNT_LIMIT)
+            offset = min(offset, ZIP64_LIMIT)
+            size = min(size, ZIP64_LIMIT)
+        return records + END_OF_CENTRAL_DIRECTORY.pack(
+            END_OF_CENTRAL_DIRECTORY_SIGNATURE,
+            0,
+            0,
+            count,
+            count,
+            size,
+            offset,
+            0,
+        )
+
+    async def read_data(
+        self, entry: ZipEntry, start: int, end: int
+    ) -> AsyncIterator[bytes]:
+        """
+        Чтение диапазона байт файла блоками.
+
+        Если файл читается целиком, попутно вычисляется его контрольная
+        сумма.
+
+        Аргументы:
+            entry (ZipEntry): Файл архива.
+            start (int): Первый байт диапазона в файле.
+            end (int): Байт после конца диапазона в файле.
+
+        Возвращает:
+            AsyncIterator[bytes]: Блоки файла не больше chunk_size.
+
+        Вызывает ошибку:
+            OSError: Если файл изменился или стал короче после вычисления
+        раскладки архива.
+        """
+        compute_crc = entry.crc32 is None and start == 0 and end == entry.size
+        crc = 0
+        file = await asyncio.to_thread(self.storage.open, entry.path, "rb")
+        try:
+            await asyncio.to_thread(file.seek, start)
+            position = start
+            while position < end:
+                chunk = await asyncio.to_thread(
+                    file.read, min(self.chunk_size, end - position)
+                )
+                if not chunk:
+                    raise OSError(
+                        ExportConfig.FILE_CHANGED_ERROR_MESSAGE.format(
+                            path=entry.path
+                        )
+                    )
+                if compute_crc:
+                    crc = zlib.crc32(chunk, crc)
+                position += len(chunk)
+                yield chunk
+        finally:
+            await asyncio.to_thread(file.close)
+        if compute_crc:
+            entry.crc32 = crc
+            entry.crc_computed = True
+
+    async def ensure_crc(self, entry: ZipEntry) -> None:
+        """
+        Вычисление контрольной суммы файла, если она неизвестна.
+
+        Аргументы:
+            entry (ZipEntry): Файл архива.
+        """
+        if entry.crc32 is not None:
+            return
+        async for _ in self.read_data(entry, 0, entry.size):
+            pass
+
+    async def stream_entry(
+        self, entry: ZipEntry, start: int, end: int
+    ) -> AsyncIterator[bytes]:
+        """
+        Локальный заголовок, данные и дескриптор одного файла в диапазоне.
+
+        Аргументы:
+            entry (ZipEntry): Файл архива.
+            start (int): Первый байт диапазона архива.
+            end (int): Последний байт диапазона архива включительно.
+
+        Возвращает:
+            AsyncIterator[bytes]: Части файла внутри диапазона.
+        """
+        header = self.local_header(entry)
+        yield clip(header, entry.offset, start, end)
+        data_offset = entry.offset + len(header)
+        data_start = max(start - data_offset, 0)
+        data_end = min(end + 1 - data_offset, entry.size)
+        if data_start < data_end:
+            async for chunk in self.read_data(entry, data_start, data_end):
+                yield chunk
+        descriptor_offset = data_offset + entry.size
+        if descriptor_offset <= end:
+            await self.ensure_crc(entry)
+            yield clip(
+                self.data_descriptor(entry), descriptor_offset, start, end
+            )
+
+    async def stream(self, start: int, end: int) -> AsyncIterator[bytes]:
+        """
+        Байты архива в диапазоне от start до end включительно.
+
+        Аргументы:
+            start (int): Первый байт диапазона.
+            end (int): Последний байт диапазона включительно.
+
+        Возвращает:
+            AsyncIterator[bytes]: Части архива, каждая не больше chunk_size.
+        """
+        for entry in self.entries:
+            entry_end = (
+                entry.offset
+                + len(self.local_header(entry))
+                + entry.size
+                + self.descriptor_size(entry)
+            )
+            if entry_end <= start:
+                continue
+            if entry.offset > end:
+                break
+            async for chunk in self.stream_entry(entry, start, end):
+                yield chunk
+        if end < self.central_directory_offset:
+            return
+        position = self.central_directory_offset
+        for entry in self.entries:
+            length = len(self.central_header(entry))
+            if position + length > start:
+                await self.ensure_crc(entry)
+                yield clip(self.central_header(entry), position, start, end)
+            position += length
+        yield clip(self.end_records(), position, start, end)
@@ -1,4 +1,7 @@
 let ws;
+// Сколько писем клиент готов принять, не подтверждая их обработку
+const CREDIT_WINDOW = 100;
+const BYTE_UNITS = ["Б", "КБ", "МБ", "ГБ"];
 $(document).ready(function() {
     const urlParams = new URLSearchParams(window.location.search);
     const email = urlParams.get("email");
@@ -8,22 +11,35 @@ $(document).ready(function() {
         return;
     }
 
+    const exportUrl = `/export/${encodeURIComponent(email)}/`;
+    $("#export-attachments").attr("href", `${exportUrl}?format=zip`);
+    $("#export-mbox").attr("href", `${exportUrl}?format=mbox`);
+
     const webSocketProtocol = window.location.protocol.includes('https') ? 'wss' : 'ws';
     ws = new WebSocket(`${webSocketProtocol}://${window.location.host}/ws/email_list/`);
     let totalEmails = 0;
     let loadedEmails = 0;
     let checkedEmails = 0;
+    let totalBytes = 0;
+    let checkedBytes = 0;
     let loadingStarted = false;
+    let unacknowledgedEmails = 0;
+    const emailRows = new Map();
 
     ws.onopen = () => {
         console.log("WebSocket connection opened");
-        ws.send(JSON.stringify({ action: "fetch_emails", email: email }));
+        ws.send(JSON.stringify({
+            action: "fetch_emails",
+            email: email,
+            credits: CREDIT_WINDOW,
+        }));
     };
 
     ws.onmessage = (event) => {
         const data = JSON.parse(event.data);
         if (data.type === "total_emails") {
             totalEmails = data.total;
+            totalBytes = data.total_bytes || 0;
             updateProgressBar(loadedEmails, checkedEmails, totalEmails);
         } else if (data.type === "new_email") {
             loadingStarted = true;
@@ -59,11 +75,19 @@ $(document).ready(function() {
                 attachmentsCell.text("Нет вложений");
             }
             row.append(attachmentsCell);
-            $("#email-table tbody").append(row);
-            loadedEmails++;
+            const key = `${email.folder}\n${email["Message-ID"]}`;
+            if (emailRows.has(key)) {
+                emailRows.get(key).replaceWith(row);
+            } else {
+                $("#email-table tbody").append(row);
+                loadedEmails++;
+            }
+            emailRows.set(key, row);
             updateProgressBar(loadedEmails, checkedEmails, totalEmails);
+            acknowledgeEmail();
         } else if (data.type === "progress") {
             checkedEmails = data.checked;
+            checkedBytes = data.checked_bytes || 0;
             updateProgressBar(loadedEmails, checkedEmails, totalEmails);
         } else if (data.type === "error") {
             $("#error-message").text(data.message);
@@ -78,18 +102,44 @@ $(document).ready(function() {
         console.log("WebSocket connection closed");
     };
 
+    function acknowledgeEmail() {
+        unacknowledgedEmails++;
+        if (unacknowledgedEmails >= CREDIT_WINDOW / 2) {
+            ws.send(JSON.stringify({
+                action: "credit",
+                credits: unacknowledgedEmails,
+            }));
+            unacknowledgedEmails = 0;
+        }
+    }
+
     function updateProgressBar(loaded, checked, total) {
+        // Крупные письма загружаются дольше, поэтому полоса заполняется по
+        // объему писем, если сервер его передал
+        const bytes = totalBytes
+            ? ` (${formatBytes(checkedBytes)}/${formatBytes(totalBytes)})`
+            : "";
         if (loadingStarted) {
+            const share = totalBytes ? checkedBytes / totalBytes : loaded / total;
             $("#progress-bar").removeClass("checking");
-            $("#progress-bar").width(`${(loaded / total) * 100}%`);
-            $("#progress-bar").text(`Загружено писем: ${total - loaded}`);
+            $("#progress-bar").width(`${share * 100}%`);
+            $("#progress-bar").text(`Загружено писем: ${total - loaded}${bytes}`);
         } else {
             $("#progress-bar").addClass("checking");
-            $("#progress-bar").text(`Проверено писем: ${checked}/${total}`);
+            $("#progress-bar").text(`Проверено писем: ${checked}/${total}${bytes}`);
         }
     }
 });
 
+function formatBytes(bytes) {
+    let unit = 0;
+    while (bytes >= 1024 && unit < BYTE_UNITS.length - 1) {
+        bytes /= 1024;
+        unit++;
+    }
+    return `${bytes.toFixed(unit ? 1 : 0)} ${BYTE_UNITS[unit]}`;
+}
+
 function closeWebSocketAndNavigate() {
     if (ws && ws.readyState === WebSocket.OPEN) {
         ws.send(JSON.stringify({ action: "close_connection" }));